@@ -5,23 +5,44 @@ This agent listens for dispatch logs on Redis pub/sub and handles:
 1. Logging to Supabase (PostgreSQL) database
 2. Sending notifications to callers via Vapi
 3. Managing communication workflows
+
+While the agent runs, incident log rows are written behind: they are queued
+in a bounded BatchWriter and inserted as one PostgREST array per batch, so
+the listener never waits on a per-row HTTP round trip. Writer stats (batch
+sizes, flush latency, backpressure) are stored in Redis under
+COMMS_METRICS_KEY for the API's /metrics/comms endpoint.
+
+Work that must survive a slow or failed downstream goes through a local
+SQLite outbox (app/database/outbox.py). Notifications are recorded there
+and sent by the outbox's replay task, so the listener never waits on Vapi.
+A failed log batch is recorded for replay instead of being dropped, and
+the writer counts it as deferred rather than failed. Every log row carries
+an idempotency key, and inserts ignore rows whose key is already stored, so
+replays and redelivered messages are written once. The key comes from the
+message's ID (the Router Agent stamps one on every log it publishes), or
+else from its content including its timestamp.
 """
 
 import asyncio
+import hashlib
 import json
 import logging
 import redis
 import sys
 import os
-from typing import Dict, Any, Optional
+import time
+import uuid
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
-import httpx
 
 # Add backend directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from uagents import Agent, Context, Model
+from app.core.batch_writer import DEFERRED, BatchWriter
 from app.core.config import settings
+from app.core.http_client import http_clients
+from app.database.outbox import Outbox
 from services.vapi_service import vapi_service
 
 # Configure logging
@@ -31,6 +52,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+COMMS_METRICS_KEY = "metrics:comms"
+METRICS_INTERVAL_SECONDS = 5.0
+METRICS_TTL_SECONDS = 60
+
+DEFAULT_OUTBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "comms_outbox.db")
+
+# Outbox entry kinds
+INCIDENT_LOGS = "incident_logs"
+NOTIFICATION = "notification"
+
+
+def idempotency_key(log_data: Dict[str, Any]) -> str:
+    """
+    Stable key for a log message, so a retried or redelivered message is written once.
+
+    Uses the message's ID when it has one. Otherwise the key hashes the
+    content, which must then include a timestamp: two identical events at
+    different times are different rows. A message with neither is given a
+    random message_id, so it is still written (and its row and notification
+    share the key), but a redelivery of it cannot be recognised.
+    """
+    for field in ('idempotency_key', 'message_id'):
+        if log_data.get(field):
+            return str(log_data[field])
+    if not log_data.get('timestamp'):
+        logger.warning(f"⚠️ Log message {log_data.get('action', 'unknown')} has no message_id or timestamp; redeliveries cannot be deduplicated")
+        log_data['message_id'] = uuid.uuid4().hex
+        return log_data['message_id']
+    return hashlib.sha1(json.dumps(log_data, sort_keys=True, default=str).encode()).hexdigest()
+
 # Message models for uAgent communication
 class LogMessage(Model):
     """Message containing log data to be processed"""
@@ -72,7 +123,7 @@ comms_agent = Agent(
 class CommsAgent:
     """Handles communications and logging for the dispatch system"""
     
-    def __init__(self, redis_url: str = None, supabase_url: str = None, supabase_key: str = None):
+    def __init__(self, redis_url: str = None, supabase_url: str = None, supabase_key: str = None, outbox_path: str = None):
         """Initialize Comms Agent"""
         self.redis_url = redis_url or settings.REDIS_URL
         self.supabase_url = supabase_url or settings.SUPABASE_URL
@@ -89,8 +140,29 @@ class CommsAgent:
         self.supabase_headers = {
             "apikey": self.supabase_key,
             "Authorization": f"Bearer {self.supabase_key}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "Prefer": "return=minimal,resolution=ignore-duplicates"
         }
+        
+        # Write-behind buffer for incident log rows, started with the listener
+        self.log_writer = BatchWriter(
+            self.flush_incident_logs,
+            max_batch=settings.COMMS_LOG_BATCH_SIZE,
+            max_delay=settings.COMMS_LOG_FLUSH_MS / 1000,
+            max_queue=settings.COMMS_LOG_QUEUE_SIZE,
+            name="incident_logs"
+        )
+        self.metrics_published_at = 0.0
+        
+        # Durable outbox for failed log batches and notifications, started with the listener
+        self.outbox = Outbox(
+            outbox_path or settings.COMMS_OUTBOX_PATH or DEFAULT_OUTBOX_PATH,
+            base_delay=settings.COMMS_OUTBOX_BASE_DELAY_SECONDS,
+            max_delay=settings.COMMS_OUTBOX_MAX_DELAY_SECONDS,
+            max_attempts=settings.COMMS_OUTBOX_MAX_ATTEMPTS
+        )
+        self.outbox.register(INCIDENT_LOGS, self.insert_incident_logs)
+        self.outbox.register(NOTIFICATION, self.send_notification)
     
     async def connect(self):
         """Establish Redis connection"""
@@ -106,44 +178,71 @@ class CommsAgent:
             logger.error(f"❌ Failed to connect to Redis: {e}")
             raise
     
+    def build_log_entry(self, log_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Row for public.incident_logs from a log message"""
+        return {
+            "idempotency_key": idempotency_key(log_data),
+            "timestamp": log_data.get('timestamp', datetime.utcnow().isoformat()),
+            "action": log_data.get('action', 'unknown'),
+            "case_id": log_data.get('case_id'),
+            "unit_id": log_data.get('unit_id'),
+            "unit_type": log_data.get('unit_type'),
+            "distance_km": log_data.get('distance_km'),
+            "incident_location": log_data.get('incident_location'),
+            "unit_location": json.dumps(log_data.get('unit_location', [])),
+            "incident_data": json.dumps(log_data.get('incident_data', {})),
+            "error": log_data.get('error'),
+            "created_at": datetime.utcnow().isoformat()
+        }
+    
+    async def insert_incident_logs(self, rows: List[Dict[str, Any]]) -> bool:
+        """Insert rows into Supabase in one request (PostgREST accepts a JSON array)"""
+        try:
+            # Insert into Supabase (assumes a table public.incident_logs exists via PostgREST)
+            response = await http_clients.post(
+                f"{self.supabase_url}/rest/v1/incident_logs?on_conflict=idempotency_key",
+                headers=self.supabase_headers,
+                json=rows,
+                timeout=10.0
+            )
+                
+            if response.status_code in [200, 201]:
+                logger.info(f"✅ Logged {len(rows)} entries to Supabase")
+                return True
+            else:
+                logger.error(f"❌ Supabase log failed: {response.status_code} - {response.text}")
+                return False
+                    
+        except Exception as e:
+            logger.error(f"❌ Error logging to Supabase: {e}")
+            return False
+    
+    async def flush_incident_logs(self, rows: List[Dict[str, Any]]) -> Union[bool, str]:
+        """Insert a batch; a failed batch is recorded in the outbox for replay and reported as DEFERRED"""
+        if await self.insert_incident_logs(rows):
+            return True
+        if self.outbox.running:
+            batch_key = hashlib.sha1("".join(row["idempotency_key"] for row in rows).encode()).hexdigest()
+            await self.outbox.add(INCIDENT_LOGS, f"{INCIDENT_LOGS}:{batch_key}", rows)
+            logger.warning(f"⚠️ Recorded {len(rows)} log entries in the outbox for replay")
+            return DEFERRED
+        return False
+    
     async def log_to_supabase(self, log_data: Dict[str, Any]) -> bool:
-        """Log an entry to Supabase database"""
+        """Log an entry to Supabase: queued for a batch while the writer runs, otherwise inserted now"""
         try:
             if not self.supabase_url or not self.supabase_key:
                 logger.warning("⚠️ Supabase not configured - logging to console only")
                 logger.info(f"📝 [MOCK LOG] {log_data}")
                 return True
             
-            # Prepare log entry for database
-            log_entry = {
-                "timestamp": log_data.get('timestamp', datetime.utcnow().isoformat()),
-                "action": log_data.get('action', 'unknown'),
-                "case_id": log_data.get('case_id'),
-                "unit_id": log_data.get('unit_id'),
-                "unit_type": log_data.get('unit_type'),
-                "distance_km": log_data.get('distance_km'),
-                "incident_location": log_data.get('incident_location'),
-                "unit_location": json.dumps(log_data.get('unit_location', [])),
-                "incident_data": json.dumps(log_data.get('incident_data', {})),
-                "error": log_data.get('error'),
-                "created_at": datetime.utcnow().isoformat()
-            }
+            log_entry = self.build_log_entry(log_data)
+            if self.log_writer.running:
+                # Waits only when the queue is full (backpressure)
+                await self.log_writer.put(log_entry)
+                return True
             
-            # Insert into Supabase (assumes a table public.incident_logs exists via PostgREST)
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.supabase_url}/rest/v1/incident_logs",
-                    headers=self.supabase_headers,
-                    json=log_entry,
-                    timeout=10.0
-                )
-                
-                if response.status_code in [200, 201]:
-                    logger.info(f"✅ Logged to Supabase: {log_data.get('action', 'unknown')}")
-                    return True
-                else:
-                    logger.error(f"❌ Supabase log failed: {response.status_code} - {response.text}")
-                    return False
+            return await self.insert_incident_logs([log_entry])
                     
         except Exception as e:
             logger.error(f"❌ Error logging to Supabase: {e}")
@@ -228,6 +327,14 @@ class CommsAgent:
             logger.error(f"❌ Error sending notification: {e}")
             return False
     
+    async def queue_notification(self, log_data: Dict[str, Any]) -> bool:
+        """Record a notification in the outbox; returns False when there is no one to notify or it is already recorded"""
+        callback_number = log_data.get('incident_data', {}).get('incident_fact', {}).get('callback_number', '')
+        if not callback_number:
+            logger.warning("⚠️ No callback number available for notification")
+            return False
+        return await self.outbox.add(NOTIFICATION, f"{NOTIFICATION}:{idempotency_key(log_data)}", log_data)
+    
     async def process_log(self, log_data: Dict[str, Any]) -> None:
         """Process a log entry from the log queue"""
         try:
@@ -240,7 +347,13 @@ class CommsAgent:
                 logger.warning("⚠️ Failed to log to Supabase, but continuing...")
             
             # Check if notification should be sent
-            if await self.should_send_notification(log_data):
+            if not await self.should_send_notification(log_data):
+                logger.info("ℹ️ No notification needed for this log entry")
+            elif self.outbox.running:
+                # Sent by the outbox's replay task, so a slow Vapi never holds the listener
+                if await self.queue_notification(log_data):
+                    logger.info("📬 Notification queued in the outbox")
+            else:
                 # Send notification
                 notification_success = await self.send_notification(log_data)
                 
@@ -248,8 +361,6 @@ class CommsAgent:
                     logger.info("✅ Notification sent successfully")
                 else:
                     logger.warning("⚠️ Notification failed, but continuing...")
-            else:
-                logger.info("ℹ️ No notification needed for this log entry")
                 
         except Exception as e:
             logger.error(f"❌ Error processing log: {e}")
@@ -267,6 +378,7 @@ class CommsAgent:
             
             # Listen for messages
             while self.running:
+                await self.publish_metrics()
                 try:
                     message = await asyncio.get_event_loop().run_in_executor(
                         None,
@@ -298,6 +410,28 @@ class CommsAgent:
             logger.error(f"❌ Error in log listener: {e}")
             raise
     
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "log_writer": self.log_writer.stats(),
+            "outbox": self.outbox.stats(),
+            "updated_at": datetime.utcnow().isoformat()
+        }
+    
+    async def publish_metrics(self, force: bool = False) -> None:
+        """Store stats in Redis for the API, at most every METRICS_INTERVAL_SECONDS"""
+        now = time.monotonic()
+        if not self.redis_client or (not force and now - self.metrics_published_at < METRICS_INTERVAL_SECONDS):
+            return
+        self.metrics_published_at = now
+        try:
+            payload = json.dumps(self.stats())
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.redis_client.set(COMMS_METRICS_KEY, payload, ex=METRICS_TTL_SECONDS)
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to publish Comms Agent metrics: {e}")
+    
     async def start(self) -> None:
         """Start the Comms Agent"""
         try:
@@ -308,6 +442,8 @@ class CommsAgent:
             
             # Set running flag
             self.running = True
+            self.outbox.start()
+            self.log_writer.start()
             
             # Start listening for logs
             await self.listen_for_logs()
@@ -325,6 +461,11 @@ class CommsAgent:
         logger.info("🛑 Stopping Comms Agent...")
         self.running = False
         
+        # Write out queued log rows before disconnecting; failed batches stay in the outbox
+        await self.log_writer.stop()
+        await self.outbox.stop()
+        await self.publish_metrics(force=True)
+        
         if self.pubsub:
             await asyncio.get_event_loop().run_in_executor(
                 None,
@@ -356,6 +497,7 @@ async def handle_log_message(ctx: Context, sender: str, msg: LogMessage):
             'details': msg.details,
             'incident_data': msg.incident_data
         })
+        await comms_instance.publish_metrics()
         
         # Send confirmation
         await ctx.send(sender, LogProcessed(
@@ -403,12 +545,23 @@ async def startup(ctx: Context):
         logger.info("✅ Comms Agent connected to Redis")
     except Exception as e:
         logger.error(f"❌ Comms Agent Redis connection failed: {e}")
+    
+    # Batch incident log writes and replay the outbox while the agent runs
+    comms_instance.outbox.start()
+    comms_instance.log_writer.start()
 
 @comms_agent.on_event("shutdown")
 async def shutdown(ctx: Context):
     """Agent shutdown handler"""
     logger.info("🛑 Shutting down Comms Agent")
     
+    # Write out queued log rows; failed batches stay in the outbox
+    await comms_instance.log_writer.stop()
+    await comms_instance.outbox.stop()
+    
+    # Close pooled HTTP connections
+    await http_clients.aclose()
+    
     # Close Redis connection
     if comms_instance.redis_client:
         await asyncio.get_event_loop().run_in_executor(
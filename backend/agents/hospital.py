@@ -1,5 +1,4 @@
 from uagents import Agent, Context, Protocol
-import httpx
 import logging
 import asyncio
 import time
@@ -13,6 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.schemas.transport_schema import TransportRequest, TransportResponse
 from app.schemas.acknowledgment_schema import MessageAcknowledgment, ErrorAcknowledgment
 from app.agent_registry import agent_registry
+from app.core.http_client import http_clients
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -106,20 +106,19 @@ async def handle_transport_request(ctx: Context, sender: str, msg: TransportRequ
 async def get_hospital_status():
     """Fetch current hospital status from internal API"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{API_BASE_URL}/internal/hospital/status/{HOSPITAL_ID}")
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Failed to fetch hospital status: {response.status_code}")
-                # Return default status if API fails
-                return {
-                    "er_status": "Normal",
-                    "er_bed_availability": 5,
-                    "icu_bed_availability": 2
-                }
-                
+        response = await http_clients.get(f"{API_BASE_URL}/internal/hospital/status/{HOSPITAL_ID}")
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            logger.error(f"Failed to fetch hospital status: {response.status_code}")
+            # Return default status if API fails
+            return {
+                "er_status": "Normal",
+                "er_bed_availability": 5,
+                "icu_bed_availability": 2
+            }
+
     except Exception as e:
         logger.error(f"Error fetching hospital status: {e}")
         # Return default status if API fails
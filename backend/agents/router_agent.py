@@ -14,12 +14,14 @@ import os
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import math
+import uuid
 
 # Add backend directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from uagents import Agent, Context, Model
 from app.core.config import settings
+from app.database import unit_store
 from app.schemas.incident_schema import IncidentFact
 
 # Configure logging
@@ -126,35 +128,35 @@ class RouterAgent:
     async def get_available_units(self, unit_type: str) -> List[Dict[str, Any]]:
         """Get all available units of a specific type from Redis"""
         try:
-            # Get unit keys for this type
-            type_key = f"units:{unit_type.lower()}"
-            unit_keys = await asyncio.get_event_loop().run_in_executor(
+            # Available units of this type are the intersection of the type and status indexes
+            unit_ids = await asyncio.get_event_loop().run_in_executor(
                 None,
-                lambda: self.redis_client.smembers(type_key)
+                lambda: self.redis_client.sinter(
+                    unit_store.type_key(unit_type),
+                    unit_store.status_key('available')
+                )
             )
             
-            if not unit_keys:
-                logger.warning(f"⚠️ No units found for type {unit_type}")
+            if not unit_ids:
+                logger.warning(f"⚠️ No available units found for type {unit_type}")
                 return []
             
-            available_units = []
+            unit_ids = list(unit_ids)
             
-            # Check each unit's status
-            for unit_key in unit_keys:
-                unit_data = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda k=unit_key: self.redis_client.hgetall(k)
-                )
-                
-                if unit_data and unit_data.get('status') == 'available':
-                    # Parse location from JSON string
-                    try:
-                        location = json.loads(unit_data.get('location', '[0,0]'))
-                        unit_data['location'] = location
-                    except json.JSONDecodeError:
-                        logger.warning(f"⚠️ Invalid location data for unit {unit_key}")
-                        continue
-                    
+            def read_units():
+                pipe = self.redis_client.pipeline(transaction=False)
+                for unit_id in unit_ids:
+                    pipe.hgetall(unit_store.unit_key(unit_id))
+                return pipe.execute()
+            
+            results = await asyncio.get_event_loop().run_in_executor(None, read_units)
+            
+            available_units = []
+            for fields in results:
+                unit_data = unit_store.decode_unit(fields)
+                if unit_data and unit_data['status'] == 'available':
+                    # find_closest_unit works on [lat, lon] locations
+                    unit_data['location'] = [unit_data['lat'], unit_data['lon']]
                     available_units.append(unit_data)
             
             logger.info(f"🔍 Found {len(available_units)} available {unit_type} units")
@@ -202,16 +204,16 @@ class RouterAgent:
     async def update_unit_status(self, unit_id: str, new_status: str) -> bool:
         """Update a unit's status in Redis"""
         try:
-            unit_key = f"unit:{unit_id}"
+            # Update status, last_updated and the status index atomically
+            def write():
+                pipe = self.redis_client.pipeline(transaction=True)
+                unit_store.queue_status_update(pipe, unit_id, new_status)
+                return pipe.execute()[0]
             
-            # Update status and last_updated
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.redis_client.hset(unit_key, mapping={
-                    'status': new_status,
-                    'last_updated': datetime.utcnow().isoformat()
-                })
-            )
+            updated = await asyncio.get_event_loop().run_in_executor(None, write)
+            if not updated:
+                logger.warning(f"⚠️ Unit {unit_id} no longer exists; status not updated")
+                return False
             
             logger.info(f"✅ Updated unit {unit_id} status to {new_status}")
             return True
@@ -221,9 +223,9 @@ class RouterAgent:
             return False
     
     async def publish_log(self, log_data: Dict[str, Any]) -> None:
-        """Publish a log entry to the log queue"""
+        """Publish a log entry to the log queue, with an ID that stays the same on redelivery"""
         try:
-            log_message = json.dumps(log_data)
+            log_message = json.dumps({'message_id': uuid.uuid4().hex, **log_data})
             await asyncio.get_event_loop().run_in_executor(
                 None,
                 lambda: self.redis_client.publish(self.log_channel, log_message)
@@ -255,9 +257,12 @@ class RouterAgent:
             required_unit_type = self.emergency_type_mapping.get(emergency_type, 'EMS')
             logger.info(f"🎯 Required unit type: {required_unit_type}")
 
-            # Derive an incident location tuple if possible; fallback to Ann Arbor center
+            # Derive an incident location tuple: geocoded coordinates first, then
+            # "lat,lon" text; fallback to Ann Arbor center
             incident_location = (42.2808, -83.7430)
-            if isinstance(location, str) and "," in location:
+            if incident_fact.get('latitude') is not None and incident_fact.get('longitude') is not None:
+                incident_location = (float(incident_fact['latitude']), float(incident_fact['longitude']))
+            elif isinstance(location, str) and "," in location:
                 try:
                     lat_str, lon_str = location.split(",")
                     incident_location = (float(lat_str.strip()), float(lon_str.strip()))
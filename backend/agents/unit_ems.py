@@ -1,5 +1,4 @@
 from uagents import Agent, Context, Protocol, Model
-import httpx
 import random
 import asyncio
 import logging
@@ -21,6 +20,7 @@ from app.schemas.dispatch_schema import DispatchOrder
 from app.schemas.acknowledgment_schema import MessageAcknowledgment, ErrorAcknowledgment
 from app.agent_registry import agent_registry, get_hospital_agent_address
 from agents.intelligent_unit_base import IntelligentUnitBase
+from app.core.http_client import http_clients
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -99,25 +99,25 @@ async def update_status(ctx: Context):
                 await handle_patient_on_scene(ctx)
         
         # Send status update to API (using unit_schema structure)
-        from app.schemas.unit_schema import PoliceUnitState  # Reuse similar structure
-        unit_state = PoliceUnitState(
+        unit_state = EMSUnitState(
             unit_id=ems_unit_state["unit_id"],
             status=ems_unit_state["status"],
             location=Location(**ems_unit_state["location"]),
-            assigned_officer_id=f"PARAMEDIC_{ems_unit_state['crew_size']}"
+            crew_size=ems_unit_state["crew_size"],
+            patient_count=ems_unit_state["patient_count"],
+            current_patient=ems_unit_state["current_patient"]
         )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE_URL}/api/units/status",
-                json=unit_state.model_dump()
-            )
-            
-            if response.status_code == 200:
-                ctx.logger.info(f"EMS unit status updated: {unit_state.status} at ({unit_state.location.lat:.6f}, {unit_state.location.lon:.6f})")
-            else:
-                ctx.logger.error(f"Failed to update EMS unit status: {response.status_code}")
-                
+        response = await http_clients.post(
+            f"{API_BASE_URL}/api/units/status",
+            json=unit_state.model_dump()
+        )
+
+        if response.status_code == 200:
+            ctx.logger.info(f"EMS unit status updated: {unit_state.status} at ({unit_state.location.lat:.6f}, {unit_state.location.lon:.6f})")
+        else:
+            ctx.logger.error(f"Failed to update EMS unit status: {response.status_code}")
+
     except Exception as e:
         ctx.logger.error(f"Error updating EMS unit status: {e}")
 
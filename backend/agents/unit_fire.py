@@ -1,5 +1,4 @@
 from uagents import Agent, Context, Model, Protocol
-import httpx
 import random
 import asyncio
 import logging
@@ -19,6 +18,7 @@ from app.schemas.dispatch_schema import DispatchOrder
 from app.schemas.acknowledgment_schema import MessageAcknowledgment, ErrorAcknowledgment
 from app.agent_registry import agent_registry
 from agents.intelligent_unit_base import IntelligentUnitBase
+from app.core.http_client import http_clients
 from app.core.config import settings
 
 # Configure logging
@@ -91,17 +91,16 @@ async def update_status(ctx: Context):
         unit_state = FireUnitState(**fire_unit_state)
         
         # Send status update to API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE_URL}/api/units/status",
-                json=unit_state.model_dump()
-            )
-            
-            if response.status_code == 200:
-                ctx.logger.info(f"Fire unit status updated: {unit_state.status} at ({unit_state.location.lat:.6f}, {unit_state.location.lon:.6f})")
-            else:
-                ctx.logger.error(f"Failed to update fire unit status: {response.status_code}")
-                
+        response = await http_clients.post(
+            f"{API_BASE_URL}/api/units/status",
+            json=unit_state.model_dump()
+        )
+
+        if response.status_code == 200:
+            ctx.logger.info(f"Fire unit status updated: {unit_state.status} at ({unit_state.location.lat:.6f}, {unit_state.location.lon:.6f})")
+        else:
+            ctx.logger.error(f"Failed to update fire unit status: {response.status_code}")
+
     except Exception as e:
         ctx.logger.error(f"Error updating fire unit status: {e}")
 
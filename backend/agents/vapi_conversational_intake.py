@@ -19,6 +19,7 @@ sys.path.insert(0, str(backend_dir))
 from uagents import Agent, Context, Model, Protocol
 from app.schemas.incident_schema import IncidentFact
 from app.core.config import settings
+from app.services.geocoder import geocode_incident
 from services.incident_registry import incident_registry
 import redis.asyncio as redis
 import asyncio
@@ -34,6 +35,9 @@ logger = logging.getLogger(__name__)
 # Redis connection
 redis_client = None
 
+# Serializes the duplicate check and registration of new incidents in this process
+dedup_lock = asyncio.Lock()
+
 # Message models for agent communication
 class IncidentFactCompleted(Model):
     """Message sent when an incident fact is completed by Vapi"""
@@ -92,6 +96,32 @@ async def handle_incident_processing(ctx: Context, sender: str, msg: IncidentPro
         
         # CommsAgent consumes from Redis log queue
         
+        # Resolve the location text to coordinates before the incident is queued;
+        # loading the gazetteer and fuzzy matching are CPU-bound
+        await asyncio.get_event_loop().run_in_executor(None, geocode_incident, incident_fact)
+        
+        # Other callers may already have reported this incident; check and register
+        # under one lock so concurrent reports cannot both open a new case. The lock
+        # only covers this process; the location claim covers the other workers.
+        async with dedup_lock:
+            registry_payload = incident_registry_payload(incident_fact)
+            duplicate_of = await incident_registry.find_duplicate(registry_payload)
+            if not duplicate_of:
+                duplicate_of = await incident_registry.claim_location(registry_payload)
+            if not duplicate_of:
+                # Register incident in Redis active incident registry (units will poll)
+                await register_incident_in_registry(incident_fact)
+        
+        if duplicate_of:
+            # Attach to the existing case instead of dispatching again
+            await merge_duplicate_incident(msg.call_id, incident_fact, duplicate_of, msg.conversation_summary)
+            await ctx.send(sender, MessageAcknowledgment(
+                message_id=msg.call_id,
+                status="merged",
+                timestamp=datetime.now().isoformat()
+            ))
+            return
+        
         # Store in Redis for dashboard
         await store_incident_in_redis(msg.call_id, incident_fact, msg.conversation_summary)
         
@@ -101,9 +131,6 @@ async def handle_incident_processing(ctx: Context, sender: str, msg: IncidentPro
         # Publish completion log to log queue for Comms Agent
         await publish_completion_log(msg.call_id, incident_fact)
         
-        # Register incident in Redis active incident registry (units will poll)
-        await register_incident_in_registry(incident_fact)
-        
         # Notify frontend of incident completion
         await notify_frontend_incident_completed(msg.call_id, incident_fact)
         
@@ -126,7 +153,7 @@ async def handle_incident_processing(ctx: Context, sender: str, msg: IncidentPro
 
 # Protocol is now handled directly by the agent
 
-async def store_incident_in_redis(call_id: str, incident_fact: IncidentFact, conversation_summary: str):
+async def store_incident_in_redis(call_id: str, incident_fact: IncidentFact, conversation_summary: str, duplicate_of: str = None):
     """Store incident data in Redis for dashboard access"""
     try:
         global redis_client
@@ -138,8 +165,10 @@ async def store_incident_in_redis(call_id: str, incident_fact: IncidentFact, con
             "incident_fact": incident_fact.model_dump(),
             "conversation_summary": conversation_summary,
             "timestamp": datetime.now().isoformat(),
-            "status": "completed"
+            "status": "merged" if duplicate_of else "completed"
         }
+        if duplicate_of:
+            incident_data["duplicate_of"] = duplicate_of
         
         # Store in Redis with expiration (24 hours)
         await redis_client.setex(
@@ -252,20 +281,25 @@ async def handle_incident_fact_completed(ctx: Context, sender: str, msg: Inciden
     except Exception as e:
         logger.error(f"Error handling completed incident fact: {e}")
 
+def incident_registry_payload(incident_fact: IncidentFact) -> Dict[str, Any]:
+    """Incident fields stored in the active incident registry"""
+    return {
+        "case_id": str(incident_fact.case_id),
+        "emergency_type": incident_fact.emergency_type,
+        "location": incident_fact.location,
+        "latitude": incident_fact.latitude,
+        "longitude": incident_fact.longitude,
+        "location_precision": incident_fact.location_precision,
+        "is_active_threat": incident_fact.is_active_threat,
+        "details": incident_fact.details,
+        "people_involved": incident_fact.people_involved,
+        "timestamp": incident_fact.timestamp.isoformat() if incident_fact.timestamp else datetime.now().isoformat()
+    }
+
 async def register_incident_in_registry(incident_fact: IncidentFact):
     """Write incident into the Redis active incident registry for unit polling"""
     try:
-        incident_data = {
-            "case_id": str(incident_fact.case_id),
-            "emergency_type": incident_fact.emergency_type,
-            "location": incident_fact.location,
-            "latitude": incident_fact.latitude,
-            "longitude": incident_fact.longitude,
-            "is_active_threat": incident_fact.is_active_threat,
-            "details": incident_fact.details,
-            "people_involved": incident_fact.people_involved,
-            "timestamp": incident_fact.timestamp.isoformat() if incident_fact.timestamp else datetime.now().isoformat()
-        }
+        incident_data = incident_registry_payload(incident_fact)
         success = await incident_registry.add_active_incident(incident_data)
         if success:
             logger.info(f"✅ Incident {incident_data['case_id']} registered in active registry")
@@ -274,7 +308,20 @@ async def register_incident_in_registry(incident_fact: IncidentFact):
     except Exception as e:
         logger.error(f"❌ Error registering incident in registry: {e}")
 
-async def notify_frontend_incident_completed(call_id: str, incident_fact: IncidentFact):
+async def merge_duplicate_incident(call_id: str, incident_fact: IncidentFact, case_id: str, conversation_summary: str):
+    """Attach a repeat report to an existing case; it is logged and shown but not dispatched"""
+    try:
+        report = {**incident_registry_payload(incident_fact), "call_id": call_id}
+        linked = await incident_registry.attach_duplicate(case_id, report)
+        logger.info(f"🔗 Call {call_id} merged into incident {case_id} ({linked + 1} callers)")
+        
+        await store_incident_in_redis(call_id, incident_fact, conversation_summary, duplicate_of=case_id)
+        await publish_completion_log(call_id, incident_fact)
+        await notify_frontend_incident_completed(call_id, incident_fact, duplicate_of=case_id)
+    except Exception as e:
+        logger.error(f"❌ Error merging duplicate incident for call {call_id}: {e}")
+
+async def notify_frontend_incident_completed(call_id: str, incident_fact: IncidentFact, duplicate_of: str = None):
     """Notify frontend that incident processing is completed"""
     try:
         # Import here to avoid circular imports
@@ -282,10 +329,12 @@ async def notify_frontend_incident_completed(call_id: str, incident_fact: Incide
         
         # Notify frontend of completed incident
         fact_data = {
-            "status": "completed",
+            "status": "merged" if duplicate_of else "completed",
             "incident_fact": incident_fact.model_dump(),
             "message": f"Incident {incident_fact.emergency_type} at {incident_fact.location} has been processed"
         }
+        if duplicate_of:
+            fact_data["duplicate_of"] = duplicate_of
         
         await broadcast_fact_update(call_id, fact_data)
         
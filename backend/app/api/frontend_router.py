@@ -8,17 +8,24 @@ Provides real-time APIs for the frontend dashboard including:
 - SMS sending functionality
 """
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Header, Response
 from fastapi.responses import HTMLResponse
 from typing import List, Dict, Any, Optional
 import json
 import asyncio
 import logging
+import redis.asyncio as redis
+from collections import OrderedDict
 from datetime import datetime
 from uuid import uuid4
 
 from app.core.config import settings
+from app.core.websocket_hub import CELL_TOPIC_PREFIX, WebSocketClient, WebSocketHub, call_topic, cell_topics, dumps
+from app.database.call_event_log import call_event_log
+from app.database.redis import get_redis_client, get_redis_dependency
 from app.schemas.incident_schema import IncidentFact
+from app.services.dashboard_snapshot import dashboard_snapshot
+from app.services.geocoder import GEOCELL_PRECISION, geocell, geocode
 from services.vapi_service import vapi_service
 
 logger = logging.getLogger(__name__)
@@ -26,74 +33,222 @@ logger = logging.getLogger(__name__)
 # Create router
 frontend_router = APIRouter(prefix="/api/frontend", tags=["frontend"])
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.call_connections: Dict[str, List[WebSocket]] = {}  # call_id -> [websockets]
+def _split(value: Any) -> List[str]:
+    """Items of a comma-separated string or a list"""
+    items = value.split(",") if isinstance(value, str) else (value or [])
+    return [str(item).strip() for item in items if str(item).strip()]
+
+def subscription_topics(calls: List[str] = (), cells: List[str] = ()) -> List[str]:
+    """Hub topics for call IDs and geohash cells (a cell prefix covers the region around it)"""
+    topics = [call_topic(call_id) for call_id in calls]
+    topics += [CELL_TOPIC_PREFIX + cell.lower()[:GEOCELL_PRECISION] for cell in cells]
+    return topics
+
+# WebSocket connection manager shared by the frontend and Vapi dashboard sockets. Broadcasts are
+# queued per client and never block the caller; with the Redis backplane they reach every worker.
+# Call updates are routed by topic: the call, the cell of its location and the event type.
+class ConnectionManager(WebSocketHub):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # call_id -> geohash cell of the call's location, most recently updated last
+        self.call_cells: "OrderedDict[str, str]" = OrderedDict()
     
-    async def connect(self, websocket: WebSocket, call_id: Optional[str] = None):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        
-        if call_id:
-            if call_id not in self.call_connections:
-                self.call_connections[call_id] = []
-            self.call_connections[call_id].append(websocket)
-        
-        logger.info(f"WebSocket connected. Total connections: {len(self.active_connections)}")
+    async def connect(
+        self,
+        websocket: WebSocket,
+        call_id: Optional[str] = None,
+        hold: bool = False,
+        topics: List[str] = (),
+        types: Optional[List[str]] = None
+    ) -> WebSocketClient:
+        groups = list(topics) + ([call_topic(call_id)] if call_id else [])
+        return await super().connect(websocket, groups=groups, hold=hold, types=types)
     
     def disconnect(self, websocket: WebSocket, call_id: Optional[str] = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        
-        if call_id and call_id in self.call_connections:
-            if websocket in self.call_connections[call_id]:
-                self.call_connections[call_id].remove(websocket)
-            if not self.call_connections[call_id]:
-                del self.call_connections[call_id]
-        
-        logger.info(f"WebSocket disconnected. Total connections: {len(self.active_connections)}")
+        super().disconnect(websocket)
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        try:
-            await websocket.send_text(message)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
+        self.send(websocket, message)
     
     async def broadcast_to_all(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting message: {e}")
+        self.publish(message)
     
     async def broadcast_to_call(self, call_id: str, message: str):
-        if call_id in self.call_connections:
-            for connection in self.call_connections[call_id]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to call {call_id}: {e}")
+        self.publish(message, group=call_topic(call_id))
+    
+    async def broadcast_transcript(self, data: Dict[str, Any]):
+        """Vapi transcript events for the dashboards, recorded in the call's event log"""
+        if data.get("callId"):
+            await publish_call_event(data["callId"], data)
+        else:
+            self.publish_update(data)
+    
+    def publish_update(self, message: Dict[str, Any]) -> None:
+        """Serialize once and route to the clients subscribed to the call, its region or the event type"""
+        self.publish(dumps(message), topics=self.event_topics(message), event_type=message.get("type"))
+    
+    def event_topics(self, message: Dict[str, Any]) -> List[str]:
+        """The call topic and cell topics of an update; updates without a call have none"""
+        call_id = message.get("call_id") or message.get("callId")
+        if not call_id:
+            return []
+        cell = self._locate(call_id, message)
+        return [call_topic(call_id)] + (cell_topics(cell) if cell else [])
+    
+    @staticmethod
+    def _fact_fields(message: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields set by a fact update (a full incident_fact or a single field); empty for other events"""
+        data = message.get("data") if message.get("type") == "fact_update" else None
+        if not isinstance(data, dict):
+            return {}
+        if "field" in data:
+            return {data["field"]: data.get("value")}
+        return data.get("incident_fact") or {}
+    
+    async def geocode_update(self, call_id: str, message: Dict[str, Any]) -> None:
+        """
+        Record the call's cell from location text in a fact update.
+        
+        Loading the gazetteer and fuzzy matching are CPU-bound, so geocoding
+        runs in an executor; updates with coordinates are located by _locate.
+        """
+        fields = self._fact_fields(message)
+        if fields.get("latitude") is not None and fields.get("longitude") is not None:
+            return
+        if not isinstance(fields.get("location"), str):
+            return
+        result = await asyncio.get_running_loop().run_in_executor(None, geocode, fields["location"])
+        if result:
+            self.call_cells[call_id] = geocell(result.lat, result.lon)
+    
+    def _locate(self, call_id: str, message: Dict[str, Any]) -> Optional[str]:
+        """Cell of the call, updated from coordinates in a fact update or as last geocoded"""
+        fields = self._fact_fields(message)
+        if fields.get("latitude") is not None and fields.get("longitude") is not None:
+            self.call_cells[call_id] = geocell(fields["latitude"], fields["longitude"])
+        cell = self.call_cells.get(call_id)
+        if cell:
+            self.call_cells.move_to_end(call_id)
+            while len(self.call_cells) > settings.CALL_EVENT_CACHE_CALLS:
+                self.call_cells.popitem(last=False)
+        return cell
 
 # Global connection manager
 manager = ConnectionManager()
 
-@frontend_router.websocket("/ws/dashboard")
-async def websocket_dashboard(websocket: WebSocket):
-    """WebSocket endpoint for dashboard updates"""
-    await manager.connect(websocket)
+def fact_changes(facts: Optional[Dict[str, Any]], fact_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Reduce a full incident_fact to the fields that differ from `facts`; None if nothing changed"""
+    incident_fact = fact_data.get("incident_fact")
+    if not isinstance(incident_fact, dict) or not facts:
+        return fact_data
+    
+    changes = {field: value for field, value in incident_fact.items() if facts.get(field) != value}
+    if not changes and set(fact_data) == {"incident_fact"}:
+        return None
+    return {**fact_data, "incident_fact": changes, "delta": True}
+
+async def fact_delta(call_id: str, fact_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Fact update carrying only the fields changed since the call's snapshot.
+
+    The snapshot is folded from the call's shared event log, so the delta is
+    the same whichever worker handles the update. Two workers racing on one
+    call can at worst both send a field, never drop one.
+    """
+    if not isinstance(fact_data.get("incident_fact"), dict):
+        return fact_data
+    redis_client = await get_redis_client()
+    snapshot = await call_event_log.snapshot(redis_client, call_id)
+    return fact_changes(snapshot["facts"] if snapshot else None, fact_data)
+
+async def publish_call_event(call_id: str, message: Dict[str, Any]) -> Optional[int]:
+    """Record a call event in its log, stamp it with the sequence number (None if unsequenced) and publish it"""
+    redis_client = await get_redis_client()
+    message["seq"] = await call_event_log.append(redis_client, call_id, message)
+    await manager.geocode_update(call_id, message)
+    manager.publish_update(message)
+    return message["seq"]
+
+async def serve_dashboard(websocket: WebSocket, calls: Optional[str] = None, cells: Optional[str] = None, types: Optional[str] = None):
+    """
+    Dashboard socket with topic subscriptions.
+
+    The query parameters (comma-separated call IDs, geohash cells and event
+    types) set the initial subscriptions; a client without call or cell
+    subscriptions receives every call's updates. Clients change them with
+    {"action": "subscribe" | "unsubscribe", "calls": [...], "cells": [...], "types": [...]}
+    and get {"type": "subscriptions", "topics": [...], "types": [...]} back.
+
+    After loading the bootstrap snapshot, {"action": "resume", "seq": {call_id: seq}}
+    sends each call's events after its snapshot seq ("resume" or "snapshot"
+    frames, as on /ws/call).
+    """
+    await manager.connect(
+        websocket,
+        topics=subscription_topics(_split(calls), _split(cells)),
+        types=_split(types) or None
+    )
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            try:
+                request = json.loads(text)
+            except ValueError:
+                # Anything else is a keep-alive
+                continue
+            if not isinstance(request, dict):
+                continue
+            if request.get("action") == "resume" and isinstance(request.get("seq"), dict):
+                await resume_calls(websocket, request["seq"])
+                continue
+            if request.get("action") not in ("subscribe", "unsubscribe"):
+                continue
+            
+            topics = subscription_topics(_split(request.get("calls")), _split(request.get("cells")))
+            types = _split(request.get("types"))
+            if request["action"] == "subscribe":
+                manager.subscribe(websocket, topics, types or None)
+            else:
+                manager.unsubscribe(websocket, topics, types)
+            manager.send(websocket, dumps({"type": "subscriptions", **manager.subscriptions(websocket)}))
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
+async def resume_calls(websocket: WebSocket, seqs: Dict[str, Any]) -> None:
+    """Catch a dashboard up on each call from the seq it last applied"""
+    redis_client = await get_redis_client()
+    for call_id, since in list(seqs.items())[:settings.BOOTSTRAP_RECENT_CALLS]:
+        try:
+            replay = await call_event_log.replay(redis_client, str(call_id), int(since))
+        except (TypeError, ValueError):
+            continue
+        except Exception as e:
+            logger.error(f"❌ Error replaying events for call {call_id}: {e}")
+            continue
+        manager.send(websocket, dumps(replay))
+
+@frontend_router.websocket("/ws/dashboard")
+async def websocket_dashboard(websocket: WebSocket, calls: Optional[str] = None, cells: Optional[str] = None, types: Optional[str] = None):
+    """WebSocket endpoint for dashboard updates, optionally filtered by call, region and event type"""
+    await serve_dashboard(websocket, calls, cells, types)
+
 @frontend_router.websocket("/ws/call/{call_id}")
-async def websocket_call(websocket: WebSocket, call_id: str):
-    """WebSocket endpoint for specific call updates"""
-    await manager.connect(websocket, call_id)
+async def websocket_call(websocket: WebSocket, call_id: str, since: Optional[int] = None):
+    """
+    WebSocket endpoint for specific call updates
+
+    The first frame catches the client up: the events after `since` when
+    they are still buffered ("resume"), otherwise a snapshot of the call.
+    Live updates follow; those with seq at or below the first frame's seq
+    are already covered by it.
+    """
+    client = await manager.connect(websocket, call_id, hold=True)
+    try:
+        redis_client = await get_redis_client()
+        client.release(dumps(await call_event_log.replay(redis_client, call_id, since)))
+    except Exception as e:
+        logger.error(f"❌ Error replaying events for call {call_id}: {e}")
+        client.release()
     try:
         while True:
             # Keep connection alive
@@ -113,10 +268,8 @@ async def update_transcript(call_id: str, transcript_data: Dict[str, Any]):
             "data": transcript_data
         }
         
-        await manager.broadcast_to_call(call_id, json.dumps(message))
-        
-        # Also broadcast to dashboard
-        await manager.broadcast_to_all(json.dumps(message))
+        # Every client, including the call's own connections, gets it once
+        await publish_call_event(call_id, message)
         
         logger.info(f"📝 Transcript updated for call {call_id}")
         return {"status": "success", "message": "Transcript updated"}
@@ -129,18 +282,17 @@ async def update_transcript(call_id: str, transcript_data: Dict[str, Any]):
 async def update_fact_sheet(call_id: str, fact_data: Dict[str, Any]):
     """Update incident fact sheet and notify frontend"""
     try:
-        # Broadcast fact update to all call-specific connections
-        message = {
+        fact_data = await fact_delta(call_id, fact_data)
+        if fact_data is None:
+            return {"status": "success", "message": "Fact sheet unchanged"}
+        
+        # Every client, including the call's own connections, gets it once
+        await publish_call_event(call_id, {
             "type": "fact_update",
             "call_id": call_id,
             "timestamp": datetime.now().isoformat(),
             "data": fact_data
-        }
-        
-        await manager.broadcast_to_call(call_id, json.dumps(message))
-        
-        # Also broadcast to dashboard
-        await manager.broadcast_to_all(json.dumps(message))
+        })
         
         logger.info(f"📋 Fact sheet updated for call {call_id}: {fact_data.get('field', 'unknown')}")
         return {"status": "success", "message": "Fact sheet updated"}
@@ -163,7 +315,7 @@ async def send_comms_message(message_data: Dict[str, Any]):
             "data": message_data
         }
         
-        await manager.broadcast_to_all(json.dumps(message))
+        await publish_call_event(call_id, message)
         
         logger.info(f"📞 Communication message sent for call {call_id}")
         return {"status": "success", "message": "Communication message sent"}
@@ -198,7 +350,7 @@ async def send_sms(sms_data: Dict[str, Any]):
             }
         }
         
-        await manager.broadcast_to_all(json.dumps(notification))
+        manager.publish_update(notification)
         
         logger.info(f"📱 SMS sent to {phone_number} for call {call_id}")
         return result
@@ -207,6 +359,34 @@ async def send_sms(sms_data: Dict[str, Any]):
         logger.error(f"❌ Error sending SMS: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@frontend_router.get("/bootstrap")
+async def get_bootstrap(
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """
+    Units, active incidents, hospitals and recent calls for a dashboard's
+    first render, gzip-compressed when accepted. The ETag names the snapshot
+    version and encoding (If-None-Match gives 304); "seq" holds each call's last event,
+    from which the live WebSocket stream continues.
+    """
+    try:
+        snapshot = await dashboard_snapshot.get(redis_client)
+    except Exception as e:
+        logger.error(f"❌ Error building dashboard snapshot: {e}")
+        raise HTTPException(status_code=500, detail="Failed to build dashboard snapshot")
+    
+    gzipped = bool(accept_encoding and "gzip" in accept_encoding.lower())
+    etag = snapshot.gzip_etag if gzipped else snapshot.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzipped, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
 @frontend_router.get("/incidents")
 async def get_incidents():
     """Get all incidents for dashboard display"""
@@ -231,20 +411,17 @@ async def get_incidents():
 
 @frontend_router.get("/call/{call_id}/status")
 async def get_call_status(call_id: str):
-    """Get status of a specific call"""
+    """Get status of a specific call, folded from its event log"""
     try:
-        # This would typically fetch from Redis
-        # For now, return mock data
-        status = {
-            "call_id": call_id,
-            "status": "active",
-            "transcript": [],
-            "facts": {},
-            "last_update": datetime.now().isoformat()
-        }
+        redis_client = await get_redis_client()
+        status = await call_event_log.snapshot(redis_client, call_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Call not found")
         
         return status
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error fetching call status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -299,7 +476,13 @@ async def get_dashboard():
             const ws = new WebSocket('ws://localhost:8000/api/frontend/ws/dashboard');
             
             ws.onmessage = function(event) {
-                const data = JSON.parse(event.data);
+                const frame = JSON.parse(event.data);
+                // Updates that arrive close together are batched into one frame
+                const updates = frame.type === 'batch' ? frame.messages : [frame];
+                updates.forEach(handleUpdate);
+            };
+            
+            function handleUpdate(data) {
                 console.log('Received:', data);
                 
                 if (data.type === 'transcript_update') {
@@ -317,7 +500,7 @@ async def get_dashboard():
                     const messages = document.getElementById('messages');
                     messages.innerHTML += '<div class="status">SMS Sent: ' + JSON.stringify(data.data) + '</div>';
                 }
-            };
+            }
             
             function sendSMS() {
                 const phoneNumber = document.getElementById('phoneNumber').value;
@@ -351,19 +534,20 @@ async def broadcast_transcript_update(call_id: str, transcript_data: Dict[str, A
         "timestamp": datetime.now().isoformat(),
         "data": transcript_data
     }
-    await manager.broadcast_to_call(call_id, json.dumps(message))
-    await manager.broadcast_to_all(json.dumps(message))
+    await publish_call_event(call_id, message)
 
 async def broadcast_fact_update(call_id: str, fact_data: Dict[str, Any]):
-    """Helper function to broadcast fact sheet updates"""
+    """Helper function to broadcast fact sheet updates (changed fields only)"""
+    fact_data = await fact_delta(call_id, fact_data)
+    if fact_data is None:
+        return
     message = {
         "type": "fact_update",
         "call_id": call_id,
         "timestamp": datetime.now().isoformat(),
         "data": fact_data
     }
-    await manager.broadcast_to_call(call_id, json.dumps(message))
-    await manager.broadcast_to_all(json.dumps(message))
+    await publish_call_event(call_id, message)
 
 async def broadcast_comms_message(call_id: str, message_data: Dict[str, Any]):
     """Helper function to broadcast communication messages"""
@@ -373,4 +557,4 @@ async def broadcast_comms_message(call_id: str, message_data: Dict[str, Any]):
         "timestamp": datetime.now().isoformat(),
         "data": message_data
     }
-    await manager.broadcast_to_all(json.dumps(message))
+    await publish_call_event(call_id, message)
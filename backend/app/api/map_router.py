@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from app.core.websocket_hub import dumps
+from app.database.redis import get_redis_dependency
+from app.database import unit_store
+from app.services.map_aggregation import LAYERS, map_aggregator
+import redis.asyncio as redis
+from typing import Optional
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+map_router = APIRouter()
+
+def view_etag(body: str) -> str:
+    """Strong ETag of a serialized map view"""
+    return '"' + hashlib.sha1(body.encode()).hexdigest()[:20] + '"'
+
+@map_router.get("/aggregate")
+async def get_map_aggregate(
+    bbox: str = Query(..., description="Bounding box as min_lon,min_lat,max_lon,max_lat"),
+    zoom: float = Query(..., ge=0, le=24, description="Map zoom level"),
+    layers: str = Query(",".join(LAYERS), description="Comma-separated layers (units, incidents)"),
+    if_none_match: Optional[str] = Header(None),
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """
+    Zoom-aware clusters, individual points and heat bins for units and
+    incidents in a bounding box. Send the returned ETag back in If-None-Match
+    to get 304 Not Modified while the view is unchanged.
+    """
+    try:
+        box = unit_store.parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        view = await map_aggregator.view(redis_client, box, zoom, [layer.strip() for layer in layers.split(",") if layer.strip()])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error aggregating map view: {e}")
+        raise HTTPException(status_code=500, detail="Failed to aggregate map view")
+
+    body = dumps(view)
+    etag = view_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -7,6 +7,7 @@ from app.api.unit_onboarding_router import unit_onboarding_router
 from app.api.vapi_router import router as vapi_router
 from app.api.call_initiation_router import router as call_initiation_router
 from app.api.frontend_router import frontend_router
+from app.api.map_router import map_router
 
 # Master API router that aggregates all other resource routers
 api_router = APIRouter()
@@ -20,3 +21,4 @@ api_router.include_router(unit_onboarding_router, tags=["unit-onboarding"])
 api_router.include_router(vapi_router, prefix="/vapi", tags=["vapi-webhooks"])
 api_router.include_router(call_initiation_router, prefix="/calls", tags=["call-initiation"])
 api_router.include_router(frontend_router, tags=["frontend"])
+api_router.include_router(map_router, prefix="/map", tags=["map"])
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from app.schemas.unit_schema import FireUnitState, PoliceUnitState
 from app.database.redis import get_redis_dependency
+from app.database import unit_store
 import redis.asyncio as redis
 import subprocess
 import json
 import logging
 import os
 import sys
-from typing import Union
+from typing import Optional, Union
 
 logger = logging.getLogger(__name__)
 
@@ -66,8 +67,7 @@ async def onboard_unit(
         )
         
         # Store initial unit state in Redis
-        key = f"unit:{unit_id}"
-        await redis_client.setex(key, 86400, json.dumps(unit_data.model_dump()))
+        await unit_store.save_unit(redis_client, unit_data.model_dump())
         
         logger.info(f"Successfully onboarded unit {unit_id} with PID {process.pid}")
         
@@ -91,9 +91,8 @@ async def offboard_unit(
 ):
     """Remove a unit from the system"""
     try:
-        # Remove from Redis
-        key = f"unit:{unit_id}"
-        await redis_client.delete(key)
+        # Remove unit state and its index entries from Redis
+        await unit_store.delete_unit(redis_client, unit_id)
         
         # Note: In a production system, you would also need to track and terminate
         # the associated agent process. This would require process management.
@@ -112,26 +111,26 @@ async def offboard_unit(
 
 @unit_onboarding_router.get("/api/units/onboarded")
 async def list_onboarded_units(
+    unit_type: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = None,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(unit_store.DEFAULT_PAGE_SIZE, ge=1, le=1000),
     redis_client: redis.Redis = Depends(get_redis_dependency)
 ):
-    """List all currently onboarded units"""
+    """List a page of currently onboarded units"""
     try:
-        # Get all unit keys
-        keys = await redis_client.keys("unit:*")
-        
-        units = []
-        for key in keys:
-            unit_data = await redis_client.get(key)
-            if unit_data:
-                unit_info = json.loads(unit_data)
-                units.append(unit_info)
+        page = await unit_store.list_units(redis_client, unit_type, status, cursor=cursor, limit=limit)
+        total_units = await redis_client.scard(unit_store.UNITS_ALL_KEY)
         
         return {
             "success": True,
-            "total_units": len(units),
-            "units": units
+            "total_units": total_units,
+            "units": page["units"],
+            "next_cursor": page["next_cursor"]
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to list onboarded units: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to list units: {str(e)}")
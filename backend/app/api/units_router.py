@@ -1,7 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.schemas.unit_schema import FireUnitState, PoliceUnitState
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.schemas.unit_schema import UnitStatusUpdate, parse_unit_state
 from app.database.redis import get_redis_dependency
+from app.database import unit_store
+from app.services.unit_history_service import as_utc, queue_location_sample, get_unit_trail
+from app.services.unit_change_feed import RESYNC, unit_change_feed, unit_state
+from app.core.config import settings
 import redis.asyncio as redis
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+import asyncio
 import json
 import logging
 
@@ -11,19 +19,31 @@ units_router = APIRouter()
 
 @units_router.post("/status")
 async def update_unit_status(
-    unit_data: FireUnitState | PoliceUnitState,
+    payload: Dict[str, Any] = Body(...),
     redis_client: redis.Redis = Depends(get_redis_dependency)
 ):
     """Update unit status in Redis database"""
+    # The payload's type field picks the state model, and is the type the unit is indexed under
     try:
-        # Use unit_id as the Redis key
-        key = f"unit:{unit_data.unit_id}"
-        
-        # Convert Pydantic model to JSON string
-        unit_json = unit_data.model_dump_json()
+        unit_data = parse_unit_state(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        unit = unit_data.model_dump()
         
-        # Store in Redis with expiration (24 hours)
-        await redis_client.setex(key, 86400, unit_json)
+        # Write unit state, its indexes and a location history sample
+        # in a single round trip
+        pipe = redis_client.pipeline(transaction=True)
+        stored = unit_store.queue_unit_write(pipe, unit)
+        queue_location_sample(
+            pipe,
+            unit_data.unit_id,
+            unit_data.location.lat,
+            unit_data.location.lon,
+            stored["status"]
+        )
+        await pipe.execute()
         
         logger.info(f"Updated status for unit {unit_data.unit_id}: {unit_data.status}")
         
@@ -37,6 +57,25 @@ async def update_unit_status(
         logger.error(f"Error updating unit status: {e}")
         raise HTTPException(status_code=500, detail="Failed to update unit status")
 
+@units_router.patch("/{unit_id}/status")
+async def change_unit_status(
+    unit_id: str,
+    update: UnitStatusUpdate,
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """Change the status of an existing unit, leaving its other fields as they are"""
+    try:
+        status = await unit_store.update_status(redis_client, unit_id, update.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error changing unit status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to change unit status")
+    
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unit not found")
+    return {"unit_id": unit_id, "status": status}
+
 @units_router.get("/{unit_id}/status")
 async def get_unit_status(
     unit_id: str,
@@ -44,13 +83,11 @@ async def get_unit_status(
 ):
     """Get unit status from Redis database"""
     try:
-        key = f"unit:{unit_id}"
-        unit_json = await redis_client.get(key)
+        unit_data = await unit_store.get_unit(redis_client, unit_id)
         
-        if not unit_json:
+        if not unit_data:
             raise HTTPException(status_code=404, detail="Unit not found")
         
-        unit_data = json.loads(unit_json)
         return unit_data
         
     except HTTPException:
@@ -59,28 +96,146 @@ async def get_unit_status(
         logger.error(f"Error retrieving unit status: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve unit status")
 
-@units_router.get("/")
-async def get_all_units(
+@units_router.get("/{unit_id}/history")
+async def get_unit_history(
+    unit_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: int = Query(500, ge=2, le=5000),
     redis_client: redis.Redis = Depends(get_redis_dependency)
 ):
-    """Get all active units from Redis database"""
+    """Get a unit's location trail for a time range (defaults to the last hour)"""
     try:
-        # Get all unit keys
-        keys = await redis_client.keys("unit:*")
+        # Times without an offset are UTC, like the stored history
+        end = as_utc(end) if end else datetime.now(timezone.utc)
+        start = as_utc(start) if start else end - timedelta(hours=1)
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must be before end")
         
-        if not keys:
-            return {"units": []}
+        return await get_unit_trail(redis_client, unit_id, start, end, max_points)
         
-        # Get all unit data
-        units = []
-        for key in keys:
-            unit_json = await redis_client.get(key)
-            if unit_json:
-                unit_data = json.loads(unit_json)
-                units.append(unit_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving unit history: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve unit history")
+
+@units_router.get("/counts")
+async def get_unit_counts(
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """Get unit counts by type and status from the maintained indexes"""
+    try:
+        return await unit_store.get_unit_counts(redis_client)
         
-        return {"units": units}
+    except Exception as e:
+        logger.error(f"Error retrieving unit counts: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve unit counts")
+
+def sse_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """One Server-Sent Event"""
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+@units_router.get("/units/stream")
+async def stream_unit_changes(
+    unit_type: Optional[str] = Query(None, alias="type", description="Comma-separated unit types (POLICE, FIRE, EMS, HOSPITAL)"),
+    bbox: Optional[str] = Query(None, description="Bounding box as min_lon,min_lat,max_lon,max_lat"),
+    min_interval_ms: int = Query(settings.UNIT_STREAM_MIN_INTERVAL_MS, ge=0, le=600000, description="Minimum time between updates of one unit"),
+    snapshot: bool = Query(True, description="Send the current matching units first"),
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """
+    Server-Sent Events stream of unit state changes.
+
+    Emits "unit" events with {unit_id, type, status, lat, lon, last_updated}
+    (or {unit_id, removed: true} when a unit leaves the filter), preceded by
+    the current matching units when `snapshot` is set and a "ready" event.
+    Each unit is sent at most once per `min_interval_ms`, always with its
+    latest state; comments keep idle connections alive. If the server missed
+    changes (its Redis subscription was lost) it sends a "resync" event:
+    clients should drop their units and apply the fresh snapshot and "ready"
+    event that follow.
+    """
+    try:
+        box = unit_store.parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    types = [item.strip() for item in unit_type.split(",") if item.strip()] if unit_type else None
+    
+    # Subscribe (confirmed by Redis) before reading the snapshot so no change falls in between
+    try:
+        subscriber = await unit_change_feed.subscribe(types, box, min_interval_ms / 1000)
+    except asyncio.TimeoutError:
+        logger.error("Unit change feed could not subscribe in time")
+        raise HTTPException(status_code=503, detail="Unit change feed unavailable")
+    
+    async def snapshot_units():
+        for listed_type in types or [None]:
+            cursor = 0
+            while True:
+                page = await unit_store.list_units(redis_client, listed_type, None, box, cursor, unit_store.DEFAULT_PAGE_SIZE)
+                for unit in page["units"]:
+                    if unit["unit_id"] not in subscriber.pending:
+                        subscriber.mark_sent(unit)
+                        yield unit_state(unit)
+                if not page["next_cursor"]:
+                    break
+                cursor = int(page["next_cursor"])
+    
+    async def event_stream():
+        event_id = 0
+        try:
+            if snapshot:
+                async for unit in snapshot_units():
+                    event_id += 1
+                    yield sse_event("unit", unit, event_id)
+            yield sse_event("ready", {"min_interval_ms": min_interval_ms})
+            
+            async for change in subscriber.events(settings.UNIT_STREAM_HEARTBEAT_SECONDS):
+                if change is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                if change is RESYNC:
+                    yield sse_event("resync", {})
+                    async for unit in snapshot_units():
+                        event_id += 1
+                        yield sse_event("unit", unit, event_id)
+                    yield sse_event("ready", {"min_interval_ms": min_interval_ms})
+                    continue
+                event_id += 1
+                yield sse_event("unit", change, event_id)
+        except Exception as e:
+            logger.error(f"Error streaming unit changes: {e}")
+        finally:
+            unit_change_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@units_router.get("/")
+async def get_all_units(
+    unit_type: Optional[str] = Query(None, alias="type", description="Unit type (POLICE, FIRE, EMS, HOSPITAL)"),
+    status: Optional[str] = Query(None, description="Unit status (available, dispatched, ...)"),
+    bbox: Optional[str] = Query(None, description="Bounding box as min_lon,min_lat,max_lon,max_lat"),
+    cursor: int = Query(0, ge=0, description="Cursor returned by the previous page"),
+    limit: int = Query(unit_store.DEFAULT_PAGE_SIZE, ge=1, le=1000, description="Page size hint"),
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """Get a page of active units, filtered by type, status and bounding box"""
+    try:
+        box = unit_store.parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return await unit_store.list_units(redis_client, unit_type, status, box, cursor, limit)
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving all units: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve units")
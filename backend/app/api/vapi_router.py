@@ -3,22 +3,36 @@ Vapi API Router for Emergency Dispatch System
 
 This router handles webhooks from Vapi for:
 1. Logic Handler - The "brain" that determines next questions
-2. Transcription Handler - Real-time transcript updates for dashboard
+2. Streaming Logic Handler - The same, streamed as OpenAI-style SSE chunks
+3. Transcription Handler - Real-time transcript updates for dashboard
 """
 
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, WebSocket
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 import json
 import logging
+import time
 from datetime import datetime
 
 from app.core.config import settings
-from app.schemas.incident_schema import IncidentFact
+from app.core.http_client import http_clients
+from app.api.frontend_router import manager, serve_dashboard
+from app.database.call_context_store import call_context_store, new_call_context
+from app.database.redis import get_redis_dependency
 from app.services.incident_service import IncidentService
+from app.services.incident_extraction_service import (
+    extract_turn,
+    get_missing_incident_fields,
+    is_off_script_turn,
+    stream_turn,
+    turn_metrics,
+)
+from app.services.conversation_compaction import compact_conversation, conversation_transcript
 from app.agent_registry import agent_registry
 import google.generativeai as genai
-import httpx
+import redis.asyncio as redis
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,78 +42,13 @@ router = APIRouter()
 
 # Configure Gemini
 genai.configure(api_key=settings.GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-2.5-flash')
+MODEL_NAME = 'gemini-2.5-flash'
+model = genai.GenerativeModel(MODEL_NAME)
 
-# WebSocket connection manager for dashboard
-class DashboardConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+INCIDENT_COMPLETE_MESSAGE = "Thank you for providing all the necessary information. Emergency services are being dispatched to your location. Please stay on the line if you need any additional assistance."
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"Dashboard connected. Total connections: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        logger.info(f"Dashboard disconnected. Total connections: {len(self.active_connections)}")
-
-    async def broadcast_transcript(self, data: dict):
-        """Broadcast transcript data to all connected dashboard clients"""
-        if not self.active_connections:
-            logger.warning("No dashboard connections available for transcript broadcast")
-            return
-            
-        message = json.dumps(data)
-        disconnected = []
-        
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting to dashboard: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
-    
-    async def broadcast_fact_update(self, call_id: str, field: str, value: str):
-        """Broadcast fact sheet updates to dashboard"""
-        if not self.active_connections:
-            logger.warning("No dashboard connections available for fact update broadcast")
-            return
-        
-        message = json.dumps({
-            "type": "fact_update",
-            "call_id": call_id,
-            "timestamp": datetime.now().isoformat(),
-            "data": {
-                "field": field,
-                "value": value,
-                "message": f"Updated {field}: {value}"
-            }
-        })
-        
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting fact update: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection)
-
-# Global connection manager
-dashboard_manager = DashboardConnectionManager()
+# WebSocket connection manager for dashboard; shared with the frontend sockets and their Redis backplane
+dashboard_manager = manager
 
 # Pydantic models for Vapi webhooks
 class VapiMessage(BaseModel):
@@ -123,11 +72,68 @@ class VapiTranscriptRequest(BaseModel):
 class VapiResponse(BaseModel):
     transcript: str
 
-# In-memory storage for call contexts (in production, use Redis)
-call_contexts: Dict[str, Dict[str, Any]] = {}
+async def start_turn(redis_client: redis.Redis, request: VapiHandlerRequest) -> Dict[str, Any]:
+    """Load (or create) the call context and add the new message to its history"""
+    call_context = await call_context_store.load(redis_client, request.callId)
+    if call_context is None:
+        call_context = new_call_context()
+    
+    if request.message:
+        call_context["conversation_history"].append({
+            "role": request.message.role,
+            "content": request.message.content,
+            "timestamp": request.message.timestamp or datetime.now()
+        })
+    return call_context
+
+def is_urgent(missing_fields: List[str]) -> bool:
+    """Whether critical information (location or emergency type) is still missing"""
+    return "location" in missing_fields or "emergency_type" in missing_fields
+
+async def complete_turn(
+    redis_client: redis.Redis,
+    call_id: str,
+    call_context: Dict[str, Any],
+    next_question: str
+) -> str:
+    """Finalize complete incidents, compact and store the context; returns the reply"""
+    # Determine what information is still missing
+    missing_fields = get_missing_incident_fields(call_context["incident_fact"])
+    
+    # If incident is complete, finalize it
+    if not missing_fields:
+        await finalize_incident(call_context, call_id)
+        next_question = INCIDENT_COMPLETE_MESSAGE
+    else:
+        # Add urgency to questions if critical information is missing
+        if is_urgent(missing_fields):
+            next_question = f"URGENT: {next_question}"
+    
+    # Fold old turns into the rolling summary so stored state stays bounded
+    compact_conversation(call_context)
+    await call_context_store.save(redis_client, call_id, call_context)
+    return next_question
+
+def completion_chunk(call_id: str, content: Optional[str] = None, finish_reason: Optional[str] = None) -> str:
+    """One SSE event in the OpenAI chat.completion.chunk format used by Vapi's custom LLM"""
+    chunk = {
+        "id": f"chatcmpl-{call_id}",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": MODEL_NAME,
+        "choices": [{
+            "index": 0,
+            "delta": {"role": "assistant", "content": content} if content is not None else {},
+            "finish_reason": finish_reason
+        }]
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
 
 @router.post("/handler")
-async def vapi_logic_handler(request: VapiHandlerRequest):
+async def vapi_logic_handler(
+    request: VapiHandlerRequest,
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
     """
     Vapi Logic Handler - The "brain" of our dispatch agent
     
@@ -137,45 +143,12 @@ async def vapi_logic_handler(request: VapiHandlerRequest):
     try:
         logger.info(f"Vapi Logic Handler called for call {request.callId}")
         
-        # Initialize or get call context
-        if request.callId not in call_contexts:
-            call_contexts[request.callId] = {
-                "incident_fact": IncidentFact(),
-                "conversation_history": [],
-                "call_start_time": datetime.now()
-            }
+        call_context = await start_turn(redis_client, request)
         
-        call_context = call_contexts[request.callId]
-        
-        # Add new message to conversation history
-        if request.message:
-            call_context["conversation_history"].append({
-                "role": request.message.role,
-                "content": request.message.content,
-                "timestamp": request.message.timestamp or datetime.now()
-            })
-        
-        # Extract facts from conversation history
-        await extract_facts_from_conversation(call_context)
-        
-        # Determine what information is still missing
-        missing_fields = get_missing_incident_fields(call_context["incident_fact"])
-        
-        # Generate next question using Gemini
-        next_question = await generate_next_question(
-            call_context["conversation_history"],
-            call_context["incident_fact"],
-            missing_fields
-        )
-        
-        # If incident is complete, finalize it
-        if not missing_fields:
-            await finalize_incident(call_context, request.callId)
-            next_question = "Thank you for providing all the necessary information. Emergency services are being dispatched to your location. Please stay on the line if you need any additional assistance."
-        else:
-            # Add urgency to questions if critical information is missing
-            if "location" in missing_fields or "emergency_type" in missing_fields:
-                next_question = f"URGENT: {next_question}"
+        # Extract facts from the new turns and generate the next question
+        # in a single Gemini call
+        next_question = await extract_turn(model, call_context)
+        next_question = await complete_turn(redis_client, request.callId, call_context, next_question)
         
         logger.info(f"Generated next question for call {request.callId}: {next_question}")
         
@@ -183,8 +156,72 @@ async def vapi_logic_handler(request: VapiHandlerRequest):
         
     except Exception as e:
         logger.error(f"Error in Vapi Logic Handler: {e}")
+        call_context_store.discard(request.callId)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.post("/handler/stream")
+async def vapi_streaming_logic_handler(
+    request: VapiHandlerRequest,
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
+    """
+    Streaming Vapi Logic Handler
+    
+    Same turn handling as /handler, but the reply is streamed as Server-Sent
+    Events in the OpenAI chat.completion.chunk format accepted by Vapi's
+    custom LLM integration. Off-script replies are streamed as the model
+    generates them, so the caller hears the rest of the reply without
+    waiting for the full response. The first words wait for extraction, so
+    the reply gets the same "URGENT: " prefix as /handler, and a turn that
+    completes the incident gets only the completion message.
+    """
+    try:
+        logger.info(f"Vapi Streaming Logic Handler called for call {request.callId}")
+        call_context = await start_turn(redis_client, request)
+    except Exception as e:
+        logger.error(f"Error in Vapi Streaming Logic Handler: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+    
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            new_turns = call_context["conversation_history"][call_context.get("extracted_turns", 0):]
+            if is_off_script_turn(new_turns):
+                # Text arrives once extraction is done, so the facts decide the reply as in complete_turn
+                stream = stream_turn(model, call_context, hold_until_extracted=True)
+                chunks = []
+                try:
+                    async for text in stream:
+                        if not chunks:
+                            missing_fields = get_missing_incident_fields(call_context["incident_fact"])
+                            if not missing_fields:
+                                # The completion message replaces the question
+                                break
+                            if is_urgent(missing_fields):
+                                yield completion_chunk(request.callId, "URGENT: ")
+                        chunks.append(text)
+                        yield completion_chunk(request.callId, text)
+                finally:
+                    await stream.aclose()
+                
+                reply = await complete_turn(redis_client, request.callId, call_context, "".join(chunks))
+                if reply == INCIDENT_COMPLETE_MESSAGE:
+                    yield completion_chunk(request.callId, reply)
+            else:
+                # Bank questions are ready as soon as extraction finishes
+                next_question = await extract_turn(model, call_context)
+                reply = await complete_turn(redis_client, request.callId, call_context, next_question)
+                yield completion_chunk(request.callId, reply)
+            
+            logger.info(f"Streamed next question for call {request.callId}")
+        except Exception as e:
+            logger.error(f"Error streaming Vapi response: {e}")
+            call_context_store.discard(request.callId)
+        
+        yield completion_chunk(request.callId, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.post("/transcripts")
 async def vapi_transcript_handler(request: VapiTranscriptRequest):
     """
@@ -215,220 +252,52 @@ async def vapi_transcript_handler(request: VapiTranscriptRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/call-context/{call_id}")
-async def get_call_context(call_id: str):
+async def get_call_context(
+    call_id: str,
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
     """
     Get the current call context and incident fact sheet data
     """
-    if call_id not in call_contexts:
+    context = await call_context_store.load(redis_client, call_id)
+    if context is None:
         raise HTTPException(status_code=404, detail="Call not found")
     
-    context = call_contexts[call_id]
     return {
         "call_id": call_id,
         "incident_fact": context["incident_fact"].dict(),
         "conversation_history": context["conversation_history"],
+        "conversation_summary": context.get("summary"),
         "call_start_time": context["call_start_time"].isoformat()
     }
 
-@router.websocket("/ws/dashboard")
-async def dashboard_websocket(websocket: WebSocket):
+@router.get("/metrics/turns")
+async def get_turn_metrics():
     """
-    WebSocket endpoint for dashboard real-time updates
+    Logic handler turn metrics: fraction of turns served without a model
+    call and p50/p99 turn latency over recent turns
     """
-    await dashboard_manager.connect(websocket)
-    try:
-        while True:
-            # Keep connection alive
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        dashboard_manager.disconnect(websocket)
+    return turn_metrics.snapshot()
 
-async def extract_facts_from_conversation(call_context: Dict[str, Any]):
-    """Extract incident facts from conversation history using Gemini"""
-    try:
-        conversation_text = "\n".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in call_context["conversation_history"]
-        ])
-        
-        prompt = f"""
-        Analyze this emergency call conversation and extract relevant information for an incident report.
-        
-        Conversation:
-        {conversation_text}
-        
-        Please extract the following information if mentioned:
-        - Emergency type (fire, medical, police, etc.)
-        - Location/address
-        - Number of people involved
-        - Severity/urgency level
-        - Any specific details about the situation
-        
-        Return the information in a structured format.
-        """
-        
-        response = model.generate_content(prompt)
-        
-        # Parse response and update incident fact
-        # This is a simplified version - in production, you'd want more sophisticated parsing
-        incident_fact = call_context["incident_fact"]
-        
-        # Enhanced fact extraction using Gemini's structured output
-        conversation_text = "\n".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in call_context["conversation_history"]
-        ])
-        
-        # Use Gemini to extract structured information
-        extraction_prompt = f"""
-        Analyze this emergency call conversation and extract specific information:
-        
-        Conversation:
-        {conversation_text}
-        
-        Extract and return ONLY the following information in this exact format:
-        EMERGENCY_TYPE: [Fire/Medical/Police/Other]
-        LOCATION: [exact address or location mentioned]
-        SEVERITY: [Low/Medium/High/Critical]
-        PEOPLE_INVOLVED: [number of people mentioned]
-        CALLER_SAFE: [Yes/No/Unknown]
-        DESCRIPTION: [brief description of the incident]
-        
-        If information is not mentioned, use "Not specified"
-        """
-        
-        extraction_response = model.generate_content(extraction_prompt)
-        extracted_text = extraction_response.text
-        
-        # Parse the structured response
-        lines = extracted_text.strip().split('\n')
-        for line in lines:
-            if line.startswith('EMERGENCY_TYPE:'):
-                incident_fact.emergency_type = line.split(':', 1)[1].strip()
-            elif line.startswith('LOCATION:'):
-                location = line.split(':', 1)[1].strip()
-                if location != "Not specified":
-                    incident_fact.location = location
-            elif line.startswith('SEVERITY:'):
-                incident_fact.severity = line.split(':', 1)[1].strip()
-            elif line.startswith('PEOPLE_INVOLVED:'):
-                try:
-                    people = int(line.split(':', 1)[1].strip())
-                    incident_fact.people_involved = people
-                except:
-                    pass
-            elif line.startswith('CALLER_SAFE:'):
-                safe = line.split(':', 1)[1].strip().lower()
-                incident_fact.is_caller_safe = safe == "yes"
-            elif line.startswith('DESCRIPTION:'):
-                incident_fact.description = line.split(':', 1)[1].strip()
-        
-        # Fallback to basic keyword extraction if structured extraction fails
-        if not incident_fact.emergency_type:
-            if "fire" in conversation_text.lower():
-                incident_fact.emergency_type = "Fire"
-            elif "medical" in conversation_text.lower() or "ambulance" in conversation_text.lower():
-                incident_fact.emergency_type = "Medical"
-            elif "police" in conversation_text.lower() or "crime" in conversation_text.lower():
-                incident_fact.emergency_type = "Police"
-        
-        logger.info(f"Extracted facts: {incident_fact}")
-        
-    except Exception as e:
-        logger.error(f"Error extracting facts: {e}")
-
-def get_missing_incident_fields(incident_fact: IncidentFact) -> List[str]:
-    """Determine which required fields are still missing from the incident fact"""
-    missing_fields = []
-    
-    # Critical fields that must be filled
-    if not incident_fact.emergency_type or incident_fact.emergency_type == "Not specified":
-        missing_fields.append("emergency_type")
-    if not incident_fact.location or incident_fact.location == "Not specified":
-        missing_fields.append("location")
-    if not incident_fact.severity or incident_fact.severity == "Not specified":
-        missing_fields.append("severity")
-    if not incident_fact.description or incident_fact.description == "Not specified":
-        missing_fields.append("description")
-    
-    # Important fields for emergency response
-    if incident_fact.is_caller_safe is None:
-        missing_fields.append("caller_safety")
-    if not incident_fact.people_involved or incident_fact.people_involved == 0:
-        missing_fields.append("people_involved")
-    
-    return missing_fields
-
-async def generate_next_question(
-    conversation_history: List[Dict],
-    incident_fact: IncidentFact,
-    missing_fields: List[str]
-) -> str:
-    """Generate the next question using Gemini based on missing information"""
-    try:
-        conversation_text = "\n".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in conversation_history[-5:]  # Last 5 messages for context
-        ])
-        
-        missing_fields_text = ", ".join(missing_fields)
-        
-        # Create a priority order for missing fields
-        field_priorities = {
-            "emergency_type": 1,
-            "location": 2, 
-            "severity": 3,
-            "caller_safety": 4,
-            "people_involved": 5,
-            "description": 6
-        }
-        
-        # Sort missing fields by priority
-        sorted_missing = sorted(missing_fields, key=lambda x: field_priorities.get(x, 99))
-        most_important_missing = sorted_missing[0] if sorted_missing else "general_info"
-        
-        prompt = f"""
-        You are an emergency dispatcher conducting an intake call. Based on the conversation so far, 
-        determine the single most important question to ask next to gather missing information.
-        
-        Current conversation:
-        {conversation_text}
-        
-        Current incident information:
-        - Emergency Type: {incident_fact.emergency_type or 'Not specified'}
-        - Location: {incident_fact.location or 'Not specified'}
-        - Severity: {incident_fact.severity or 'Not specified'}
-        - Caller Safe: {incident_fact.is_caller_safe if incident_fact.is_caller_safe is not None else 'Not specified'}
-        - People Involved: {incident_fact.people_involved or 'Not specified'}
-        - Description: {incident_fact.description or 'Not specified'}
-        
-        Missing information: {missing_fields_text}
-        Most critical missing field: {most_important_missing}
-        
-        Generate a single, clear, and empathetic question to ask the caller. 
-        Be professional but reassuring. Keep it concise and specific to the missing information.
-        If this is a critical emergency, be more direct and urgent.
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text.strip()
-        
-    except Exception as e:
-        logger.error(f"Error generating next question: {e}")
-        return "Can you please provide more details about the emergency?"
+@router.websocket("/ws/dashboard")
+async def dashboard_websocket(websocket: WebSocket, calls: Optional[str] = None, cells: Optional[str] = None, types: Optional[str] = None):
+    """
+    WebSocket endpoint for dashboard real-time updates, optionally filtered
+    by call, region and event type (see frontend_router.serve_dashboard)
+    """
+    await serve_dashboard(websocket, calls, cells, types)
 
 async def finalize_incident(call_context: Dict[str, Any], call_id: str):
     """Finalize the incident and send to conversational intake agent"""
     try:
         incident_fact = call_context["incident_fact"]
-        incident_fact.callback_number = call_context.get("caller_number", "Unknown")
+        # A callback number the caller gave takes precedence over caller ID
+        if not incident_fact.callback_number:
+            incident_fact.callback_number = call_context.get("caller_number", "Unknown")
         incident_fact.timestamp = datetime.now()
         
-        # Create conversation summary
-        conversation_summary = "\n".join([
-            f"{msg['role']}: {msg['content']}" 
-            for msg in call_context["conversation_history"]
-        ])
+        # Create conversation summary from the rolling summary and recent turns
+        conversation_summary = conversation_transcript(call_context)
         
         # Send to conversational intake agent
         conversational_intake_address = agent_registry.get_agent_address("conversational_intake")
@@ -444,17 +313,16 @@ async def finalize_incident(call_context: Dict[str, Any], call_id: str):
             }
             
             # Send HTTP request to agent
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"http://localhost:8001/submit",
-                    json=message_data,
-                    timeout=10.0
-                )
+            response = await http_clients.post(
+                f"http://localhost:8001/submit",
+                json=message_data,
+                timeout=10.0
+            )
                 
-                if response.status_code == 200:
-                    logger.info(f"Successfully sent incident to conversational intake agent")
-                else:
-                    logger.error(f"Failed to send incident to agent: {response.status_code}")
+            if response.status_code == 200:
+                logger.info(f"Successfully sent incident to conversational intake agent")
+            else:
+                logger.error(f"Failed to send incident to agent: {response.status_code}")
         else:
             logger.warning("Conversational intake agent not found in registry")
         
@@ -462,12 +330,15 @@ async def finalize_incident(call_context: Dict[str, Any], call_id: str):
         logger.error(f"Error finalizing incident: {e}")
 
 @router.get("/calls/{call_id}/status")
-async def get_call_status(call_id: str):
+async def get_call_status(
+    call_id: str,
+    redis_client: redis.Redis = Depends(get_redis_dependency)
+):
     """Get the current status of a call"""
-    if call_id not in call_contexts:
+    call_context = await call_context_store.load(redis_client, call_id)
+    if call_context is None:
         raise HTTPException(status_code=404, detail="Call not found")
     
-    call_context = call_contexts[call_id]
     return {
         "callId": call_id,
         "incidentFact": call_context["incident_fact"].dict(),
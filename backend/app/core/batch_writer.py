@@ -0,0 +1,164 @@
+"""
+Write-behind Batch Writer for Emergency Dispatch System
+
+Producers put() items into a bounded queue and return at once. A single
+flusher task collects them into batches and hands each batch to a flush
+callable, for example a PostgREST bulk insert of an array of rows. A batch
+is flushed when it reaches max_batch items or when its oldest item has
+waited max_delay seconds, whichever comes first.
+
+The queue is bounded. When it is full, put() waits for the flusher to make
+room. That backpressure reaches the producer (e.g. the Comms Agent's Redis
+listener), which stops reading until the downstream catches up. Memory use
+stays bounded instead.
+
+The flush callable returns True when the batch was written and False when
+it failed. It returns DEFERRED when the batch was not written but was handed
+off to be written later, e.g. recorded in an outbox for replay. Those items
+are counted as deferred, not failed.
+
+stats() reports batch sizes, flush call latency, and the latency of each
+batch's oldest item (from put() to the end of its flush) over recent
+batches.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Queued by stop(); the flusher writes what it holds and exits
+_STOP = object()
+
+# Returned by a flush that handed its batch off for a later write
+DEFERRED = "deferred"
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return round(ordered[int(fraction * (len(ordered) - 1))], 2) if ordered else 0.0
+
+
+class BatchWriter:
+    """Bounded write-behind queue flushed in batches by size or age"""
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], Awaitable[Union[bool, str]]],
+        max_batch: int = 100,
+        max_delay: float = 0.25,
+        max_queue: int = 5000,
+        name: str = "batch_writer",
+        window: int = 1000
+    ):
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.deferred = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        # Recent batches: (size, flush call ms, oldest item latency ms)
+        self.recent = deque(maxlen=window)
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self) -> None:
+        """Start the flusher task on the running event loop"""
+        if not self.running:
+            self.task = asyncio.create_task(self._run())
+
+    async def put(self, item: Any) -> None:
+        """Queue an item, waiting for room when the queue is full"""
+        if self.queue.full():
+            self.backpressure_waits += 1
+        await self.queue.put((time.monotonic(), item))
+        self.enqueued += 1
+
+    async def _next_batch(self) -> List[tuple]:
+        """Wait for one item, then collect more until the batch is full or due"""
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch and batch[-1] is not _STOP:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, batch: List[tuple]) -> None:
+        items = [item for _, item in batch]
+        started = time.monotonic()
+        try:
+            ok = await self.flush(items)
+        except Exception as e:
+            logger.error(f"❌ {self.name} flush of {len(items)} items failed: {e}")
+            ok = False
+        finished = time.monotonic()
+
+        self.batches += 1
+        if ok == DEFERRED:
+            self.deferred += len(items)
+        elif ok:
+            self.written += len(items)
+        else:
+            self.failed += len(items)
+        self.recent.append((len(items), (finished - started) * 1000, (finished - batch[0][0]) * 1000))
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            if batch:
+                await self._write(batch)
+            if stopping:
+                return
+
+    async def stop(self) -> None:
+        """Flush everything queued so far and stop the flusher"""
+        if not self.running:
+            return
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, totals, batch sizes and p50/p99 flush and item latency"""
+        sizes = [size for size, _, _ in self.recent]
+        flush_ms = sorted(ms for _, ms, _ in self.recent)
+        latency_ms = sorted(ms for _, _, ms in self.recent)
+        return {
+            "queued": self.queue.qsize(),
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "batch_size_avg": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "batch_size_max": max(sizes, default=0),
+            "flush_p50_ms": _percentile(flush_ms, 0.50),
+            "flush_p99_ms": _percentile(flush_ms, 0.99),
+            "latency_p50_ms": _percentile(latency_ms, 0.50),
+            "latency_p99_ms": _percentile(latency_ms, 0.99)
+        }
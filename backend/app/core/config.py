@@ -10,6 +10,62 @@ class Settings(BaseSettings):
     DATABASE_URL: str = ""  # Direct PostgreSQL connection string for SQLAlchemy
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Vapi call contexts: TTL after the last turn and in-process cache size
+    CALL_CONTEXT_TTL_SECONDS: int = 3600
+    CALL_CONTEXT_CACHE_SIZE: int = 256
+    
+    # Per-call dashboard event log: in-memory ring buffer per call, Redis Stream length, calls kept in memory
+    CALL_EVENT_BUFFER_SIZE: int = 500
+    CALL_EVENT_STREAM_MAXLEN: int = 1000
+    CALL_EVENT_CACHE_CALLS: int = 256
+    
+    # Dashboard bootstrap snapshot: cache lifetime and recent calls included
+    BOOTSTRAP_CACHE_SECONDS: float = 2.0
+    BOOTSTRAP_RECENT_CALLS: int = 50
+    
+    # Comms Agent incident log write-behind: rows per bulk insert, longest wait before a flush, queued rows
+    COMMS_LOG_BATCH_SIZE: int = 100
+    COMMS_LOG_FLUSH_MS: int = 250
+    COMMS_LOG_QUEUE_SIZE: int = 5000
+    # Comms Agent outbox for failed log writes and notifications: SQLite file (empty uses data/comms_outbox.db), retry backoff and attempts
+    COMMS_OUTBOX_PATH: str = ""
+    COMMS_OUTBOX_BASE_DELAY_SECONDS: float = 1.0
+    COMMS_OUTBOX_MAX_DELAY_SECONDS: float = 300.0
+    COMMS_OUTBOX_MAX_ATTEMPTS: int = 12
+    
+    # Conversation compaction: token budget for the stored history and turns kept verbatim
+    CONVERSATION_TOKEN_BUDGET: int = 1500
+    CONVERSATION_KEEP_TURNS: int = 6
+    
+    # Offline geocoder gazetteer (streets and places); empty uses data/ann_arbor_gazetteer.json
+    GAZETTEER_PATH: str = ""
+    
+    # Multi-caller deduplication: same-type incidents this close, this far apart in time, are one case
+    DEDUP_RADIUS_KM: float = 0.15
+    DEDUP_WINDOW_SECONDS: int = 900
+    
+    # Unit change stream: default minimum interval between updates of one unit, keep-alive period, unit states kept per worker
+    UNIT_STREAM_MIN_INTERVAL_MS: int = 1000
+    UNIT_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    UNIT_STREAM_MAX_TRACKED_UNITS: int = 50000
+    
+    # Map aggregation: grid cells per view, points returned individually below this many, view cache lifetime, expired-unit sweep period
+    MAP_MAX_CELLS: int = 1024
+    MAP_POINT_LIMIT: int = 500
+    MAP_CACHE_SECONDS: float = 2.0
+    MAP_SWEEP_SECONDS: float = 300.0
+    
+    # WebSocket fan-out: per-client send queue, overflow policy ("drop_oldest" or "disconnect") and send timeout
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_OVERFLOW_POLICY: str = "drop_oldest"
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    # Updates reaching a client within this window are sent as one frame (0 disables batching)
+    WS_BATCH_WINDOW_MS: float = 50.0
+    # Relay WebSocket broadcasts between API workers over Redis pub/sub
+    WS_BACKPLANE_ENABLED: bool = True
+    # Publishes waiting for Redis; when full, the oldest is delivered to this worker's clients only
+    WS_BACKPLANE_QUEUE_SIZE: int = 10000
+    
     # Application settings
     APP_NAME: str = "Emergency Dispatch System"
     DEBUG: bool = True
@@ -0,0 +1,203 @@
+"""
+Shared HTTP Client Registry for Emergency Dispatch System
+
+Outbound HTTP calls (Vapi, Supabase PostgREST, the dispatch API and agent
+endpoints) go through one pooled httpx.AsyncClient per origin instead of a
+new client per request, so repeated calls reuse keep-alive connections and
+skip the TCP and TLS handshakes. HTTP/2 is used when the optional `h2`
+package is installed.
+
+Requests get default timeouts and a retry budget. Failures where the request
+was never sent (connect errors, pool timeouts) are retried for every method.
+Read timeouts and 502/503/504 responses are retried only for idempotent
+methods. Retries are capped at a fraction of recent requests so they cannot
+amplify an outage. Every new TCP connection is counted through the httpcore
+trace hook, and stats() reports connections opened per minute.
+
+A client is bound to the event loop it was created on. When a different
+loop asks for the same origin, the old client is replaced and closed on its
+own loop (if that loop is still open), so its connections are released.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0)
+DEFAULT_MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.1
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+# Errors raised before the request reaches the server; safe to retry for any method
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Errors after the request may have been processed; retried for idempotent methods only
+IDEMPOTENT_RETRY_ERRORS = (httpx.ReadTimeout, httpx.RemoteProtocolError)
+
+
+class RetryBudget:
+    """Allows retries up to `ratio` of recent requests plus a small floor per window"""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window_seconds: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self.requests = deque()
+        self.retries = deque()
+        self.exhausted = 0
+
+    def _prune(self, now: float) -> None:
+        for events in (self.requests, self.retries):
+            while events and now - events[0] > self.window_seconds:
+                events.popleft()
+
+    def record_request(self) -> None:
+        self.requests.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; returns False when it is exhausted"""
+        now = time.monotonic()
+        self._prune(now)
+        if len(self.retries) >= self.min_retries + self.ratio * len(self.requests):
+            self.exhausted += 1
+            return False
+        self.retries.append(now)
+        return True
+
+
+class HTTPClientRegistry:
+    """Pooled httpx.AsyncClient per origin with timeouts, retry budget and connection stats"""
+
+    def __init__(
+        self,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        http2: bool = HTTP2_AVAILABLE,
+        max_retries: int = DEFAULT_MAX_RETRIES
+    ):
+        self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.retry_budget = RetryBudget()
+        self.connections_opened = 0
+        self.retries = 0
+        self._connection_times = deque()
+        # origin -> (event loop, client); clients are bound to the loop they were created on
+        self._clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpcore trace callback; counts new TCP connections"""
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+            self._connection_times.append(time.monotonic())
+
+    async def _attach_trace(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """Shared client for the origin of `url`, created on first use"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        loop = asyncio.get_running_loop()
+
+        entry = self._clients.get(origin)
+        if entry and entry[0] is loop and not entry[1].is_closed:
+            return entry[1]
+        if entry and entry[0] is not loop:
+            self._close_on_loop(*entry)
+
+        client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            event_hooks={"request": [self._attach_trace]}
+        )
+        self._clients[origin] = (loop, client)
+        return client
+
+    @staticmethod
+    def _close_on_loop(loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient) -> None:
+        """Schedule aclose of a client on the loop it belongs to; a closed loop took its sockets with it"""
+        if client.is_closed or loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        except RuntimeError as e:
+            logger.warning(f"Could not close HTTP client of another event loop: {e}")
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request on the origin's shared client, retrying within the budget"""
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        client = self.client(url)
+        self.retry_budget.record_request()
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await client.request(method, url, **kwargs)
+            except UNSENT_ERRORS:
+                if last_attempt or not self.retry_budget.try_spend():
+                    raise
+            except IDEMPOTENT_RETRY_ERRORS:
+                if not idempotent or last_attempt or not self.retry_budget.try_spend():
+                    raise
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or not idempotent
+                    or last_attempt
+                    or not self.retry_budget.try_spend()
+                ):
+                    return response
+
+            self.retries += 1
+            logger.warning(f"Retrying {method} {url} (attempt {attempt + 2})")
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage: clients, connections opened (total and last minute) and retries"""
+        now = time.monotonic()
+        while self._connection_times and now - self._connection_times[0] > 60:
+            self._connection_times.popleft()
+        return {
+            "clients": len(self._clients),
+            "http2": self.http2,
+            "connections_opened": self.connections_opened,
+            "connections_per_minute": len(self._connection_times),
+            "retries": self.retries,
+            "retry_budget_exhausted": self.retry_budget.exhausted
+        }
+
+    async def aclose(self) -> None:
+        """Close every client, those of other event loops on their own loop"""
+        loop = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for client_loop, client in clients.values():
+            if client_loop is loop:
+                await client.aclose()
+            else:
+                self._close_on_loop(client_loop, client)
+
+
+# Shared registry for the API process and each agent process
+http_clients = HTTPClientRegistry()
@@ -0,0 +1,200 @@
+"""
+Redis Pub/Sub Backplane for WebSocket Fan-out
+
+Lets several API workers share one logical WebSocket hub. Broadcasts are
+published to Redis instead of being delivered locally. Every worker,
+including the one that published, relays what it receives to its own
+connected clients. A transcript that reaches worker A is therefore seen by
+a dashboard connected to worker B.
+
+Channels:
+- ws:broadcast carries messages for every client
+- ws:group:<group> carries messages for one group, e.g. a call's own
+  connections. A worker subscribes to a group channel only while it has a
+  local client in that group.
+- ws:routed carries topic-routed events. Each payload starts with a header
+  line "<event type>\t<topic>,<topic>..." and every worker routes it
+  against its own topic index. Serialized JSON never contains a raw
+  newline, so the first newline ends the header.
+
+Publishes are queued and sent in pipelined batches by a single task, so the
+caller never waits on Redis. If Redis is unreachable, messages fall back to
+local delivery and the relay reconnects with backoff. The queue is bounded:
+while Redis is too slow to drain it, the oldest publish is delivered to this
+worker's clients only.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CHANNEL = "ws:broadcast"
+GROUP_CHANNEL_PREFIX = "ws:group:"
+ROUTED_CHANNEL = "ws:routed"
+RECONNECT_BACKOFF_SECONDS = (0.5, 1.0, 2.0, 5.0)
+
+
+def channel_for(group: Optional[str]) -> str:
+    return BROADCAST_CHANNEL if group is None else GROUP_CHANNEL_PREFIX + group
+
+
+def group_for(channel: str) -> Optional[str]:
+    return None if channel == BROADCAST_CHANNEL else channel[len(GROUP_CHANNEL_PREFIX):]
+
+
+def encode_routed(message: str, topics: List[str], event_type: Optional[str]) -> str:
+    return f"{event_type or ''}\t{','.join(topics)}\n{message}"
+
+
+def decode_routed(payload: str) -> Tuple[str, List[str], Optional[str]]:
+    """(message, topics, event type) of a ws:routed payload"""
+    header, message = payload.split("\n", 1)
+    event_type, topics = header.split("\t", 1)
+    return message, topics.split(",") if topics else [], event_type or None
+
+
+class RedisBackplane:
+    """Relays hub broadcasts between API workers over Redis pub/sub"""
+
+    def __init__(self, hub, redis_url: str, max_queue: int = None):
+        self.hub = hub
+        self.redis_url = redis_url
+        self.max_queue = max_queue or settings.WS_BACKPLANE_QUEUE_SIZE
+        self.client: Optional[redis.Redis] = None
+        self.pubsub = None
+        self.outbox: Optional[asyncio.Queue] = None
+        self.tasks = []
+        self.connected = False
+        self.published = 0
+        self.relayed = 0
+        self.fallbacks = 0
+        self.overflows = 0
+
+    async def start(self) -> None:
+        """Connect, subscribe to the broadcast and local group channels and start relaying"""
+        self.client = redis.from_url(self.redis_url, decode_responses=True)
+        await self._subscribe()
+        self.outbox = asyncio.Queue(maxsize=self.max_queue)
+        self.tasks = [asyncio.create_task(self._publish_loop()), asyncio.create_task(self._relay_loop())]
+        logger.info("✅ WebSocket backplane connected to Redis")
+
+    async def _subscribe(self) -> None:
+        if self.pubsub is not None:
+            # Each pub/sub holds its own connection; a reconnect must not leak the old one
+            pubsub, self.pubsub = self.pubsub, None
+            try:
+                await pubsub.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to close the previous backplane subscription: {e}")
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(BROADCAST_CHANNEL, ROUTED_CHANNEL, *[channel_for(group) for group in self.hub.groups])
+        self.connected = True
+
+    def publish(self, message: str, group: Optional[str] = None) -> None:
+        """Queue a message for every worker; sent by the publish task"""
+        self._enqueue(channel_for(group), message)
+
+    def publish_routed(self, message: str, topics: List[str], event_type: Optional[str] = None) -> None:
+        """Queue a topic-routed event for every worker"""
+        self._enqueue(ROUTED_CHANNEL, encode_routed(message, topics, event_type))
+
+    def _enqueue(self, channel: str, payload: str) -> None:
+        try:
+            self.outbox.put_nowait((channel, payload))
+            return
+        except asyncio.QueueFull:
+            pass
+        # Make room; the oldest publish still reaches this worker's clients
+        self._deliver(*self.outbox.get_nowait())
+        self.outbox.put_nowait((channel, payload))
+        self.overflows += 1
+
+    def _deliver(self, channel: str, payload: str) -> None:
+        """Hand a channel message to this worker's clients"""
+        if channel == ROUTED_CHANNEL:
+            self.hub.route(*decode_routed(payload))
+        else:
+            self.hub.broadcast(payload, group=group_for(channel))
+
+    async def _publish_loop(self) -> None:
+        while True:
+            batch = [await self.outbox.get()]
+            while not self.outbox.empty():
+                batch.append(self.outbox.get_nowait())
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                for channel, message in batch:
+                    pipe.publish(channel, message)
+                await pipe.execute()
+                self.published += len(batch)
+            except Exception as e:
+                # Deliver to this worker's clients rather than lose the updates
+                logger.error(f"❌ Backplane publish failed, delivering locally: {e}")
+                self.fallbacks += len(batch)
+                for channel, message in batch:
+                    self._deliver(channel, message)
+
+    async def _relay_loop(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                if not self.connected:
+                    await self._subscribe()
+                    logger.info("✅ WebSocket backplane resubscribed")
+                attempt = 0
+                async for item in self.pubsub.listen():
+                    if item["type"] != "message":
+                        continue
+                    self._deliver(item["channel"], item["data"])
+                    self.relayed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.connected = False
+                delay = RECONNECT_BACKOFF_SECONDS[min(attempt, len(RECONNECT_BACKOFF_SECONDS) - 1)]
+                attempt += 1
+                logger.error(f"❌ Backplane subscription lost, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+
+    def watch_group(self, group: str) -> None:
+        """Start receiving a group's channel; called when its first local client connects"""
+        if self.connected:
+            asyncio.create_task(self._run(self.pubsub.subscribe(channel_for(group))))
+
+    def unwatch_group(self, group: str) -> None:
+        """Stop receiving a group's channel; called when its last local client leaves"""
+        if self.connected:
+            asyncio.create_task(self._run(self.pubsub.unsubscribe(channel_for(group))))
+
+    @staticmethod
+    async def _run(command) -> None:
+        try:
+            await command
+        except Exception as e:
+            logger.error(f"❌ Backplane subscription change failed: {e}")
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.connected = False
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        if self.client is not None:
+            await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "published": self.published,
+            "relayed": self.relayed,
+            "local_fallbacks": self.fallbacks,
+            "queued": self.outbox.qsize() if self.outbox is not None else 0,
+            "overflows": self.overflows
+        }
@@ -0,0 +1,379 @@
+"""
+WebSocket Fan-out Hub for Emergency Dispatch System
+
+Dashboard and call WebSocket clients each get a bounded send queue drained
+by their own writer task. A broadcast only enqueues the message and returns,
+so webhook handlers never wait on sockets and one slow dashboard cannot stall
+the others.
+
+When a client's queue is full, the overflow policy decides what happens:
+"drop_oldest" discards the oldest queued message, and "disconnect" closes
+the slow client. A writer whose send fails or exceeds the send timeout
+closes its client, and closed clients are pruned from every group.
+
+Messages are serialized once with dumps() (orjson when installed) and the
+same string is queued for every client. Each writer coalesces whatever
+arrives within the batching window into one frame; a frame holding more
+than one message is {"type": "batch", "messages": [...]}.
+
+Clients can subscribe to topics instead of receiving every update. A topic
+is a group: "call:<call_id>" for one call, "cell:<geohash prefix>" for a
+region, and a client may also narrow what it receives to some event types.
+route() delivers an event to the clients indexed under any of its topics
+plus the clients without subscriptions, so the work per event grows with
+the clients that want it rather than with every connected client.
+
+With several API workers, start_backplane() routes publish() through Redis
+pub/sub (see websocket_backplane) so every worker relays each update to its
+own clients. Without a backplane, publish() delivers locally.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.core.websocket_backplane import RedisBackplane
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (DROP_OLDEST, DISCONNECT)
+
+# Close code sent to clients disconnected for falling behind ("try again later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+CALL_TOPIC_PREFIX = "call:"
+CELL_TOPIC_PREFIX = "cell:"
+
+
+def call_topic(call_id: str) -> str:
+    return CALL_TOPIC_PREFIX + call_id
+
+
+def cell_topics(cell: str) -> List[str]:
+    """Topics of an event in `cell`: one per geohash prefix, so subscriptions to larger regions match"""
+    return [CELL_TOPIC_PREFIX + cell[:length] for length in range(1, len(cell) + 1)]
+
+
+def dumps(message: Dict[str, Any]) -> str:
+    """Serialize a message to compact JSON; UUIDs and datetimes become strings"""
+    if orjson is not None:
+        return orjson.dumps(message, default=str).decode()
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+def batch_frame(messages: List[str]) -> str:
+    """One frame for several serialized messages, without re-encoding them"""
+    if len(messages) == 1:
+        return messages[0]
+    return '{"type":"batch","messages":[' + ",".join(messages) + "]}"
+
+
+class WebSocketClient:
+    """One WebSocket with a bounded send queue and its writer task"""
+
+    def __init__(self, hub: "WebSocketHub", websocket: WebSocket, groups: Set[str], hold: bool = False):
+        self.hub = hub
+        self.websocket = websocket
+        self.groups = groups
+        # Event types this client receives; None receives every type
+        self.types: Optional[Set[str]] = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=hub.max_queue)
+        # Live messages held back until release(), e.g. while a catch-up frame is prepared
+        self.held: Optional[List[str]] = [] if hold else None
+        self.closed = False
+        self.sent = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.writer = asyncio.create_task(self._write())
+
+    def offer(self, message: str) -> bool:
+        """Queue a message without waiting; applies the overflow policy when full"""
+        if self.closed:
+            return False
+        if self.held is not None:
+            self.held.append(message)
+            del self.held[:-self.hub.max_queue]
+            return True
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.hub.overflow == DISCONNECT:
+            logger.warning(f"Disconnecting slow WebSocket client ({self.queue.qsize()} messages queued)")
+            self.hub.slow_disconnects += 1
+            self.close(code=SLOW_CLIENT_CLOSE_CODE)
+            return False
+
+        self.queue.get_nowait()
+        self.queue.put_nowait(message)
+        self.dropped += 1
+        self.hub.dropped += 1
+        return True
+
+    def release(self, first: Optional[str] = None) -> None:
+        """Send `first`, then the messages held since connect, then live messages"""
+        held, self.held = self.held or [], None
+        for message in ([first] if first is not None else []) + held:
+            self.offer(message)
+
+    def wants(self, event_type: Optional[str]) -> bool:
+        return self.types is None or event_type in self.types
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                messages = [await self.queue.get()]
+                if self.hub.batch_window:
+                    # Let the rest of the burst arrive, then send it as one frame
+                    await asyncio.sleep(self.hub.batch_window)
+                while not self.queue.empty():
+                    messages.append(self.queue.get_nowait())
+
+                frame = batch_frame(messages)
+                await asyncio.wait_for(self.websocket.send_text(frame), self.hub.send_timeout)
+                self.sent += len(messages)
+                self.frames += 1
+                self.bytes_sent += len(frame)
+                self.hub._record_frame(len(frame))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"WebSocket send failed, pruning client: {e!r}")
+            self.close()
+
+    def close(self, code: Optional[int] = None) -> None:
+        """Stop the writer and prune the client; the socket is closed when `code` is given"""
+        if self.closed:
+            return
+        self.closed = True
+        self.hub._prune(self)
+        if asyncio.current_task() is not self.writer:
+            self.writer.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class WebSocketHub:
+    """Registry of WebSocket clients by group and topic with non-blocking broadcast"""
+
+    def __init__(
+        self,
+        max_queue: int = None,
+        overflow: str = None,
+        send_timeout: float = None,
+        batch_window_ms: float = None
+    ):
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.overflow = overflow or settings.WS_OVERFLOW_POLICY
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {self.overflow}")
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        if batch_window_ms is None:
+            batch_window_ms = settings.WS_BATCH_WINDOW_MS
+        self.batch_window = batch_window_ms / 1000
+        self.clients: Dict[WebSocket, WebSocketClient] = {}
+        self.groups: Dict[str, Set[WebSocketClient]] = {}
+        # Clients without topic subscriptions; route() delivers every event to them
+        self.unfiltered: Set[WebSocketClient] = set()
+        self.routed = 0
+        self.route_deliveries = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.frames = 0
+        self.bytes_sent = 0
+        self.started_at = time.monotonic()
+        self.backplane = None
+
+    @property
+    def active_connections(self):
+        return list(self.clients)
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        groups: Iterable[str] = (),
+        hold: bool = False,
+        types: Optional[Iterable[str]] = None
+    ) -> WebSocketClient:
+        """Accept a WebSocket and start its writer; with `hold`, messages wait for client.release()"""
+        await websocket.accept()
+        client = WebSocketClient(self, websocket, set(), hold=hold)
+        self.clients[websocket] = client
+        self.unfiltered.add(client)
+        self._join(client, groups)
+        if types is not None:
+            client.types = set(types)
+        logger.info(f"WebSocket connected. Total connections: {len(self.clients)}")
+        return client
+
+    def disconnect(self, websocket: WebSocket) -> None:
+        client = self.clients.get(websocket)
+        if client:
+            client.close()
+            logger.info(f"WebSocket disconnected. Total connections: {len(self.clients)}")
+
+    def _join(self, client: WebSocketClient, groups: Iterable[str]) -> None:
+        for group in groups:
+            if group in client.groups:
+                continue
+            if group not in self.groups and self.backplane:
+                self.backplane.watch_group(group)
+            self.groups.setdefault(group, set()).add(client)
+            client.groups.add(group)
+        if client.groups:
+            self.unfiltered.discard(client)
+
+    def _leave(self, client: WebSocketClient, groups: Iterable[str]) -> None:
+        for group in list(groups):
+            if group not in client.groups:
+                continue
+            client.groups.discard(group)
+            members = self.groups.get(group)
+            if members is not None:
+                members.discard(client)
+                if not members:
+                    del self.groups[group]
+                    if self.backplane:
+                        self.backplane.unwatch_group(group)
+        if not client.groups and not client.closed:
+            self.unfiltered.add(client)
+
+    def _prune(self, client: WebSocketClient) -> None:
+        if self.clients.get(client.websocket) is client:
+            del self.clients[client.websocket]
+        self.unfiltered.discard(client)
+        self._leave(client, client.groups)
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str] = (), types: Optional[Iterable[str]] = None) -> None:
+        """Add topics to a client's subscriptions and event types to its type filter"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        self._join(client, topics)
+        if types is not None:
+            client.types = (client.types or set()) | set(types)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str] = (), types: Iterable[str] = ()) -> None:
+        """Remove topics and event types; a client left without topics receives every event again"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        self._leave(client, topics)
+        if client.types is not None:
+            client.types -= set(types)
+            if not client.types:
+                client.types = None
+
+    def subscriptions(self, websocket: WebSocket) -> Dict[str, Any]:
+        client = self.clients.get(websocket)
+        if client is None:
+            return {"topics": [], "types": None}
+        return {"topics": sorted(client.groups), "types": sorted(client.types) if client.types is not None else None}
+
+    def _record_frame(self, size: int) -> None:
+        self.frames += 1
+        self.bytes_sent += size
+
+    def send(self, websocket: WebSocket, message: str) -> bool:
+        """Queue a message for one client"""
+        client = self.clients.get(websocket)
+        return client.offer(message) if client else False
+
+    def broadcast(self, message: str, group: Optional[str] = None) -> int:
+        """Queue a message for every client, or for one group; returns clients reached"""
+        clients = self.clients.values() if group is None else self.groups.get(group, ())
+        return sum(client.offer(message) for client in list(clients))
+
+    def route(self, message: str, topics: Iterable[str], event_type: Optional[str] = None) -> int:
+        """Queue an event for the clients subscribed to any of its topics and those without subscriptions"""
+        recipients = set(self.unfiltered)
+        for topic in topics:
+            recipients.update(self.groups.get(topic, ()))
+        delivered = sum(client.offer(message) for client in recipients if client.wants(event_type))
+        self.routed += 1
+        self.route_deliveries += delivered
+        return delivered
+
+    def publish(
+        self,
+        message: str,
+        group: Optional[str] = None,
+        topics: Optional[Iterable[str]] = None,
+        event_type: Optional[str] = None
+    ) -> None:
+        """
+        Deliver to clients on every worker through the backplane, or locally without one.
+
+        With `topics`, the message is routed by topic and event type;
+        otherwise it goes to every client, or to one group.
+        """
+        if topics is not None:
+            topics = list(topics)
+            if self.backplane and self.backplane.connected:
+                self.backplane.publish_routed(message, topics, event_type)
+            else:
+                self.route(message, topics, event_type)
+        elif self.backplane and self.backplane.connected:
+            self.backplane.publish(message, group)
+        else:
+            self.broadcast(message, group)
+
+    async def start_backplane(self, redis_url: str) -> bool:
+        """Relay publishes through Redis pub/sub; stays local if Redis is unreachable"""
+        backplane = RedisBackplane(self, redis_url)
+        try:
+            await backplane.start()
+        except Exception as e:
+            logger.warning(f"⚠️ WebSocket backplane unavailable, delivering locally only: {e}")
+            await backplane.stop()
+            return False
+        self.backplane = backplane
+        return True
+
+    async def stop_backplane(self) -> None:
+        if self.backplane:
+            backplane, self.backplane = self.backplane, None
+            await backplane.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """Connected clients, frames and bytes sent, queued and dropped messages, slow-client disconnects"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "clients": len(self.clients),
+            "groups": len(self.groups),
+            "unfiltered_clients": len(self.unfiltered),
+            "routed_events": self.routed,
+            "routed_deliveries": self.route_deliveries,
+            "deliveries_per_routed_event": round(self.route_deliveries / self.routed, 2) if self.routed else None,
+            "frames_sent": self.frames,
+            "bytes_sent": self.bytes_sent,
+            "frames_per_second": round(self.frames / elapsed, 2),
+            "batch_window_ms": self.batch_window * 1000,
+            "queued": sum(client.queue.qsize() for client in self.clients.values()),
+            "max_queue": self.max_queue,
+            "overflow_policy": self.overflow,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "backplane": self.backplane.stats() if self.backplane else None
+        }
@@ -0,0 +1,275 @@
+"""
+Call Context Store for Emergency Dispatch System
+
+Per-call state of the Vapi logic handler (IncidentFact, conversation history
+and extraction progress) lives in Redis, so any API worker can serve any turn
+of a call and finished calls expire instead of accumulating in memory:
+
+    call:{call_id}            Hash: v (version), ctx (compact JSON context)
+
+Every save refreshes the TTL, so a context lives for CALL_CONTEXT_TTL_SECONDS
+after the last turn. A bounded in-process LRU keeps recently used contexts
+decoded; a cached context is only reused while its version matches Redis.
+Loads return a copy carrying the version it was read at, and a save is a
+compare-and-set on that version. If another turn saved the call in between,
+this turn's changes are merged into the newer context and the save is
+retried, so concurrent turns on different workers do not overwrite each
+other.
+"""
+
+import copy
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.schemas.incident_schema import IncidentFact
+
+logger = logging.getLogger(__name__)
+
+CALL_KEY_PREFIX = "call:"
+
+# Set on loaded contexts to the version they were read at; never stored
+VERSION_FIELD = "_version"
+SAVE_ATTEMPTS = 3
+
+# Fields maintained by extraction and compaction against the stored history;
+# a merge keeps the newer context's values
+_PROGRESS_FIELDS = ("extracted_turns", "summary", "compacted_turns")
+
+# KEYS: call hash; ARGV: expected version, encoded context, TTL.
+# Returns the new version, or 0 when the stored version has moved on.
+_SAVE_SCRIPT = """
+local version = redis.call('HGET', KEYS[1], 'v') or '0'
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'ctx', ARGV[2])
+local saved = redis.call('HINCRBY', KEYS[1], 'v', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return saved
+"""
+
+# Short keys for the context fields that are always present; anything else
+# on the context is kept under "x"
+_FIELD_KEYS = {
+    "extracted_turns": "n",
+    "last_question": "q",
+    "question_attempts": "a",
+    "summary": "s",
+    "compacted_turns": "k",
+}
+
+
+def call_key(call_id: str) -> str:
+    """Redis Hash key for a call context"""
+    return f"{CALL_KEY_PREFIX}{call_id}"
+
+
+def new_call_context() -> Dict[str, Any]:
+    """Empty context for a call's first turn"""
+    return {
+        "incident_fact": IncidentFact(),
+        "conversation_history": [],
+        "extracted_turns": 0,
+        "last_question": None,
+        "call_start_time": datetime.now()
+    }
+
+
+def _isoformat(value: Any) -> Any:
+    """Datetimes as ISO strings, everything else unchanged"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _parse_datetime(value: Optional[str]) -> Any:
+    """Parse an ISO string back into a datetime, keeping unparseable values"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return value
+
+
+def encode_context(context: Dict[str, Any]) -> str:
+    """
+    Encode a call context as compact JSON.
+
+    The IncidentFact keeps only non-default fields and history messages are
+    [role, content, timestamp] triples, so a stored context is a fraction of
+    the size of the plain dict dump.
+    """
+    encoded: Dict[str, Any] = {
+        "f": context["incident_fact"].model_dump(mode="json", exclude_defaults=True),
+        "h": [
+            [message["role"], message["content"], _isoformat(message.get("timestamp"))]
+            for message in context.get("conversation_history", [])
+        ],
+        "t": _isoformat(context.get("call_start_time")),
+    }
+    for field, key in _FIELD_KEYS.items():
+        if context.get(field) is not None:
+            encoded[key] = context[field]
+
+    extras = {
+        field: value for field, value in context.items()
+        if field not in _FIELD_KEYS and field not in ("incident_fact", "conversation_history", "call_start_time", VERSION_FIELD)
+    }
+    if extras:
+        encoded["x"] = extras
+
+    return json.dumps(encoded, separators=(",", ":"), default=str)
+
+
+def decode_context(data: str) -> Dict[str, Any]:
+    """Decode a context stored by encode_context"""
+    encoded = json.loads(data)
+    context: Dict[str, Any] = {
+        "incident_fact": IncidentFact(**encoded.get("f", {})),
+        "conversation_history": [
+            {"role": role, "content": content, "timestamp": _parse_datetime(timestamp)}
+            for role, content, timestamp in encoded.get("h", [])
+        ],
+        "extracted_turns": 0,
+        "last_question": None,
+        "call_start_time": _parse_datetime(encoded.get("t")),
+    }
+    for field, key in _FIELD_KEYS.items():
+        if key in encoded:
+            context[field] = encoded[key]
+    context.update(encoded.get("x", {}))
+    return context
+
+
+def _message_key(message: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+    return message.get("role"), message.get("content"), _isoformat(message.get("timestamp"))
+
+
+def merge_context(base: Optional[Dict[str, Any]], ours: Dict[str, Any], latest: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold the changes a turn made to `base` into `latest`, saved meanwhile by another turn.
+
+    New history messages are appended and changed facts and fields win;
+    extraction and compaction progress is taken from `latest`, so appended
+    messages are extracted again on the next turn. Without a base (evicted
+    from the cache) every fact and field of `ours` counts as changed.
+    """
+    merged = copy.deepcopy(latest)
+    base_fact = base["incident_fact"] if base else IncidentFact()
+    changed_facts = {
+        field: value for field, value in ours["incident_fact"]
+        if value != getattr(base_fact, field) and (base or field in ours["incident_fact"].model_fields_set)
+    }
+    merged["incident_fact"] = latest["incident_fact"].model_copy(update=changed_facts)
+
+    seen = {_message_key(message) for message in latest["conversation_history"]}
+    seen.update(_message_key(message) for message in (base or {}).get("conversation_history", []))
+    merged["conversation_history"].extend(
+        copy.deepcopy(message) for message in ours["conversation_history"] if _message_key(message) not in seen
+    )
+
+    for field, value in ours.items():
+        if field in ("incident_fact", "conversation_history", VERSION_FIELD) or field in _PROGRESS_FIELDS:
+            continue
+        if base is None or base.get(field) != value:
+            merged[field] = copy.deepcopy(value)
+    return merged
+
+
+class CallContextStore:
+    """Redis-backed call contexts with TTL and a versioned in-process LRU front cache"""
+
+    def __init__(self, ttl_seconds: int = None, cache_size: int = None):
+        self.ttl_seconds = ttl_seconds or settings.CALL_CONTEXT_TTL_SECONDS
+        self.cache_size = cache_size or settings.CALL_CONTEXT_CACHE_SIZE
+        self._cache: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+
+    def _remember(self, call_id: str, version: int, context: Dict[str, Any]) -> None:
+        """Cache a context, evicting the least recently used beyond cache_size"""
+        self._cache[call_id] = (version, context)
+        self._cache.move_to_end(call_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _copy(version: int, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Private copy of a cached context for one turn, tagged with its version"""
+        return {**copy.deepcopy(context), VERSION_FIELD: version}
+
+    async def load(self, client: redis.Redis, call_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a call context; returns None for unknown or expired calls.
+
+        A cached context costs one HGET of the version; a miss or a stale
+        entry reads and decodes the stored context. The caller gets its own
+        copy, so a failed or concurrent turn never changes the cached one.
+        """
+        key = call_key(call_id)
+        cached = self._cache.get(call_id)
+        if cached:
+            version = await client.hget(key, "v")
+            if version is not None and int(version) == cached[0]:
+                self._cache.move_to_end(call_id)
+                return self._copy(*cached)
+
+        fields = await client.hgetall(key)
+        if not fields or "ctx" not in fields:
+            self._cache.pop(call_id, None)
+            return None
+
+        try:
+            context = decode_context(fields["ctx"])
+        except (ValueError, TypeError, KeyError) as e:
+            logger.error(f"❌ Invalid stored context for call {call_id}: {e}")
+            return None
+
+        version = int(fields.get("v", 0))
+        self._remember(call_id, version, context)
+        return self._copy(version, context)
+
+    async def save(self, client: redis.Redis, call_id: str, context: Dict[str, Any]) -> int:
+        """
+        Store a call context and refresh its TTL; returns the new version.
+
+        The write only succeeds if the stored version is still the one the
+        context was loaded at (0 for a new call). Otherwise the newer context
+        is loaded, this turn's changes are merged into it (`context` is
+        updated in place) and the save is retried up to SAVE_ATTEMPTS times.
+        """
+        key = call_key(call_id)
+        for _ in range(SAVE_ATTEMPTS):
+            expected = context.get(VERSION_FIELD, 0)
+            version = int(await client.eval(_SAVE_SCRIPT, 1, key, expected, encode_context(context), self.ttl_seconds))
+            if version:
+                context[VERSION_FIELD] = version
+                self._remember(call_id, version, {
+                    field: value for field, value in copy.deepcopy(context).items() if field != VERSION_FIELD
+                })
+                return version
+
+            cached = self._cache.get(call_id)
+            base = cached[1] if cached and cached[0] == expected else None
+            latest = await self.load(client, call_id)
+            if latest is None:
+                # The stored context expired; this turn starts it again
+                context[VERSION_FIELD] = 0
+                continue
+            logger.warning(f"⚠️ Call {call_id} was saved by another turn (version {latest[VERSION_FIELD]}), merging")
+            merged = merge_context(base, context, latest)
+            context.clear()
+            context.update(merged)
+
+        raise RuntimeError(f"Call context {call_id} kept changing during save")
+
+    def discard(self, call_id: str) -> None:
+        """Drop a cached context, e.g. after a failed turn left it modified but unsaved"""
+        self._cache.pop(call_id, None)
+
+
+# Shared store for the Vapi router
+call_context_store = CallContextStore()
@@ -0,0 +1,221 @@
+"""
+Call Event Log for Emergency Dispatch System
+
+Every dashboard event for a call (transcript lines, fact updates, comms
+messages) is appended to a bounded per-call log with a sequence number, so a
+client that connects late or reconnects after a network blip can catch up
+without a database query:
+
+    call:events:{call_id}     Stream: entry ID "0-<seq>", field e (compact JSON event)
+    calls:recent              Sorted set: call ID scored by the time of its last event
+
+Entry IDs are allocated by XADD "0-*", which makes the sequence number
+atomic across API workers (Redis 7+). The stream is trimmed to roughly
+CALL_EVENT_STREAM_MAXLEN entries and expires CALL_CONTEXT_TTL_SECONDS after
+the last event. calls:recent lists the calls with live streams, so a
+dashboard can bootstrap without scanning keys.
+
+Each worker keeps an in-memory ring buffer of recent events per call and a
+snapshot folded from them (merged facts, recent transcript, status). Before
+a read, the buffer is synced with the entries other workers appended, using
+one XRANGE. If Redis is unavailable, an event is left unsequenced (seq
+None): it is folded into this worker's snapshot but cannot be resumed from,
+so clients that reconnect from before it get a snapshot. If the stream
+expired and restarted its numbering, the worker drops its copy of the call
+and rebuilds it from the new stream.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_KEY_PREFIX = "call:events:"
+RECENT_CALLS_KEY = "calls:recent"
+
+# Transcript lines kept in a call snapshot
+SNAPSHOT_TRANSCRIPT_LINES = 50
+
+
+def events_key(call_id: str) -> str:
+    """Redis Stream key for a call's events"""
+    return f"{EVENTS_KEY_PREFIX}{call_id}"
+
+
+def _seq(entry_id: str) -> int:
+    return int(entry_id.split("-", 1)[1])
+
+
+class CallEvents:
+    """Recent events of one call with the snapshot folded from every event seen"""
+
+    def __init__(self, buffer_size: int):
+        self.events: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=buffer_size)
+        self.seq = 0
+        self.status = "active"
+        self.facts: Dict[str, Any] = {}
+        self.transcript: Deque[Dict[str, Any]] = deque(maxlen=SNAPSHOT_TRANSCRIPT_LINES)
+        self.last_update: Optional[str] = None
+        # Sequence number the latest unsequenced event followed
+        self.unsequenced_after: Optional[int] = None
+
+    def apply(self, seq: Optional[int], event: Dict[str, Any]) -> None:
+        """
+        Add an event and fold it into the snapshot; already-seen sequence
+        numbers are ignored. Unsequenced events (seq None) are only folded.
+        """
+        if seq is None:
+            self.unsequenced_after = self.seq
+        elif seq <= self.seq:
+            return
+        else:
+            self.seq = seq
+            self.events.append((seq, event))
+        self.last_update = event.get("timestamp") or self.last_update
+
+        event_type = event.get("type")
+        data = event.get("data") or {}
+        if event_type == "transcript_update":
+            self.transcript.append(data)
+        elif event_type == "transcript":
+            self.transcript.append({key: value for key, value in event.items() if key != "seq"})
+        elif event_type == "fact_update":
+            if isinstance(data.get("incident_fact"), dict):
+                self.facts.update(data["incident_fact"])
+            elif "field" in data:
+                self.facts[data["field"]] = data.get("value")
+            if data.get("status"):
+                self.status = data["status"]
+
+    def since(self, seq: int) -> Optional[List[Dict[str, Any]]]:
+        """Events after `seq`, or None when some of them are no longer buffered or unsequenced"""
+        if self.unsequenced_after is not None and seq <= self.unsequenced_after:
+            return None
+        if seq >= self.seq:
+            return []
+        if not self.events or self.events[0][0] > seq + 1:
+            return None
+        return [{**event, "seq": event_seq} for event_seq, event in self.events if event_seq > seq]
+
+    def snapshot(self, call_id: str) -> Dict[str, Any]:
+        return {
+            "call_id": call_id,
+            "seq": self.seq,
+            "status": self.status,
+            "facts": dict(self.facts),
+            "transcript": list(self.transcript),
+            "last_update": self.last_update
+        }
+
+
+class CallEventLog:
+    """Per-call event log: Redis Stream shared by workers, ring buffer and snapshot in memory"""
+
+    def __init__(self, buffer_size: int = None, stream_maxlen: int = None, cache_calls: int = None, ttl_seconds: int = None):
+        self.buffer_size = buffer_size or settings.CALL_EVENT_BUFFER_SIZE
+        self.stream_maxlen = stream_maxlen or settings.CALL_EVENT_STREAM_MAXLEN
+        self.cache_calls = cache_calls or settings.CALL_EVENT_CACHE_CALLS
+        self.ttl_seconds = ttl_seconds or settings.CALL_CONTEXT_TTL_SECONDS
+        self._calls: "OrderedDict[str, CallEvents]" = OrderedDict()
+
+    def _call(self, call_id: str) -> CallEvents:
+        """In-memory log of a call, evicting the least recently used beyond cache_calls"""
+        call = self._calls.get(call_id)
+        if call is None:
+            call = self._calls[call_id] = CallEvents(self.buffer_size)
+        self._calls.move_to_end(call_id)
+        while len(self._calls) > self.cache_calls:
+            self._calls.popitem(last=False)
+        return call
+
+    async def append(self, client: redis.Redis, call_id: str, event: Dict[str, Any]) -> Optional[int]:
+        """Record an event and return its sequence number, or None if Redis could not number it"""
+        call = self._call(call_id)
+        encoded = json.dumps(event, separators=(",", ":"), default=str)
+        try:
+            key = events_key(call_id)
+            pipe = client.pipeline(transaction=True)
+            pipe.xadd(key, {"e": encoded}, id="0-*", maxlen=self.stream_maxlen, approximate=True)
+            now = time.time()
+            pipe.zadd(RECENT_CALLS_KEY, {call_id: now})
+            pipe.zremrangebyscore(RECENT_CALLS_KEY, "-inf", now - self.ttl_seconds)
+            pipe.expire(key, self.ttl_seconds)
+            entry_id = (await pipe.execute())[0]
+            seq = _seq(entry_id)
+            if seq <= call.seq:
+                logger.warning(f"⚠️ Event stream of call {call_id} restarted at {seq} (had {call.seq}), rebuilding it")
+                call = self._calls[call_id] = CallEvents(self.buffer_size)
+            if seq > call.seq + 1:
+                # Other workers appended since our last sync; fold their events in first
+                await self._sync(client, call_id, call, until=seq - 1)
+        except Exception as e:
+            logger.error(f"❌ Failed to append event for call {call_id}, leaving it unsequenced: {e}")
+            seq = None
+
+        call.apply(seq, dict(event))
+        return seq
+
+    async def _sync(self, client: redis.Redis, call_id: str, call: CallEvents, until: Optional[int] = None) -> None:
+        """Fold stream entries newer than the local buffer into it"""
+        entries = await client.xrange(
+            events_key(call_id),
+            min=f"(0-{call.seq}",
+            max=f"0-{until}" if until is not None else "+",
+            count=self.stream_maxlen
+        )
+        for entry_id, fields in entries:
+            call.apply(_seq(entry_id), json.loads(fields["e"]))
+
+    async def _synced(self, client: redis.Redis, call_id: str) -> Optional[CallEvents]:
+        call = self._calls.get(call_id) or CallEvents(self.buffer_size)
+        try:
+            await self._sync(client, call_id, call)
+        except Exception as e:
+            logger.error(f"❌ Failed to sync events for call {call_id}, serving from memory: {e}")
+        if call.seq == 0:
+            return None
+        if call_id not in self._calls:
+            self._calls[call_id] = call
+        return self._call(call_id)
+
+    async def snapshot(self, client: redis.Redis, call_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a call folded from its events; None for unknown calls"""
+        call = await self._synced(client, call_id)
+        return call.snapshot(call_id) if call else None
+
+    async def recent_calls(self, client: redis.Redis, limit: int = 50) -> List[str]:
+        """IDs of the calls with events in the last TTL, most recently active first"""
+        try:
+            return await client.zrevrangebyscore(RECENT_CALLS_KEY, "+inf", time.time() - self.ttl_seconds, start=0, num=limit)
+        except Exception as e:
+            logger.error(f"❌ Failed to list recent calls, using this worker's: {e}")
+            return list(reversed(self._calls))[:limit]
+
+    async def replay(self, client: redis.Redis, call_id: str, since: Optional[int] = None) -> Dict[str, Any]:
+        """
+        What a (re)connecting client needs to catch up.
+
+        {"type": "resume", "seq", "events"} when every event after `since`
+        is still buffered, otherwise {"type": "snapshot", "seq", "snapshot"}.
+        Live events with seq at or below the returned seq are already covered.
+        """
+        call = await self._synced(client, call_id)
+        if call is None:
+            return {"type": "snapshot", "call_id": call_id, "seq": 0, "snapshot": None}
+
+        if since is not None:
+            events = call.since(since)
+            if events is not None:
+                return {"type": "resume", "call_id": call_id, "seq": call.seq, "events": events}
+        return {"type": "snapshot", "call_id": call_id, "seq": call.seq, "snapshot": call.snapshot(call_id)}
+
+
+# Shared log for the frontend and Vapi routers
+call_event_log = CallEventLog()
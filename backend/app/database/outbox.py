@@ -0,0 +1,280 @@
+"""
+Local Outbox for Emergency Dispatch System
+
+An append-only SQLite table (WAL mode) of outbound work that must not be
+lost when a downstream is slow or down, such as Supabase log inserts and
+Vapi notifications. Recording an entry is one local insert, so the caller
+never waits on the downstream. A replay task delivers due entries through
+the handler registered for their kind.
+
+Every entry has an idempotency key, and the key is unique. Adding an entry
+whose key is already recorded (pending, delivered or dead) does nothing, so
+a redelivered message is sent once. Handlers should pass the key on where
+the downstream supports it (e.g. PostgREST on_conflict), which makes the
+at-least-once replay safe after a crash between sending and marking.
+
+A failed delivery is retried with exponential backoff and jitter, up to
+max_attempts. After that the entry is kept as "dead" for inspection.
+Delivered entries keep only their key, and are pruned after
+retention_seconds.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DELIVERED = "delivered"
+DEAD = "dead"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+"""
+
+
+def backoff_delay(attempts: int, base: float, cap: float) -> float:
+    """Exponential delay after `attempts` failures, with the upper half jittered"""
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Outbox:
+    """Durable SQLite outbox with per-kind handlers and a backoff replay task"""
+
+    def __init__(
+        self,
+        path: str,
+        base_delay: float = 1.0,
+        max_delay: float = 300.0,
+        max_attempts: int = 12,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        retention_seconds: float = 86400.0
+    ):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.handlers: Dict[str, Callable[[Any], Awaitable[bool]]] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self._db: Optional[sqlite3.Connection] = None
+        # One connection shared by executor threads
+        self._lock = threading.Lock()
+        # Concurrent replays would deliver the same due entries twice
+        self._replay_lock = asyncio.Lock()
+        self.recorded = 0
+        self.duplicates = 0
+        self.delivered = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.counts: Dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def register(self, kind: str, handler: Callable[[Any], Awaitable[bool]]) -> None:
+        """Deliver entries of `kind` with `handler(payload)`; it returns True on success"""
+        self.handlers[kind] = handler
+
+    def open(self) -> None:
+        if self._db is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL commits skip fsync; a power loss can only drop the last few entries
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+        self._refresh_counts()
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+            self._db = None
+
+    async def _call(self, fn: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    # SQLite operations, run on executor threads
+
+    def _insert(self, kind: str, key: str, payload: str, now: float) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO outbox (kind, idempotency_key, payload, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, payload, now, now, now)
+            )
+            return cursor.rowcount == 1
+
+    def _due(self, now: float) -> List[tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, kind, idempotency_key, payload, attempts FROM outbox "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (PENDING, now, self.batch_size)
+            ).fetchall()
+
+    def _mark_delivered(self, entry_id: int, now: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, payload = '', updated_at = ? WHERE id = ?",
+                (DELIVERED, now, entry_id)
+            )
+
+    def _mark_failed(self, entry_id: int, attempts: int, error: str, next_attempt_at: float, status: str, now: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (status, attempts, error, next_attempt_at, now, entry_id)
+            )
+
+    def _prune(self, now: float) -> int:
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM outbox WHERE status = ? AND updated_at < ?",
+                (DELIVERED, now - self.retention_seconds)
+            ).rowcount
+
+    def _refresh_counts(self) -> None:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        self.counts = {PENDING: 0, DELIVERED: 0, DEAD: 0, **dict(rows)}
+
+    # Async API
+
+    async def add(self, kind: str, key: str, payload: Any) -> bool:
+        """Record an entry for delivery; returns False when its key is already recorded"""
+        self.open()
+        added = await self._call(self._insert, kind, key, json.dumps(payload), time.time())
+        if added:
+            self.recorded += 1
+            if self.wakeup is not None:
+                self.wakeup.set()
+        else:
+            self.duplicates += 1
+        return added
+
+    async def _deliver(self, entry: tuple) -> None:
+        entry_id, kind, key, payload, attempts = entry
+        handler = self.handlers.get(kind)
+        error = None
+        try:
+            ok = handler is not None and await handler(json.loads(payload))
+            if handler is None:
+                error = f"no handler for {kind}"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        now = time.time()
+        if ok:
+            self.delivered += 1
+            await self._call(self._mark_delivered, entry_id, now)
+            return
+
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self.dead_lettered += 1
+            logger.error(f"❌ Outbox entry {key} ({kind}) failed {attempts} times, giving up: {error}")
+            await self._call(self._mark_failed, entry_id, attempts, error, now, DEAD, now)
+        else:
+            self.retries += 1
+            delay = backoff_delay(attempts, self.base_delay, self.max_delay)
+            logger.warning(f"⚠️ Outbox entry {key} ({kind}) failed, retrying in {delay:.1f}s: {error}")
+            await self._call(self._mark_failed, entry_id, attempts, error, now + delay, PENDING, now)
+
+    async def _deliver_in_order(self, entries: List[tuple]) -> None:
+        for entry in entries:
+            await self._deliver(entry)
+
+    async def replay_once(self) -> int:
+        """Deliver the entries that are due; each kind in order, kinds concurrently"""
+        self.open()
+        async with self._replay_lock:
+            entries = await self._call(self._due, time.time())
+            by_kind = defaultdict(list)
+            for entry in entries:
+                by_kind[entry[1]].append(entry)
+            await asyncio.gather(*[self._deliver_in_order(kind_entries) for kind_entries in by_kind.values()])
+            await self._call(self._refresh_counts)
+        return len(entries)
+
+    async def _run(self) -> None:
+        last_prune = 0.0
+        while True:
+            self.wakeup.clear()
+            try:
+                replayed = await self.replay_once()
+                if time.time() - last_prune > 60:
+                    last_prune = time.time()
+                    await self._call(self._prune, last_prune)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                replayed = 0
+                logger.error(f"❌ Outbox replay failed: {e}")
+            # A full batch means more entries may already be due
+            if replayed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        """Open the outbox and start replaying on the running event loop"""
+        if self.running:
+            return
+        self.open()
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+        if self.counts.get(PENDING):
+            logger.info(f"📬 Outbox has {self.counts[PENDING]} entries to replay")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entries by status (as of the last replay) and delivery counters"""
+        return {
+            "pending": self.counts.get(PENDING, 0),
+            "delivered_retained": self.counts.get(DELIVERED, 0),
+            "dead": self.counts.get(DEAD, 0),
+            "recorded": self.recorded,
+            "duplicates_ignored": self.duplicates,
+            "delivered": self.delivered,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered
+        }
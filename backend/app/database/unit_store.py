@@ -0,0 +1,557 @@
+"""
+Unit State Store for Emergency Dispatch System
+
+Single source of truth for how unit state is laid out in Redis. Every writer
+(status API, onboarding, Redis loader, Router Agent) and every reader goes
+through these helpers so there is exactly one schema:
+
+    unit:{unit_id}            Hash: unit_id, type, status, lat, lon,
+                              last_updated, attrs (JSON of type-specific fields)
+    units:all                 Set of all unit IDs
+    units:{type}              Set of unit IDs per type (units:police, ...)
+    units:status:{status}     Set of unit IDs per normalized status
+    units:geo                 GEO index of unit positions (member = unit ID)
+    units:bbox:{bbox}         Short-lived sorted set of a bbox listing's GEO matches
+    units:changes             Pub/sub channel: one compact JSON change per write
+
+Counts by type and status are the cardinalities of the index sets. The
+`queue_*` helpers only queue commands on a pipeline, so they work with both the
+sync client (agents, loader) and `redis.asyncio` (API), and each write or read
+is a single pipelined round trip. Every write also publishes its change on
+units:changes in the same pipeline, which drives the unit change stream.
+"""
+
+import json
+import logging
+import math
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.services.unit_history_service import history_key
+
+logger = logging.getLogger(__name__)
+
+UNIT_KEY_PREFIX = "unit:"
+UNIT_TTL_SECONDS = 86400  # 24 hours
+UNITS_ALL_KEY = "units:all"
+UNIT_GEO_KEY = "units:geo"
+UNIT_CHANGES_CHANNEL = "units:changes"
+
+UNIT_TYPES = ("POLICE", "FIRE", "EMS", "HOSPITAL")
+UNIT_STATUSES = ("available", "dispatched", "enroute", "on_scene", "out_of_service", "unknown")
+
+DEFAULT_PAGE_SIZE = 100
+BBOX_RESULT_TTL_SECONDS = 60
+KM_PER_DEGREE = 111.32
+
+# Fields stored directly on the unit hash; everything else goes into `attrs`
+_CORE_FIELDS = ("unit_id", "type", "status", "lat", "lon", "last_updated", "location")
+
+# Status spellings used across agents and schemas
+_STATUS_ALIASES = {
+    "en_route": "enroute",
+    "onscene": "on_scene",
+    "outofservice": "out_of_service",
+}
+
+
+def unit_key(unit_id: str) -> str:
+    """Redis Hash key for a unit"""
+    return f"{UNIT_KEY_PREFIX}{unit_id}"
+
+
+def type_key(unit_type: str) -> str:
+    """Index set key for a unit type"""
+    return f"units:{unit_type.lower()}"
+
+
+def status_key(status: str) -> str:
+    """Index set key for a normalized unit status"""
+    return f"units:status:{status}"
+
+
+def normalize_type(unit_type: Optional[str]) -> str:
+    """Normalize a unit type to its upper-case index name"""
+    return (unit_type or "").upper()
+
+
+def normalize_status(status: Optional[str]) -> str:
+    """Normalize status spellings ("Available", "En_Route", ...) to index names"""
+    value = (status or "unknown").strip().lower()
+    value = _STATUS_ALIASES.get(value, value)
+    if value not in UNIT_STATUSES:
+        raise ValueError(f"Unknown unit status: {status}")
+    return value
+
+
+def _coordinates(unit: Dict[str, Any]) -> Optional[tuple]:
+    """Extract (lat, lon) from the flat, dict or [lat, lon] location shapes"""
+    if unit.get("lat") is not None and unit.get("lon") is not None:
+        return float(unit["lat"]), float(unit["lon"])
+
+    location = unit.get("location")
+    if isinstance(location, dict) and "lat" in location and "lon" in location:
+        return float(location["lat"]), float(location["lon"])
+    if isinstance(location, (list, tuple)) and len(location) >= 2:
+        return float(location[0]), float(location[1])
+    return None
+
+
+def encode_unit(unit: Dict[str, Any]) -> Dict[str, str]:
+    """Encode a unit dict into the canonical Redis Hash mapping"""
+    coordinates = _coordinates(unit) or (0.0, 0.0)
+    attrs = {key: value for key, value in unit.items() if key not in _CORE_FIELDS}
+
+    return {
+        "unit_id": unit["unit_id"],
+        "type": normalize_type(unit.get("type")),
+        "status": normalize_status(unit.get("status")),
+        "lat": repr(coordinates[0]),
+        "lon": repr(coordinates[1]),
+        "last_updated": unit.get("last_updated") or datetime.utcnow().isoformat(),
+        "attrs": json.dumps(attrs, default=str),
+    }
+
+
+def decode_unit(fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Decode a unit Hash into a dict; returns None for missing units"""
+    if not fields:
+        return None
+
+    try:
+        lat, lon = float(fields.get("lat", 0.0)), float(fields.get("lon", 0.0))
+    except ValueError:
+        lat, lon = 0.0, 0.0
+
+    unit: Dict[str, Any] = {}
+    try:
+        unit.update(json.loads(fields.get("attrs") or "{}"))
+    except json.JSONDecodeError:
+        logger.warning(f"Invalid attrs for unit {fields.get('unit_id')}")
+
+    unit.update({
+        "unit_id": fields.get("unit_id"),
+        "type": fields.get("type"),
+        "status": fields.get("status"),
+        "lat": lat,
+        "lon": lon,
+        "location": {"lat": lat, "lon": lon},
+        "last_updated": fields.get("last_updated"),
+    })
+    return unit
+
+
+def queue_unit_indexes(pipe, unit_id: str, unit_type: str, status: str, lat: float, lon: float) -> None:
+    """Queue the secondary index updates for a unit's current type, status and position"""
+    pipe.sadd(UNITS_ALL_KEY, unit_id)
+
+    for other_type in UNIT_TYPES:
+        if other_type != unit_type:
+            pipe.srem(type_key(other_type), unit_id)
+    if unit_type:
+        pipe.sadd(type_key(unit_type), unit_id)
+
+    for other_status in UNIT_STATUSES:
+        if other_status != status:
+            pipe.srem(status_key(other_status), unit_id)
+    pipe.sadd(status_key(status), unit_id)
+
+    if lat != 0.0 or lon != 0.0:
+        # GEOADD expects lon, lat order
+        pipe.geoadd(UNIT_GEO_KEY, [lon, lat, unit_id])
+    else:
+        pipe.zrem(UNIT_GEO_KEY, unit_id)
+
+
+def queue_unit_change(pipe, change: Dict[str, Any]) -> None:
+    """Queue a change-feed message: full state, a status-only update or {"deleted": true}"""
+    pipe.publish(UNIT_CHANGES_CHANNEL, json.dumps(change, separators=(",", ":")))
+
+
+def queue_unit_write(pipe, unit: Dict[str, Any]) -> Dict[str, str]:
+    """Queue a full unit write (state hash plus all indexes); returns the stored mapping"""
+    mapping = encode_unit(unit)
+    key = unit_key(mapping["unit_id"])
+
+    # Replace the whole hash so fields from an earlier shape never linger
+    pipe.delete(key)
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, UNIT_TTL_SECONDS)
+    queue_unit_indexes(
+        pipe,
+        mapping["unit_id"],
+        mapping["type"],
+        mapping["status"],
+        float(mapping["lat"]),
+        float(mapping["lon"])
+    )
+    queue_unit_change(pipe, {
+        "unit_id": mapping["unit_id"],
+        "type": mapping["type"],
+        "status": mapping["status"],
+        "lat": float(mapping["lat"]),
+        "lon": float(mapping["lon"]),
+        "last_updated": mapping["last_updated"]
+    })
+    return mapping
+
+
+# KEYS: unit hash, new status set, other status sets
+# ARGV: unit ID, status, last_updated, TTL, change channel, change message
+_STATUS_UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[2], 'last_updated', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+for i = 3, #KEYS do
+    redis.call('SREM', KEYS[i], ARGV[1])
+end
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('PUBLISH', ARGV[5], ARGV[6])
+return 1
+"""
+
+
+def queue_status_update(pipe, unit_id: str, status: str) -> str:
+    """
+    Queue a status-only change for an existing unit; returns the normalized status.
+
+    The change is one script that does nothing for a unit whose hash has
+    expired or was deleted, so it never leaves a partial hash behind. Its
+    result in the pipeline is 1 when the unit was updated and 0 when it is
+    missing. The update also refreshes the unit's TTL.
+    """
+    normalized = normalize_status(status)
+    last_updated = datetime.utcnow().isoformat()
+    change = json.dumps({"unit_id": unit_id, "status": normalized, "last_updated": last_updated}, separators=(",", ":"))
+    other_keys = [status_key(other) for other in UNIT_STATUSES if other != normalized]
+    pipe.eval(
+        _STATUS_UPDATE_SCRIPT,
+        2 + len(other_keys),
+        unit_key(unit_id),
+        status_key(normalized),
+        *other_keys,
+        unit_id,
+        normalized,
+        last_updated,
+        UNIT_TTL_SECONDS,
+        UNIT_CHANGES_CHANNEL,
+        change
+    )
+    return normalized
+
+
+def queue_unit_delete(pipe, unit_id: str) -> None:
+    """Queue removal of a unit's state, location history and every index entry"""
+    pipe.delete(unit_key(unit_id), history_key(unit_id))
+    pipe.srem(UNITS_ALL_KEY, unit_id)
+    for unit_type in UNIT_TYPES:
+        pipe.srem(type_key(unit_type), unit_id)
+    for status in UNIT_STATUSES:
+        pipe.srem(status_key(status), unit_id)
+    pipe.zrem(UNIT_GEO_KEY, unit_id)
+    queue_unit_change(pipe, {"unit_id": unit_id, "deleted": True})
+
+
+# KEYS: index sets, GEO index, then one unit hash per ID; ARGV: the unit IDs
+_PRUNE_SCRIPT = """
+local index_count = #KEYS - #ARGV
+local pruned = 0
+for i, unit_id in ipairs(ARGV) do
+    if redis.call('EXISTS', KEYS[index_count + i]) == 0 then
+        for j = 1, index_count - 1 do
+            redis.call('SREM', KEYS[j], unit_id)
+        end
+        redis.call('ZREM', KEYS[index_count], unit_id)
+        pruned = pruned + 1
+    end
+end
+return pruned
+"""
+
+
+def queue_index_prune(pipe, unit_ids: List[str]) -> None:
+    """
+    Queue removal of index entries for units whose hash no longer exists.
+
+    Each ID is checked with EXISTS inside one script, so a unit rewritten
+    since it was read keeps its entries. The hash is never deleted and no
+    change is published: the unit already expired.
+    """
+    index_keys = [UNITS_ALL_KEY]
+    index_keys += [type_key(unit_type) for unit_type in UNIT_TYPES]
+    index_keys += [status_key(status) for status in UNIT_STATUSES]
+    index_keys.append(UNIT_GEO_KEY)
+    pipe.eval(
+        _PRUNE_SCRIPT,
+        len(index_keys) + len(unit_ids),
+        *index_keys,
+        *[unit_key(unit_id) for unit_id in unit_ids],
+        *unit_ids
+    )
+
+
+async def save_unit(client: redis.Redis, unit: Dict[str, Any]) -> Dict[str, Any]:
+    """Write a unit and its indexes in one atomic round trip"""
+    pipe = client.pipeline(transaction=True)
+    mapping = queue_unit_write(pipe, unit)
+    await pipe.execute()
+    return decode_unit(mapping)
+
+
+async def update_status(client: redis.Redis, unit_id: str, status: str) -> Optional[str]:
+    """Change an existing unit's status; returns the normalized status, or None if the unit is missing"""
+    pipe = client.pipeline(transaction=False)
+    normalized = queue_status_update(pipe, unit_id, status)
+    updated, = await pipe.execute()
+    return normalized if updated else None
+
+
+async def get_unit(client: redis.Redis, unit_id: str) -> Optional[Dict[str, Any]]:
+    """Read a single unit"""
+    return decode_unit(await client.hgetall(unit_key(unit_id)))
+
+
+async def get_units(client: redis.Redis, unit_ids: Iterable[str], prune: bool = True) -> List[Dict[str, Any]]:
+    """
+    Read many units in one pipelined round trip.
+
+    Index entries whose hash has expired are pruned with one follow-up
+    script so indexes do not accumulate stale IDs.
+    """
+    unit_ids = list(unit_ids)
+    if not unit_ids:
+        return []
+
+    pipe = client.pipeline(transaction=False)
+    for unit_id in unit_ids:
+        pipe.hgetall(unit_key(unit_id))
+    results = await pipe.execute()
+
+    units = []
+    stale = []
+    for unit_id, fields in zip(unit_ids, results):
+        unit = decode_unit(fields)
+        if unit is None:
+            stale.append(unit_id)
+        else:
+            units.append(unit)
+
+    if stale and prune:
+        pipe = client.pipeline(transaction=False)
+        queue_index_prune(pipe, stale)
+        pruned, = await pipe.execute()
+        if pruned:
+            logger.info(f"Pruned {pruned} expired units from indexes")
+
+    return units
+
+
+async def prune_expired_units(client: redis.Redis, batch_size: int = 500) -> int:
+    """Walk the GEO index and remove the index entries of units whose hash expired; returns how many"""
+    cursor, pruned = 0, 0
+    while True:
+        cursor, entries = await client.zscan(UNIT_GEO_KEY, cursor=cursor, count=batch_size)
+        unit_ids = [member for member, _ in entries]
+        if unit_ids:
+            pipe = client.pipeline(transaction=False)
+            for unit_id in unit_ids:
+                pipe.exists(unit_key(unit_id))
+            exists = await pipe.execute()
+            stale = [unit_id for unit_id, found in zip(unit_ids, exists) if not found]
+            if stale:
+                pipe = client.pipeline(transaction=False)
+                queue_index_prune(pipe, stale)
+                pruned += (await pipe.execute())[0]
+        if cursor == 0:
+            return pruned
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse a "min_lon,min_lat,max_lon,max_lat" bounding box"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+async def _filter_members(client: redis.Redis, unit_ids: List[str], keys: List[str]) -> List[str]:
+    """Keep the IDs that are members of every set in `keys` (one round trip)"""
+    if not unit_ids or not keys:
+        return unit_ids
+
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.smismember(key, unit_ids)
+    flags = await pipe.execute()
+    return [unit_id for unit_id, *member in zip(unit_ids, *flags) if all(member)]
+
+
+async def _scan_index(client: redis.Redis, keys: List[str], cursor: int, limit: int) -> Tuple[List[str], int]:
+    """
+    SSCAN the smallest of the index sets and filter by the others.
+
+    The smallest set is chosen by SCARD on the first page only. Later
+    cursors carry its position in `keys` (cursor = SSCAN cursor * len(keys)
+    + position), so a listing keeps walking the same set even if the set
+    sizes change between pages. Like SCAN, a page may hold fewer than
+    `limit` IDs; iteration is complete when the returned cursor is 0.
+    """
+    if cursor:
+        cursor, position = divmod(cursor, len(keys))
+    elif len(keys) > 1:
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.scard(key)
+        sizes = await pipe.execute()
+        position = min(range(len(keys)), key=lambda index: sizes[index])
+    else:
+        position = 0
+
+    source, others = keys[position], keys[:position] + keys[position + 1:]
+    unit_ids: List[str] = []
+    while True:
+        cursor, batch = await client.sscan(source, cursor=cursor, count=limit)
+        unit_ids.extend(await _filter_members(client, list(batch), others))
+        if cursor == 0 or len(unit_ids) >= limit:
+            return unit_ids, cursor * len(keys) + position if cursor else 0
+
+
+def bbox_result_key(bbox: Tuple[float, float, float, float]) -> str:
+    """Temporary sorted set holding the GEO matches for a bounding box"""
+    return "units:bbox:" + ",".join(repr(value) for value in bbox)
+
+
+async def _search_bbox(
+    client: redis.Redis,
+    bbox: Tuple[float, float, float, float],
+    keys: List[str],
+    offset: int,
+    limit: int
+) -> Tuple[List[str], int]:
+    """
+    Page through units inside a bounding box using the GEO index.
+
+    The first page stores the GEO matches, nearest the centre first, in a
+    short-lived sorted set with GEOSEARCHSTORE; later pages read their slice
+    with ZRANGE instead of searching again. Only the page's IDs are then
+    checked against the exact box and the filter sets, so a page may hold
+    fewer than `limit` IDs. If the stored matches expired, they are stored
+    again.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    center_lon, center_lat = (min_lon + max_lon) / 2, (min_lat + max_lat) / 2
+    result_key = bbox_result_key(bbox)
+
+    async def read_page(search: bool) -> Tuple[List[str], int]:
+        pipe = client.pipeline(transaction=False)
+        if search:
+            # The box is measured in km at its widest latitude, then matches are
+            # filtered exactly on their coordinates
+            widest_lat = 0.0 if min_lat <= 0.0 <= max_lat else min(abs(min_lat), abs(max_lat))
+            width_km = (max_lon - min_lon) * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+            height_km = (max_lat - min_lat) * KM_PER_DEGREE
+            pipe.geosearchstore(
+                result_key,
+                UNIT_GEO_KEY,
+                longitude=center_lon,
+                latitude=center_lat,
+                width=max(width_km, 0.001) * 1.01,
+                height=max(height_km, 0.001) * 1.01,
+                unit="KM",
+                sort="ASC",
+                storedist=True
+            )
+            pipe.expire(result_key, BBOX_RESULT_TTL_SECONDS)
+        pipe.zrange(result_key, offset, offset + limit - 1)
+        pipe.zcard(result_key)
+        *_, members, total = await pipe.execute()
+        return members, total
+
+    members, total = await read_page(search=offset == 0)
+    if offset and not total:
+        members, total = await read_page(search=True)
+
+    unit_ids: List[str] = []
+    if members:
+        pipe = client.pipeline(transaction=False)
+        pipe.geopos(UNIT_GEO_KEY, *members)
+        for key in keys:
+            pipe.smismember(key, members)
+        positions, *flags = await pipe.execute()
+        unit_ids = [
+            member for member, position, *member_of in zip(members, positions, *flags)
+            if position and all(member_of)
+            and min_lon <= position[0] <= max_lon and min_lat <= position[1] <= max_lat
+        ]
+
+    next_offset = offset + limit
+    return unit_ids, next_offset if next_offset < total else 0
+
+
+async def list_units(
+    client: redis.Redis,
+    unit_type: Optional[str] = None,
+    status: Optional[str] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    cursor: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> Dict[str, Any]:
+    """
+    List one page of units from the indexes.
+
+    Without a bounding box the smallest matching index set is walked with
+    SSCAN; with one, the GEO matches are stored once and paged by offset. Unit
+    hashes for the page are read in one pipeline. `next_cursor` is None once
+    the listing is complete.
+    """
+    keys = []
+    if unit_type:
+        keys.append(type_key(normalize_type(unit_type)))
+    if status:
+        keys.append(status_key(normalize_status(status)))
+
+    if bbox:
+        unit_ids, next_cursor = await _search_bbox(client, bbox, keys, cursor, limit)
+    else:
+        unit_ids, next_cursor = await _scan_index(client, keys or [UNITS_ALL_KEY], cursor, limit)
+
+    units = await get_units(client, unit_ids)
+    return {
+        "units": units,
+        "count": len(units),
+        "next_cursor": str(next_cursor) if next_cursor else None,
+    }
+
+
+async def delete_unit(client: redis.Redis, unit_id: str) -> None:
+    """Remove a unit and its index entries in one round trip"""
+    pipe = client.pipeline(transaction=True)
+    queue_unit_delete(pipe, unit_id)
+    await pipe.execute()
+
+
+async def get_unit_counts(client: redis.Redis) -> Dict[str, Any]:
+    """Counts of units by type and by status, read in one round trip"""
+    pipe = client.pipeline(transaction=False)
+    pipe.scard(UNITS_ALL_KEY)
+    for unit_type in UNIT_TYPES:
+        pipe.scard(type_key(unit_type))
+    for status in UNIT_STATUSES:
+        pipe.scard(status_key(status))
+    results = await pipe.execute()
+
+    total = results[0]
+    type_counts = results[1:1 + len(UNIT_TYPES)]
+    status_counts = results[1 + len(UNIT_TYPES):]
+    return {
+        "total": total,
+        "by_type": dict(zip(UNIT_TYPES, type_counts)),
+        "by_status": dict(zip(UNIT_STATUSES, status_counts)),
+    }
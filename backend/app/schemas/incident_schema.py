@@ -16,6 +16,9 @@ class IncidentFact(BaseModel):
     emergency_type: Optional[str] = None
     incident_type: Optional[str] = None  # Alias for emergency_type
     location: Optional[str] = None
+    latitude: Optional[float] = None  # Set by the offline geocoder from `location`
+    longitude: Optional[float] = None
+    location_precision: Optional[str] = None  # Geocode precision: coordinates, address, intersection, street, place
     caller_name: Optional[str] = None
     callback_number: str = ""  # Required field with default empty string
     is_caller_safe: Optional[bool] = None
@@ -27,7 +30,10 @@ class IncidentFact(BaseModel):
     severity: Optional[str] = None
     
     def get_location_coordinates(self) -> dict:
-        """Extract lat/lon coordinates from location string if available"""
+        """Extract lat/lon coordinates from geocoded fields or a "lat,lon" location string"""
+        if self.latitude is not None and self.longitude is not None:
+            return {"lat": self.latitude, "lon": self.longitude}
+        
         if not self.location or "," not in self.location:
             # Default to San Francisco if no coordinates provided
             return {"lat": 37.7749, "lon": -122.4194}
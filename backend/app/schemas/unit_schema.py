@@ -1,5 +1,6 @@
 from uagents import Model
-from typing import Literal, Optional
+from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional
 
 class Location(Model):
     """GPS location coordinates"""
@@ -9,6 +10,7 @@ class Location(Model):
 class FireUnitState(Model):
     """Fire department unit state"""
     unit_id: str
+    type: Literal["FIRE"] = "FIRE"
     unit_type: Literal["Engine", "Ladder", "Rescue", "Command", "Hazmat"] = "Engine"
     status: Literal["Available", "Dispatched", "On_Scene", "En_Route", "Out_of_Service"] = "Available"
     location: Location
@@ -18,6 +20,7 @@ class FireUnitState(Model):
 class PoliceUnitState(Model):
     """Police department unit state"""
     unit_id: str
+    type: Literal["POLICE"] = "POLICE"
     status: Literal["Available", "Dispatched", "On_Scene", "En_Route", "Out_of_Service"] = "Available"
     location: Location
     assigned_officer_id: Optional[str] = None
@@ -25,6 +28,7 @@ class PoliceUnitState(Model):
 class EMSUnitState(Model):
     """EMS unit state with medical-specific fields"""
     unit_id: str
+    type: Literal["EMS"] = "EMS"
     unit_level: Literal["Basic", "Advanced", "Critical_Care"] = "Advanced"
     status: Literal["Available", "Dispatched", "On_Scene", "En_Route", "Out_of_Service"] = "Available"
     location: Location
@@ -32,3 +36,22 @@ class EMSUnitState(Model):
     patient_count: int = 0
     equipment_status: Literal["Fully_Operational", "Minor_Issues", "Major_Issues", "Out_of_Service"] = "Fully_Operational"
     current_patient: Optional[dict] = None
+
+# A pydantic v2 model: FastAPI reads uagents (v1) models from the query string, not the body
+class UnitStatusUpdate(BaseModel):
+    """Status-only change for an existing unit"""
+    status: str
+
+# State model for each unit type (as used by the unit state store indexes)
+UNIT_STATE_MODELS = {
+    "FIRE": FireUnitState,
+    "POLICE": PoliceUnitState,
+    "EMS": EMSUnitState,
+}
+
+def parse_unit_state(payload: Dict[str, Any]) -> Model:
+    """Validate a unit state payload with the model named by its `type` field"""
+    model = UNIT_STATE_MODELS.get(payload.get("type"))
+    if model is None:
+        raise ValueError(f"Unit type must be one of {', '.join(UNIT_STATE_MODELS)}, got {payload.get('type')!r}")
+    return model.parse_obj(payload)
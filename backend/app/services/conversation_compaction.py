@@ -0,0 +1,92 @@
+"""
+Conversation Compaction for Emergency Dispatch System
+
+Keeps per-call conversation state bounded on long calls. Once the history
+exceeds the token budget, turns that have already been extracted into the
+IncidentFact are folded into a rolling summary of caller statements, and only
+the last few turns are kept verbatim. The structured fact state carries
+everything dispatch needs, so the summary only has to preserve context for
+full re-extraction and the finalized incident.
+
+Token counts are estimated locally from character length, so compaction
+runs on every turn without a tokenizer or model call.
+"""
+
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.services.incident_extraction_service import format_conversation
+
+# Roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Each caller turn is clipped to this many tokens when it enters the summary
+SUMMARY_TURN_TOKENS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast local token estimate from character length"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def clip_to_tokens(text: str, max_tokens: int) -> str:
+    """Clip text to about `max_tokens`, cutting at a word boundary"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+def summarize_turns(turns: List[Dict[str, Any]]) -> List[str]:
+    """Summary lines for compacted turns: the caller's statements, clipped"""
+    return [
+        f"caller: {clip_to_tokens(turn['content'].strip(), SUMMARY_TURN_TOKENS)}"
+        for turn in turns
+        if turn["role"] == "user" and turn["content"].strip()
+    ]
+
+
+def conversation_transcript(call_context: Dict[str, Any]) -> str:
+    """The call as text: the rolling summary followed by the verbatim turns"""
+    transcript = format_conversation(call_context["conversation_history"])
+    if call_context.get("summary"):
+        return f"Earlier in the call (summary):\n{call_context['summary']}\n\n{transcript}"
+    return transcript
+
+
+def compact_conversation(
+    call_context: Dict[str, Any],
+    budget_tokens: int = None,
+    keep_turns: int = None
+) -> int:
+    """
+    Fold old turns into the rolling summary when the history exceeds the budget.
+
+    Only turns that have already been extracted are compacted, and the last
+    `keep_turns` turns always stay verbatim. The summary is capped at a third
+    of the budget by dropping its oldest lines. Returns the number of turns
+    compacted.
+    """
+    budget_tokens = budget_tokens or settings.CONVERSATION_TOKEN_BUDGET
+    keep_turns = keep_turns or settings.CONVERSATION_KEEP_TURNS
+    history = call_context["conversation_history"]
+
+    if estimate_tokens(conversation_transcript(call_context)) <= budget_tokens:
+        return 0
+
+    compacted = max(0, min(call_context.get("extracted_turns", 0), len(history) - keep_turns))
+    if not compacted:
+        return 0
+
+    lines = call_context["summary"].split("\n") if call_context.get("summary") else []
+    lines.extend(summarize_turns(history[:compacted]))
+
+    summary_budget = budget_tokens // 3
+    while lines and estimate_tokens("\n".join(lines)) > summary_budget:
+        lines.pop(0)
+
+    del history[:compacted]
+    call_context["summary"] = "\n".join(lines)
+    call_context["extracted_turns"] -= compacted
+    call_context["compacted_turns"] = call_context.get("compacted_turns", 0) + compacted
+    return compacted
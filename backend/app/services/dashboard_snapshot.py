@@ -0,0 +1,128 @@
+"""
+Dashboard Bootstrap Snapshot for Emergency Dispatch System
+
+Everything a dispatcher dashboard needs on load, in one response: units
+and their counts, active incidents, hospitals, and the recent calls with
+their folded state. It is read from the maintained indexes rather than
+from key scans:
+- units come from unit_store (index sets plus pipelined hashes)
+- incidents from the incident registry's active set
+- calls from the per-call event log and its calls:recent index
+
+The snapshot is serialized once, gzip-compressed and cached for
+BOOTSTRAP_CACHE_SECONDS. Concurrent requests wait for a single build
+instead of each rebuilding it. The ETag is a hash of the uncompressed
+body without its generated_at time, so a rebuild with unchanged content
+keeps its ETag. The gzip encoding has its own ETag ("<hash>-gzip"), as the
+two bodies are different representations.
+
+Every call in the snapshot carries the seq of the last event folded into
+it. A client opens the dashboard WebSocket, loads the snapshot and then
+applies live events whose seq is above their call's snapshot seq. Events
+missed while the snapshot was cached are fetched with a "resume" request
+on the socket.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+from app.api.hospital_router import get_all_hospitals
+from app.core.config import settings
+from app.core.websocket_hub import dumps
+from app.database import unit_store
+from app.database.call_event_log import call_event_log
+from services.incident_registry import incident_registry
+
+logger = logging.getLogger(__name__)
+
+UNIT_PAGE_SIZE = 1000
+
+
+@dataclass
+class EncodedSnapshot:
+    body: bytes
+    gzipped: bytes
+    etag: str
+    built_at: float
+
+    @property
+    def gzip_etag(self) -> str:
+        """ETag of the gzip-encoded body"""
+        return self.etag[:-1] + '-gzip"'
+
+
+async def _all_units(client: redis.Redis) -> List[Dict[str, Any]]:
+    units, cursor = [], 0
+    while True:
+        page = await unit_store.list_units(client, cursor=cursor, limit=UNIT_PAGE_SIZE)
+        units.extend(page["units"])
+        if not page["next_cursor"]:
+            return units
+        cursor = int(page["next_cursor"])
+
+
+async def build_snapshot(client: redis.Redis, recent_calls: int = None) -> Dict[str, Any]:
+    """Assemble the dashboard state; each source is read concurrently"""
+    recent_calls = recent_calls or settings.BOOTSTRAP_RECENT_CALLS
+    call_ids = await call_event_log.recent_calls(client, recent_calls)
+    units, counts, incidents, *calls = await asyncio.gather(
+        _all_units(client),
+        unit_store.get_unit_counts(client),
+        incident_registry.get_active_incidents(),
+        *[call_event_log.snapshot(client, call_id) for call_id in call_ids]
+    )
+    calls = [call for call in calls if call]
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "units": units,
+        "unit_counts": counts,
+        "incidents": incidents,
+        "hospitals": (await get_all_hospitals())["hospitals"],
+        "calls": calls,
+        "seq": {call["call_id"]: call["seq"] for call in calls}
+    }
+
+
+class DashboardSnapshotCache:
+    """Serialized, compressed bootstrap snapshot shared by every request for a short time"""
+
+    def __init__(self, ttl_seconds: float = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.BOOTSTRAP_CACHE_SECONDS
+        self._snapshot: Optional[EncodedSnapshot] = None
+        self._lock = asyncio.Lock()
+        self.builds = 0
+
+    def _fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() - self._snapshot.built_at < self.ttl_seconds
+
+    async def get(self, client: redis.Redis) -> EncodedSnapshot:
+        if self._fresh():
+            return self._snapshot
+        async with self._lock:
+            # Another request may have rebuilt it while this one waited
+            if not self._fresh():
+                snapshot = await build_snapshot(client)
+                generated_at = snapshot.pop("generated_at", None)
+                content = dumps(snapshot)
+                body = content if generated_at is None else '{"generated_at":' + dumps(generated_at) + "," + content[1:]
+                self._snapshot = EncodedSnapshot(
+                    body=body.encode(),
+                    gzipped=gzip.compress(body.encode(), compresslevel=6),
+                    etag='"' + hashlib.sha1(content.encode()).hexdigest()[:20] + '"',
+                    built_at=time.monotonic()
+                )
+                self.builds += 1
+                logger.info(f"Built dashboard snapshot: {len(body)} bytes, {len(self._snapshot.gzipped)} gzipped")
+        return self._snapshot
+
+
+# Shared snapshot cache for the frontend API
+dashboard_snapshot = DashboardSnapshotCache()
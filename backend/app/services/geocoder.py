@@ -0,0 +1,313 @@
+"""
+Offline Geocoder for Emergency Dispatch System
+
+Resolves free-text incident locations ("412 Maple Avenue", "Main and
+William", "the Big House", "42.2808, -83.7430") to coordinates without a
+network call, so incidents are routed from where they actually are instead
+of a default point.
+
+The gazetteer file (GAZETTEER_PATH) lists street centerlines with their
+house-number ranges and named places. At load time street and place names
+are normalized into a sorted prefix index. Where two streets cross is
+worked out the first time the pair is looked up, and cached. A lookup is a few dictionary and
+bisect operations with a fuzzy fallback for misspelled or mis-suffixed
+names ("Maple Avenue" for Maple Road). Results are memoized in an LRU
+cache, so repeated locations resolve in microseconds. Loading and the first
+lookups are CPU-bound; async callers run them in an executor.
+"""
+
+import bisect
+import difflib
+import json
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_PATH = Path(__file__).resolve().parents[2] / "data" / "ann_arbor_gazetteer.json"
+CACHE_SIZE = 4096
+
+# Minimum difflib ratio for a fuzzy street or place name match
+FUZZY_CUTOFF = 0.8
+
+SUFFIXES = {
+    "street": "st", "st": "st", "avenue": "ave", "ave": "ave", "av": "ave", "road": "rd", "rd": "rd",
+    "boulevard": "blvd", "blvd": "blvd", "drive": "dr", "dr": "dr", "lane": "ln", "ln": "ln",
+    "court": "ct", "ct": "ct", "place": "pl", "pl": "pl", "parkway": "pkwy", "pkwy": "pkwy",
+    "way": "way", "highway": "hwy", "hwy": "hwy"
+}
+DIRECTIONS = {"north": "N", "n": "N", "south": "S", "s": "S", "east": "E", "e": "E", "west": "W", "w": "W"}
+
+COORDINATES_PATTERN = re.compile(r"^\s*(-?\d{1,2}\.\d+)\s*,\s*(-?\d{1,3}\.\d+)\s*$")
+ADDRESS_PATTERN = re.compile(r"^\s*(\d{1,6})\s+(.+)$")
+INTERSECTION_PATTERN = re.compile(r"^(?:corner of\s+)?(.+?)\s+(?:and|&|at)\s+(.+)$")
+# Unit designators and trailing city/state are not part of the street name
+UNIT_PATTERN = re.compile(r"(?:\b(?:apartment|apt|unit|suite|ste)\b|#)\s*\w+\b")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Geohash length of a region cell (~4.9 km x 4.9 km); shorter prefixes are larger regions
+GEOCELL_PRECISION = 5
+
+
+class GeocodeResult(NamedTuple):
+    lat: float
+    lon: float
+    match: str  # Gazetteer name the text resolved to
+    precision: str  # "coordinates", "address", "intersection", "street" or "place"
+
+
+class Street(NamedTuple):
+    name: str
+    prefix: Optional[str]
+    points: Tuple[Tuple[float, float], ...]
+    start: int
+    end: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.prefix} {self.name}" if self.prefix else self.name
+
+
+def _words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def split_street(text: str) -> Tuple[Optional[str], str, Optional[str]]:
+    """Split a street name into (direction prefix, base name, suffix)"""
+    words = [word for word in _words(UNIT_PATTERN.sub(" ", text.lower())) if word != "the"]
+    prefix = None
+    if len(words) > 1 and words[0] in DIRECTIONS:
+        prefix = DIRECTIONS[words.pop(0)]
+
+    # Everything after the last suffix word (city, state) is dropped
+    for index in range(len(words) - 1, 0, -1):
+        if words[index] in SUFFIXES:
+            return prefix, " ".join(words[:index]), SUFFIXES[words[index]]
+    return prefix, " ".join(words), None
+
+
+def _interpolate(points: Tuple[Tuple[float, float], ...], fraction: float) -> Tuple[float, float]:
+    """Point `fraction` of the way along a polyline, by vertex segments"""
+    fraction = min(max(fraction, 0.0), 1.0)
+    segments = len(points) - 1
+    position = fraction * segments
+    index = min(int(position), segments - 1)
+    local = position - index
+    (lat1, lon1), (lat2, lon2) = points[index], points[index + 1]
+    return lat1 + (lat2 - lat1) * local, lon1 + (lon2 - lon1) * local
+
+
+def _segment_crossing(a1, a2, b1, b2, tolerance: float = 0.02) -> Optional[Tuple[float, float]]:
+    """Crossing point of two segments (slightly extended by `tolerance`), if any"""
+    d1 = (a2[0] - a1[0], a2[1] - a1[1])
+    d2 = (b2[0] - b1[0], b2[1] - b1[1])
+    denominator = d1[0] * d2[1] - d1[1] * d2[0]
+    if abs(denominator) < 1e-12:
+        return None
+
+    offset = (b1[0] - a1[0], b1[1] - a1[1])
+    t = (offset[0] * d2[1] - offset[1] * d2[0]) / denominator
+    u = (offset[0] * d1[1] - offset[1] * d1[0]) / denominator
+    if -tolerance <= t <= 1 + tolerance and -tolerance <= u <= 1 + tolerance:
+        return a1[0] + t * d1[0], a1[1] + t * d1[1]
+    return None
+
+
+def geocell(lat: float, lon: float, precision: int = GEOCELL_PRECISION) -> str:
+    """Geohash of a point; every prefix of it names an enclosing, larger cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    cell, bits, value, even = [], 0, 0, True
+    while len(cell) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            cell.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return "".join(cell)
+
+
+class Geocoder:
+    """Gazetteer-backed geocoder with a prefix index, fuzzy matching and an LRU cache"""
+
+    def __init__(self, gazetteer: Dict[str, Any], cache_size: int = CACHE_SIZE):
+        self.streets: Dict[str, List[Street]] = {}
+        for entry in gazetteer.get("streets", []):
+            _, base, _ = split_street(entry["name"])
+            self.streets.setdefault(base, []).append(Street(
+                name=entry["name"],
+                prefix=entry.get("prefix"),
+                points=tuple(tuple(point) for point in entry["points"]),
+                start=entry["range"][0],
+                end=entry["range"][1]
+            ))
+
+        self.places: Dict[str, Tuple[str, float, float]] = {}
+        for entry in gazetteer.get("places", []):
+            for name in [entry["name"], *entry.get("aliases", [])]:
+                self.places[" ".join(_words(name))] = (entry["name"], entry["lat"], entry["lon"])
+
+        # Sorted name lists serve prefix lookups with bisect
+        self.street_names = sorted(self.streets)
+        self.place_names = sorted(self.places)
+        self.crossing = lru_cache(maxsize=cache_size)(self._crossing)
+        self.geocode = lru_cache(maxsize=cache_size)(self._geocode)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "Geocoder":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _crossing(self, base_a: str, base_b: str) -> Optional[Tuple[float, float]]:
+        """Where two streets cross; cached per pair by `crossing`"""
+        return self._first_crossing(self.streets[base_a], self.streets[base_b])
+
+    @staticmethod
+    def _first_crossing(streets_a: List[Street], streets_b: List[Street]) -> Optional[Tuple[float, float]]:
+        for street_a in streets_a:
+            for street_b in streets_b:
+                for a1, a2 in zip(street_a.points, street_a.points[1:]):
+                    for b1, b2 in zip(street_b.points, street_b.points[1:]):
+                        point = _segment_crossing(a1, a2, b1, b2)
+                        if point:
+                            return point
+        return None
+
+    @staticmethod
+    def _lookup(names: List[str], key: str) -> Optional[str]:
+        """Exact name, then the only name with `key` as a prefix, then the closest fuzzy match"""
+        index = bisect.bisect_left(names, key)
+        if index < len(names) and names[index] == key:
+            return key
+
+        prefixed = []
+        while index < len(names) and names[index].startswith(key) and len(prefixed) < 2:
+            prefixed.append(names[index])
+            index += 1
+        if len(prefixed) == 1:
+            return prefixed[0]
+
+        close = difflib.get_close_matches(key, names, n=1, cutoff=FUZZY_CUTOFF)
+        return close[0] if close else None
+
+    def _streets(self, text: str) -> Tuple[Optional[str], List[Street], Optional[str]]:
+        """Candidate streets for a street name, preferring a matching suffix"""
+        prefix, base, suffix = split_street(text)
+        name = self._lookup(self.street_names, base) if base else None
+        if not name:
+            return prefix, [], suffix
+
+        streets = self.streets[name]
+        if prefix:
+            streets = [street for street in streets if street.prefix == prefix] or streets
+        return prefix, streets, name
+
+    def _address(self, number: int, text: str) -> Optional[GeocodeResult]:
+        _, streets, _ = self._streets(text)
+        if not streets:
+            return None
+
+        for street in streets:
+            if street.start <= number <= street.end:
+                lat, lon = _interpolate(street.points, (number - street.start) / max(street.end - street.start, 1))
+                return GeocodeResult(lat, lon, f"{number} {street.label}", "address")
+
+        # Number outside every known range: the nearest end of the closest range
+        street = min(streets, key=lambda s: min(abs(number - s.start), abs(number - s.end)))
+        lat, lon = street.points[0] if abs(number - street.start) <= abs(number - street.end) else street.points[-1]
+        return GeocodeResult(lat, lon, street.label, "street")
+
+    def _intersection(self, first: str, second: str) -> Optional[GeocodeResult]:
+        _, streets_a, base_a = self._streets(first)
+        _, streets_b, base_b = self._streets(second)
+        if not streets_a or not streets_b:
+            return None
+
+        point = self.crossing(*sorted((base_a, base_b)))
+        if not point:
+            return None
+        return GeocodeResult(point[0], point[1], f"{streets_a[0].name} & {streets_b[0].name}", "intersection")
+
+    def _place(self, text: str) -> Optional[GeocodeResult]:
+        name = self._lookup(self.place_names, " ".join(_words(text)))
+        if not name:
+            return None
+        match, lat, lon = self.places[name]
+        return GeocodeResult(lat, lon, match, "place")
+
+    def _geocode(self, text: str) -> Optional[GeocodeResult]:
+        coordinates = COORDINATES_PATTERN.match(text)
+        if coordinates:
+            lat, lon = float(coordinates.group(1)), float(coordinates.group(2))
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return GeocodeResult(lat, lon, text, "coordinates")
+            return None
+
+        normalized = text.lower().strip().rstrip(".")
+        address = ADDRESS_PATTERN.match(normalized)
+        if address:
+            result = self._address(int(address.group(1)), address.group(2))
+            if result:
+                return result
+            # No such street: the number may be part of a place name
+
+        intersection = INTERSECTION_PATTERN.match(normalized)
+        if intersection:
+            result = self._intersection(intersection.group(1), intersection.group(2))
+            if result:
+                return result
+
+        place = self._place(normalized)
+        if place:
+            return place
+
+        _, streets, _ = self._streets(normalized)
+        if streets:
+            lat, lon = _interpolate(streets[0].points, 0.5)
+            return GeocodeResult(lat, lon, streets[0].label, "street")
+        return None
+
+
+_geocoder: Optional[Geocoder] = None
+
+
+def get_geocoder() -> Geocoder:
+    """Shared geocoder, loaded from the gazetteer on first use"""
+    global _geocoder
+    if _geocoder is None:
+        path = Path(settings.GAZETTEER_PATH) if settings.GAZETTEER_PATH else DEFAULT_GAZETTEER_PATH
+        _geocoder = Geocoder.from_file(path)
+        logger.info(f"Loaded gazetteer {path.name}: {len(_geocoder.street_names)} streets, {len(_geocoder.place_names)} place names")
+    return _geocoder
+
+
+def geocode(text: Optional[str]) -> Optional[GeocodeResult]:
+    """Resolve free-text location to coordinates; None when it cannot be resolved"""
+    if not text or not text.strip():
+        return None
+    return get_geocoder().geocode(text.strip())
+
+
+def geocode_incident(incident_fact) -> Optional[GeocodeResult]:
+    """Set the incident's latitude/longitude from its location text, if resolvable"""
+    result = geocode(incident_fact.location)
+    if result:
+        incident_fact.latitude = result.lat
+        incident_fact.longitude = result.lon
+        incident_fact.location_precision = result.precision
+    else:
+        logger.warning(f"⚠️ Could not geocode incident location: {incident_fact.location!r}")
+    return result
@@ -0,0 +1,509 @@
+"""
+Incident Extraction Service for Emergency Dispatch System
+
+Turns a Vapi call transcript into IncidentFact updates and the next question
+to ask. Each caller turn is handled by a single async, schema-constrained
+Gemini call that returns both the extracted fields and the next question as
+JSON, instead of separate free-text extraction and question calls.
+
+Extraction is incremental: the prompt carries the current IncidentFact state
+and only the turns that have not been extracted yet, so prompt size stays flat
+over a long call. The returned deltas are merged into the fact state, and the
+whole conversation is re-extracted only when a turn contradicts a known fact.
+
+New turns go through the rule-based extractor first. When the rules account
+for every new caller turn, the turn is answered without a model call. The
+next question comes from the precomputed question bank; the model writes it
+only for off-script turns, so on-script calls return extracted fields only.
+
+For streaming responses, off-script turns stream the spoken question from a
+plain-text model call while the facts are extracted concurrently, so the
+caller hears the first words without waiting for the structured response.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import google.generativeai as genai
+
+from app.schemas.incident_schema import IncidentFact
+from app.services.question_bank import get_question, is_off_script
+from app.services.rule_extractor import RESIDUAL_WORD_LIMIT, extract_rules
+
+logger = logging.getLogger(__name__)
+
+EMERGENCY_TYPES = ["Fire", "Medical", "Police", "Other"]
+SEVERITIES = ["Low", "Medium", "High", "Critical"]
+
+DEFAULT_QUESTION = "Can you please provide more details about the emergency?"
+
+# Order in which missing information is asked for
+FIELD_PRIORITIES = {
+    "emergency_type": 1,
+    "location": 2,
+    "severity": 3,
+    "caller_safety": 4,
+    "people_involved": 5,
+    "description": 6
+}
+
+# Structured output schema for extracting facts from one conversation turn
+EXTRACTION_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "emergency_type": {"type": "string", "enum": EMERGENCY_TYPES, "nullable": True},
+        "location": {"type": "string", "nullable": True},
+        "severity": {"type": "string", "enum": SEVERITIES, "nullable": True},
+        "people_involved": {"type": "integer", "nullable": True},
+        "caller_safe": {"type": "boolean", "nullable": True},
+        "description": {"type": "string", "nullable": True},
+        "contradiction": {"type": "boolean"}
+    }
+}
+
+# Off-script turns also need the model to write the next question
+TURN_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **EXTRACTION_RESPONSE_SCHEMA["properties"],
+        "next_question": {"type": "string"}
+    },
+    "required": ["next_question"]
+}
+
+# Known facts that, when changed by a new turn, trigger a full re-extraction
+CONTRADICTION_FIELDS = ("emergency_type", "location", "is_caller_safe")
+
+EXTRACTION_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=EXTRACTION_RESPONSE_SCHEMA,
+    temperature=0.2
+)
+
+TURN_GENERATION_CONFIG = genai.GenerationConfig(
+    response_mime_type="application/json",
+    response_schema=TURN_RESPONSE_SCHEMA,
+    temperature=0.2
+)
+
+
+class TurnMetrics:
+    """Latency and model usage over the most recent handler turns"""
+
+    def __init__(self, window: int = 1000):
+        self.turns = deque(maxlen=window)
+
+    def record(self, latency_ms: float, used_llm: bool) -> None:
+        self.turns.append((latency_ms, used_llm))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Fraction of turns served without a model call and p50/p99 turn latency"""
+        if not self.turns:
+            return {"turns": 0, "no_llm_fraction": 0.0, "p50_ms": 0.0, "p99_ms": 0.0}
+
+        latencies = sorted(latency for latency, _ in self.turns)
+        no_llm = sum(1 for _, used_llm in self.turns if not used_llm)
+        return {
+            "turns": len(self.turns),
+            "no_llm_fraction": round(no_llm / len(self.turns), 3),
+            "p50_ms": round(latencies[int(0.50 * (len(latencies) - 1))], 2),
+            "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 2)
+        }
+
+
+turn_metrics = TurnMetrics()
+
+
+def get_missing_incident_fields(incident_fact: IncidentFact) -> List[str]:
+    """Determine which required fields are still missing from the incident fact"""
+    missing_fields = []
+
+    # Critical fields that must be filled
+    if not incident_fact.emergency_type or incident_fact.emergency_type == "Not specified":
+        missing_fields.append("emergency_type")
+    if not incident_fact.location or incident_fact.location == "Not specified":
+        missing_fields.append("location")
+    if not incident_fact.severity or incident_fact.severity == "Not specified":
+        missing_fields.append("severity")
+    if not incident_fact.description or incident_fact.description == "Not specified":
+        missing_fields.append("description")
+
+    # Important fields for emergency response
+    if incident_fact.is_caller_safe is None:
+        missing_fields.append("caller_safety")
+    if not incident_fact.people_involved or incident_fact.people_involved == 0:
+        missing_fields.append("people_involved")
+
+    return sorted(missing_fields, key=lambda field: FIELD_PRIORITIES.get(field, 99))
+
+
+def format_conversation(conversation_history: List[Dict[str, Any]]) -> str:
+    """Render conversation history as "role: content" lines"""
+    return "\n".join(f"{msg['role']}: {msg['content']}" for msg in conversation_history)
+
+
+QUESTION_INSTRUCTION = """
+    3. Write next_question: the caller has gone off script, so briefly respond to what
+       they said, then ask a single, clear and empathetic question for the most critical
+       field that is still missing after your extraction. Be professional but reassuring,
+       and more direct if this is a critical emergency."""
+
+
+def build_turn_prompt(
+    turns: List[Dict[str, Any]],
+    incident_fact: IncidentFact,
+    last_question: Optional[str] = None,
+    full: bool = False,
+    ask_question: bool = False,
+    summary: Optional[str] = None
+) -> str:
+    """
+    Build the single prompt used to extract facts (and, off-script, the next question).
+
+    Incremental prompts carry the current fact state, the question the caller
+    is answering and only the new turns; full prompts carry the whole
+    conversation, starting with the rolling summary of compacted turns.
+    """
+    missing_fields = get_missing_incident_fields(incident_fact)
+    if full:
+        earlier = f"""Earlier in the call (summary):
+    {summary}
+
+    """ if summary else ""
+        conversation = f"""{earlier}Conversation:
+    {format_conversation(turns)}"""
+    else:
+        conversation = f"""Last question asked: {last_question or 'None'}
+
+    New conversation turns:
+    {format_conversation(turns)}"""
+
+    return f"""
+    You are an emergency dispatcher conducting an intake call.
+
+    Current incident information:
+    - Emergency Type: {incident_fact.emergency_type or 'Not specified'}
+    - Location: {incident_fact.location or 'Not specified'}
+    - Severity: {incident_fact.severity or 'Not specified'}
+    - Caller Safe: {incident_fact.is_caller_safe if incident_fact.is_caller_safe is not None else 'Not specified'}
+    - People Involved: {incident_fact.people_involved or 'Not specified'}
+    - Description: {incident_fact.description or 'Not specified'}
+
+    {conversation}
+
+    Missing information (most critical first): {", ".join(missing_fields) or "none"}
+
+    1. Extract every field the caller has stated or updated. Use null for anything
+       not mentioned; never guess. Location is the exact address or place the caller gave.
+    2. Set contradiction to true if the caller corrects or contradicts the current
+       incident information.{QUESTION_INSTRUCTION if ask_question else ""}
+    """
+
+
+def build_question_prompt(
+    turns: List[Dict[str, Any]],
+    incident_fact: IncidentFact,
+    last_question: Optional[str] = None
+) -> str:
+    """Build the plain-text prompt for a streamed off-script reply and question"""
+    missing_fields = get_missing_incident_fields(incident_fact)
+    return f"""
+    You are an emergency dispatcher conducting an intake call.
+
+    Current incident information:
+    - Emergency Type: {incident_fact.emergency_type or 'Not specified'}
+    - Location: {incident_fact.location or 'Not specified'}
+    - Severity: {incident_fact.severity or 'Not specified'}
+
+    Last question asked: {last_question or 'None'}
+
+    New conversation turns:
+    {format_conversation(turns)}
+
+    Missing information (most critical first): {", ".join(missing_fields) or "none"}
+
+    The caller has gone off script. Briefly respond to what they said, then ask a
+    single, clear and empathetic question for the most critical missing field the
+    caller has not just answered. Reply with the spoken words only, in one or two
+    short sentences.
+    """
+
+
+def _clean_text(value: Any) -> Optional[str]:
+    """Strip a string value; empty or non-string values become None"""
+    return (value.strip() or None) if isinstance(value, str) else None
+
+
+def parse_extraction(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate model output into IncidentFact updates, dropping nulls and out-of-schema values"""
+    people = data.get("people_involved")
+    updates = {
+        "emergency_type": data.get("emergency_type") if data.get("emergency_type") in EMERGENCY_TYPES else None,
+        "location": _clean_text(data.get("location")),
+        "severity": data.get("severity") if data.get("severity") in SEVERITIES else None,
+        "description": _clean_text(data.get("description")),
+        "is_caller_safe": data.get("caller_safe") if isinstance(data.get("caller_safe"), bool) else None,
+        "people_involved": people if type(people) is int and people > 0 else None
+    }
+    return {field: value for field, value in updates.items() if value is not None}
+
+
+def apply_extraction(incident_fact: IncidentFact, data: Dict[str, Any]) -> List[str]:
+    """Apply extracted values to the incident fact; returns the fields that changed"""
+    changed = []
+    for field, value in parse_extraction(data).items():
+        if getattr(incident_fact, field) != value:
+            setattr(incident_fact, field, value)
+            changed.append(field)
+    return changed
+
+
+def _same_value(current: Any, new: Any) -> bool:
+    """Compare fact values, ignoring case and surrounding whitespace for text"""
+    if isinstance(current, str) and isinstance(new, str):
+        return current.strip().lower() == new.strip().lower()
+    return current == new
+
+
+def is_contradiction(incident_fact: IncidentFact, data: Dict[str, Any]) -> bool:
+    """Whether extracted deltas contradict facts that are already known"""
+    if data.get("contradiction") is True:
+        return True
+
+    updates = parse_extraction(data)
+    return any(
+        field in updates
+        and getattr(incident_fact, field) is not None
+        and not _same_value(getattr(incident_fact, field), updates[field])
+        for field in CONTRADICTION_FIELDS
+    )
+
+
+def keyword_emergency_type(conversation_text: str) -> Optional[str]:
+    """Basic keyword fallback for the emergency type"""
+    text = conversation_text.lower()
+    if "fire" in text:
+        return "Fire"
+    if "medical" in text or "ambulance" in text:
+        return "Medical"
+    if "police" in text or "crime" in text:
+        return "Police"
+    return None
+
+
+def apply_rules(incident_fact: IncidentFact, turns: List[Dict[str, Any]], last_question: Optional[str]) -> bool:
+    """
+    Apply rule-extracted facts from new caller turns; returns whether the LLM is still needed.
+
+    The LLM is needed when a caller turn yields no rule match, carries more
+    unexplained words than RESIDUAL_WORD_LIMIT, or contradicts a known fact.
+    Contradicting values are left for the LLM to resolve.
+    """
+    needs_llm = False
+    for turn in turns:
+        if turn["role"] != "user":
+            continue
+
+        updates, residual = extract_rules(turn["content"], last_question)
+        if not updates or len(residual) > RESIDUAL_WORD_LIMIT:
+            needs_llm = True
+
+        for field, value in updates.items():
+            current = getattr(incident_fact, field)
+            if field in CONTRADICTION_FIELDS and current is not None and not _same_value(current, value):
+                needs_llm = True
+            else:
+                setattr(incident_fact, field, value)
+    return needs_llm
+
+
+def next_bank_question(call_context: Dict[str, Any]) -> str:
+    """
+    Question bank entry for the most critical missing field.
+
+    Asking for the same field again picks the next phrasing, so an
+    unanswered question is rephrased rather than repeated verbatim.
+    """
+    missing_fields = get_missing_incident_fields(call_context["incident_fact"])
+    if not missing_fields:
+        return DEFAULT_QUESTION
+
+    field = missing_fields[0]
+    attempts = call_context.setdefault("question_attempts", {})
+    question = get_question(field, call_context["incident_fact"], attempts.get(field, 0))
+    attempts[field] = attempts.get(field, 0) + 1
+    return question or DEFAULT_QUESTION
+
+
+async def _generate(model: genai.GenerativeModel, prompt: str, ask_question: bool = False) -> Dict[str, Any]:
+    """Run one structured extraction call and parse its JSON output"""
+    generation_config = TURN_GENERATION_CONFIG if ask_question else EXTRACTION_GENERATION_CONFIG
+    response = await model.generate_content_async(prompt, generation_config=generation_config)
+    return json.loads(response.text)
+
+
+async def extract_turn(
+    model: genai.GenerativeModel,
+    call_context: Dict[str, Any],
+    full: bool = False,
+    write_question: bool = True
+) -> str:
+    """
+    Update the call's incident fact from new turns and return the next question.
+
+    New turns after `call_context["extracted_turns"]` first go through the
+    rule-based extractor; if the rules account for all follow-up turns, no
+    model call is made. Otherwise the new turns are sent together with the
+    current fact state, and the deltas are merged. A second call over the
+    whole conversation is made only when the deltas contradict known facts
+    (or with `full=True`). If extraction fails, known facts are kept and the
+    turns are retried on the next call.
+
+    The next question comes from the question bank unless a caller turn is
+    off script, in which case the model writes it in the same call. With
+    `write_question=False` the bank question is always used, for callers
+    that generate the off-script question separately.
+    """
+    start_time = time.perf_counter()
+    conversation_history = call_context["conversation_history"]
+    incident_fact = call_context["incident_fact"]
+    extracted_turns = 0 if full else call_context.get("extracted_turns", 0)
+    new_turns = conversation_history[extracted_turns:]
+    opening_turn = extracted_turns == 0 and not call_context.get("compacted_turns")
+
+    if not new_turns and call_context.get("last_question"):
+        return call_context["last_question"]
+
+    off_script = is_off_script_turn(new_turns)
+    ask_question = write_question and off_script
+    # The opening turn always goes to the model, since it carries the description
+    needs_llm = full or apply_rules(incident_fact, new_turns, call_context.get("last_question"))
+    used_llm = bool(opening_turn or needs_llm or ask_question)
+
+    next_question = None
+    if used_llm:
+        try:
+            data = await _generate(model, build_turn_prompt(
+                new_turns,
+                incident_fact,
+                call_context.get("last_question"),
+                full=extracted_turns == 0,
+                ask_question=ask_question,
+                summary=call_context.get("summary")
+            ), ask_question=ask_question)
+
+            if extracted_turns and is_contradiction(incident_fact, data):
+                logger.info("Contradiction detected, re-extracting the full conversation")
+                data = await _generate(
+                    model,
+                    build_turn_prompt(
+                        conversation_history,
+                        IncidentFact(),
+                        full=True,
+                        ask_question=ask_question,
+                        summary=call_context.get("summary")
+                    ),
+                    ask_question=ask_question
+                )
+
+            changed = apply_extraction(incident_fact, data)
+            call_context["extracted_turns"] = len(conversation_history)
+            if ask_question:
+                next_question = _clean_text(data.get("next_question"))
+            logger.info(f"Extracted fields {changed} from {len(new_turns)} new turns")
+
+        except Exception as e:
+            logger.error(f"Error extracting turn: {e}")
+    else:
+        call_context["extracted_turns"] = len(conversation_history)
+
+    # Fallback to basic keyword extraction if structured extraction fails
+    if not incident_fact.emergency_type:
+        incident_fact.emergency_type = keyword_emergency_type(format_conversation(conversation_history))
+
+    next_question = next_question or next_bank_question(call_context)
+    call_context["last_question"] = next_question
+
+    # Off-script questions left to the caller are streamed from the model, so the turn used it too
+    used_llm = used_llm or off_script
+    latency_ms = (time.perf_counter() - start_time) * 1000
+    turn_metrics.record(latency_ms, used_llm)
+    logger.info(f"Turn handled in {latency_ms:.1f} ms ({'model' if used_llm else 'rules'})")
+    return next_question
+
+
+def is_off_script_turn(turns: List[Dict[str, Any]]) -> bool:
+    """Whether any new caller turn goes beyond the intake script"""
+    return any(turn["role"] == "user" and is_off_script(turn["content"]) for turn in turns)
+
+
+async def stream_question(model: genai.GenerativeModel, prompt: str) -> AsyncIterator[str]:
+    """Stream a plain-text model reply as it is generated"""
+    response = await model.generate_content_async(prompt, stream=True)
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. safety or finish metadata)
+            continue
+        if text:
+            yield text
+
+
+async def stream_turn(
+    model: genai.GenerativeModel,
+    call_context: Dict[str, Any],
+    hold_until_extracted: bool = False
+) -> AsyncIterator[str]:
+    """
+    Update the incident fact like extract_turn, yielding the next question as it is produced.
+
+    On-script turns yield the bank question once extraction finishes. For
+    off-script turns the reply is streamed from a plain-text model call
+    while extraction runs concurrently, so the first words do not wait for
+    the structured response. With `hold_until_extracted`, text generated
+    before extraction finishes is held back. The caller can then inspect the
+    updated facts when the first text arrives, and can stop iterating to drop
+    the question. If streaming fails before any text, the bank question is
+    yielded instead.
+    """
+    new_turns = call_context["conversation_history"][call_context.get("extracted_turns", 0):]
+    if not is_off_script_turn(new_turns):
+        yield await extract_turn(model, call_context)
+        return
+
+    prompt = build_question_prompt(new_turns, call_context["incident_fact"], call_context.get("last_question"))
+    extraction = asyncio.create_task(extract_turn(model, call_context, write_question=False))
+    # Streamed text, then None when the stream ends
+    texts: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for text in stream_question(model, prompt):
+                await texts.put(text)
+        except Exception as e:
+            logger.error(f"Error streaming question: {e}")
+        finally:
+            await texts.put(None)
+
+    streaming = asyncio.create_task(pump())
+    chunks = []
+    try:
+        if hold_until_extracted:
+            await asyncio.wait({extraction})
+        while (text := await texts.get()) is not None:
+            chunks.append(text)
+            yield text
+    finally:
+        streaming.cancel()
+
+    bank_question = await extraction
+    question = "".join(chunks).strip()
+    if question:
+        call_context["last_question"] = question
+    else:
+        yield bank_question
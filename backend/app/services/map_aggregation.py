@@ -0,0 +1,287 @@
+"""
+Map Aggregation Service for Emergency Dispatch System
+
+Zoom-aware clusters and heat bins for units and incidents inside a map
+bounding box, computed from the Redis GEO indexes (units:geo, incidents:geo)
+without reading every point.
+
+A GEO index is a sorted set whose score is the member's 52-bit geohash:
+longitude and latitude bits interleaved, 26 of each, over Redis's
+[-180, 180] x [-85.05112878, 85.05112878] ranges. Every geohash cell is
+therefore one contiguous score range. ZCOUNT over that range returns the
+cell's count in O(log N) from the skiplist's span counters. Redis keeps
+those counters up to date on every GEOADD and ZREM, so no separate counter
+has to be written on the unit update path.
+
+For a view, the grid resolution follows the zoom (about eight cells across
+a map tile). It is coarsened until the box spans at most MAP_MAX_CELLS
+cells. One pipeline counts every cell.
+- If the view holds at most MAP_POINT_LIMIT points, they are returned
+  individually with their type and status.
+- Otherwise each non-empty cell becomes a cluster, placed on its median
+  member so that markers sit on real positions, plus a heat bin at the
+  cell center.
+
+Points whose unit hash or incident payload is gone are dropped and not
+counted. Cluster and heat counts come from the GEO index alone, so they can
+include units whose hash expired since the last sweep: every
+MAP_SWEEP_SECONDS a view request starts a background sweep that removes
+the index entries of expired units.
+
+Responses are cached for MAP_CACHE_SECONDS per (layers, box, zoom level),
+so dashboards showing the same view share one computation.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.database import unit_store
+from services.incident_registry import INCIDENT_DATA_PREFIX, INCIDENT_GEO_KEY
+
+logger = logging.getLogger(__name__)
+
+GEO_STEP = 26
+GEO_LAT_MIN, GEO_LAT_MAX = -85.05112878, 85.05112878
+GEO_LON_MIN, GEO_LON_MAX = -180.0, 180.0
+
+# Grid cells across one web-mercator tile are 2**TILE_CELL_BITS
+TILE_CELL_BITS = 3
+CACHE_ENTRIES = 256
+
+LAYERS = ("units", "incidents")
+
+
+def _interleave(lon_index: int, lat_index: int, bits: int) -> int:
+    """Geohash bits of a cell: longitude bit first, then latitude, from the top bit down"""
+    value = 0
+    for shift in range(bits - 1, -1, -1):
+        value = (value << 2) | (((lon_index >> shift) & 1) << 1) | ((lat_index >> shift) & 1)
+    return value
+
+
+def _deinterleave(value: int, bits: int) -> Tuple[int, int]:
+    lon_index = lat_index = 0
+    for shift in range(bits - 1, -1, -1):
+        pair = (value >> (2 * shift)) & 3
+        lon_index = (lon_index << 1) | (pair >> 1)
+        lat_index = (lat_index << 1) | (pair & 1)
+    return lon_index, lat_index
+
+
+def _index(value: float, low: float, high: float, bits: int) -> int:
+    cells = 1 << bits
+    return min(max(int((value - low) / (high - low) * cells), 0), cells - 1)
+
+
+def geo_score(lat: float, lon: float) -> int:
+    """Score Redis GEOADD stores for a point"""
+    return _interleave(
+        _index(lon, GEO_LON_MIN, GEO_LON_MAX, GEO_STEP),
+        _index(lat, GEO_LAT_MIN, GEO_LAT_MAX, GEO_STEP),
+        GEO_STEP
+    )
+
+
+def cell_center(lon_index: int, lat_index: int, bits: int) -> Tuple[float, float]:
+    """(lat, lon) of a cell's center"""
+    cells = 1 << bits
+    return (
+        GEO_LAT_MIN + (lat_index + 0.5) * (GEO_LAT_MAX - GEO_LAT_MIN) / cells,
+        GEO_LON_MIN + (lon_index + 0.5) * (GEO_LON_MAX - GEO_LON_MIN) / cells
+    )
+
+
+def score_position(score: float) -> Tuple[float, float]:
+    """(lat, lon) of a GEO index score, accurate to well under a meter"""
+    return cell_center(*_deinterleave(int(score), GEO_STEP), GEO_STEP)
+
+
+def cell_range(lon_index: int, lat_index: int, bits: int) -> Tuple[int, int]:
+    """Scores [low, high) of the points inside a cell"""
+    shift = 2 * (GEO_STEP - bits)
+    prefix = _interleave(lon_index, lat_index, bits)
+    return prefix << shift, (prefix + 1) << shift
+
+
+def grid_for_view(bbox: Tuple[float, float, float, float], zoom: float, max_cells: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """Bits per axis and the cells covering the box, coarsened until at most max_cells"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    bits = min(max(int(math.floor(zoom)) + TILE_CELL_BITS, 1), GEO_STEP)
+    while True:
+        lon_low, lon_high = (_index(value, GEO_LON_MIN, GEO_LON_MAX, bits) for value in (min_lon, max_lon))
+        lat_low, lat_high = (_index(value, GEO_LAT_MIN, GEO_LAT_MAX, bits) for value in (min_lat, max_lat))
+        if (lon_high - lon_low + 1) * (lat_high - lat_low + 1) <= max_cells or bits == 1:
+            break
+        bits -= 1
+    cells = [(lon_index, lat_index) for lat_index in range(lat_low, lat_high + 1) for lon_index in range(lon_low, lon_high + 1)]
+    return bits, cells
+
+
+async def _unit_details(client: redis.Redis, unit_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    pipe = client.pipeline(transaction=False)
+    for unit_id in unit_ids:
+        pipe.hmget(unit_store.unit_key(unit_id), "type", "status")
+    rows = await pipe.execute()
+    return {
+        unit_id: {"type": unit_type, "status": status}
+        for unit_id, (unit_type, status) in zip(unit_ids, rows)
+        if unit_type is not None or status is not None
+    }
+
+
+async def _incident_details(client: redis.Redis, incident_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    rows = await client.mget([INCIDENT_DATA_PREFIX + incident_id for incident_id in incident_ids])
+    details = {}
+    for incident_id, raw in zip(incident_ids, rows):
+        if raw is None:
+            continue
+        try:
+            incident = json.loads(raw) if raw else {}
+        except ValueError:
+            incident = {}
+        details[incident_id] = {"emergency_type": incident.get("emergency_type"), "status": incident.get("status")}
+    return details
+
+
+LAYER_SOURCES = {
+    "units": (unit_store.UNIT_GEO_KEY, _unit_details),
+    "incidents": (INCIDENT_GEO_KEY, _incident_details),
+}
+
+
+async def aggregate_layer(
+    client: redis.Redis,
+    layer: str,
+    bbox: Tuple[float, float, float, float],
+    bits: int,
+    cells: List[Tuple[int, int]],
+    point_limit: int
+) -> Dict[str, Any]:
+    """Points, clusters and heat bins of one layer over the view's cells"""
+    key, details = LAYER_SOURCES[layer]
+    ranges = [cell_range(lon_index, lat_index, bits) for lon_index, lat_index in cells]
+
+    pipe = client.pipeline(transaction=False)
+    for low, high in ranges:
+        pipe.zcount(key, low, f"({high}")
+    counts = await pipe.execute()
+    occupied = [(cell, span, count) for cell, span, count in zip(cells, ranges, counts) if count]
+    total = sum(count for _, _, count in occupied)
+
+    # Every point of the view when there are few enough, otherwise each cell's median member
+    pipe = client.pipeline(transaction=False)
+    for _, (low, high), count in occupied:
+        if total <= point_limit:
+            pipe.zrangebyscore(key, low, f"({high}", withscores=True)
+        else:
+            pipe.zrangebyscore(key, low, f"({high}", start=(count - 1) // 2, num=1, withscores=True)
+    members = await pipe.execute() if occupied else []
+
+    min_lon, min_lat, max_lon, max_lat = bbox
+    points, clusters, heat = [], [], []
+    # Heat bin of each point, to uncount the points found stale below
+    point_bins = []
+    for (cell, _, count), cell_members in zip(occupied, members):
+        positions = [(member, *score_position(score)) for member, score in cell_members]
+        if total <= point_limit or count == 1:
+            for member, lat, lon in positions:
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    points.append({"id": member, "lat": round(lat, 6), "lon": round(lon, 6)})
+                    point_bins.append(len(heat))
+        elif positions:
+            _, lat, lon = positions[0]
+            clusters.append({"lat": round(lat, 6), "lon": round(lon, 6), "count": count})
+        center_lat, center_lon = cell_center(*cell, bits)
+        heat.append([round(center_lat, 5), round(center_lon, 5), count])
+
+    if points:
+        found = await details(client, [point["id"] for point in points])
+        for point, heat_bin in zip(points, point_bins):
+            if point["id"] not in found:
+                # Index entry of an expired unit or removed incident
+                heat[heat_bin][2] -= 1
+                total -= 1
+        points = [{**point, **found[point["id"]]} for point in points if point["id"] in found]
+        heat = [heat_bin for heat_bin in heat if heat_bin[2]]
+    return {"total": total, "points": points, "clusters": clusters, "heat": heat}
+
+
+class MapAggregator:
+    """Builds map views from the GEO indexes, caching each view briefly"""
+
+    def __init__(self, max_cells: int = None, point_limit: int = None, cache_seconds: float = None, sweep_seconds: float = None):
+        self.max_cells = max_cells or settings.MAP_MAX_CELLS
+        self.point_limit = point_limit if point_limit is not None else settings.MAP_POINT_LIMIT
+        self.cache_seconds = cache_seconds if cache_seconds is not None else settings.MAP_CACHE_SECONDS
+        self.sweep_seconds = sweep_seconds if sweep_seconds is not None else settings.MAP_SWEEP_SECONDS
+        self._cache: "OrderedDict[tuple, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._last_sweep = time.monotonic()
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    def _maybe_sweep(self, client: redis.Redis) -> None:
+        """Start a background sweep of expired units when the last one is MAP_SWEEP_SECONDS old"""
+        if not self.sweep_seconds or time.monotonic() - self._last_sweep < self.sweep_seconds:
+            return
+        if self._sweep_task is not None and not self._sweep_task.done():
+            return
+        self._last_sweep = time.monotonic()
+        self._sweep_task = asyncio.create_task(self._sweep(client))
+
+    async def _sweep(self, client: redis.Redis) -> None:
+        try:
+            pruned = await unit_store.prune_expired_units(client)
+            if pruned:
+                logger.info(f"🧹 Removed {pruned} expired units from the map indexes")
+        except Exception as e:
+            logger.error(f"❌ Failed to sweep expired units: {e}")
+
+    async def view(
+        self,
+        client: redis.Redis,
+        bbox: Tuple[float, float, float, float],
+        zoom: float,
+        layers: Iterable[str] = LAYERS
+    ) -> Dict[str, Any]:
+        """Clusters, points and heat bins per layer for a bounding box at a zoom level"""
+        layers = tuple(layers)
+        unknown = [layer for layer in layers if layer not in LAYER_SOURCES]
+        if unknown:
+            raise ValueError(f"Unknown map layers: {', '.join(unknown)}")
+
+        if "units" in layers:
+            self._maybe_sweep(client)
+
+        # Views within one zoom level share a grid; only the echoed zoom differs
+        cache_key = (layers, bbox, math.floor(zoom))
+        cached = self._cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self.cache_seconds:
+            return {**cached[1], "zoom": zoom}
+
+        bits, cells = grid_for_view(bbox, zoom, self.max_cells)
+        lat_step = (GEO_LAT_MAX - GEO_LAT_MIN) / (1 << bits)
+        lon_step = (GEO_LON_MAX - GEO_LON_MIN) / (1 << bits)
+        result = {
+            "bbox": list(bbox),
+            "zoom": zoom,
+            "cell_size_deg": [round(lat_step, 6), round(lon_step, 6)],
+            "layers": {}
+        }
+        for layer in layers:
+            result["layers"][layer] = await aggregate_layer(client, layer, bbox, bits, cells, self.point_limit)
+
+        self._cache[cache_key] = (time.monotonic(), result)
+        while len(self._cache) > CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+        return result
+
+
+# Shared aggregator for the map API
+map_aggregator = MapAggregator()
@@ -0,0 +1,146 @@
+"""
+Question Bank for Emergency Dispatch System
+
+Precomputed intake questions keyed by the highest-priority missing field, the
+emergency type and the urgency of the call. Most turns only need to ask for
+the next missing field, so the question is a dictionary lookup instead of
+model output; the LLM writes the question only for off-script turns where the
+caller asks something or goes beyond the intake script.
+
+Each key holds several phrasings, so a question the caller did not answer is
+rephrased on the next attempt instead of repeated verbatim.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.schemas.incident_schema import IncidentFact
+
+ANY = "*"
+CRITICAL = "critical"
+STANDARD = "standard"
+
+# (missing field, emergency type, urgency) -> phrasings; ANY matches every value
+QUESTION_BANK: Dict[Tuple[str, str, str], List[str]] = {
+    ("emergency_type", ANY, ANY): [
+        "What is your emergency? Do you need fire, medical or police assistance?",
+        "Tell me what is happening right now. Is it a fire, a medical problem, or a crime?"
+    ],
+    ("location", ANY, STANDARD): [
+        "What is the address of the emergency?",
+        "I need to know where you are. What is the street address or the nearest intersection?"
+    ],
+    ("location", ANY, CRITICAL): [
+        "Help is my priority. What is the exact address?",
+        "Tell me the address or the nearest cross streets so I can send help now."
+    ],
+    ("location", "Police", CRITICAL): [
+        "Stay as quiet as you need to. What is the address where this is happening?",
+        "Whisper if you have to. What street are you on, or what is the nearest cross street?"
+    ],
+    ("severity", "Fire", ANY): [
+        "How big is the fire? Is it spreading?",
+        "Can you see flames, or only smoke? Is it getting worse?"
+    ],
+    ("severity", "Medical", ANY): [
+        "Is the person conscious and breathing?",
+        "Is the person awake and able to talk to you?"
+    ],
+    ("severity", "Police", ANY): [
+        "Is anyone hurt, and does anyone have a weapon?",
+        "Are they still there, and have you seen any weapons?"
+    ],
+    ("severity", ANY, ANY): [
+        "How serious is the situation right now? Is anyone in immediate danger?",
+        "Is anyone hurt or in danger right now?"
+    ],
+    ("caller_safety", "Fire", ANY): [
+        "Are you safely out of the building and away from the smoke?",
+        "Are you somewhere safe, away from the fire?"
+    ],
+    ("caller_safety", "Police", ANY): [
+        "Are you somewhere safe where they cannot see or hear you?",
+        "Are you safe right now? Can you get somewhere locked?"
+    ],
+    ("caller_safety", ANY, ANY): [
+        "Are you in a safe place right now?",
+        "Are you safe where you are?"
+    ],
+    ("people_involved", "Fire", ANY): [
+        "Is anyone still inside? How many people are involved?",
+        "How many people live there, and is everyone out?"
+    ],
+    ("people_involved", "Medical", ANY): [
+        "How many people are hurt or need medical help?",
+        "Is it just one person who needs help, or more?"
+    ],
+    ("people_involved", "Police", ANY): [
+        "How many people are involved, including anyone causing the problem?",
+        "How many people do you see there?"
+    ],
+    ("people_involved", ANY, ANY): [
+        "How many people are involved or hurt?",
+        "How many people need help?"
+    ],
+    ("description", ANY, STANDARD): [
+        "Can you tell me exactly what is happening?",
+        "Describe what you can see right now."
+    ],
+    ("description", ANY, CRITICAL): [
+        "Tell me quickly what is happening right now.",
+        "In a few words, what do you see right now?"
+    ],
+}
+
+BANK_FIELDS = ("emergency_type", "location", "severity", "caller_safety", "people_involved", "description")
+BANK_TYPES = ("Fire", "Medical", "Police", "Other", None)
+
+# Turns that ask the dispatcher something or ask for guidance are off-script
+OFF_SCRIPT_PATTERN = re.compile(
+    r"\?|\b(?:what should i|what do i|should i|can you|could you|how long|when will|"
+    r"is help|are they coming|what happens)\b",
+    re.IGNORECASE
+)
+
+
+def _resolve(field: str, emergency_type: Optional[str], urgency: str) -> List[str]:
+    """Most specific bank entry for a key, falling back through ANY"""
+    for key in (
+        (field, emergency_type, urgency),
+        (field, emergency_type, ANY),
+        (field, ANY, urgency),
+        (field, ANY, ANY),
+    ):
+        if key in QUESTION_BANK:
+            return QUESTION_BANK[key]
+    return []
+
+
+# Every key is resolved once at import, so lookups are a single dict access
+_LOOKUP = {
+    (field, emergency_type, urgency): _resolve(field, emergency_type, urgency)
+    for field in BANK_FIELDS
+    for emergency_type in BANK_TYPES
+    for urgency in (CRITICAL, STANDARD)
+}
+
+
+def get_urgency(incident_fact: IncidentFact) -> str:
+    """Critical when the incident is critical, threatening or the caller is unsafe"""
+    if incident_fact.severity == "Critical" or incident_fact.is_active_threat or incident_fact.is_caller_safe is False:
+        return CRITICAL
+    return STANDARD
+
+
+def is_off_script(text: str) -> bool:
+    """Whether a caller turn asks something the intake script does not cover"""
+    return bool(OFF_SCRIPT_PATTERN.search(text))
+
+
+def get_question(field: str, incident_fact: IncidentFact, attempt: int = 0) -> Optional[str]:
+    """Question for a missing field; `attempt` picks the rephrasing for repeated asks"""
+    emergency_type = incident_fact.emergency_type if incident_fact.emergency_type in BANK_TYPES else None
+    phrasings = _LOOKUP.get((field, emergency_type, get_urgency(incident_fact)))
+    if not phrasings:
+        return None
+    return phrasings[attempt % len(phrasings)]
@@ -0,0 +1,212 @@
+"""
+Rule-Based Fact Extractor for Emergency Dispatch System
+
+Deterministic fast path for incident facts that callers usually state
+explicitly: emergency type, callback number, coordinates, street addresses,
+people counts and caller safety. All patterns are compiled once at import, so
+a turn is processed in microseconds without a model call.
+
+Rules only report a field when the match is unambiguous. Every other field,
+and any turn with substantial text the rules did not account for, is left to
+the LLM extraction in incident_extraction_service.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Keyword automaton: one alternation per emergency type, matched on word boundaries
+EMERGENCY_KEYWORDS = {
+    "Fire": [
+        "fire", "flames?", "smoke", "burning", "on fire", "gas leak", "smell gas", "explosion", "exploded"
+    ],
+    "Medical": [
+        "ambulance", "not breathing", "collapsed", "unconscious", "heart attack", "chest pain", "bleeding",
+        "allergic reaction", "seizure", "overdose", "stroke", "injured", "hurt", "fell", "crash",
+        "accident", "choking"
+    ],
+    "Police": [
+        "gun", "shooting", "shots fired", "robbery", "robbed", "breaking into", "break-in", "burglar",
+        "intruder", "stolen", "assault", "attacked", "knife", "stabbed", "threatening", "crowbar"
+    ]
+}
+
+# Words that make an incident critical regardless of type
+CRITICAL_KEYWORDS = [
+    "not breathing", "unconscious", "gun", "shooting", "shots fired", "trapped", "heart attack",
+    "stabbed", "explosion", "throat is swelling", "spreading"
+]
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "a dozen": 12, "twenty": 20
+}
+
+PEOPLE_NOUNS = (
+    "people", "persons?", "men", "man", "women", "woman", "kids", "children", "adults",
+    "victims?", "patients?", "residents", "of us"
+)
+
+# Filler words ignored when deciding whether a turn carries information the rules missed
+FILLER_WORDS = frozenset(
+    "a an and the i i'm im it it's its is are was we we're were he he's she she's they they're "
+    "my our at in on of to for with yes no um uh okay ok so just now here there right please "
+    "sorry think me him her this that".split()
+)
+
+# Turns with more unexplained words than this go to the LLM
+RESIDUAL_WORD_LIMIT = 5
+
+
+def _keyword_pattern(keywords: List[str]) -> re.Pattern:
+    """Compile keywords into a single case-insensitive word-boundary alternation"""
+    return re.compile(r"\b(?:" + "|".join(keywords) + r")\b", re.IGNORECASE)
+
+
+TYPE_PATTERNS = {emergency_type: _keyword_pattern(words) for emergency_type, words in EMERGENCY_KEYWORDS.items()}
+CRITICAL_PATTERN = _keyword_pattern(CRITICAL_KEYWORDS)
+
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+?1[\s.-]?)?\(?(\d{3})\)?[\s.-]?(\d{3})[\s.-]?(\d{4})(?!\d)")
+
+COORDINATES_PATTERN = re.compile(r"(?<![\d.])(-?\d{1,2}\.\d{3,})\s*,\s*(-?\d{1,3}\.\d{3,})(?![\d.])")
+
+ADDRESS_PATTERN = re.compile(
+    r"\b\d{1,6}\s+"
+    r"(?:(?:North|South|East|West|N|S|E|W)\.?\s+)?"
+    r"(?:[A-Z][a-z]+\s+){1,3}"
+    r"(?:Street|St|Avenue|Ave|Road|Rd|Boulevard|Blvd|Drive|Dr|Lane|Ln|Way|Court|Ct|Place|Pl|Parkway|Pkwy)\b\.?"
+    r"(?:,?\s+(?:apartment|apt\.?|unit|suite)\s+\w+)?"
+    r"(?:,\s+(?:[A-Z][a-z]+\s?){1,3}(?=[.,!?]|$))?"
+)
+
+_NUMBER = r"\d{1,3}|" + "|".join(NUMBER_WORDS)
+PEOPLE_PATTERN = re.compile(
+    r"\b(" + _NUMBER + r")\s+(?:\w+\s+)?(?:" + "|".join(PEOPLE_NOUNS) + r")\b",
+    re.IGNORECASE
+)
+SINGLE_PERSON_PATTERN = re.compile(
+    r"\b(?:(?:it's\s+)?(?:just|only)\s+(?:me|him|her|one)|(?:he|she)\s+is\s+alone|(?:he's|she's)\s+alone)\b",
+    re.IGNORECASE
+)
+
+UNSAFE_PATTERN = re.compile(
+    r"\b(?:i'm|i am)\s+not\s+(?:safe|okay|ok|fine|alright)\b|\bnot\s+safe\b|\bin\s+danger\b",
+    re.IGNORECASE
+)
+SAFE_PATTERN = re.compile(
+    r"\b(?:i'm|i am|we're|we are)\s+(?:safe|okay|ok|fine|alright|all right)\b",
+    re.IGNORECASE
+)
+YES_NO_PATTERN = re.compile(r"^\s*(yes|yeah|yep|no|nope)\b", re.IGNORECASE)
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _parse_number(value: str) -> int:
+    """Parse a digit string or a number word"""
+    value = value.lower()
+    return int(value) if value.isdigit() else NUMBER_WORDS[value]
+
+
+def _emergency_type(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    """The emergency type when exactly one type's keywords appear"""
+    matched = {}
+    for emergency_type, pattern in TYPE_PATTERNS.items():
+        found = list(pattern.finditer(text))
+        if found:
+            matched[emergency_type] = found
+
+    if len(matched) != 1:
+        return None
+    emergency_type, found = next(iter(matched.items()))
+    spans.extend(match.span() for match in found)
+    return emergency_type
+
+
+def _callback_number(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    """A single US phone number, as digits"""
+    found = {"".join(match.groups()): match for match in PHONE_PATTERN.finditer(text)}
+    if len(found) != 1:
+        return None
+    number, match = next(iter(found.items()))
+    spans.append(match.span())
+    return number
+
+
+def _location(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    """GPS coordinates as "lat, lon", or a single street address"""
+    match = COORDINATES_PATTERN.search(text)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            spans.append(match.span())
+            return f"{match.group(1)}, {match.group(2)}"
+
+    addresses = list(ADDRESS_PATTERN.finditer(text))
+    if len(addresses) != 1:
+        return None
+    spans.append(addresses[0].span())
+    return addresses[0].group(0).rstrip(".").strip()
+
+
+def _people_involved(text: str, spans: List[Tuple[int, int]]) -> Optional[int]:
+    """A single stated people count"""
+    counts = {}
+    for match in PEOPLE_PATTERN.finditer(text):
+        counts.setdefault(_parse_number(match.group(1)), match.span())
+    for match in SINGLE_PERSON_PATTERN.finditer(text):
+        counts.setdefault(1, match.span())
+
+    if len(counts) != 1:
+        return None
+    count, span = next(iter(counts.items()))
+    spans.append(span)
+    return count
+
+
+def _caller_safe(text: str, last_question: Optional[str], spans: List[Tuple[int, int]]) -> Optional[bool]:
+    """Caller safety from explicit statements, or a yes/no answer to a safety question"""
+    unsafe = UNSAFE_PATTERN.search(text)
+    if unsafe:
+        spans.append(unsafe.span())
+        return False
+
+    safe = SAFE_PATTERN.search(text)
+    if safe:
+        spans.append(safe.span())
+        return True
+
+    answer = YES_NO_PATTERN.search(text)
+    if answer and last_question and "safe" in last_question.lower():
+        spans.append(answer.span())
+        return answer.group(1).lower() in ("yes", "yeah", "yep")
+    return None
+
+
+def residual_words(text: str, spans: List[Tuple[int, int]]) -> List[str]:
+    """Words in `text` outside the matched spans that are not filler"""
+    chars = list(text)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    return [word for word in WORD_PATTERN.findall("".join(chars).lower()) if word not in FILLER_WORDS]
+
+
+def extract_rules(text: str, last_question: Optional[str] = None) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Extract confidently stated IncidentFact fields from caller text.
+
+    Returns the field updates and the residual words the rules did not
+    account for; a caller can use the residual to decide whether the turn
+    still needs the LLM.
+    """
+    spans: List[Tuple[int, int]] = []
+    updates = {
+        "emergency_type": _emergency_type(text, spans),
+        "callback_number": _callback_number(text, spans),
+        "location": _location(text, spans),
+        "people_involved": _people_involved(text, spans),
+        "is_caller_safe": _caller_safe(text, last_question, spans),
+    }
+    if CRITICAL_PATTERN.search(text):
+        updates["severity"] = "Critical"
+
+    return {field: value for field, value in updates.items() if value is not None}, residual_words(text, spans)
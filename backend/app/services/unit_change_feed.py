@@ -0,0 +1,277 @@
+"""
+Unit Change Feed for Emergency Dispatch System
+
+Streams unit state changes to subscribers, so dashboards and external
+consumers stop polling the unit listing. Every unit_store write publishes
+its change on the units:changes channel in the same pipeline as the write
+(status API, onboarding, Redis loader, Router Agent). Each API worker
+holds one subscription to that channel and fans changes out to its
+subscribers.
+
+A subscriber may filter by unit type and bounding box. A unit that leaves
+the box is sent once as {"unit_id", "removed": true}. Changes are
+throttled per unit to the subscriber's minimum interval. A change that
+arrives sooner waits, and a newer one replaces it, so the last state is
+always delivered and a fast-reporting unit cannot flood a slow consumer.
+
+Status-only changes are merged with the last known state of the unit. That
+state is read from Redis once when the feed has not seen the unit yet. The
+feed keeps at most UNIT_STREAM_MAX_TRACKED_UNITS states, least recently
+changed first out, and forgets a unit unchanged for UNIT_TTL_SECONDS, as
+its hash has expired by then.
+
+Subscribing waits for Redis to confirm the channel subscription, so a
+snapshot read afterwards cannot miss a change. Changes published while the
+subscription is lost are missed: after reconnecting every subscriber gets
+a RESYNC event and should reload its units.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.database import unit_store
+
+logger = logging.getLogger(__name__)
+
+STATE_FIELDS = ("unit_id", "type", "status", "lat", "lon", "last_updated")
+RECONNECT_BACKOFF_SECONDS = (0.5, 1.0, 2.0, 5.0)
+SUBSCRIBE_TIMEOUT_SECONDS = 5.0
+# Yielded by UnitSubscriber.events after the feed missed changes
+RESYNC = {"resync": True}
+
+
+def unit_state(unit: Dict[str, Any]) -> Dict[str, Any]:
+    """The streamed fields of a unit"""
+    return {field: unit.get(field) for field in STATE_FIELDS if unit.get(field) is not None}
+
+
+class UnitSubscriber:
+    """One stream consumer: its filters, per-unit throttle and pending changes"""
+
+    def __init__(self, types: Optional[Iterable[str]] = None, bbox: Optional[Tuple[float, float, float, float]] = None, min_interval: float = 0.0):
+        self.types = {unit_store.normalize_type(unit_type) for unit_type in types} if types else None
+        self.bbox = bbox
+        self.min_interval = min_interval
+        # Latest undelivered event per unit, oldest first
+        self.pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.last_sent: Dict[str, float] = {}
+        self.visible: Set[str] = set()
+        self.wakeup = asyncio.Event()
+        self.needs_resync = False
+        self.delivered = 0
+        self.coalesced = 0
+
+    def matches(self, unit: Dict[str, Any]) -> bool:
+        if unit.get("deleted"):
+            return False
+        if self.types is not None and unit.get("type") not in self.types:
+            return False
+        if self.bbox is not None:
+            if unit.get("lat") is None or unit.get("lon") is None:
+                return False
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            return min_lon <= unit["lon"] <= max_lon and min_lat <= unit["lat"] <= max_lat
+        return True
+
+    def offer(self, unit: Dict[str, Any]) -> None:
+        """Queue a unit's new state if it concerns this subscriber"""
+        unit_id = unit["unit_id"]
+        if self.matches(unit):
+            self.visible.add(unit_id)
+            event = unit_state(unit)
+        elif unit_id in self.visible:
+            self.visible.discard(unit_id)
+            event = {"unit_id": unit_id, "removed": True}
+        else:
+            return
+        if unit_id in self.pending:
+            self.coalesced += 1
+        self.pending[unit_id] = event
+        self.wakeup.set()
+
+    def resync(self) -> None:
+        """Drop queued changes, which may predate missed ones, and ask the consumer to reload"""
+        self.pending.clear()
+        self.visible.clear()
+        self.needs_resync = True
+        self.wakeup.set()
+
+    def mark_sent(self, unit: Dict[str, Any], now: float = None) -> None:
+        """Record a unit delivered outside the feed, e.g. in the initial state"""
+        self.visible.add(unit["unit_id"])
+        self.last_sent[unit["unit_id"]] = time.monotonic() if now is None else now
+
+    def due(self, now: float) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        """Events whose unit interval has passed, and the time the next one is due"""
+        ready, next_due = [], None
+        for unit_id in list(self.pending):
+            available_at = self.last_sent.get(unit_id, float("-inf")) + self.min_interval
+            if available_at <= now:
+                ready.append(self.pending.pop(unit_id))
+                self.last_sent[unit_id] = now
+            elif next_due is None or available_at < next_due:
+                next_due = available_at
+        self.delivered += len(ready)
+        return ready, next_due
+
+    async def events(self, heartbeat: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Events as they become due, RESYNC after missed changes, None after `heartbeat` seconds without any"""
+        while True:
+            self.wakeup.clear()
+            if self.needs_resync:
+                self.needs_resync = False
+                yield RESYNC
+                continue
+            ready, next_due = self.due(time.monotonic())
+            for event in ready:
+                yield event
+            if ready:
+                continue
+            timeout = heartbeat if next_due is None else min(heartbeat, max(next_due - time.monotonic(), 0.0))
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                if timeout >= heartbeat:
+                    yield None
+
+
+class UnitChangeFeed:
+    """Per-worker subscription to units:changes, fanned out to stream subscribers"""
+
+    def __init__(self, redis_url: str = None, max_units: int = None):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.max_units = max_units or settings.UNIT_STREAM_MAX_TRACKED_UNITS
+        self.client: Optional[redis.Redis] = None
+        self.subscribers: Set[UnitSubscriber] = set()
+        # Last known state and its monotonic change time per unit, least recently changed first
+        self.units: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+        # Set while Redis has confirmed the channel subscription
+        self.ready = asyncio.Event()
+        self.received = 0
+        self.resyncs = 0
+
+    async def subscribe(self, types: Optional[Iterable[str]] = None, bbox: Optional[Tuple[float, float, float, float]] = None, min_interval: float = 0.0, timeout: float = SUBSCRIBE_TIMEOUT_SECONDS) -> UnitSubscriber:
+        """
+        Add a subscriber once the channel subscription is confirmed, starting
+        the relay on first use. Raises asyncio.TimeoutError if Redis does not
+        confirm within `timeout` seconds.
+        """
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._relay())
+        while not self.ready.is_set():
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        subscriber = UnitSubscriber(types, bbox, min_interval)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: UnitSubscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def _resync(self) -> None:
+        """After changes were missed: forget known states and have every subscriber reload"""
+        self.resyncs += 1
+        self.units.clear()
+        for subscriber in list(self.subscribers):
+            subscriber.resync()
+
+    async def _relay(self) -> None:
+        attempt = 0
+        subscribed_before = False
+        while True:
+            pubsub = None
+            try:
+                if self.client is None:
+                    self.client = redis.from_url(self.redis_url, decode_responses=True)
+                pubsub = self.client.pubsub()
+                await pubsub.subscribe(unit_store.UNIT_CHANGES_CHANNEL)
+                async for item in pubsub.listen():
+                    if item["type"] == "message":
+                        await self.apply(json.loads(item["data"]))
+                    elif item["type"] == "subscribe":
+                        logger.info("✅ Unit change feed subscribed")
+                        attempt = 0
+                        if subscribed_before:
+                            logger.warning("⚠️ Unit change feed resubscribed, asking subscribers to resync")
+                            self._resync()
+                        subscribed_before = True
+                        self.ready.set()
+            except asyncio.CancelledError:
+                self.ready.clear()
+                raise
+            except Exception as e:
+                self.ready.clear()
+                delay = RECONNECT_BACKOFF_SECONDS[min(attempt, len(RECONNECT_BACKOFF_SECONDS) - 1)]
+                attempt += 1
+                logger.error(f"❌ Unit change feed subscription lost, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def _known(self, unit_id: str, now: float) -> Optional[Dict[str, Any]]:
+        """Known state of a unit, after forgetting units unchanged for longer than their TTL"""
+        while self.units:
+            oldest_id, (changed_at, _) = next(iter(self.units.items()))
+            if now - changed_at < unit_store.UNIT_TTL_SECONDS:
+                break
+            del self.units[oldest_id]
+        entry = self.units.get(unit_id)
+        return entry[1] if entry else None
+
+    async def apply(self, change: Dict[str, Any]) -> None:
+        """Merge a change into the unit's known state and offer it to every subscriber"""
+        self.received += 1
+        unit_id = change["unit_id"]
+        now = time.monotonic()
+        known = self._known(unit_id, now)
+        if change.get("deleted"):
+            self.units.pop(unit_id, None)
+            state = {**(known or {"unit_id": unit_id}), "deleted": True}
+        else:
+            if known is None and "type" not in change:
+                try:
+                    known = unit_state(await unit_store.get_unit(self.client, unit_id) or {})
+                except Exception as e:
+                    logger.error(f"❌ Failed to load unit {unit_id} for the change feed: {e}")
+            state = {**(known or {}), **change}
+            self.units[unit_id] = (now, state)
+            self.units.move_to_end(unit_id)
+            while len(self.units) > self.max_units:
+                self.units.popitem(last=False)
+        for subscriber in list(self.subscribers):
+            subscriber.offer(state)
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self.ready.clear()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "changes_received": self.received,
+            "units_tracked": len(self.units),
+            "resyncs": self.resyncs,
+            "delivered": sum(subscriber.delivered for subscriber in self.subscribers),
+            "coalesced": sum(subscriber.coalesced for subscriber in self.subscribers)
+        }
+
+
+# Shared feed for the units API
+unit_change_feed = UnitChangeFeed()
@@ -0,0 +1,120 @@
+"""
+Unit Location History Service
+
+Keeps a capped per-unit location trail in Redis Streams so past positions can
+be replayed. Each status update appends one entry (XADD with approximate
+MAXLEN trimming, O(1) amortized) in the same pipeline as the state write, and
+stream entry IDs are millisecond timestamps so time-range queries map directly
+onto XRANGE. Every sample also renews the stream's expiry, so the trail of
+a unit that stops reporting is dropped after UNIT_HISTORY_RETENTION_SECONDS.
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+UNIT_HISTORY_KEY_PREFIX = "history:unit:"
+UNIT_HISTORY_MAXLEN = 17280  # 24 hours of 5-second updates
+UNIT_HISTORY_RETENTION_SECONDS = 86400  # 24 hours after the last sample
+
+
+def history_key(unit_id: str) -> str:
+    """Redis Stream key holding a unit's location history"""
+    return f"{UNIT_HISTORY_KEY_PREFIX}{unit_id}"
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat a naive datetime as UTC; aware datetimes are returned unchanged"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_ms(value: datetime) -> int:
+    """Convert a datetime to epoch milliseconds (naive datetimes are UTC)"""
+    return int(as_utc(value).timestamp() * 1000)
+
+
+def queue_location_sample(pipe, unit_id: str, lat: float, lon: float, status: str) -> None:
+    """
+    Queue a location sample on a pipeline.
+
+    The server assigns the entry ID, so samples are always ordered by arrival
+    time and the stream is trimmed to roughly UNIT_HISTORY_MAXLEN entries.
+    """
+    key = history_key(unit_id)
+    pipe.xadd(
+        key,
+        {"lat": lat, "lon": lon, "status": status},
+        maxlen=UNIT_HISTORY_MAXLEN,
+        approximate=True
+    )
+    pipe.expire(key, UNIT_HISTORY_RETENTION_SECONDS)
+
+
+def downsample(points: List[Dict[str, Any]], start_ms: int, end_ms: int, max_points: int) -> List[Dict[str, Any]]:
+    """
+    Reduce a trail to at most `max_points` by time bucketing.
+
+    The range is split into equal time buckets and the latest sample of each
+    bucket is kept, so gaps in reporting stay visible and the final position
+    is always preserved.
+    """
+    if len(points) <= max_points:
+        return points
+
+    bucket_ms = max(1, (end_ms - start_ms + 1) / max_points)
+    buckets: Dict[int, Dict[str, Any]] = {}
+    for point in points:
+        bucket = min(int((point["ms"] - start_ms) / bucket_ms), max_points - 1)
+        buckets[bucket] = point
+    return [buckets[bucket] for bucket in sorted(buckets)]
+
+
+async def get_unit_trail(
+    redis_client: redis.Redis,
+    unit_id: str,
+    start: datetime,
+    end: datetime,
+    max_points: Optional[int] = None
+) -> Dict[str, Any]:
+    """Read a unit's trail for a time range, optionally downsampled"""
+    start_ms, end_ms = to_ms(start), to_ms(end)
+    entries = await redis_client.xrange(history_key(unit_id), min=start_ms, max=end_ms)
+
+    points = []
+    for entry_id, fields in entries:
+        try:
+            ms = int(entry_id.split("-", 1)[0])
+            points.append({
+                "ms": ms,
+                "lat": float(fields["lat"]),
+                "lon": float(fields["lon"]),
+                "status": fields.get("status")
+            })
+        except (KeyError, ValueError):
+            logger.warning(f"Skipping malformed history entry {entry_id} for unit {unit_id}")
+
+    total_samples = len(points)
+    if max_points:
+        points = downsample(points, start_ms, end_ms, max_points)
+
+    return {
+        "unit_id": unit_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total_samples": total_samples,
+        "points": [
+            {
+                "timestamp": datetime.fromtimestamp(point["ms"] / 1000, tz=timezone.utc).isoformat(),
+                "lat": point["lat"],
+                "lon": point["lon"],
+                "status": point["status"]
+            }
+            for point in points
+        ]
+    }
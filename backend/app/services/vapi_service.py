@@ -4,10 +4,10 @@ Vapi Service for Emergency Dispatch System
 This service handles initiating calls through the Vapi API
 """
 
-import httpx
 import logging
 from typing import Optional, Dict, Any
 from app.core.config import settings
+from app.core.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -50,22 +50,21 @@ class VapiService:
             logger.info(f"Vapi call config: {call_config}")
             logger.info(f"Phone number being sent: '{phone_number}' (length: {len(phone_number)})")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/call",
-                    headers=headers,
-                    json=call_config,
-                    timeout=30.0
-                )
-                
-                if response.status_code in [200, 201]:
-                    call_data = response.json()
-                    logger.info(f"Successfully initiated Vapi call: {call_data}")
-                    return call_data
-                else:
-                    logger.error(f"Failed to initiate Vapi call: {response.status_code} - {response.text}")
-                    raise Exception(f"Vapi API error: {response.status_code} - {response.text}")
-                    
+            response = await http_clients.post(
+                f"{self.base_url}/call",
+                headers=headers,
+                json=call_config,
+                timeout=30.0
+            )
+
+            if response.status_code in [200, 201]:
+                call_data = response.json()
+                logger.info(f"Successfully initiated Vapi call: {call_data}")
+                return call_data
+            else:
+                logger.error(f"Failed to initiate Vapi call: {response.status_code} - {response.text}")
+                raise Exception(f"Vapi API error: {response.status_code} - {response.text}")
+
         except Exception as e:
             logger.error(f"Error initiating Vapi call: {e}")
             raise
@@ -78,19 +77,18 @@ class VapiService:
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/call/{call_id}",
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Failed to get call status: {response.status_code} - {response.text}")
-                    raise Exception(f"Vapi API error: {response.status_code} - {response.text}")
-                    
+            response = await http_clients.get(
+                f"{self.base_url}/call/{call_id}",
+                headers=headers,
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Failed to get call status: {response.status_code} - {response.text}")
+                raise Exception(f"Vapi API error: {response.status_code} - {response.text}")
+
         except Exception as e:
             logger.error(f"Error getting call status: {e}")
             raise
@@ -103,19 +101,18 @@ class VapiService:
                 "Content-Type": "application/json"
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/call/{call_id}/end",
-                    headers=headers,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Failed to end call: {response.status_code} - {response.text}")
-                    raise Exception(f"Vapi API error: {response.status_code} - {response.text}")
-                    
+            response = await http_clients.post(
+                f"{self.base_url}/call/{call_id}/end",
+                headers=headers,
+                timeout=30.0
+            )
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.error(f"Failed to end call: {response.status_code} - {response.text}")
+                raise Exception(f"Vapi API error: {response.status_code} - {response.text}")
+
         except Exception as e:
             logger.error(f"Error ending call: {e}")
             raise
@@ -0,0 +1,140 @@
+"""
+Benchmark for the Dashboard Bootstrap Snapshot
+
+Loads --units units and --calls calls with events into Redis. Then
+--dashboards dashboards load at the same moment, in two ways:
+- separate: each dashboard fetches the unit list page by page, the unit
+  counts, the hospitals and every recent call on its own
+- snapshot: each dashboard reads the shared, cached bootstrap snapshot
+
+Reports wall time for all loads, snapshot builds and bytes per dashboard
+(plain JSON and gzip). Keys are written under a scratch database; use a
+Redis you can flush.
+
+Usage:
+    python benchmarks/bench_bootstrap.py --redis-url redis://localhost:6379/15
+    python benchmarks/bench_bootstrap.py --units 5000 --dashboards 100
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from unittest.mock import AsyncMock, patch
+
+import redis.asyncio as redis
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.hospital_router import get_all_hospitals
+from app.core.websocket_hub import dumps
+from app.database import unit_store
+from app.database.call_event_log import CallEventLog
+from app.services import dashboard_snapshot
+from app.services.dashboard_snapshot import DashboardSnapshotCache
+
+
+async def seed(client: redis.Redis, event_log: CallEventLog, units: int, calls: int, seed_value: int = 5) -> None:
+    rng = random.Random(seed_value)
+    await client.flushdb()
+    for start in range(0, units, 1000):
+        pipe = client.pipeline(transaction=False)
+        for index in range(start, min(start + 1000, units)):
+            mapping = unit_store.encode_unit({
+                "unit_id": f"UNIT_{index:05d}",
+                "type": rng.choice(("POLICE", "FIRE", "EMS")),
+                "status": rng.choice(("available", "dispatched", "enroute")),
+                "lat": rng.gauss(42.28, 0.05),
+                "lon": rng.gauss(-83.74, 0.07),
+                "crew": rng.randint(2, 5)
+            })
+            pipe.hset(unit_store.unit_key(mapping["unit_id"]), mapping=mapping)
+            pipe.sadd(unit_store.UNITS_ALL_KEY, mapping["unit_id"])
+            pipe.sadd(unit_store.type_key(mapping["type"]), mapping["unit_id"])
+            pipe.sadd(unit_store.status_key(mapping["status"]), mapping["unit_id"])
+        await pipe.execute()
+
+    for call in range(calls):
+        call_id = f"call_{call:03d}"
+        for line in range(20):
+            await event_log.append(client, call_id, {
+                "type": "transcript_update",
+                "call_id": call_id,
+                "data": {"role": "user", "text": f"caller line {line} describing the emergency"}
+            })
+
+
+async def separate_load(client: redis.Redis, event_log: CallEventLog) -> int:
+    """One dashboard fetching each source itself; returns the bytes it received"""
+    size, cursor = 0, 0
+    while True:
+        page = await unit_store.list_units(client, cursor=cursor, limit=1000)
+        size += len(dumps(page))
+        if not page["next_cursor"]:
+            break
+        cursor = int(page["next_cursor"])
+    size += len(dumps(await unit_store.get_unit_counts(client)))
+    size += len(dumps(await get_all_hospitals()))
+    for call_id in await event_log.recent_calls(client):
+        size += len(dumps(await event_log.snapshot(client, call_id)))
+    return size
+
+
+async def run(redis_url: str, units: int, calls: int, dashboards: int) -> dict:
+    client = redis.from_url(redis_url, decode_responses=True)
+    event_log = CallEventLog(buffer_size=100)
+    try:
+        await seed(client, event_log, units, calls)
+
+        start_time = time.perf_counter()
+        sizes = await asyncio.gather(*[separate_load(client, event_log) for _ in range(dashboards)])
+        separate_s = time.perf_counter() - start_time
+
+        cache = DashboardSnapshotCache(ttl_seconds=60)
+        with patch.object(dashboard_snapshot, "call_event_log", event_log), \
+             patch.object(dashboard_snapshot.incident_registry, "get_active_incidents", AsyncMock(return_value=[])):
+            start_time = time.perf_counter()
+            snapshots = await asyncio.gather(*[cache.get(client) for _ in range(dashboards)])
+            snapshot_s = time.perf_counter() - start_time
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+    snapshot = snapshots[0]
+    return {
+        "units": units,
+        "calls": calls,
+        "dashboards": dashboards,
+        "separate": {
+            "wall_ms": round(separate_s * 1000, 1),
+            "bytes_per_dashboard": sizes[0]
+        },
+        "snapshot": {
+            "wall_ms": round(snapshot_s * 1000, 1),
+            "builds": cache.builds,
+            "bytes_per_dashboard": len(snapshot.body),
+            "gzip_bytes_per_dashboard": len(snapshot.gzipped),
+            "calls_with_seq": len(json.loads(gzip.decompress(snapshot.gzipped))["seq"])
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare separate dashboard loads with the bootstrap snapshot")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15", help="Scratch Redis database (flushed)")
+    parser.add_argument("--units", type=int, default=2000, help="Units to load")
+    parser.add_argument("--calls", type=int, default=20, help="Recent calls with events")
+    parser.add_argument("--dashboards", type=int, default=50, help="Dashboards loading at once")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.redis_url, args.units, args.calls, args.dashboards)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Benchmark for Comms Agent Incident Log Writes
+
+Starts the local PostgREST stand-in (postgrest_standin.py) and writes --logs
+incident log messages through CommsAgent.log_to_supabase in two ways:
+- per-row: the write-behind writer is not running, so every log is its own
+  POST and the caller waits for it (the previous listener behaviour)
+- batched: the writer runs, logs are queued and inserted as arrays of up to
+  --batch-size rows
+
+Reports wall time, caller time per log, HTTP requests and the writer's batch
+size and flush latency.
+
+Usage:
+    python benchmarks/bench_comms_logs.py
+    python benchmarks/bench_comms_logs.py --logs 5000 --latency-ms 30 --batch-size 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.comms_agent import CommsAgent
+from app.core.http_client import http_clients
+from benchmarks.postgrest_standin import start_standin
+
+# One info line per insert would dominate the per-row timing
+logging.getLogger("agents.comms_agent").setLevel(logging.WARNING)
+
+
+def log_message(index: int) -> dict:
+    return {
+        "action": "unit_dispatched",
+        "case_id": f"case_{index:05d}",
+        "unit_id": f"UNIT_{index % 40:03d}",
+        "unit_type": "EMS",
+        "distance_km": 1.5,
+        "incident_location": "123 Main Street, Ann Arbor, MI",
+        "unit_location": [42.2808, -83.7430],
+        "incident_data": {"incident_fact": {"emergency_type": "Medical", "severity": "High"}}
+    }
+
+
+async def write_logs(agent: CommsAgent, logs: int, first: int = 0) -> dict:
+    start_time = time.perf_counter()
+    for index in range(first, first + logs):
+        await agent.log_to_supabase(log_message(index))
+    caller_s = time.perf_counter() - start_time
+    await agent.log_writer.stop()
+    return {"caller_s": caller_s, "wall_s": time.perf_counter() - start_time}
+
+
+async def run(logs: int, latency_ms: float, batch_size: int, flush_ms: int) -> dict:
+    server, url = start_standin(latency_ms=latency_ms)
+    results = {"logs": logs, "latency_ms": latency_ms}
+    try:
+        per_row = CommsAgent(supabase_url=url, supabase_key="bench")
+        timing = await write_logs(per_row, logs)
+        results["per_row"] = {
+            "wall_ms": round(timing["wall_s"] * 1000, 1),
+            "caller_ms_per_log": round(timing["caller_s"] * 1000 / logs, 3),
+            "requests": server.stats()["incident_logs"]["requests"]
+        }
+
+        batched = CommsAgent(supabase_url=url, supabase_key="bench")
+        batched.log_writer.max_batch = batch_size
+        batched.log_writer.max_delay = flush_ms / 1000
+        batched.log_writer.start()
+        # New case ids, so the idempotency keys do not match the per-row run
+        timing = await write_logs(batched, logs, first=logs)
+        stats = batched.log_writer.stats()
+        results["batched"] = {
+            "wall_ms": round(timing["wall_s"] * 1000, 1),
+            "caller_ms_per_log": round(timing["caller_s"] * 1000 / logs, 3),
+            "requests": server.stats()["incident_logs"]["requests"] - results["per_row"]["requests"],
+            "batch_size_avg": stats["batch_size_avg"],
+            "flush_p50_ms": stats["flush_p50_ms"],
+            "flush_p99_ms": stats["flush_p99_ms"],
+            "latency_p99_ms": stats["latency_p99_ms"],
+            "backpressure_waits": stats["backpressure_waits"]
+        }
+        results["rows_stored"] = server.stats()["incident_logs"]["rows"]
+    finally:
+        await http_clients.aclose()
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and batched Comms Agent log writes")
+    parser.add_argument("--logs", type=int, default=1000, help="Log messages to write")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stand-in latency per request")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows per bulk insert")
+    parser.add_argument("--flush-ms", type=int, default=250, help="Longest wait before a partial batch is flushed")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.logs, args.latency_ms, args.batch_size, args.flush_ms)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
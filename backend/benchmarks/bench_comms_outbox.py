@@ -0,0 +1,146 @@
+"""
+Benchmark for the Comms Agent Outbox
+
+Runs --logs dispatch logs through CommsAgent.process_log with a slow Vapi
+(--vapi-ms per notification), while the local PostgREST stand-in is down
+for the first half of the run:
+- inline: no outbox; process_log waits for every notification, and log
+  writes that fail during the outage are lost
+- outbox: notifications and failed log batches go to the SQLite outbox and
+  are replayed once the stand-in is back; every log is also delivered a
+  second time, as a redelivered message would be
+
+Reports time per process_log call, rows stored and notifications sent, the
+time to drain the outbox after the outage, and duplicates.
+
+Usage:
+    python benchmarks/bench_comms_outbox.py
+    python benchmarks/bench_comms_outbox.py --logs 500 --vapi-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import comms_agent as comms_module
+from agents.comms_agent import CommsAgent
+from app.core.http_client import http_clients
+from benchmarks.postgrest_standin import start_standin
+
+# Per-message lines and the simulated outage's errors would dominate the output
+logging.getLogger("agents.comms_agent").setLevel(logging.CRITICAL)
+logging.getLogger("app.database.outbox").setLevel(logging.CRITICAL)
+
+
+class SlowVapi:
+    """Counts notifications per case and answers after a fixed delay"""
+
+    def __init__(self, delay_ms: float):
+        self.delay = delay_ms / 1000
+        self.sent = {}
+
+    async def send_dispatch_notification(self, phone_number, unit_info, incident_info):
+        await asyncio.sleep(self.delay)
+        self.sent[incident_info["case_id"]] = self.sent.get(incident_info["case_id"], 0) + 1
+        return {"success": True}
+
+
+def log_message(index: int, run: str) -> dict:
+    case_id = f"{run}_{index:05d}"
+    return {
+        "timestamp": f"2025-01-01T12:00:{index % 60:02d}",
+        "action": "unit_dispatched",
+        "case_id": case_id,
+        "unit_id": f"UNIT_{index % 40:03d}",
+        "unit_type": "EMS",
+        "distance_km": 1.5,
+        "incident_data": {"incident_fact": {"case_id": case_id, "callback_number": "+15550100", "emergency_type": "Medical"}}
+    }
+
+
+async def drive(agent: CommsAgent, server, logs: int, run: str, redeliver: bool) -> float:
+    """Process every log with the stand-in down for the first half; returns seconds in process_log"""
+    spent = 0.0
+    server.available = False
+    for index in range(logs):
+        if index == logs // 2:
+            # Let the writer flush (and fail) what arrived during the outage
+            await asyncio.sleep(agent.log_writer.max_delay * 2)
+            server.available = True
+        for _ in range(2 if redeliver else 1):
+            start_time = time.perf_counter()
+            await agent.process_log(log_message(index, run))
+            spent += time.perf_counter() - start_time
+    return spent
+
+
+async def run(logs: int, vapi_ms: float, latency_ms: float) -> dict:
+    server, url = start_standin(latency_ms=latency_ms)
+    vapi = SlowVapi(vapi_ms)
+    results = {"logs": logs, "vapi_ms": vapi_ms}
+    try:
+        with patch.object(comms_module, "vapi_service", vapi), tempfile.TemporaryDirectory() as directory:
+            inline = CommsAgent(supabase_url=url, supabase_key="bench")
+            spent = await drive(inline, server, logs, "inline", redeliver=False)
+            results["inline"] = {
+                "process_log_ms": round(spent * 1000 / logs, 2),
+                "rows_stored": server.stats().get("incident_logs", {}).get("rows", 0),
+                "notifications_sent": sum(vapi.sent.values())
+            }
+
+            stored_before = results["inline"]["rows_stored"]
+            vapi.sent.clear()
+            agent = CommsAgent(supabase_url=url, supabase_key="bench", outbox_path=os.path.join(directory, "outbox.db"))
+            agent.outbox.base_delay = 0.2
+            agent.outbox.start()
+            agent.log_writer.start()
+            spent = await drive(agent, server, logs, "outbox", redeliver=True)
+
+            start_time = time.perf_counter()
+            await agent.log_writer.stop()
+            while agent.outbox.stats()["pending"] or len(vapi.sent) < logs:
+                await asyncio.sleep(0.05)
+                await agent.outbox.replay_once()
+            drain_s = time.perf_counter() - start_time
+            stats = agent.outbox.stats()
+            await agent.outbox.stop()
+
+            results["outbox"] = {
+                "process_log_ms": round(spent * 1000 / (2 * logs), 3),
+                "rows_stored": server.stats()["incident_logs"]["rows"] - stored_before,
+                "notifications_sent": sum(vapi.sent.values()),
+                "duplicate_notifications": sum(count - 1 for count in vapi.sent.values()),
+                "drain_ms": round(drain_s * 1000, 1),
+                "log_rows_deferred": agent.log_writer.stats()["deferred"],
+                "recorded": stats["recorded"],
+                "duplicates_ignored": stats["duplicates_ignored"],
+                "retries": stats["retries"]
+            }
+    finally:
+        await http_clients.aclose()
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline notifications and dropped logs with the Comms Agent outbox")
+    parser.add_argument("--logs", type=int, default=200, help="Dispatch logs to process")
+    parser.add_argument("--vapi-ms", type=float, default=200.0, help="Simulated Vapi latency per notification")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stand-in latency per request")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.logs, args.vapi_ms, args.latency_ms)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Benchmark for Conversation Compaction
+
+Simulates long intake calls by cycling the recorded caller turns with
+dispatcher questions in between, and reports the stored context size, the
+full re-extraction prompt size and the finalized transcript size at several
+call lengths, with and without compaction.
+
+Usage:
+    python benchmarks/bench_compaction.py
+    python benchmarks/bench_compaction.py --budget-tokens 1000 --keep-turns 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.call_context_store import encode_context, new_call_context
+from app.services.conversation_compaction import compact_conversation, conversation_transcript, estimate_tokens
+from app.services.incident_extraction_service import build_turn_prompt
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intake_transcripts.json"
+CHECKPOINTS = (10, 50, 200, 1000)
+
+
+def measure(call_context) -> dict:
+    """Sizes a turn pays for: stored context, full prompt and transcript"""
+    prompt = build_turn_prompt(
+        call_context["conversation_history"],
+        call_context["incident_fact"],
+        full=True,
+        summary=call_context.get("summary")
+    )
+    return {
+        "context_bytes": len(encode_context(call_context)),
+        "full_prompt_tokens": estimate_tokens(prompt),
+        "transcript_tokens": estimate_tokens(conversation_transcript(call_context))
+    }
+
+
+def run(corpus_path: Path, budget_tokens: int, keep_turns: int) -> dict:
+    """Grow one call to the largest checkpoint in both modes"""
+    caller_turns = [
+        turn["content"]
+        for call in json.loads(corpus_path.read_text())["calls"]
+        for turn in call["turns"]
+        if turn["role"] == "user"
+    ]
+
+    results = {}
+    for mode, compact in (("uncompacted", False), ("compacted", True)):
+        call_context = new_call_context()
+        compaction_ms = 0.0
+        results[mode] = {}
+        for index in range(max(CHECKPOINTS)):
+            call_context["conversation_history"].append({"role": "assistant", "content": "Can you tell me more?"})
+            call_context["conversation_history"].append({
+                "role": "user",
+                "content": caller_turns[index % len(caller_turns)]
+            })
+            call_context["extracted_turns"] = len(call_context["conversation_history"])
+
+            if compact:
+                start_time = time.perf_counter()
+                compact_conversation(call_context, budget_tokens, keep_turns)
+                compaction_ms += (time.perf_counter() - start_time) * 1000
+
+            if index + 1 in CHECKPOINTS:
+                results[mode][f"turn_{index + 1}"] = measure(call_context)
+
+        if compact:
+            results[mode]["mean_compaction_us"] = round(compaction_ms * 1000 / max(CHECKPOINTS), 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure call state size with and without compaction")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Transcript corpus JSON")
+    parser.add_argument("--budget-tokens", type=int, default=1500, help="Conversation token budget")
+    parser.add_argument("--keep-turns", type=int, default=6, help="Turns kept verbatim")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.corpus, args.budget_tokens, args.keep_turns), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Benchmark for the Offline Geocoder
+
+Geocodes the expected locations from the transcript corpus plus common
+spoken variants (intersections, landmarks, misspellings) with the bundled
+gazetteer, and reports the fraction resolved by precision, uncached and
+cached lookup time, and how far each location is from the default point
+incidents were previously routed from.
+
+Usage:
+    python benchmarks/bench_geocoder.py
+    python benchmarks/bench_geocoder.py --iterations 100000
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.geocoder import get_geocoder
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intake_transcripts.json"
+
+# Router Agent fallback for locations that are not "lat,lon" text
+DEFAULT_POINT = (42.2808, -83.7430)
+
+SPOKEN_VARIANTS = [
+    "corner of State and Liberty",
+    "Main & Huron",
+    "the Big House",
+    "University Hospital",
+    "Briarwood",
+    "1200 Packard St",
+    "300 North Main",
+    "Stadum Boulevard",
+    "the downtown library",
+    "2000 Washtenaw Ave apt 12"
+]
+
+
+def haversine_km(a, b) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, [a[0], a[1], b[0], b[1]])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(h))
+
+
+def run(corpus_path: Path, iterations: int) -> dict:
+    calls = json.loads(corpus_path.read_text())["calls"]
+    texts = [call["expected"]["location"] for call in calls] + SPOKEN_VARIANTS
+    geocoder = get_geocoder()
+
+    results = {text: geocoder._geocode(text) for text in texts}
+    resolved = [result for result in results.values() if result]
+
+    start_time = time.perf_counter()
+    for index in range(iterations):
+        geocoder._geocode(texts[index % len(texts)])
+    uncached_us = (time.perf_counter() - start_time) * 1e6 / iterations
+
+    geocoder.geocode.cache_clear()
+    start_time = time.perf_counter()
+    for index in range(iterations):
+        geocoder.geocode(texts[index % len(texts)])
+    cached_us = (time.perf_counter() - start_time) * 1e6 / iterations
+
+    offsets = [haversine_km((result.lat, result.lon), DEFAULT_POINT) for result in resolved]
+    return {
+        "locations": len(texts),
+        "resolved_fraction": round(len(resolved) / len(texts), 3),
+        "by_precision": dict(Counter(result.precision for result in resolved)),
+        "unresolved": [text for text, result in results.items() if not result],
+        "uncached_us": round(uncached_us, 2),
+        "cached_us": round(cached_us, 2),
+        "mean_default_point_error_km": round(sum(offsets) / len(offsets), 2) if offsets else 0.0,
+        "max_default_point_error_km": round(max(offsets), 2) if offsets else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure offline geocoder coverage and lookup time")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Transcript corpus JSON")
+    parser.add_argument("--iterations", type=int, default=20000, help="Lookups per timing run")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.corpus, args.iterations), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark for the Shared HTTP Client Registry
+
+Sends the same sequence of POSTs to a local keep-alive HTTP server, first
+with a new httpx.AsyncClient per request (the previous pattern) and then
+through the shared registry, and reports TCP connections opened and p50/p99
+request latency for each. Pass --url to target a real endpoint instead, e.g.
+the dispatch API's unit status route.
+
+Usage:
+    python benchmarks/bench_http_pool.py
+    python benchmarks/bench_http_pool.py --requests 500 --url http://localhost:8000/api/units/status
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.core.http_client import HTTPClientRegistry
+
+PAYLOAD = {"unit_id": "police_01", "status": "Available", "location": {"lat": 42.2808, "lon": -83.7430}}
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a small JSON body over HTTP/1.1 keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle delays on keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b'{"status":"success"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server() -> str:
+    """Run the local server on a free port in a background thread"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/api/units/status"
+
+
+def summarize(latencies_ms, connections: int) -> dict:
+    ordered = sorted(latencies_ms)
+    return {
+        "connections_opened": connections,
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p99_ms": round(ordered[int(0.99 * (len(ordered) - 1))], 3)
+    }
+
+
+async def per_request_clients(url: str, requests: int) -> dict:
+    """One AsyncClient per request, as update_status and log_to_supabase did"""
+    opened = 0
+
+    async def trace(event_name, info):
+        nonlocal opened
+        if event_name == "connection.connect_tcp.complete":
+            opened += 1
+
+    latencies = []
+    for _ in range(requests):
+        start_time = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            await client.post(url, json=PAYLOAD, extensions={"trace": trace})
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return summarize(latencies, opened)
+
+
+async def shared_registry(url: str, requests: int) -> dict:
+    """All requests through the shared registry"""
+    registry = HTTPClientRegistry()
+    latencies = []
+    for _ in range(requests):
+        start_time = time.perf_counter()
+        await registry.post(url, json=PAYLOAD)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    await registry.aclose()
+    return summarize(latencies, registry.stats()["connections_opened"])
+
+
+async def run(url: str, requests: int) -> dict:
+    return {
+        "requests": requests,
+        "per_request_client": await per_request_clients(url, requests),
+        "shared_registry": await shared_registry(url, requests)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request clients with the shared HTTP registry")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per mode")
+    parser.add_argument("--url", help="Target URL (defaults to a local keep-alive server)")
+    args = parser.parse_args()
+
+    url = args.url or start_server()
+    print(json.dumps(asyncio.run(run(url, args.requests)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark for Server-side Map Aggregation
+
+Loads --units units and --incidents incidents scattered around Ann Arbor into
+Redis, then compares what a dashboard map has to fetch:
+- list: every unit, page by page, through unit_store.list_units (what the
+  map renders today)
+- aggregate: MapAggregator views for a city-wide and a neighborhood
+  bounding box
+
+Reports payload bytes and time per view. Points are indexed with ZADD using
+the score GEOADD stores (geo_score), so the benchmark also runs against
+servers whose GEO commands differ from Redis internally. Keys are written
+under a scratch database; use a Redis you can flush.
+
+Usage:
+    python benchmarks/bench_map_aggregation.py --redis-url redis://localhost:6379/15
+    python benchmarks/bench_map_aggregation.py --units 50000 --incidents 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import redis.asyncio as redis
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.websocket_hub import dumps
+from app.database import unit_store
+from app.services.map_aggregation import INCIDENT_DATA_PREFIX, INCIDENT_GEO_KEY, MapAggregator, geo_score
+
+CENTER = (42.2808, -83.7430)
+CITY_VIEW = ((-84.05, 42.10, -83.45, 42.46), 11)
+NEIGHBORHOOD_VIEW = ((-83.752, 42.276, -83.734, 42.286), 16)
+
+
+async def seed(client: redis.Redis, units: int, incidents: int, seed_value: int = 3) -> None:
+    rng = random.Random(seed_value)
+    await client.flushdb()
+    for start in range(0, units, 2000):
+        pipe = client.pipeline(transaction=False)
+        for index in range(start, min(start + 2000, units)):
+            lat, lon = rng.gauss(CENTER[0], 0.06), rng.gauss(CENTER[1], 0.08)
+            unit_id = f"UNIT_{index:06d}"
+            mapping = unit_store.encode_unit({
+                "unit_id": unit_id,
+                "type": rng.choice(("POLICE", "FIRE", "EMS")),
+                "status": rng.choice(("available", "dispatched", "enroute")),
+                "lat": lat,
+                "lon": lon
+            })
+            pipe.hset(unit_store.unit_key(unit_id), mapping=mapping)
+            pipe.sadd(unit_store.UNITS_ALL_KEY, unit_id)
+            pipe.zadd(unit_store.UNIT_GEO_KEY, {unit_id: geo_score(lat, lon)})
+        await pipe.execute()
+
+    pipe = client.pipeline(transaction=False)
+    for index in range(incidents):
+        lat, lon = rng.gauss(CENTER[0], 0.05), rng.gauss(CENTER[1], 0.07)
+        incident_id = f"case_{index:05d}"
+        pipe.set(INCIDENT_DATA_PREFIX + incident_id, json.dumps({"case_id": incident_id, "emergency_type": "Medical"}))
+        pipe.zadd(INCIDENT_GEO_KEY, {incident_id: geo_score(lat, lon)})
+    await pipe.execute()
+
+
+async def list_everything(client: redis.Redis) -> dict:
+    start_time = time.perf_counter()
+    units, cursor, size = 0, 0, 0
+    while True:
+        page = await unit_store.list_units(client, cursor=cursor, limit=1000)
+        units += page["count"]
+        size += len(dumps(page))
+        if not page["next_cursor"]:
+            break
+        cursor = int(page["next_cursor"])
+    return {"units": units, "bytes": size, "ms": round((time.perf_counter() - start_time) * 1000, 1)}
+
+
+async def aggregate(client: redis.Redis, bbox, zoom) -> dict:
+    aggregator = MapAggregator(cache_seconds=0)
+    start_time = time.perf_counter()
+    view = await aggregator.view(client, bbox, zoom)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "zoom": zoom,
+        "bytes": len(dumps(view)),
+        "ms": round(elapsed * 1000, 1),
+        **{
+            layer: {"total": data["total"], "points": len(data["points"]), "clusters": len(data["clusters"]), "heat_bins": len(data["heat"])}
+            for layer, data in view["layers"].items()
+        }
+    }
+
+
+async def run(redis_url: str, units: int, incidents: int) -> dict:
+    client = redis.from_url(redis_url, decode_responses=True)
+    try:
+        await seed(client, units, incidents)
+        return {
+            "units": units,
+            "incidents": incidents,
+            "list_all_units": await list_everything(client),
+            "aggregate_city": await aggregate(client, *CITY_VIEW),
+            "aggregate_neighborhood": await aggregate(client, *NEIGHBORHOOD_VIEW)
+        }
+    finally:
+        await client.flushdb()
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare listing every unit with aggregated map views")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15", help="Scratch Redis database (flushed)")
+    parser.add_argument("--units", type=int, default=30000, help="Units to load")
+    parser.add_argument("--incidents", type=int, default=2000, help="Active incidents to load")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.redis_url, args.units, args.incidents)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark for Question Bank Turn Latency
+
+Replays the recorded transcript corpus turn by turn through the Vapi
+extraction pipeline with a stub model that waits a fixed latency per call,
+then reports the fraction of turns served without a model call and the p50
+and p99 turn latency, next to the one-call-per-turn baseline.
+
+Usage:
+    python benchmarks/bench_question_bank.py
+    python benchmarks/bench_question_bank.py --llm-latency-ms 800
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.incident_schema import IncidentFact
+from app.services.incident_extraction_service import extract_turn, turn_metrics
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intake_transcripts.json"
+
+
+class StubModel:
+    """Stands in for Gemini with a fixed call latency; fills descriptive fields"""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency_ms / 1000)
+        return SimpleNamespace(text=json.dumps({
+            "description": "Caller reported an emergency",
+            "severity": "High",
+            "next_question": "Help is on the way. Can you tell me more?"
+        }))
+
+
+async def run(corpus_path: Path, latency_ms: float):
+    """Replay every call and collect turn metrics"""
+    calls = json.loads(corpus_path.read_text())["calls"]
+    model = StubModel(latency_ms)
+
+    for call in calls:
+        call_context = {
+            "incident_fact": IncidentFact(),
+            "conversation_history": [],
+            "extracted_turns": 0,
+            "last_question": None
+        }
+        for turn in call["turns"]:
+            call_context["conversation_history"].append(turn)
+            await extract_turn(model, call_context)
+
+    return {
+        **turn_metrics.snapshot(),
+        "llm_calls": model.calls,
+        "baseline_calls": sum(len(call["turns"]) for call in calls),
+        "baseline_p50_ms": latency_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark question bank turn latency")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Transcript corpus JSON")
+    parser.add_argument("--llm-latency-ms", type=float, default=600.0, help="Simulated model call latency")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.corpus, args.llm_latency_ms)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark for the Rule-Based Fact Extractor
+
+Measures, on the recorded transcript corpus:
+1. Rule extraction accuracy per dispatch field against the expected facts
+2. Rule extraction time per caller turn
+3. LLM calls made by the Vapi extraction pipeline with the rule fast path,
+   compared with one call per turn. The model is a stub that fills only the
+   descriptive fields (description, severity), so the count reflects the
+   pipeline's decisions rather than model quality.
+
+Usage:
+    python benchmarks/bench_rule_extractor.py
+    python benchmarks/bench_rule_extractor.py --corpus benchmarks/data/intake_transcripts.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.incident_schema import IncidentFact
+from app.services.incident_extraction_service import extract_turn
+from app.services.rule_extractor import extract_rules
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intake_transcripts.json"
+
+
+class StubModel:
+    """Stands in for Gemini: fills descriptive fields and counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(text=json.dumps({
+            "description": "Caller reported an emergency",
+            "severity": "High",
+            "next_question": "Can you tell me more?"
+        }))
+
+
+def normalize(value: Any) -> Any:
+    """Normalize text values for comparison"""
+    if isinstance(value, str):
+        return " ".join(value.lower().replace(",", " ").split())
+    return value
+
+
+def measure_accuracy(calls) -> Dict[str, Any]:
+    """Per-field precision and recall of rules alone over each whole call"""
+    stats: Dict[str, Dict[str, int]] = {}
+    for call in calls:
+        facts: Dict[str, Any] = {}
+        for turn in call["turns"]:
+            facts.update(extract_rules(turn["content"])[0])
+
+        for field, expected in call["expected"].items():
+            field_stats = stats.setdefault(field, {"expected": 0, "correct": 0, "wrong": 0})
+            field_stats["expected"] += 1
+            if field not in facts:
+                continue
+            if normalize(facts[field]) == normalize(expected):
+                field_stats["correct"] += 1
+            else:
+                field_stats["wrong"] += 1
+
+    return {
+        field: {
+            "precision": round(s["correct"] / max(s["correct"] + s["wrong"], 1), 3),
+            "recall": round(s["correct"] / s["expected"], 3)
+        }
+        for field, s in stats.items()
+    }
+
+
+def measure_speed(calls, repeat: int = 200) -> float:
+    """Mean rule extraction time per caller turn in microseconds"""
+    texts = [turn["content"] for call in calls for turn in call["turns"]]
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            extract_rules(text)
+    return round((time.perf_counter() - start_time) / (repeat * len(texts)) * 1e6, 1)
+
+
+async def measure_llm_calls(calls) -> Dict[str, Any]:
+    """Replay each call turn by turn through extract_turn and count model calls"""
+    model = StubModel()
+    turns = 0
+    for call in calls:
+        call_context = {
+            "incident_fact": IncidentFact(),
+            "conversation_history": [],
+            "extracted_turns": 0,
+            "last_question": None
+        }
+        for turn in call["turns"]:
+            call_context["conversation_history"].append(turn)
+            await extract_turn(model, call_context)
+            turns += 1
+
+    return {
+        "turns": turns,
+        "llm_calls": model.calls,
+        "llm_call_reduction": round(1 - model.calls / turns, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rule-based fact extractor")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Transcript corpus JSON")
+    args = parser.parse_args()
+
+    calls = json.loads(args.corpus.read_text())["calls"]
+    results = {
+        "accuracy": measure_accuracy(calls),
+        "us_per_turn": measure_speed(calls),
+        **asyncio.run(measure_llm_calls(calls))
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
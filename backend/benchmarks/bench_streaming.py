@@ -0,0 +1,137 @@
+"""
+Benchmark for Streamed Vapi Replies
+
+Replays the recorded transcript corpus with an off-script caller question
+injected after each opening turn, using a stub model with a fixed time to
+first token and per-token generation time. For the off-script turns it
+reports the time until the caller hears the first words with the streaming
+handler path (stream_turn) against the full-response latency of the
+non-streaming path (extract_turn).
+
+Usage:
+    python benchmarks/bench_streaming.py
+    python benchmarks/bench_streaming.py --first-token-ms 400 --per-token-ms 25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.call_context_store import new_call_context
+from app.services.incident_extraction_service import extract_turn, stream_turn
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intake_transcripts.json"
+
+OFF_SCRIPT_TURNS = [
+    "What should I do while I wait for them?",
+    "How long until someone gets here?",
+    "Should I try to move him or leave him where he is?",
+    "Can you stay on the line with me?"
+]
+
+STUB_REPLY = "Stay where you are and keep the line open. Help is on the way. Is anyone else with you?"
+STUB_EXTRACTION = {
+    "emergency_type": None,
+    "location": None,
+    "severity": "High",
+    "people_involved": None,
+    "caller_safe": True,
+    "description": "Caller is waiting for responders and asked for guidance",
+    "contradiction": False,
+    "next_question": STUB_REPLY
+}
+
+
+class StubModel:
+    """Stands in for Gemini: JSON responses arrive whole, text responses stream word by word"""
+
+    def __init__(self, first_token_ms: float, per_token_ms: float):
+        self.first_token_ms = first_token_ms
+        self.per_token_ms = per_token_ms
+
+    async def _stream(self, words):
+        await asyncio.sleep(self.first_token_ms / 1000)
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(self.per_token_ms / 1000)
+            yield SimpleNamespace(text=f"{word} ")
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream(STUB_REPLY.split())
+
+        text = json.dumps(STUB_EXTRACTION)
+        tokens = len(text) // 4
+        await asyncio.sleep((self.first_token_ms + tokens * self.per_token_ms) / 1000)
+        return SimpleNamespace(text=text)
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return round(ordered[int(fraction * (len(ordered) - 1))], 1)
+
+
+async def replay(calls, model: StubModel, streaming: bool):
+    """Time the off-script turns; returns (first-word latencies, full latencies) in ms"""
+    first_word_ms, full_ms = [], []
+    for index, call in enumerate(calls):
+        call_context = new_call_context()
+        call_context["conversation_history"].append(call["turns"][0])
+        await extract_turn(model, call_context)
+
+        call_context["conversation_history"].append({
+            "role": "user",
+            "content": OFF_SCRIPT_TURNS[index % len(OFF_SCRIPT_TURNS)]
+        })
+        start_time = time.perf_counter()
+        if streaming:
+            first_word = None
+            async for _ in stream_turn(model, call_context):
+                first_word = first_word or time.perf_counter()
+        else:
+            await extract_turn(model, call_context)
+            first_word = time.perf_counter()
+
+        first_word_ms.append((first_word - start_time) * 1000)
+        full_ms.append((time.perf_counter() - start_time) * 1000)
+    return first_word_ms, full_ms
+
+
+async def run(corpus_path: Path, first_token_ms: float, per_token_ms: float):
+    """Replay the off-script turns in both modes"""
+    calls = json.loads(corpus_path.read_text())["calls"]
+    model = StubModel(first_token_ms, per_token_ms)
+
+    results = {"off_script_turns": len(calls)}
+    for mode, streaming in (("full_response", False), ("streaming", True)):
+        first_word_ms, full_ms = await replay(calls, model, streaming)
+        results[mode] = {
+            "p50_first_word_ms": percentile(first_word_ms, 0.50),
+            "p99_first_word_ms": percentile(first_word_ms, 0.99),
+            "p50_complete_ms": percentile(full_ms, 0.50)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time to first word for streamed and full replies")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Transcript corpus JSON")
+    parser.add_argument("--first-token-ms", type=float, default=350, help="Stub model time to first token")
+    parser.add_argument("--per-token-ms", type=float, default=15, help="Stub model generation time per token")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.corpus, args.first_token_ms, args.per_token_ms)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Benchmark for the Unit Change Stream
+
+Loads --units units into Redis, then makes --updates status changes over
+--seconds seconds, concentrated on a few busy units. Each of
+--dashboards dashboards follows the units in two ways:
+- polling: fetch the full unit listing every --poll-ms milliseconds
+- stream: subscribe to the unit change feed with a --min-interval-ms throttle
+
+Reports requests or events and bytes per dashboard for both. Keys are
+written under a scratch database; use a Redis you can flush.
+
+Usage:
+    python benchmarks/bench_unit_stream.py --redis-url redis://localhost:6379/15
+    python benchmarks/bench_unit_stream.py --units 2000 --updates 2000 --dashboards 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import redis.asyncio as redis
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.websocket_hub import dumps
+from app.database import unit_store
+from app.services.unit_change_feed import UnitChangeFeed
+
+
+async def seed(client: redis.Redis, units: int, rng: random.Random) -> None:
+    await client.flushdb()
+    for start in range(0, units, 1000):
+        pipe = client.pipeline(transaction=False)
+        for index in range(start, min(start + 1000, units)):
+            unit_store.queue_unit_write(pipe, {
+                "unit_id": f"UNIT_{index:05d}",
+                "type": rng.choice(("POLICE", "FIRE", "EMS")),
+                "status": "available",
+                "lat": rng.gauss(42.28, 0.05),
+                "lon": rng.gauss(-83.74, 0.07)
+            })
+        await pipe.execute()
+
+
+async def update(client: redis.Redis, units: int, updates: int, seconds: float, rng: random.Random) -> None:
+    busy = max(units // 50, 1)
+    for _ in range(updates):
+        index = rng.randrange(busy) if rng.random() < 0.8 else rng.randrange(units)
+        pipe = client.pipeline(transaction=True)
+        unit_store.queue_status_update(pipe, f"UNIT_{index:05d}", rng.choice(("dispatched", "enroute", "on_scene")))
+        await pipe.execute()
+        await asyncio.sleep(seconds / updates)
+
+
+async def poll(client: redis.Redis, seconds: float, poll_ms: int) -> dict:
+    """One dashboard polling the listing; returns its messages and bytes"""
+    result = {"requests": 0, "bytes": 0}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        cursor = 0
+        while True:
+            page = await unit_store.list_units(client, cursor=cursor, limit=1000)
+            result["requests"] += 1
+            result["bytes"] += len(dumps(page))
+            if not page["next_cursor"]:
+                break
+            cursor = int(page["next_cursor"])
+        await asyncio.sleep(poll_ms / 1000)
+    return result
+
+
+async def stream(feed: UnitChangeFeed, seconds: float, min_interval_ms: int) -> dict:
+    """One dashboard following the change feed; returns its messages and bytes"""
+    result = {"events": 0, "bytes": 0}
+    subscriber = await feed.subscribe(min_interval=min_interval_ms / 1000)
+    events = subscriber.events(heartbeat=1.0)
+    deadline = time.monotonic() + seconds + min_interval_ms / 1000
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(events.__anext__(), max(deadline - time.monotonic(), 0.001))
+            except asyncio.TimeoutError:
+                break
+            if event is not None:
+                result["events"] += 1
+                result["bytes"] += len(json.dumps(event, separators=(",", ":")))
+    finally:
+        await events.aclose()
+        feed.unsubscribe(subscriber)
+    return result
+
+
+async def run(redis_url: str, units: int, updates: int, seconds: float, dashboards: int, poll_ms: int, min_interval_ms: int) -> dict:
+    client = redis.from_url(redis_url, decode_responses=True)
+    feed = UnitChangeFeed(redis_url)
+    try:
+        await seed(client, units, random.Random(7))
+        polled = await asyncio.gather(
+            update(client, units, updates, seconds, random.Random(11)),
+            *[poll(client, seconds, poll_ms) for _ in range(dashboards)]
+        )
+
+        streams = [asyncio.create_task(stream(feed, seconds, min_interval_ms)) for _ in range(dashboards)]
+        # Let the feed subscribe before the updates start
+        await asyncio.sleep(0.2)
+        await update(client, units, updates, seconds, random.Random(11))
+        streamed = await asyncio.gather(*streams)
+        received = feed.received
+    finally:
+        await feed.stop()
+        await client.flushdb()
+        await client.aclose()
+
+    polled = polled[1:]
+    return {
+        "units": units,
+        "updates": updates,
+        "seconds": seconds,
+        "dashboards": dashboards,
+        "polling": {
+            "poll_ms": poll_ms,
+            "requests_per_dashboard": polled[0]["requests"],
+            "bytes_per_dashboard": polled[0]["bytes"]
+        },
+        "stream": {
+            "min_interval_ms": min_interval_ms,
+            "changes_received": received,
+            "events_per_dashboard": streamed[0]["events"],
+            "bytes_per_dashboard": streamed[0]["bytes"]
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare polling the unit listing with the unit change stream")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15", help="Scratch Redis database (flushed)")
+    parser.add_argument("--units", type=int, default=1000, help="Units to load")
+    parser.add_argument("--updates", type=int, default=1000, help="Status updates during the run")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of each run")
+    parser.add_argument("--dashboards", type=int, default=10, help="Dashboards following the units")
+    parser.add_argument("--poll-ms", type=int, default=1000, help="Polling interval")
+    parser.add_argument("--min-interval-ms", type=int, default=1000, help="Stream per-unit minimum interval")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.redis_url, args.units, args.updates, args.seconds, args.dashboards, args.poll_ms, args.min_interval_ms)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
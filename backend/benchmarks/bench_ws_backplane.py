@@ -0,0 +1,130 @@
+"""
+Benchmark for the Redis WebSocket Backplane
+
+Starts several worker processes. Each runs a WebSocket hub with the Redis
+backplane and a few simulated dashboard clients. The main process acts as
+the API worker that receives the webhooks: it publishes timestamped
+transcript updates at a fixed rate. The benchmark reports the fraction
+delivered and the end-to-end delivery latency (publish to client send) on
+every other worker.
+
+Requires a reachable Redis (--redis-url, default settings.REDIS_URL).
+
+Usage:
+    python benchmarks/bench_ws_backplane.py
+    python benchmarks/bench_ws_backplane.py --workers 8 --messages 1000 --rate 500 --window-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.websocket_hub import WebSocketHub, dumps
+
+
+class TimingWebSocket:
+    """Client that records delivery latency for each message it is sent"""
+
+    def __init__(self):
+        self.latencies_ms = []
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, frame: str):
+        now = time.time()
+        data = json.loads(frame)
+        for message in data["messages"] if data.get("type") == "batch" else [data]:
+            self.latencies_ms.append((now - message["sent_at"]) * 1000)
+
+
+async def run_worker(redis_url: str, clients: int, messages: int, window_ms: float, ready, results) -> None:
+    hub = WebSocketHub(batch_window_ms=window_ms)
+    if not await hub.start_backplane(redis_url):
+        results.put([])
+        return
+    sockets = [TimingWebSocket() for _ in range(clients)]
+    for websocket in sockets:
+        await hub.connect(websocket)
+    ready.release()
+
+    deadline = time.monotonic() + 30
+    while any(len(websocket.latencies_ms) < messages for websocket in sockets) and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    results.put([latency for websocket in sockets for latency in websocket.latencies_ms])
+    await hub.stop_backplane()
+
+
+def worker(redis_url: str, clients: int, messages: int, window_ms: float, ready, results) -> None:
+    asyncio.run(run_worker(redis_url, clients, messages, window_ms, ready, results))
+
+
+async def publish(redis_url: str, messages: int, rate: float) -> None:
+    """The worker receiving webhooks: publish transcript updates through the backplane"""
+    hub = WebSocketHub()
+    if not await hub.start_backplane(redis_url):
+        raise SystemExit(f"Redis unreachable at {redis_url}")
+    interval = 1 / rate
+    for index in range(messages):
+        hub.publish(dumps({"type": "transcript_update", "seq": index, "sent_at": time.time()}))
+        await asyncio.sleep(interval)
+    await asyncio.sleep(0.5)
+    await hub.stop_backplane()
+
+
+def percentile(ordered, fraction: float) -> float:
+    return round(ordered[int(fraction * (len(ordered) - 1))], 2) if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cross-worker WebSocket delivery latency over the Redis backplane")
+    parser.add_argument("--redis-url", default=settings.REDIS_URL, help="Redis used as the backplane")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes with dashboard clients")
+    parser.add_argument("--clients", type=int, default=5, help="Dashboard clients per worker")
+    parser.add_argument("--messages", type=int, default=500, help="Updates to publish")
+    parser.add_argument("--rate", type=float, default=200.0, help="Updates per second")
+    parser.add_argument("--window-ms", type=float, default=0.0, help="Per-client batching window on the workers")
+    args = parser.parse_args()
+
+    ready, results = multiprocessing.Semaphore(0), multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(args.redis_url, args.clients, args.messages, args.window_ms, ready, results))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire(timeout=10)
+    time.sleep(0.2)  # let every subscription settle
+
+    asyncio.run(publish(args.redis_url, args.messages, args.rate))
+    latencies = sorted(latency for _ in processes for latency in results.get(timeout=60))
+    for process in processes:
+        process.join()
+
+    expected = args.workers * args.clients * args.messages
+    print(json.dumps({
+        "workers": args.workers,
+        "clients": args.workers * args.clients,
+        "messages": args.messages,
+        "delivered_fraction": round(len(latencies) / expected, 4),
+        "latency_p50_ms": percentile(latencies, 0.5),
+        "latency_p99_ms": percentile(latencies, 0.99),
+        "latency_max_ms": percentile(latencies, 1.0)
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
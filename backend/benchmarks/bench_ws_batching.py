@@ -0,0 +1,167 @@
+"""
+Benchmark for Serialize-once, Batched WebSocket Updates
+
+Replays a busy call: a transcript fragment every --fragment-ms and a full
+incident fact sheet after every --fragments-per-turn fragments. One
+dashboard client and one call client are connected. The same stream is sent
+the previous way, then through the ConnectionManager:
+- previous: json.dumps for the call broadcast and again for the dashboard
+  broadcast, one frame per update, full fact sheets
+- ConnectionManager: one encode, coalesced frames, fact deltas
+
+Reports frames per second and bytes per client, plus encode time per update
+measured in a tight loop over the same stream.
+
+Usage:
+    python benchmarks/bench_ws_batching.py
+    python benchmarks/bench_ws_batching.py --seconds 5 --window-ms 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from uuid import uuid4
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.frontend_router import ConnectionManager, fact_changes
+from app.core.websocket_hub import dumps
+from app.schemas.incident_schema import IncidentFact
+
+
+class CountingWebSocket:
+    """Client that counts frames and bytes received"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        self.frames += 1
+        self.bytes += len(message)
+
+
+def updates(count: int, fragments_per_turn: int):
+    """Transcript fragments with a full fact sheet after each turn"""
+    incident_fact = IncidentFact(emergency_type="Fire", callback_number="+17345550100")
+    fields = [
+        ("location", "412 Maple Avenue, Ann Arbor"), ("caller_name", "Dana Lee"),
+        ("is_caller_safe", True), ("people_involved", 3), ("is_active_threat", True),
+        ("details", "Smoke coming from the second floor, neighbors evacuating")
+    ]
+    for index in range(count):
+        yield "transcript_update", {"role": "user", "transcript": f"fragment {index} of what the caller is saying", "final": False}
+        if index % fragments_per_turn == fragments_per_turn - 1:
+            field, value = fields[(index // fragments_per_turn) % len(fields)]
+            setattr(incident_fact, field, value)
+            yield "fact_update", {"status": "in_progress", "incident_fact": incident_fact.model_dump(mode="json")}
+
+
+def message(kind: str, call_id: str, data: dict) -> dict:
+    return {"type": kind, "call_id": call_id, "timestamp": datetime.now().isoformat(), "data": data}
+
+
+async def previous(stream, fragment_s: float) -> dict:
+    """Serialize per broadcast, one frame per update, call clients reached twice"""
+    call_id = str(uuid4())
+    dashboard, call_client = CountingWebSocket(), CountingWebSocket()
+    start_time = time.perf_counter()
+    for kind, data in stream:
+        payload = message(kind, call_id, data)
+        for_call, for_all = json.dumps(payload), json.dumps(payload)
+        await call_client.send_text(for_call)
+        for websocket in (dashboard, call_client):
+            await websocket.send_text(for_all)
+        if kind == "transcript_update":
+            await asyncio.sleep(fragment_s)
+    return summarize(time.perf_counter() - start_time, dashboard, call_client)
+
+
+async def batched(stream, fragment_s: float, window_ms: float) -> dict:
+    """ConnectionManager: serialize once, coalesce per client, fact deltas"""
+    call_id = str(uuid4())
+    manager = ConnectionManager(batch_window_ms=window_ms)
+    dashboard, call_client = CountingWebSocket(), CountingWebSocket()
+    await manager.connect(dashboard)
+    await manager.connect(call_client, call_id)
+
+    # Stands in for the facts folded into the call's event log
+    facts = {}
+    start_time = time.perf_counter()
+    for kind, data in stream:
+        if kind == "fact_update":
+            data = fact_changes(facts, data)
+            if data is not None:
+                facts.update(data["incident_fact"])
+        if data is not None:
+            manager.broadcast(dumps(message(kind, call_id, data)))
+        if kind == "transcript_update":
+            await asyncio.sleep(fragment_s)
+
+    await asyncio.sleep(window_ms / 1000 * 2)
+    elapsed = time.perf_counter() - start_time
+    for websocket in (dashboard, call_client):
+        manager.disconnect(websocket)
+    return summarize(elapsed, dashboard, call_client)
+
+
+def summarize(elapsed: float, dashboard, call_client) -> dict:
+    return {
+        "dashboard": {"frames_per_second": round(dashboard.frames / elapsed, 1), "bytes": dashboard.bytes},
+        "call_client": {"frames_per_second": round(call_client.frames / elapsed, 1), "bytes": call_client.bytes}
+    }
+
+
+def encode_cost(messages, repeats: int = 20) -> dict:
+    """Microseconds per update: json.dumps per broadcast vs one dumps()"""
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for payload in messages:
+            json.dumps(payload)
+            json.dumps(payload)
+    previous_us = (time.perf_counter() - start_time) * 1e6 / (repeats * len(messages))
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for payload in messages:
+            dumps(payload)
+    once_us = (time.perf_counter() - start_time) * 1e6 / (repeats * len(messages))
+    return {"previous_us_per_update": round(previous_us, 2), "serialize_once_us_per_update": round(once_us, 2)}
+
+
+async def run(seconds: float, fragment_ms: float, fragments_per_turn: int, window_ms: float) -> dict:
+    count = int(seconds * 1000 / fragment_ms)
+    messages = [message(kind, "call", data) for kind, data in updates(count, fragments_per_turn)]
+    return {
+        "fragments": count,
+        "encode": encode_cost(messages),
+        "previous": await previous(updates(count, fragments_per_turn), fragment_ms / 1000),
+        "serialize_once_batched": await batched(updates(count, fragments_per_turn), fragment_ms / 1000, window_ms)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure WebSocket frames and bytes per client during a busy call")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Length of the simulated busy period")
+    parser.add_argument("--fragment-ms", type=float, default=10.0, help="Interval between transcript fragments")
+    parser.add_argument("--fragments-per-turn", type=int, default=20, help="Fragments between fact sheet updates")
+    parser.add_argument("--window-ms", type=float, default=50.0, help="Batching window")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.seconds, args.fragment_ms, args.fragments_per_turn, args.window_ms)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Benchmark for WebSocket Fan-out
+
+Broadcasts a burst of transcript updates to simulated dashboard clients,
+one of which is slow, first with the previous pattern (await send_text on
+each socket in turn) and then through the WebSocket hub. Reports how long
+the broadcasting handler is blocked and the delivery latency seen by the
+healthy clients.
+
+Usage:
+    python benchmarks/bench_ws_fanout.py
+    python benchmarks/bench_ws_fanout.py --clients 100 --slow-ms 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.websocket_hub import WebSocketHub
+
+
+class SimulatedWebSocket:
+    """Client whose send_text takes `send_ms`; records delivery latency per message"""
+
+    def __init__(self, send_ms: float):
+        self.send_ms = send_ms
+        self.latencies_ms = []
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(self.send_ms / 1000)
+        sent_at = json.loads(message)["sent_at"]
+        self.latencies_ms.append((time.perf_counter() - sent_at) * 1000)
+
+
+def message(index: int) -> str:
+    return json.dumps({"type": "transcript", "seq": index, "sent_at": time.perf_counter()})
+
+
+def summarize(blocked_ms, clients) -> dict:
+    latencies = sorted(latency for client in clients for latency in client.latencies_ms)
+    return {
+        "handler_blocked_ms_total": round(sum(blocked_ms), 2),
+        "handler_blocked_ms_max": round(max(blocked_ms), 3),
+        "healthy_delivery_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "healthy_delivery_p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 2)
+    }
+
+
+async def sequential(clients: int, messages: int, fast_ms: float, slow_ms: float) -> dict:
+    """await send_text on each socket in turn, as broadcast_to_all did"""
+    sockets = [SimulatedWebSocket(slow_ms)] + [SimulatedWebSocket(fast_ms) for _ in range(clients)]
+    blocked = []
+    for index in range(messages):
+        start_time = time.perf_counter()
+        payload = message(index)
+        for websocket in sockets:
+            await websocket.send_text(payload)
+        blocked.append((time.perf_counter() - start_time) * 1000)
+    return summarize(blocked, sockets[1:])
+
+
+async def hub(clients: int, messages: int, fast_ms: float, slow_ms: float, queue_size: int) -> dict:
+    """Per-client bounded queues and writer tasks"""
+    websocket_hub = WebSocketHub(max_queue=queue_size, overflow="drop_oldest", send_timeout=30)
+    sockets = [SimulatedWebSocket(slow_ms)] + [SimulatedWebSocket(fast_ms) for _ in range(clients)]
+    for websocket in sockets:
+        await websocket_hub.connect(websocket)
+
+    blocked = []
+    for index in range(messages):
+        start_time = time.perf_counter()
+        websocket_hub.broadcast(message(index))
+        blocked.append((time.perf_counter() - start_time) * 1000)
+        # Updates arrive over time; let writers run between them
+        await asyncio.sleep(fast_ms / 1000)
+
+    while any(len(websocket.latencies_ms) < messages for websocket in sockets[1:]):
+        await asyncio.sleep(0.001)
+    result = summarize(blocked, sockets[1:])
+    result["dropped_for_slow_client"] = websocket_hub.stats()["dropped"]
+    for websocket in sockets:
+        websocket_hub.disconnect(websocket)
+    return result
+
+
+async def run(clients: int, messages: int, fast_ms: float, slow_ms: float, queue_size: int) -> dict:
+    return {
+        "clients": clients + 1,
+        "messages": messages,
+        "sequential_await": await sequential(clients, messages, fast_ms, slow_ms),
+        "websocket_hub": await hub(clients, messages, fast_ms, slow_ms, queue_size)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential WebSocket broadcast with the fan-out hub")
+    parser.add_argument("--clients", type=int, default=20, help="Healthy dashboard clients (plus one slow client)")
+    parser.add_argument("--messages", type=int, default=20, help="Transcript updates to broadcast")
+    parser.add_argument("--fast-ms", type=float, default=1.0, help="Send time for healthy clients")
+    parser.add_argument("--slow-ms", type=float, default=250.0, help="Send time for the slow client")
+    parser.add_argument("--queue-size", type=int, default=8, help="Per-client send queue size")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.clients, args.messages, args.fast_ms, args.slow_ms, args.queue_size)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
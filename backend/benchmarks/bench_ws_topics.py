@@ -0,0 +1,157 @@
+"""
+Benchmark for Topic-routed Dashboard Updates
+
+Simulates a dispatch floor: --calls concurrent calls spread over the county,
+each producing transcript and fact updates, and --clients dashboards. Most
+dashboards follow one call (call takers) or one region (sector
+supervisors); --unfiltered of them still watch everything. The same event
+stream is delivered twice through the ConnectionManager:
+- broadcast: every event to every client, as before topic subscriptions
+- routed: publish_update(), which routes by call, region cell and event type
+
+Reports messages and bytes delivered to clients and the fan-out CPU time per
+event (enqueueing only; sockets are in-memory counters).
+
+Usage:
+    python benchmarks/bench_ws_topics.py
+    python benchmarks/bench_ws_topics.py --calls 40 --clients 500 --events 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.frontend_router import ConnectionManager, subscription_topics
+from app.core.websocket_hub import dumps
+from app.services.geocoder import geocell
+
+# Washtenaw County, roughly
+LAT_RANGE = (42.07, 42.43)
+LON_RANGE = (-84.13, -83.54)
+REGION_PRECISION = 4
+
+
+class CountingWebSocket:
+    """Client that counts messages and bytes received"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, message: str):
+        self.messages += message.count('"call_id"')
+        self.bytes += len(message)
+
+
+def scenario(calls: int, events: int, seed: int = 7):
+    """Call locations and an event stream: the fact sheet first, then transcript and fact updates"""
+    rng = random.Random(seed)
+    locations = {
+        f"call_{index}": (rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE))
+        for index in range(calls)
+    }
+    stream = []
+    for call_id, (lat, lon) in locations.items():
+        stream.append(message("fact_update", call_id, {"incident_fact": {"latitude": lat, "longitude": lon, "emergency_type": "Fire"}}))
+    while len(stream) < events:
+        call_id = rng.choice(list(locations))
+        if rng.random() < 0.85:
+            stream.append(message("transcript_update", call_id, {"role": "user", "transcript": "caller describing the scene in some detail", "final": False}))
+        else:
+            stream.append(message("fact_update", call_id, {"incident_fact": {"details": "Smoke from the second floor"}, "delta": True}))
+    return locations, stream
+
+
+def message(kind: str, call_id: str, data: dict) -> dict:
+    return {"type": kind, "call_id": call_id, "timestamp": datetime.now().isoformat(), "data": data}
+
+
+def subscriptions(locations, clients: int, unfiltered: int, seed: int = 11):
+    """Per client: None (everything), or the topics of one call or one region"""
+    rng = random.Random(seed)
+    regions = sorted({geocell(lat, lon, REGION_PRECISION) for lat, lon in locations.values()})
+    plans = []
+    for index in range(clients):
+        if index < unfiltered:
+            plans.append(None)
+        elif index % 4 == 0:
+            plans.append(subscription_topics(cells=[rng.choice(regions)]))
+        else:
+            plans.append(subscription_topics(calls=[rng.choice(list(locations))]))
+    return plans
+
+
+async def deliver(stream, plans, routed: bool) -> dict:
+    manager = ConnectionManager(max_queue=len(stream) + 1, batch_window_ms=0)
+    websockets = []
+    for topics in plans:
+        websocket = CountingWebSocket()
+        await manager.connect(websocket, topics=topics or [])
+        websockets.append(websocket)
+
+    fanout_s = 0.0
+    for index, payload in enumerate(stream):
+        start_time = time.perf_counter()
+        if routed:
+            manager.publish_update(payload)
+        else:
+            manager.broadcast(dumps(payload))
+        fanout_s += time.perf_counter() - start_time
+        if index % 200 == 0:
+            # Let the writers drain so queues stay short
+            await asyncio.sleep(0)
+
+    await asyncio.sleep(0.05)
+    for websocket in websockets:
+        manager.disconnect(websocket)
+    return {
+        "messages_delivered": sum(websocket.messages for websocket in websockets),
+        "bytes_delivered": sum(websocket.bytes for websocket in websockets),
+        "fanout_us_per_event": round(fanout_s * 1e6 / len(stream), 2)
+    }
+
+
+async def run(calls: int, clients: int, unfiltered: int, events: int) -> dict:
+    locations, stream = scenario(calls, events)
+    plans = subscriptions(locations, clients, unfiltered)
+    broadcast = await deliver(stream, plans, routed=False)
+    routed = await deliver(stream, plans, routed=True)
+    return {
+        "calls": calls,
+        "clients": clients,
+        "unfiltered_clients": unfiltered,
+        "events": len(stream),
+        "broadcast": broadcast,
+        "routed": routed,
+        "delivered_ratio": round(routed["messages_delivered"] / broadcast["messages_delivered"], 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare broadcast and topic-routed dashboard fan-out")
+    parser.add_argument("--calls", type=int, default=20, help="Concurrent calls")
+    parser.add_argument("--clients", type=int, default=200, help="Dashboard clients")
+    parser.add_argument("--unfiltered", type=int, default=5, help="Clients without subscriptions")
+    parser.add_argument("--events", type=int, default=5000, help="Events in the stream")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.calls, args.clients, args.unfiltered, args.events)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Stand-in PostgREST Server for Benchmarks
+
+A small local server that answers the Supabase REST calls the Comms Agent
+makes, so incident log writes can be benchmarked without a Supabase
+project. POST /rest/v1/<table> accepts one JSON object or an array of them,
+like PostgREST's bulk insert. With ?on_conflict=<column> and
+"Prefer: resolution=ignore-duplicates", rows whose column value is already
+stored are skipped. Each request waits --latency-ms plus --row-ms per row
+to stand in for the network round trip and the insert. Setting
+`available = False` makes inserts answer 503, to simulate an outage.
+GET /rest/v1/<table> returns the stored rows, and GET /stats returns the
+request and row counts per table.
+
+Usage:
+    python benchmarks/postgrest_standin.py --port 54321 --latency-ms 20
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=dev python agents/comms_agent.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+from urllib.parse import parse_qs, urlsplit
+
+TABLE_PREFIX = "/rest/v1/"
+
+
+class PostgRESTStandIn(ThreadingHTTPServer):
+    """In-memory tables with simulated per-request and per-row latency"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency_ms: float = 20.0, row_ms: float = 0.05):
+        super().__init__(address, StandInHandler)
+        self.latency_ms = latency_ms
+        self.row_ms = row_ms
+        self.lock = threading.Lock()
+        self.available = True
+        self.tables = defaultdict(list)
+        self.keys = defaultdict(set)
+        self.requests = defaultdict(int)
+
+    def insert(self, table: str, rows: list, conflict_column: str = None) -> None:
+        time.sleep((self.latency_ms + self.row_ms * len(rows)) / 1000)
+        with self.lock:
+            self.requests[table] += 1
+            for row in rows:
+                if conflict_column:
+                    if row.get(conflict_column) in self.keys[table]:
+                        continue
+                    self.keys[table].add(row.get(conflict_column))
+                self.tables[table].append(row)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                table: {"requests": self.requests[table], "rows": len(rows)}
+                for table, rows in self.tables.items()
+            }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """PostgREST-style insert and select on /rest/v1/<table>"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle delays on keep-alive
+    disable_nagle_algorithm = True
+
+    def _send(self, status: int, payload=None) -> None:
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.startswith(TABLE_PREFIX):
+            self._send(404, {"message": "not found"})
+            return
+        if not self.server.available:
+            self._send(503, {"message": "service unavailable"})
+            return
+        try:
+            rows = json.loads(body)
+        except json.JSONDecodeError:
+            self._send(400, {"message": "invalid JSON"})
+            return
+        rows = rows if isinstance(rows, list) else [rows]
+        url = urlsplit(self.path)
+        conflict_column = None
+        if "resolution=ignore-duplicates" in self.headers.get("Prefer", ""):
+            conflict_column = parse_qs(url.query).get("on_conflict", [None])[0]
+        self.server.insert(url.path[len(TABLE_PREFIX):], rows, conflict_column)
+        if "return=representation" in self.headers.get("Prefer", ""):
+            self._send(201, rows)
+        else:
+            self._send(201)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, self.server.stats())
+        elif self.path.startswith(TABLE_PREFIX):
+            with self.server.lock:
+                self._send(200, list(self.server.tables.get(self.path[len(TABLE_PREFIX):].split("?")[0], [])))
+        else:
+            self._send(404, {"message": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin(latency_ms: float = 20.0, row_ms: float = 0.05, port: int = 0) -> Tuple[PostgRESTStandIn, str]:
+    """Run the stand-in on a background thread; returns the server and its base URL"""
+    server = PostgRESTStandIn(("127.0.0.1", port), latency_ms, row_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for Supabase PostgREST inserts")
+    parser.add_argument("--port", type=int, default=54321, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated latency per request")
+    parser.add_argument("--row-ms", type=float, default=0.05, help="Simulated insert cost per row")
+    args = parser.parse_args()
+
+    server = PostgRESTStandIn(("127.0.0.1", args.port), args.latency_ms, args.row_ms)
+    print(f"PostgREST stand-in on http://127.0.0.1:{args.port} (GET /stats for counts)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Replay Benchmark for Incident Extraction
+
+Replays recorded intake calls through the Vapi extraction pipeline turn by
+turn, once with full-history extraction and once with incremental extraction,
+and reports model calls, prompt size and whether the dispatch-relevant facts
+match between the two modes and the expected values.
+
+Usage:
+    GOOGLE_API_KEY=... python benchmarks/replay_extraction.py
+    python benchmarks/replay_extraction.py --corpus benchmarks/data/intake_transcripts.json --model gemini-2.5-flash
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Add backend directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+
+from app.core.config import settings
+from app.schemas.incident_schema import IncidentFact
+from app.services.incident_extraction_service import extract_turn
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "intake_transcripts.json"
+
+# Facts the router and units act on
+DISPATCH_FIELDS = ("emergency_type", "location", "people_involved", "is_caller_safe")
+
+
+class CountingModel:
+    """Wraps a Gemini model and records call count, prompt size and latency"""
+
+    def __init__(self, model: genai.GenerativeModel):
+        self.model = model
+        self.calls = 0
+        self.prompt_chars = 0
+        self.latencies_ms: List[float] = []
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        start_time = time.perf_counter()
+        try:
+            return await self.model.generate_content_async(prompt, **kwargs)
+        finally:
+            self.latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+
+def dispatch_facts(incident_fact: IncidentFact) -> Dict[str, Any]:
+    """Dispatch-relevant facts, normalized for comparison"""
+    facts = {field: getattr(incident_fact, field) for field in DISPATCH_FIELDS}
+    if isinstance(facts["location"], str):
+        facts["location"] = " ".join(facts["location"].lower().replace(",", " ").split())
+    return facts
+
+
+async def replay_call(model: CountingModel, call: Dict[str, Any], full: bool) -> IncidentFact:
+    """Replay one call the way the logic handler sees it, one turn per request"""
+    call_context = {
+        "incident_fact": IncidentFact(),
+        "conversation_history": [],
+        "extracted_turns": 0,
+        "last_question": None
+    }
+    for turn in call["turns"]:
+        call_context["conversation_history"].append(turn)
+        await extract_turn(model, call_context, full=full)
+    return call_context["incident_fact"]
+
+
+async def run(corpus_path: Path, model_name: str) -> Dict[str, Any]:
+    """Replay the corpus in both modes and compare the results"""
+    calls = json.loads(corpus_path.read_text())["calls"]
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+
+    results = {}
+    facts_by_mode = {}
+    for mode, full in (("full", True), ("incremental", False)):
+        model = CountingModel(genai.GenerativeModel(model_name))
+        facts_by_mode[mode] = {}
+        for call in calls:
+            facts_by_mode[mode][call["call_id"]] = dispatch_facts(await replay_call(model, call, full))
+
+        latencies = sorted(model.latencies_ms)
+        results[mode] = {
+            "model_calls": model.calls,
+            "prompt_chars": model.prompt_chars,
+            "p50_call_ms": round(latencies[len(latencies) // 2], 1) if latencies else 0.0
+        }
+
+    mismatches = [
+        call_id for call_id, facts in facts_by_mode["full"].items()
+        if facts != facts_by_mode["incremental"][call_id]
+    ]
+    results["calls"] = len(calls)
+    results["fact_mismatches"] = mismatches
+    results["prompt_reduction"] = round(
+        1 - results["incremental"]["prompt_chars"] / max(results["full"]["prompt_chars"], 1), 3
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay intake calls through incident extraction")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Transcript corpus JSON")
+    parser.add_argument("--model", default="gemini-2.5-flash", help="Gemini model name")
+    args = parser.parse_args()
+
+    if not settings.GOOGLE_API_KEY:
+        print("❌ GOOGLE_API_KEY is not configured")
+        return 1
+
+    print(json.dumps(asyncio.run(run(args.corpus, args.model)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
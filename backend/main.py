@@ -1,10 +1,29 @@
+import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.router import api_router
+from app.api.frontend_router import manager
+from app.core.config import settings
+from app.core.http_client import http_clients
+from app.database.redis import get_redis_client
+from app.services.unit_change_feed import unit_change_feed
+from services.incident_registry import incident_registry
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Relay WebSocket broadcasts across workers; stop the unit change feed and close pooled connections on shutdown"""
+    if settings.WS_BACKPLANE_ENABLED:
+        await manager.start_backplane(settings.REDIS_URL)
+    yield
+    await manager.stop_backplane()
+    await unit_change_feed.stop()
+    await http_clients.aclose()
 
 app = FastAPI(
     title="AI-Powered Emergency Dispatch System",
     description="Backend API for emergency dispatch system with AI agents",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Health check endpoint
@@ -13,6 +32,39 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "emergency-dispatch-api"}
 
+# Outbound HTTP pool metrics
+@app.get("/metrics/http")
+async def http_metrics():
+    """Shared HTTP client pools: connections opened per minute and retries"""
+    return http_clients.stats()
+
+# Multi-caller deduplication metrics
+@app.get("/metrics/dedup")
+async def dedup_metrics():
+    """Duplicate reports merged into existing incidents, total and per emergency type"""
+    return await incident_registry.get_dedup_stats()
+
+# WebSocket fan-out metrics
+@app.get("/metrics/websockets")
+async def websocket_metrics():
+    """Connected clients, frames, queued and dropped messages, and backplane relay counts"""
+    return manager.stats()
+
+# Unit change stream metrics
+@app.get("/metrics/unit-stream")
+async def unit_stream_metrics():
+    """Unit stream subscribers, changes received, updates delivered and coalesced by throttling"""
+    return unit_change_feed.stats()
+
+# Comms Agent metrics (published to Redis by the agent process)
+@app.get("/metrics/comms")
+async def comms_metrics():
+    """Incident log write-behind: queue depth, batch sizes, flush latency and backpressure waits"""
+    redis_client = await get_redis_client()
+    # Written by agents/comms_agent.py (COMMS_METRICS_KEY)
+    metrics = await redis_client.get("metrics:comms")
+    return json.loads(metrics) if metrics else {"status": "unavailable"}
+
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
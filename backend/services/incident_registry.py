@@ -3,27 +3,68 @@ Incident Registry Service (Redis GEO-based)
 
 Stores active incidents in Redis using GEO indexes and provides queries
 for units to find nearby incidents.
+
+Multiple callers reporting the same incident are deduplicated against the
+GEO index: a new incident whose point falls within DEDUP_RADIUS_KM of an
+active incident of the same emergency type, reported within
+DEDUP_WINDOW_SECONDS, is attached to the existing case instead of being
+dispatched again. GEORADIUS scans the geohash cells around the point, so
+reports on either side of a cell boundary still cluster. Only points geocoded
+to an address, intersection or explicit coordinates take part: a street or
+place match is a centroid, and unrelated reports on the same street would
+otherwise merge.
+
+The check and the registration of a new incident are not one Redis
+operation, so two workers could both miss each other's report. Each new
+incident therefore also claims its type and geohash cell with SET NX for
+the dedup window; a report that loses the claim is merged into the winner.
+The claim covers one ~150 m cell, so simultaneous reports in neighbouring
+cells on different workers can still open two cases.
 """
 
 import asyncio
 import json
 import logging
+from datetime import datetime
 from typing import Dict, Any, List, Optional
 import redis
 
 from app.core.config import settings
+from app.services.geocoder import geocell
 
 logger = logging.getLogger(__name__)
 
+# Incident GEO index and per-incident JSON keys, shared with the map aggregation
+INCIDENT_GEO_KEY = "incidents:geo"
+INCIDENT_DATA_PREFIX = "incident:data:"
+
+# Geocode precisions exact enough to merge reports by distance
+DEDUP_PRECISIONS = frozenset({"address", "coordinates", "intersection"})
+# Geohash length of the cross-worker claim cell (~150 m)
+CLAIM_CELL_PRECISION = 7
+
+
+def dedup_eligible(incident: Dict[str, Any]) -> bool:
+    """Whether an incident has a type and a precise enough location to be deduplicated"""
+    return (
+        bool((incident.get("emergency_type") or "").strip())
+        and incident.get("latitude") is not None
+        and incident.get("longitude") is not None
+        and incident.get("location_precision") in DEDUP_PRECISIONS
+    )
+
 
 class IncidentRegistry:
     def __init__(self, redis_url: str = None):
         self.redis_url = redis_url or settings.REDIS_URL
         self.client: Optional[redis.Redis] = None
         # Keys
-        self.geo_key = "incidents:geo"
-        self.data_key_prefix = "incident:data:"
+        self.geo_key = INCIDENT_GEO_KEY
+        self.data_key_prefix = INCIDENT_DATA_PREFIX
         self.active_set_key = "incidents:active"
+        self.linked_key_prefix = "incident:linked:"
+        self.dedup_stats_key = "incidents:dedup"
+        self.claim_key_prefix = "incident:claim:"
 
     async def connect(self) -> None:
         if self.client is None:
@@ -105,6 +146,156 @@ class IncidentRegistry:
             logger.error(f"Failed to query nearby incidents: {e}")
             return []
 
+    async def find_duplicate(
+        self,
+        incident: Dict[str, Any],
+        radius_km: float = None,
+        window_seconds: int = None,
+        limit: int = 10
+    ) -> Optional[str]:
+        """Case ID of an active incident of the same type reported nearby within the time window"""
+        if not dedup_eligible(incident):
+            return None
+        emergency_type = incident["emergency_type"].strip().lower()
+        lat, lon = incident["latitude"], incident["longitude"]
+
+        radius_km = radius_km if radius_km is not None else settings.DEDUP_RADIUS_KM
+        window_seconds = window_seconds if window_seconds is not None else settings.DEDUP_WINDOW_SECONDS
+        reported_at = _parse_timestamp(incident.get("timestamp")) or datetime.now()
+        incident_id = str(incident.get("case_id") or "")
+        try:
+            await self.connect()
+            members = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.georadius(self.geo_key, float(lon), float(lat), radius_km, unit="km", count=limit, sort="ASC")
+            )
+            members = [member for member in members if member != incident_id]
+            if not members:
+                return None
+
+            # One round trip for every candidate's payload, nearest first
+            payloads = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.mget([self.data_key_prefix + member for member in members])
+            )
+            for member, raw in zip(members, payloads):
+                if not raw:
+                    continue
+                candidate = json.loads(raw)
+                if (candidate.get("emergency_type") or "").strip().lower() != emergency_type:
+                    continue
+                if candidate.get("location_precision") not in DEDUP_PRECISIONS:
+                    continue
+                candidate_at = _parse_timestamp(candidate.get("timestamp"))
+                if candidate_at and abs((reported_at - candidate_at).total_seconds()) <= window_seconds:
+                    return member
+            return None
+        except Exception as e:
+            logger.error(f"Failed to check for duplicate incident: {e}")
+            return None
+
+    async def claim_location(self, incident: Dict[str, Any], window_seconds: int = None) -> Optional[str]:
+        """Claim the incident's type and cell across workers; returns the case ID already holding it"""
+        if not dedup_eligible(incident):
+            return None
+        window_seconds = window_seconds if window_seconds is not None else settings.DEDUP_WINDOW_SECONDS
+        incident_id = str(incident.get("case_id") or "")
+        cell = geocell(float(incident["latitude"]), float(incident["longitude"]), CLAIM_CELL_PRECISION)
+        claim_key = f"{self.claim_key_prefix}{incident['emergency_type'].strip().lower()}:{cell}"
+        try:
+            await self.connect()
+
+            def claim():
+                if self.client.set(claim_key, incident_id, nx=True, ex=window_seconds):
+                    return None
+                return self.client.get(claim_key)
+
+            holder = await asyncio.get_event_loop().run_in_executor(None, claim)
+            return holder if holder and holder != incident_id else None
+        except Exception as e:
+            logger.error(f"Failed to claim incident location: {e}")
+            return None
+
+    async def attach_duplicate(self, case_id: str, incident: Dict[str, Any]) -> int:
+        """Link a duplicate report to an existing case; returns the number of linked reports"""
+        try:
+            await self.connect()
+            report = {
+                "case_id": str(incident.get("case_id") or ""),
+                "call_id": incident.get("call_id"),
+                "location": incident.get("location"),
+                "timestamp": incident.get("timestamp")
+            }
+            emergency_type = (incident.get("emergency_type") or "unknown").strip().lower()
+            linked_key = self.linked_key_prefix + case_id
+
+            def attach():
+                pipe = self.client.pipeline()
+                pipe.rpush(linked_key, json.dumps(report))
+                pipe.expire(linked_key, 86400)
+                pipe.hincrby(self.dedup_stats_key, "merged", 1)
+                pipe.hincrby(self.dedup_stats_key, f"merged:{emergency_type}", 1)
+                return pipe.execute()[0]
+
+            linked = await asyncio.get_event_loop().run_in_executor(None, attach)
+            logger.info(f"Attached duplicate report {report['case_id']} to incident {case_id} ({linked} linked)")
+            return linked
+        except Exception as e:
+            logger.error(f"Failed to attach duplicate to incident {case_id}: {e}")
+            return 0
+
+    async def get_linked_reports(self, case_id: str) -> List[Dict[str, Any]]:
+        """Duplicate reports attached to a case, oldest first"""
+        try:
+            await self.connect()
+            raw = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.lrange(self.linked_key_prefix + case_id, 0, -1)
+            )
+            return [json.loads(item) for item in raw]
+        except Exception as e:
+            logger.error(f"Failed to load linked reports for {case_id}: {e}")
+            return []
+
+    async def get_active_incidents(self) -> List[Dict[str, Any]]:
+        """Payloads of every active incident, read in one round trip after the active set"""
+        try:
+            await self.connect()
+
+            def load():
+                incident_ids = sorted(self.client.smembers(self.active_set_key))
+                if not incident_ids:
+                    return []
+                return self.client.mget([self.data_key_prefix + incident_id for incident_id in incident_ids])
+
+            raw = await asyncio.get_event_loop().run_in_executor(None, load)
+            return [json.loads(item) for item in raw if item]
+        except Exception as e:
+            logger.error(f"Failed to load active incidents: {e}")
+            return []
+
+    async def get_dedup_stats(self) -> Dict[str, int]:
+        """Duplicate merge counts, in total ("merged") and per emergency type ("merged:<type>")"""
+        try:
+            await self.connect()
+            stats = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.client.hgetall(self.dedup_stats_key)
+            )
+            return {field: int(count) for field, count in stats.items()}
+        except Exception as e:
+            logger.error(f"Failed to load dedup stats: {e}")
+            return {}
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    except ValueError:
+        return None
+
 
 incident_registry = IncidentRegistry()
 
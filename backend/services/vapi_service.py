@@ -5,13 +5,13 @@ This service handles SMS and call notifications using the Vapi API.
 It provides methods to send updates to callers about their emergency dispatch.
 """
 
-import httpx
 import logging
 import asyncio
 from typing import Dict, Any, Optional
 from datetime import datetime
 
 from app.core.config import settings
+from app.core.http_client import http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -86,31 +86,30 @@ class VapiService:
             logger.info(f"📞 Initiating call to {phone_number}")
             logger.debug(f"Call config: {call_config}")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/call",
-                    headers=headers,
-                    json=call_config,
-                    timeout=30.0
-                )
-                
-                if response.status_code in [200, 201]:
-                    call_data = response.json()
-                    logger.info(f"✅ Call initiated successfully: {call_data.get('id', 'unknown')}")
-                    return {
-                        "success": True,
-                        "call_id": call_data.get('id'),
-                        "status": call_data.get('status'),
-                        "message": "Call initiated successfully"
-                    }
-                else:
-                    logger.error(f"❌ Call failed: {response.status_code} - {response.text}")
-                    return {
-                        "success": False,
-                        "error": f"API error: {response.status_code} - {response.text}",
-                        "status_code": response.status_code
-                    }
-                    
+            response = await http_clients.post(
+                f"{self.base_url}/call",
+                headers=headers,
+                json=call_config,
+                timeout=30.0
+            )
+
+            if response.status_code in [200, 201]:
+                call_data = response.json()
+                logger.info(f"✅ Call initiated successfully: {call_data.get('id', 'unknown')}")
+                return {
+                    "success": True,
+                    "call_id": call_data.get('id'),
+                    "status": call_data.get('status'),
+                    "message": "Call initiated successfully"
+                }
+            else:
+                logger.error(f"❌ Call failed: {response.status_code} - {response.text}")
+                return {
+                    "success": False,
+                    "error": f"API error: {response.status_code} - {response.text}",
+                    "status_code": response.status_code
+                }
+
         except Exception as e:
             logger.error(f"❌ Error initiating call: {e}")
             raise
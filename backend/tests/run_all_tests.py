@@ -27,7 +27,27 @@ def run_all_tests():
         "test_services.py",
         "test_kubernetes_agent.py",
         "test_comms_agent.py",
-        "test_intelligent_unit.py"
+        "test_intelligent_unit.py",
+        "test_redis_loader.py",
+        "test_unit_history.py",
+        "test_unit_store.py",
+        "test_incident_extraction.py",
+        "test_rule_extractor.py",
+        "test_question_bank.py",
+        "test_call_context_store.py",
+        "test_conversation_compaction.py",
+        "test_http_client.py",
+        "test_geocoder.py",
+        "test_websocket_hub.py",
+        "test_websocket_backplane.py",
+        "test_call_event_log.py",
+        "test_map_aggregation.py",
+        "test_dashboard_snapshot.py",
+        "test_unit_change_feed.py",
+        "test_batch_writer.py",
+        "test_outbox.py",
+        "test_vapi_streaming.py",
+        "test_units_router.py"
     ]
     
     # Convert to full paths
@@ -80,7 +100,27 @@ def run_component_tests(component):
         "services": "test_services.py",
         "kubernetes": "test_kubernetes_agent.py",
         "comms": "test_comms_agent.py",
-        "intelligence": "test_intelligent_unit.py"
+        "intelligence": "test_intelligent_unit.py",
+        "loader": "test_redis_loader.py",
+        "history": "test_unit_history.py",
+        "store": "test_unit_store.py",
+        "extraction": "test_incident_extraction.py",
+        "rules": "test_rule_extractor.py",
+        "questions": "test_question_bank.py",
+        "call_context": "test_call_context_store.py",
+        "compaction": "test_conversation_compaction.py",
+        "http": "test_http_client.py",
+        "geocoder": "test_geocoder.py",
+        "websockets": "test_websocket_hub.py",
+        "backplane": "test_websocket_backplane.py",
+        "call_events": "test_call_event_log.py",
+        "map": "test_map_aggregation.py",
+        "bootstrap": "test_dashboard_snapshot.py",
+        "unit_stream": "test_unit_change_feed.py",
+        "batch_writer": "test_batch_writer.py",
+        "outbox": "test_outbox.py",
+        "vapi_streaming": "test_vapi_streaming.py",
+        "units_router": "test_units_router.py"
     }
     
     if component not in component_tests:
@@ -0,0 +1,104 @@
+"""
+Test suite for the write-behind batch writer
+
+Tests flushing by size and by age, draining on stop, failed and deferred
+flushes, backpressure on a full queue and the reported stats.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.batch_writer import DEFERRED, BatchWriter
+
+
+class TestBatchWriter:
+    """Test cases for the write-behind batch writer"""
+
+    @pytest.mark.asyncio
+    async def test_full_batches_flush_without_waiting(self):
+        """Items already queued are flushed in batches of max_batch"""
+        flush = AsyncMock(return_value=True)
+        writer = BatchWriter(flush, max_batch=10, max_delay=60.0)
+        for index in range(25):
+            await writer.put(index)
+
+        writer.start()
+        await asyncio.sleep(0.01)
+
+        assert [len(call.args[0]) for call in flush.await_args_list] == [10, 10]
+        await writer.stop()
+        assert flush.await_args_list[-1].args[0] == list(range(20, 25))
+        assert writer.stats()["written"] == 25
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_flushes_after_max_delay(self):
+        """A batch that never fills is flushed once its oldest item is due"""
+        flush = AsyncMock(return_value=True)
+        writer = BatchWriter(flush, max_batch=100, max_delay=0.05)
+        writer.start()
+
+        await writer.put("a")
+        await writer.put("b")
+        await asyncio.sleep(0.01)
+        flush.assert_not_awaited()
+
+        await asyncio.sleep(0.1)
+        flush.assert_awaited_once_with(["a", "b"])
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_flushes_are_counted(self):
+        """A flush that returns False or raises counts its items as failed"""
+        writer = BatchWriter(AsyncMock(side_effect=[False, RuntimeError("down")]), max_batch=2, max_delay=60.0)
+        for index in range(4):
+            await writer.put(index)
+        writer.start()
+        await writer.stop()
+
+        stats = writer.stats()
+        assert stats["batches"] == 2 and stats["failed"] == 4 and stats["written"] == 0
+
+    @pytest.mark.asyncio
+    async def test_deferred_flushes_are_not_failures(self):
+        """A flush that hands its batch off for later counts the items as deferred"""
+        writer = BatchWriter(AsyncMock(side_effect=[DEFERRED, True]), max_batch=2, max_delay=60.0)
+        for index in range(4):
+            await writer.put(index)
+        writer.start()
+        await writer.stop()
+
+        stats = writer.stats()
+        assert stats["deferred"] == 2 and stats["written"] == 2 and stats["failed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_applies_backpressure(self):
+        """put() waits while the queue is full and resumes when the flusher drains it"""
+        release = asyncio.Event()
+
+        async def slow_flush(items):
+            await release.wait()
+            return True
+
+        writer = BatchWriter(slow_flush, max_batch=1, max_delay=0.0, max_queue=2)
+        writer.start()
+        await writer.put(0)
+        await asyncio.sleep(0.01)
+        # The flusher holds item 0; items 1 and 2 fill the queue
+        await writer.put(1)
+        await writer.put(2)
+
+        blocked = asyncio.ensure_future(writer.put(3))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert writer.stats()["backpressure_waits"] == 1
+
+        release.set()
+        await asyncio.wait_for(blocked, 1.0)
+        await writer.stop()
+        assert writer.stats()["written"] == 4
@@ -0,0 +1,174 @@
+"""
+Test suite for the call context store
+
+Tests compact context serialization, TTL refresh on save and the versioned
+LRU front cache.
+"""
+
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.call_context_store import (
+    SAVE_ATTEMPTS,
+    VERSION_FIELD,
+    CallContextStore,
+    decode_context,
+    encode_context,
+    new_call_context,
+)
+from app.schemas.incident_schema import IncidentFact
+
+
+def make_context():
+    """Call context part way through an intake call"""
+    context = new_call_context()
+    context["incident_fact"] = IncidentFact(emergency_type="Fire", location="123 Main Street")
+    context["conversation_history"].append({
+        "role": "user",
+        "content": "There's a fire at 123 Main Street",
+        "timestamp": datetime(2025, 1, 1, 12, 0, 0)
+    })
+    context["extracted_turns"] = 1
+    context["last_question"] = "How big is the fire?"
+    context["question_attempts"] = {"severity": 1}
+    context["caller_number"] = "+17345550148"
+    return context
+
+
+def make_client(version=1, data=None):
+    """Mock redis.asyncio client whose save script returns `version`"""
+    client = MagicMock()
+    client.eval = AsyncMock(return_value=version)
+    client.hget = AsyncMock(return_value=str(version))
+    client.hgetall = AsyncMock(return_value={"v": str(version), "ctx": data} if data else {})
+    return client
+
+
+class TestCallContextStore:
+    """Test cases for the call context store"""
+
+    def test_encode_decode_round_trip(self):
+        """Facts, history, progress and extra fields survive serialization"""
+        context = make_context()
+
+        decoded = decode_context(encode_context(context))
+
+        assert decoded["incident_fact"] == context["incident_fact"]
+        assert decoded["conversation_history"] == context["conversation_history"]
+        assert decoded["call_start_time"] == context["call_start_time"]
+        assert decoded["extracted_turns"] == 1
+        assert decoded["last_question"] == "How big is the fire?"
+        assert decoded["question_attempts"] == {"severity": 1}
+        assert decoded["caller_number"] == "+17345550148"
+
+    def test_encoding_is_compact(self):
+        """Default IncidentFact fields are omitted and history is stored as triples"""
+        encoded = json.loads(encode_context(make_context()))
+
+        assert "people_involved" not in encoded["f"]
+        assert encoded["h"] == [["user", "There's a fire at 123 Main Street", "2025-01-01T12:00:00"]]
+
+    @pytest.mark.asyncio
+    async def test_save_refreshes_ttl(self):
+        """A save is one script that checks the version, writes the context and refreshes the TTL"""
+        client = make_client(version=3)
+        store = CallContextStore(ttl_seconds=600, cache_size=4)
+        context = {**make_context(), VERSION_FIELD: 2}
+
+        version = await store.save(client, "call_1", context)
+
+        assert version == 3 and context[VERSION_FIELD] == 3
+        script, numkeys, key, expected, encoded, ttl = client.eval.await_args[0]
+        assert "HINCRBY" in script and "EXPIRE" in script
+        assert (numkeys, key, expected, ttl) == (1, "call:call_1", 2, 600)
+        assert VERSION_FIELD not in json.loads(encoded).get("x", {})
+
+    @pytest.mark.asyncio
+    async def test_load_uses_cache_while_version_matches(self):
+        """A cached context is reused without reading the stored context, as a private copy"""
+        client = make_client(version=2)
+        store = CallContextStore(ttl_seconds=600, cache_size=4)
+        context = make_context()
+        await store.save(client, "call_1", context)
+
+        loaded = await store.load(client, "call_1")
+        loaded["conversation_history"].append({"role": "user", "content": "unsaved", "timestamp": None})
+        again = await store.load(client, "call_1")
+
+        assert loaded is not context and loaded[VERSION_FIELD] == 2
+        assert again["conversation_history"] == make_context()["conversation_history"]
+        client.hgetall.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_save_merges_concurrent_turn(self):
+        """A turn saved elsewhere since the load is merged instead of overwritten"""
+        client = make_client(version=2)
+        store = CallContextStore(ttl_seconds=600, cache_size=4)
+        await store.save(client, "call_1", make_context())
+        ours = await store.load(client, "call_1")
+        ours["conversation_history"].append({"role": "user", "content": "Two people are inside", "timestamp": datetime(2025, 1, 1, 12, 0, 5)})
+        ours["incident_fact"].people_involved = 2
+
+        other = make_context()
+        other["conversation_history"].append({"role": "user", "content": "It's spreading", "timestamp": datetime(2025, 1, 1, 12, 0, 4)})
+        other["incident_fact"].is_active_threat = True
+        other["last_question"] = "Is anyone inside?"
+        client.eval.side_effect = [0, 4]
+        client.hget.return_value = "3"
+        client.hgetall.return_value = {"v": "3", "ctx": encode_context(other)}
+
+        version = await store.save(client, "call_1", ours)
+
+        assert version == 4
+        assert client.eval.await_args_list[-1][0][3] == 3
+        assert [message["content"] for message in ours["conversation_history"]][-2:] == ["It's spreading", "Two people are inside"]
+        assert ours["incident_fact"].people_involved == 2 and ours["incident_fact"].is_active_threat is True
+        assert ours["last_question"] == "Is anyone inside?"
+
+    @pytest.mark.asyncio
+    async def test_save_gives_up_after_repeated_conflicts(self):
+        """A call that keeps changing fails the save instead of looping"""
+        client = make_client(version=0, data=encode_context(make_context()))
+        store = CallContextStore(ttl_seconds=600, cache_size=4)
+
+        with pytest.raises(RuntimeError):
+            await store.save(client, "call_1", make_context())
+        assert client.eval.await_count == SAVE_ATTEMPTS
+
+    @pytest.mark.asyncio
+    async def test_load_rereads_stale_cache(self):
+        """A turn saved by another worker invalidates the cached copy"""
+        client = make_client(version=2, data=encode_context(make_context()))
+        store = CallContextStore(ttl_seconds=600, cache_size=4)
+        await store.save(client, "call_1", new_call_context())
+        client.hget.return_value = "5"
+
+        loaded = await store.load(client, "call_1")
+
+        client.hgetall.assert_awaited_once_with("call:call_1")
+        assert loaded["incident_fact"].location == "123 Main Street"
+
+    @pytest.mark.asyncio
+    async def test_load_missing_call(self):
+        """Unknown or expired calls load as None"""
+        client = make_client()
+
+        assert await CallContextStore(ttl_seconds=600, cache_size=4).load(client, "call_1") is None
+
+    @pytest.mark.asyncio
+    async def test_cache_is_bounded(self):
+        """The least recently used contexts are evicted beyond cache_size"""
+        client = make_client()
+        store = CallContextStore(ttl_seconds=600, cache_size=2)
+
+        for call_id in ("call_1", "call_2", "call_3"):
+            await store.save(client, call_id, new_call_context())
+
+        assert list(store._cache) == ["call_2", "call_3"]
@@ -0,0 +1,159 @@
+"""
+Test suite for the per-call event log
+
+Tests sequence numbering through the Redis Stream, snapshot folding,
+resume versus snapshot replay, syncing events appended by other workers,
+the recent calls index, unsequenced events without Redis and restarted
+streams.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.call_event_log import CallEventLog
+
+
+def make_client(*entry_ids, entries=None):
+    """Mock redis.asyncio client whose XADDs return `entry_ids` in order"""
+    client = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(side_effect=[[entry_id, True] for entry_id in entry_ids])
+    client.pipeline.return_value = pipe
+    client.xrange = AsyncMock(return_value=entries or [])
+    return client, pipe
+
+
+def transcript(text):
+    return {"type": "transcript_update", "call_id": "call_1", "timestamp": "2025-01-01T12:00:00", "data": {"text": text}}
+
+
+def fact(**fields):
+    return {"type": "fact_update", "call_id": "call_1", "data": {"incident_fact": fields}}
+
+
+class TestCallEventLog:
+    """Test cases for the per-call event log"""
+
+    @pytest.mark.asyncio
+    async def test_append_numbers_events_from_stream(self):
+        """Sequence numbers come from XADD "0-*" and the stream is trimmed and expired"""
+        log = CallEventLog(buffer_size=10, stream_maxlen=100, ttl_seconds=60)
+        client, pipe = make_client("0-1", "0-2")
+
+        assert await log.append(client, "call_1", transcript("There's a fire")) == 1
+        assert await log.append(client, "call_1", fact(location="412 Maple Avenue")) == 2
+
+        key, fields = pipe.xadd.call_args[0]
+        assert key == "call:events:call_1"
+        assert json.loads(fields["e"])["type"] == "fact_update"
+        assert pipe.xadd.call_args[1] == {"id": "0-*", "maxlen": 100, "approximate": True}
+        pipe.expire.assert_called_with("call:events:call_1", 60)
+
+    @pytest.mark.asyncio
+    async def test_snapshot_folds_events(self):
+        """Facts are merged, transcript lines kept and the status tracked"""
+        log = CallEventLog(buffer_size=10)
+        client, _ = make_client("0-1", "0-2", "0-3")
+        await log.append(client, "call_1", fact(emergency_type="Fire"))
+        await log.append(client, "call_1", transcript("Smoke on the second floor"))
+        await log.append(client, "call_1", {"type": "fact_update", "data": {"field": "location", "value": "88 Packard Street", "status": "completed"}})
+
+        snapshot = await log.snapshot(client, "call_1")
+
+        assert snapshot["seq"] == 3
+        assert snapshot["status"] == "completed"
+        assert snapshot["facts"] == {"emergency_type": "Fire", "location": "88 Packard Street"}
+        assert snapshot["transcript"] == [{"text": "Smoke on the second floor"}]
+
+    @pytest.mark.asyncio
+    async def test_replay_resumes_or_snapshots(self):
+        """Buffered gaps are replayed as events; gaps older than the buffer get a snapshot"""
+        log = CallEventLog(buffer_size=2)
+        client, _ = make_client("0-1", "0-2", "0-3")
+        for text in ["one", "two", "three"]:
+            await log.append(client, "call_1", transcript(text))
+
+        resume = await log.replay(client, "call_1", since=1)
+        assert resume["type"] == "resume"
+        assert [(event["seq"], event["data"]["text"]) for event in resume["events"]] == [(2, "two"), (3, "three")]
+
+        snapshot = await log.replay(client, "call_1", since=0)
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["seq"] == 3
+        assert len(snapshot["snapshot"]["transcript"]) == 3
+
+    @pytest.mark.asyncio
+    async def test_events_from_other_workers_are_synced(self):
+        """A worker without local state rebuilds the call from the stream"""
+        log = CallEventLog(buffer_size=10)
+        client, _ = make_client(entries=[
+            ("0-1", {"e": json.dumps(fact(emergency_type="Medical"))}),
+            ("0-2", {"e": json.dumps(transcript("He's not breathing"))})
+        ])
+
+        replay = await log.replay(client, "call_1", since=1)
+
+        assert client.xrange.call_args[1]["min"] == "(0-0"
+        assert replay["type"] == "resume"
+        assert replay["events"][0]["seq"] == 2
+
+    @pytest.mark.asyncio
+    async def test_recent_calls_index(self):
+        """Appends score the call in calls:recent, which lists live calls newest first"""
+        log = CallEventLog(buffer_size=10, ttl_seconds=60)
+        client, pipe = make_client("0-1")
+        client.zrevrangebyscore = AsyncMock(return_value=["call_1"])
+
+        await log.append(client, "call_1", transcript("hello"))
+        assert pipe.zadd.call_args[0][0] == "calls:recent"
+        assert list(pipe.zadd.call_args[0][1]) == ["call_1"]
+
+        assert await log.recent_calls(client, limit=5) == ["call_1"]
+        assert client.zrevrangebyscore.call_args[1] == {"start": 0, "num": 5}
+
+        client.zrevrangebyscore = AsyncMock(side_effect=ConnectionError("redis down"))
+        assert await log.recent_calls(client) == ["call_1"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_call(self):
+        """Calls without events have no snapshot"""
+        log = CallEventLog(buffer_size=10)
+        client, _ = make_client()
+
+        assert await log.snapshot(client, "missing") is None
+
+    @pytest.mark.asyncio
+    async def test_redis_failure_leaves_events_unsequenced(self):
+        """Without Redis, events are folded from memory but not numbered, and resuming past them snapshots"""
+        log = CallEventLog(buffer_size=10)
+        client, pipe = make_client("0-1")
+        await log.append(client, "call_1", transcript("hello"))
+        pipe.execute = AsyncMock(side_effect=ConnectionError("redis down"))
+        client.xrange = AsyncMock(side_effect=ConnectionError("redis down"))
+
+        assert await log.append(client, "call_1", fact(location="412 Maple Avenue")) is None
+
+        replay = await log.replay(client, "call_1", since=1)
+        assert replay["type"] == "snapshot" and replay["seq"] == 1
+        assert replay["snapshot"]["facts"] == {"location": "412 Maple Avenue"}
+
+    @pytest.mark.asyncio
+    async def test_restarted_stream_resets_the_call(self):
+        """An XADD numbered at or below the local seq means the stream expired; the call is rebuilt"""
+        log = CallEventLog(buffer_size=10)
+        client, _ = make_client("0-1", "0-2", "0-1")
+        await log.append(client, "call_1", fact(emergency_type="Fire"))
+        await log.append(client, "call_1", transcript("old"))
+
+        assert await log.append(client, "call_1", transcript("new")) == 1
+
+        snapshot = await log.snapshot(client, "call_1")
+        assert snapshot["seq"] == 1
+        assert snapshot["facts"] == {}
+        assert snapshot["transcript"] == [{"text": "new"}]
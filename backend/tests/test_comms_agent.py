@@ -18,7 +18,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agents.comms_agent import CommsAgent
+from agents.comms_agent import CommsAgent, idempotency_key
+from app.core.batch_writer import DEFERRED
 
 class MockRedisClient:
     """Mock Redis client for testing"""
@@ -142,13 +143,13 @@ class TestCommsAgent:
     @pytest.mark.asyncio
     async def test_log_to_supabase_success(self, comms_agent, sample_log_data):
         """Test successful logging to Supabase"""
-        with patch('httpx.AsyncClient') as mock_client:
+        with patch('agents.comms_agent.http_clients.post', new_callable=AsyncMock) as mock_post:
             # Mock successful response
             mock_response = MagicMock()
             mock_response.status_code = 201
             mock_response.json.return_value = {'id': 'test-log-123'}
             
-            mock_client.return_value.__aenter__.return_value.post.return_value = mock_response
+            mock_post.return_value = mock_response
             
             # Test logging
             result = await comms_agent.log_to_supabase(sample_log_data)
@@ -156,18 +157,18 @@ class TestCommsAgent:
             assert result is True
             
             # Verify the request was made
-            mock_client.return_value.__aenter__.return_value.post.assert_called_once()
+            mock_post.assert_called_once()
     
     @pytest.mark.asyncio
     async def test_log_to_supabase_failure(self, comms_agent, sample_log_data):
         """Test Supabase logging failure"""
-        with patch('httpx.AsyncClient') as mock_client:
+        with patch('agents.comms_agent.http_clients.post', new_callable=AsyncMock) as mock_post:
             # Mock failed response
             mock_response = MagicMock()
             mock_response.status_code = 500
             mock_response.text = 'Internal Server Error'
             
-            mock_client.return_value.__aenter__.return_value.post.return_value = mock_response
+            mock_post.return_value = mock_response
             
             # Test logging
             result = await comms_agent.log_to_supabase(sample_log_data)
@@ -186,6 +187,92 @@ class TestCommsAgent:
         
         assert result is True
     
+    @pytest.mark.asyncio
+    async def test_log_to_supabase_batches_while_writer_runs(self, comms_agent, sample_log_data):
+        """Queued log rows are inserted as one PostgREST array"""
+        comms_agent.supabase_url = "http://supabase.test"
+        comms_agent.supabase_key = "test-key"
+        comms_agent.log_writer.max_delay = 60.0
+        
+        with patch('agents.comms_agent.http_clients.post', new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = MagicMock(status_code=201)
+            comms_agent.log_writer.start()
+            
+            for _ in range(3):
+                assert await comms_agent.log_to_supabase(sample_log_data) is True
+            mock_post.assert_not_called()
+            
+            await comms_agent.log_writer.stop()
+            
+            mock_post.assert_called_once()
+            rows = mock_post.call_args.kwargs['json']
+            assert len(rows) == 3
+            assert rows[0]['case_id'] == 'test-case-123'
+            assert comms_agent.log_writer.stats()['written'] == 3
+    
+    @pytest.mark.asyncio
+    async def test_failed_log_batch_is_recorded_in_outbox(self, comms_agent, sample_log_data, tmp_path):
+        """A batch Supabase rejects is kept in the outbox and replayed with the same keys"""
+        comms_agent.supabase_url = "http://supabase.test"
+        comms_agent.outbox.path = str(tmp_path / "outbox.db")
+        comms_agent.outbox.start()
+        rows = [comms_agent.build_log_entry(sample_log_data)]
+        
+        with patch('agents.comms_agent.http_clients.post', new_callable=AsyncMock) as mock_post:
+            mock_post.side_effect = [MagicMock(status_code=503, text='Service Unavailable'), MagicMock(status_code=201)]
+            assert await comms_agent.flush_incident_logs(rows) == DEFERRED
+            # The replay task is woken by the new entry
+            for _ in range(100):
+                if mock_post.await_count == 2:
+                    break
+                await asyncio.sleep(0.01)
+            
+            assert mock_post.await_count == 2
+            assert 'on_conflict=idempotency_key' in mock_post.await_args_list[1].args[0]
+            assert mock_post.await_args_list[1].kwargs['json'][0]['idempotency_key'] == rows[0]['idempotency_key']
+        
+        await comms_agent.outbox.stop()
+        assert comms_agent.outbox.stats()['delivered'] == 1
+    
+    def test_idempotency_key_uses_an_id_or_timestamp(self, sample_log_data):
+        """Message IDs are used as keys; content keys need a timestamp to tell events apart"""
+        assert idempotency_key({**sample_log_data, 'message_id': 'abc'}) == 'abc'
+        later = {**sample_log_data, 'timestamp': '2025-01-01T12:00:01'}
+        assert idempotency_key(sample_log_data) == idempotency_key(dict(sample_log_data))
+        assert idempotency_key(later) != idempotency_key(sample_log_data)
+    
+    def test_log_without_id_or_timestamp_is_still_written(self, comms_agent, sample_log_data):
+        """A message with neither field gets a generated key instead of being dropped"""
+        first = {key: value for key, value in sample_log_data.items() if key != 'timestamp'}
+        second = dict(first)
+        
+        entry = comms_agent.build_log_entry(first)
+        
+        assert entry['idempotency_key'] == first['message_id']
+        assert idempotency_key(first) == entry['idempotency_key']
+        assert idempotency_key(second) != entry['idempotency_key']
+        assert entry['timestamp']
+    
+    @pytest.mark.asyncio
+    async def test_process_log_queues_notification_in_outbox(self, comms_agent, mock_vapi_service, sample_log_data, tmp_path):
+        """With the outbox running, the notification is recorded and sent by the replay task"""
+        comms_agent.outbox.path = str(tmp_path / "outbox.db")
+        comms_agent.outbox.poll_interval = 30.0
+        comms_agent.outbox.start()
+        
+        with patch.object(comms_agent, 'log_to_supabase', return_value=True):
+            await comms_agent.process_log(sample_log_data)
+            await comms_agent.process_log(sample_log_data)
+            
+            assert comms_agent.outbox.stats()['recorded'] == 1
+            for _ in range(100):
+                if mock_vapi_service.send_dispatch_notification_calls:
+                    break
+                await asyncio.sleep(0.01)
+        
+        assert len(mock_vapi_service.send_dispatch_notification_calls) == 1
+        await comms_agent.outbox.stop()
+    
     def test_should_send_notification(self, comms_agent):
         """Test notification decision logic"""
         # Test cases that should send notifications
@@ -0,0 +1,111 @@
+"""
+Test suite for conversation compaction
+
+Tests the local token estimate, rolling summary compaction and the bounded
+size of long call histories.
+"""
+
+import pytest
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.call_context_store import new_call_context
+from app.services.conversation_compaction import (
+    clip_to_tokens,
+    compact_conversation,
+    conversation_transcript,
+    estimate_tokens,
+)
+from app.services.incident_extraction_service import build_turn_prompt
+
+
+def add_turns(call_context, count, start=0):
+    """Append alternating dispatcher and caller turns, all already extracted"""
+    for index in range(start, start + count):
+        call_context["conversation_history"].append({"role": "assistant", "content": f"Question {index}?"})
+        call_context["conversation_history"].append({
+            "role": "user",
+            "content": f"Answer {index}: the smoke is coming from the second floor window"
+        })
+    call_context["extracted_turns"] = len(call_context["conversation_history"])
+
+
+class TestConversationCompaction:
+    """Test cases for conversation compaction"""
+
+    def test_estimate_tokens(self):
+        """Token estimate is about four characters per token"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("fire") == 1
+        assert estimate_tokens("x" * 400) == 100
+
+    def test_clip_to_tokens(self):
+        """Long text is clipped at a word boundary"""
+        assert clip_to_tokens("short text", 10) == "short text"
+        assert clip_to_tokens("one two three four five", 3) == "one two..."
+
+    def test_short_call_is_not_compacted(self):
+        """Histories within budget are left untouched"""
+        call_context = new_call_context()
+        add_turns(call_context, 2)
+
+        assert compact_conversation(call_context, budget_tokens=500, keep_turns=4) == 0
+        assert len(call_context["conversation_history"]) == 4
+        assert "summary" not in call_context
+
+    def test_compaction_keeps_recent_turns(self):
+        """Old extracted turns move into the summary and the last K stay verbatim"""
+        call_context = new_call_context()
+        add_turns(call_context, 20)
+
+        compacted = compact_conversation(call_context, budget_tokens=300, keep_turns=4)
+
+        assert compacted == 36
+        assert len(call_context["conversation_history"]) == 4
+        assert call_context["conversation_history"][-1]["content"].startswith("Answer 19")
+        assert call_context["extracted_turns"] == 4
+        assert call_context["compacted_turns"] == 36
+        assert call_context["summary"].split("\n")[-1].startswith("caller: Answer 17")
+        assert "Question" not in call_context["summary"]
+
+    def test_unextracted_turns_are_never_compacted(self):
+        """Turns the extractor has not seen yet stay in the history"""
+        call_context = new_call_context()
+        add_turns(call_context, 20)
+        call_context["extracted_turns"] = 10
+
+        compact_conversation(call_context, budget_tokens=300, keep_turns=4)
+
+        assert len(call_context["conversation_history"]) == 30
+        assert call_context["extracted_turns"] == 0
+
+    def test_long_call_stays_within_budget(self):
+        """History and summary size stay bounded however long the call runs"""
+        call_context = new_call_context()
+        sizes = []
+        for index in range(200):
+            add_turns(call_context, 1, start=index)
+            compact_conversation(call_context, budget_tokens=300, keep_turns=4)
+            sizes.append(estimate_tokens(conversation_transcript(call_context)))
+
+        assert max(sizes[50:]) <= 300
+        assert estimate_tokens(call_context["summary"]) <= 100
+
+    def test_full_prompt_includes_summary(self):
+        """Full re-extraction prompts start with the rolling summary"""
+        call_context = new_call_context()
+        add_turns(call_context, 20)
+        compact_conversation(call_context, budget_tokens=300, keep_turns=4)
+
+        prompt = build_turn_prompt(
+            call_context["conversation_history"],
+            call_context["incident_fact"],
+            full=True,
+            summary=call_context["summary"]
+        )
+
+        assert "Earlier in the call (summary):" in prompt
+        assert "caller: Answer 17" in prompt
@@ -0,0 +1,111 @@
+"""
+Test suite for the dashboard bootstrap snapshot
+
+Tests assembly from the unit store, incident registry and call event log,
+per-call sequence numbers, gzip encoding, ETags and the shared cache.
+"""
+
+import asyncio
+import gzip
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import dashboard_snapshot
+from app.services.dashboard_snapshot import DashboardSnapshotCache, build_snapshot
+
+
+def patch_sources(units=None, incidents=None, calls=None):
+    """Patch the snapshot's sources with fixed data"""
+    calls = calls or {}
+    event_log = MagicMock()
+    event_log.recent_calls = AsyncMock(return_value=list(calls))
+    event_log.snapshot = AsyncMock(side_effect=lambda client, call_id: calls[call_id])
+    registry = MagicMock()
+    registry.get_active_incidents = AsyncMock(return_value=incidents or [])
+    return [
+        patch.object(dashboard_snapshot.unit_store, "list_units", AsyncMock(return_value={"units": units or [], "count": len(units or []), "next_cursor": None})),
+        patch.object(dashboard_snapshot.unit_store, "get_unit_counts", AsyncMock(return_value={"total": len(units or [])})),
+        patch.object(dashboard_snapshot, "incident_registry", registry),
+        patch.object(dashboard_snapshot, "call_event_log", event_log)
+    ]
+
+
+class TestDashboardSnapshot:
+    """Test cases for the dashboard bootstrap snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_collects_every_source(self):
+        """Units, incidents, hospitals and recent calls with their seq"""
+        calls = {
+            "call_2": {"call_id": "call_2", "seq": 7, "status": "active", "facts": {"emergency_type": "Fire"}},
+            "call_1": {"call_id": "call_1", "seq": 3, "status": "completed", "facts": {}}
+        }
+        patches = patch_sources(units=[{"unit_id": "ENGINE_1"}], incidents=[{"case_id": "case_1"}], calls=calls)
+        for item in patches:
+            item.start()
+        try:
+            snapshot = await build_snapshot(MagicMock())
+        finally:
+            for item in patches:
+                item.stop()
+
+        assert [unit["unit_id"] for unit in snapshot["units"]] == ["ENGINE_1"]
+        assert snapshot["incidents"] == [{"case_id": "case_1"}]
+        assert snapshot["hospitals"]
+        assert [call["call_id"] for call in snapshot["calls"]] == ["call_2", "call_1"]
+        assert snapshot["seq"] == {"call_2": 7, "call_1": 3}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_build(self):
+        """Requests arriving while the snapshot is built wait for that build"""
+        cache = DashboardSnapshotCache(ttl_seconds=60)
+
+        async def slow_build(client):
+            await asyncio.sleep(0.01)
+            return {"units": [{"unit_id": "ENGINE_1"}] * 100, "seq": {"call_1": 4}}
+
+        with patch.object(dashboard_snapshot, "build_snapshot", AsyncMock(side_effect=slow_build)) as build:
+            snapshots = await asyncio.gather(*[cache.get(MagicMock()) for _ in range(10)])
+
+        assert build.await_count == 1
+        assert all(snapshot is snapshots[0] for snapshot in snapshots)
+        assert json.loads(gzip.decompress(snapshots[0].gzipped)) == json.loads(snapshots[0].body)
+        assert len(snapshots[0].gzipped) < len(snapshots[0].body)
+
+    @pytest.mark.asyncio
+    async def test_expired_snapshot_is_rebuilt_with_new_etag(self):
+        """The ETag changes with the content and stays put while it does not"""
+        cache = DashboardSnapshotCache(ttl_seconds=0)
+        states = iter([{"seq": {"call_1": 1}}, {"seq": {"call_1": 1}}, {"seq": {"call_1": 2}}])
+
+        with patch.object(dashboard_snapshot, "build_snapshot", AsyncMock(side_effect=lambda client: next(states))):
+            first = await cache.get(MagicMock())
+            same = await cache.get(MagicMock())
+            changed = await cache.get(MagicMock())
+
+        assert cache.builds == 3
+        assert first.etag == same.etag
+        assert changed.etag != first.etag
+
+    @pytest.mark.asyncio
+    async def test_etag_ignores_generation_time_and_names_the_encoding(self):
+        """Rebuilds differing only in generated_at keep the ETag; gzip has its own"""
+        cache = DashboardSnapshotCache(ttl_seconds=0)
+        states = iter([
+            {"generated_at": "2025-01-01T12:00:00", "seq": {"call_1": 1}},
+            {"generated_at": "2025-01-01T12:00:05", "seq": {"call_1": 1}}
+        ])
+
+        with patch.object(dashboard_snapshot, "build_snapshot", AsyncMock(side_effect=lambda client: next(states))):
+            first = await cache.get(MagicMock())
+            second = await cache.get(MagicMock())
+
+        assert json.loads(second.body) == {"generated_at": "2025-01-01T12:00:05", "seq": {"call_1": 1}}
+        assert first.etag == second.etag
+        assert first.gzip_etag != first.etag and first.gzip_etag.endswith('-gzip"')
@@ -0,0 +1,107 @@
+"""
+Test suite for the offline geocoder
+
+Tests coordinate, address, intersection, place and fuzzy street lookups
+against a small gazetteer, plus incident geocoding with the bundled one.
+"""
+
+import pytest
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.incident_schema import IncidentFact
+from app.services.geocoder import Geocoder, geocode_incident, split_street
+
+GAZETTEER = {
+    "streets": [
+        {"name": "Main Street", "prefix": "S", "points": [[42.28, -83.75], [42.26, -83.75]], "range": [100, 2100]},
+        {"name": "Main Street", "prefix": "N", "points": [[42.28, -83.75], [42.30, -83.75]], "range": [100, 2100]},
+        {"name": "Liberty Street", "points": [[42.27, -83.77], [42.27, -83.73]], "range": [100, 500]},
+        {"name": "Maple Road", "points": [[42.29, -83.78], [42.25, -83.78]], "range": [100, 900]}
+    ],
+    "places": [
+        {"name": "Michigan Stadium", "aliases": ["the big house"], "lat": 42.2658, "lon": -83.7487},
+        {"name": "333 Depot", "lat": 42.2876, "lon": -83.7431}
+    ]
+}
+
+
+@pytest.fixture
+def geocoder():
+    return Geocoder(GAZETTEER)
+
+
+class TestGeocoder:
+    """Test cases for the offline geocoder"""
+
+    def test_split_street(self):
+        """Direction prefixes, suffixes, unit designators and city names are separated"""
+        assert split_street("South State Street, Ann Arbor") == ("S", "state", "st")
+        assert split_street("Packard Street apartment 3B") == (None, "packard", "st")
+        assert split_street("Main") == (None, "main", None)
+
+    def test_coordinates(self, geocoder):
+        """"lat, lon" text is returned as-is"""
+        result = geocoder.geocode("42.2808, -83.7430")
+
+        assert (result.lat, result.lon, result.precision) == (42.2808, -83.743, "coordinates")
+
+    def test_address_interpolation(self, geocoder):
+        """House numbers are interpolated along the street's range, honoring the direction"""
+        result = geocoder.geocode("1100 South Main Street")
+
+        assert result.precision == "address"
+        assert result.match == "1100 S Main Street"
+        assert result.lat == pytest.approx(42.27)
+
+    def test_fuzzy_street_names(self, geocoder):
+        """Wrong suffixes and misspellings still resolve to the street"""
+        assert geocoder.geocode("500 Maple Avenue").match == "500 Maple Road"
+        assert geocoder.geocode("500 Mapel Road").match == "500 Maple Road"
+
+    def test_intersection(self, geocoder):
+        """Street pairs resolve to their crossing, worked out on first lookup"""
+        assert geocoder.crossing.cache_info().currsize == 0
+
+        result = geocoder.geocode("Main and Liberty")
+        geocoder.geocode("Liberty and Main")
+
+        assert result.precision == "intersection"
+        assert (result.lat, result.lon) == pytest.approx((42.27, -83.75))
+        assert geocoder.crossing.cache_info().currsize == 1
+
+    def test_place(self, geocoder):
+        """Named places and their aliases resolve"""
+        assert geocoder.geocode("The Big House").match == "Michigan Stadium"
+
+    def test_numbered_place_is_not_an_address(self, geocoder):
+        """Text shaped like an address with no matching street falls through to places"""
+        result = geocoder.geocode("333 Depot")
+
+        assert result.match == "333 Depot"
+        assert result.precision == "place"
+
+    def test_unresolvable(self, geocoder):
+        """Unknown text returns None"""
+        assert geocoder.geocode("somewhere by the river") is None
+
+    def test_results_are_cached(self, geocoder):
+        """Repeated lookups are served from the LRU cache"""
+        geocoder.geocode("Main and Liberty")
+        geocoder.geocode("Main and Liberty")
+
+        assert geocoder.geocode.cache_info().hits == 1
+
+    def test_geocode_incident(self):
+        """Incidents get coordinates from the bundled gazetteer before routing"""
+        incident_fact = IncidentFact(location="200 South State Street")
+
+        assert geocode_incident(incident_fact) is not None
+        assert incident_fact.get_location_coordinates() == {
+            "lat": incident_fact.latitude,
+            "lon": incident_fact.longitude
+        }
+        assert 42.2 < incident_fact.latitude < 42.35
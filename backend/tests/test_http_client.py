@@ -0,0 +1,129 @@
+"""
+Test suite for the shared HTTP client registry
+
+Tests client reuse per origin, closing clients of other event loops,
+retry rules, the retry budget and connection counting.
+"""
+
+import asyncio
+import threading
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.http_client import HTTPClientRegistry, RetryBudget
+
+
+def make_registry(*results):
+    """Registry whose shared client returns (or raises) `results` in order"""
+    registry = HTTPClientRegistry(max_retries=2)
+    client = MagicMock()
+    client.request = AsyncMock(side_effect=list(results))
+    registry.client = MagicMock(return_value=client)
+    return registry, client
+
+
+class TestHTTPClientRegistry:
+    """Test cases for the shared HTTP client registry"""
+
+    @pytest.mark.asyncio
+    async def test_client_is_shared_per_origin(self):
+        """Requests to the same origin reuse one pooled client"""
+        registry = HTTPClientRegistry()
+
+        first = registry.client("https://api.vapi.ai/call")
+        second = registry.client("https://api.vapi.ai/call/123")
+        other = registry.client("http://localhost:8000/api/units/status")
+
+        assert first is second
+        assert first is not other
+        assert registry.stats()["clients"] == 2
+
+        await registry.aclose()
+        assert first.is_closed
+
+    @pytest.mark.asyncio
+    async def test_client_of_another_loop_is_closed_on_its_loop(self):
+        """Replacing another loop's client for an origin closes it on that loop"""
+        registry = HTTPClientRegistry()
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            async def create():
+                return registry.client("https://api.vapi.ai/call")
+
+            old = asyncio.run_coroutine_threadsafe(create(), other_loop).result(1.0)
+            new = registry.client("https://api.vapi.ai/call")
+
+            assert new is not old
+            for _ in range(100):
+                if old.is_closed:
+                    break
+                await asyncio.sleep(0.01)
+            assert old.is_closed and not new.is_closed
+        finally:
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(1.0)
+            other_loop.close()
+            await registry.aclose()
+
+    @pytest.mark.asyncio
+    async def test_connect_errors_are_retried_for_post(self):
+        """Requests that never reached the server are retried for any method"""
+        registry, client = make_registry(httpx.ConnectError("refused"), MagicMock(status_code=201))
+
+        with patch("app.core.http_client.asyncio.sleep", new_callable=AsyncMock):
+            response = await registry.post("https://example.supabase.co/rest/v1/incident_logs", json={})
+
+        assert response.status_code == 201
+        assert client.request.await_count == 2
+        assert registry.stats()["retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_server_errors_only_retried_when_idempotent(self):
+        """5xx responses are retried for GET but returned as-is for POST"""
+        registry, client = make_registry(MagicMock(status_code=503), MagicMock(status_code=200))
+        with patch("app.core.http_client.asyncio.sleep", new_callable=AsyncMock):
+            response = await registry.get("http://localhost:8000/internal/hospital/status/h1")
+        assert response.status_code == 200
+
+        registry, client = make_registry(MagicMock(status_code=503))
+        response = await registry.post("https://api.vapi.ai/call", json={})
+        assert response.status_code == 503
+        assert client.request.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_read_timeout_not_retried_for_post(self):
+        """A POST that may have been processed is never sent twice"""
+        registry, client = make_registry(httpx.ReadTimeout("slow"))
+
+        with pytest.raises(httpx.ReadTimeout):
+            await registry.post("https://api.vapi.ai/call", json={})
+        assert client.request.await_count == 1
+
+    def test_retry_budget(self):
+        """Retries are capped at the floor plus a fraction of recent requests"""
+        budget = RetryBudget(ratio=0.5, min_retries=1, window_seconds=60)
+        for _ in range(4):
+            budget.record_request()
+
+        assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+        assert budget.exhausted == 1
+
+    @pytest.mark.asyncio
+    async def test_connections_opened_are_counted(self):
+        """New TCP connections reported by the trace hook are counted per minute"""
+        registry = HTTPClientRegistry()
+
+        await registry._trace("connection.connect_tcp.complete", {})
+        await registry._trace("http11.send_request_headers.complete", {})
+
+        stats = registry.stats()
+        assert stats["connections_opened"] == 1
+        assert stats["connections_per_minute"] == 1
@@ -0,0 +1,283 @@
+"""
+Test suite for the incident extraction service
+
+Tests single-call structured extraction, incremental extraction over new
+turns, the rule-based fast path, question bank selection, streamed replies,
+field validation and fallbacks.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.incident_schema import IncidentFact
+from app.services import incident_extraction_service
+from app.services.incident_extraction_service import (
+    EXTRACTION_GENERATION_CONFIG,
+    TURN_GENERATION_CONFIG,
+    apply_extraction,
+    extract_turn,
+    get_missing_incident_fields,
+    is_contradiction,
+    stream_turn,
+)
+from app.services.question_bank import get_question
+
+
+def make_model(payload):
+    """Create a mock Gemini model returning `payload` as its response text"""
+    model = MagicMock()
+    model.generate_content_async = AsyncMock(return_value=MagicMock(text=payload))
+    return model
+
+
+def make_context(turns, **facts):
+    """Create a call context holding caller turns"""
+    return {
+        "incident_fact": IncidentFact(**facts),
+        "conversation_history": [{"role": "user", "content": turn} for turn in turns],
+        "extracted_turns": 0,
+        "last_question": None
+    }
+
+
+def make_stream(*texts):
+    """Async iterable of response chunks, as returned by a streaming Gemini call"""
+    async def chunks():
+        for text in texts:
+            yield MagicMock(text=text)
+    return chunks()
+
+
+@pytest.fixture
+def call_context():
+    """Call context with a single caller turn"""
+    return make_context(["There's a fire at 123 Main Street, two people are inside"])
+
+
+class TestIncidentExtraction:
+    """Test cases for the incident extraction service"""
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_single_structured_call(self, call_context):
+        """Facts come from one async JSON call and the question from the bank"""
+        model = make_model(json.dumps({
+            "emergency_type": "Fire",
+            "location": "123 Main Street",
+            "people_involved": 2,
+            "severity": None
+        }))
+        incident_fact = call_context["incident_fact"]
+
+        question = await extract_turn(model, call_context)
+
+        assert question == get_question("severity", incident_fact)
+        assert call_context["extracted_turns"] == 1
+        assert incident_fact.emergency_type == "Fire"
+        assert incident_fact.location == "123 Main Street"
+        assert incident_fact.people_involved == 2
+        assert incident_fact.severity is None
+        model.generate_content_async.assert_awaited_once()
+        assert model.generate_content_async.await_args.kwargs["generation_config"] is EXTRACTION_GENERATION_CONFIG
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_off_script_model_question(self):
+        """Off-script turns ask the model for the next question in the same call"""
+        call_context = make_context(["There's smoke everywhere, what should I do?"])
+        model = make_model(json.dumps({
+            "emergency_type": "Fire",
+            "next_question": "Get outside and stay low. What is the address?"
+        }))
+
+        question = await extract_turn(model, call_context)
+
+        assert question == "Get outside and stay low. What is the address?"
+        assert model.generate_content_async.await_args.kwargs["generation_config"] is TURN_GENERATION_CONFIG
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_invalid_json_falls_back(self):
+        """Malformed output keeps known facts and still asks the next bank question"""
+        call_context = make_context(["There's a fire"], location="123 Main Street")
+        incident_fact = call_context["incident_fact"]
+
+        question = await extract_turn(make_model("not json"), call_context)
+
+        assert question == get_question("severity", incident_fact)
+        assert call_context["extracted_turns"] == 0  # Retried on the next turn
+        assert incident_fact.location == "123 Main Street"
+        assert incident_fact.emergency_type == "Fire"  # keyword fallback
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_sends_only_new_turns(self):
+        """Later turns send the fact state and new turns, not the whole history"""
+        call_context = make_context(
+            ["There's a fire at 123 Main Street", "My neighbors upstairs are banging on the windows and shouting"],
+            emergency_type="Fire"
+        )
+        call_context["extracted_turns"] = 1
+        call_context["last_question"] = "Is anyone else in the building?"
+        model = make_model(json.dumps({"people_involved": 3, "next_question": "Are you safe?"}))
+
+        await extract_turn(model, call_context)
+
+        prompt = model.generate_content_async.await_args.args[0]
+        assert "banging on the windows" in prompt
+        assert "123 Main Street" not in prompt
+        assert "Last question asked: Is anyone else in the building?" in prompt
+        assert call_context["incident_fact"].people_involved == 3
+        assert call_context["extracted_turns"] == 2
+        model.generate_content_async.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_rules_fast_path(self):
+        """Follow-up turns fully resolved by rules make no model call"""
+        call_context = make_context(["There's a fire", "It's 412 Maple Avenue, Ann Arbor."], emergency_type="Fire")
+        call_context["extracted_turns"] = 1
+        model = make_model("{}")
+
+        question = await extract_turn(model, call_context)
+
+        model.generate_content_async.assert_not_awaited()
+        assert call_context["incident_fact"].location == "412 Maple Avenue, Ann Arbor"
+        assert call_context["extracted_turns"] == 2
+        assert question == get_question("severity", call_context["incident_fact"])
+
+    @pytest.mark.asyncio
+    async def test_unanswered_question_is_rephrased(self):
+        """Asking for the same field again uses the next phrasing"""
+        call_context = make_context(["There's a fire", "Oh no oh no"], emergency_type="Fire")
+        call_context["extracted_turns"] = 1
+        call_context["question_attempts"] = {"location": 1}
+
+        question = await extract_turn(make_model("{}"), call_context)
+
+        assert question == get_question("location", call_context["incident_fact"], attempt=1)
+        assert call_context["question_attempts"]["location"] == 2
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_rule_conflict_uses_model(self):
+        """Rule values that contradict known facts are left to the model"""
+        call_context = make_context(["Fire at 10 Oak Street", "Sorry, it's 12 Oak Street."], location="10 Oak Street")
+        call_context["extracted_turns"] = 1
+        model = make_model(json.dumps({"next_question": "Is anyone inside?"}))
+
+        await extract_turn(model, call_context)
+
+        model.generate_content_async.assert_awaited()
+        assert call_context["incident_fact"].location == "10 Oak Street"
+
+    @pytest.mark.asyncio
+    async def test_extract_turn_contradiction_reextracts(self):
+        """A delta that changes a known location triggers one full re-extraction"""
+        call_context = make_context(
+            ["Crash at Main and Liberty", "Actually it's Main and William"],
+            emergency_type="Medical",
+            location="Main and Liberty"
+        )
+        call_context["extracted_turns"] = 1
+        model = MagicMock()
+        model.generate_content_async = AsyncMock(side_effect=[
+            MagicMock(text=json.dumps({"location": "Main and William", "next_question": "Is anyone hurt?"})),
+            MagicMock(text=json.dumps({
+                "emergency_type": "Medical",
+                "location": "Main and William",
+                "next_question": "How many people are hurt?"
+            }))
+        ])
+
+        question = await extract_turn(model, call_context)
+
+        assert model.generate_content_async.await_count == 2
+        full_prompt = model.generate_content_async.await_args_list[1].args[0]
+        assert "Crash at Main and Liberty" in full_prompt
+        assert call_context["incident_fact"].location == "Main and William"
+        assert question == get_question("severity", call_context["incident_fact"])
+
+    @pytest.mark.asyncio
+    async def test_stream_turn_streams_off_script_reply(self):
+        """Off-script replies are streamed while facts come from a separate extraction call"""
+        call_context = make_context(["There's a fire", "The smoke is getting really thick near the stairs, what should I do?"])
+        call_context["extracted_turns"] = 1
+        extraction = MagicMock(text=json.dumps({"severity": "High"}))
+        model = MagicMock()
+        model.generate_content_async = AsyncMock(side_effect=lambda prompt, **kwargs: (
+            make_stream("Get low and ", "leave now. ", "What is the address?") if kwargs.get("stream") else extraction
+        ))
+
+        chunks = [text async for text in stream_turn(model, call_context)]
+
+        assert chunks == ["Get low and ", "leave now. ", "What is the address?"]
+        assert call_context["last_question"] == "Get low and leave now. What is the address?"
+        assert call_context["incident_fact"].severity == "High"
+        extraction_kwargs = [call.kwargs for call in model.generate_content_async.await_args_list if not call.kwargs.get("stream")]
+        assert extraction_kwargs[0]["generation_config"] is EXTRACTION_GENERATION_CONFIG
+
+    @pytest.mark.asyncio
+    async def test_stream_turn_falls_back_to_bank_question(self):
+        """A failed stream yields the bank question instead"""
+        call_context = make_context(["There's a fire", "Should I go back in for my cat?"], emergency_type="Fire")
+        call_context["extracted_turns"] = 1
+        async def generate(prompt, **kwargs):
+            if kwargs.get("stream"):
+                raise RuntimeError("stream failed")
+            return MagicMock(text="{}")
+
+        model = MagicMock()
+        model.generate_content_async = AsyncMock(side_effect=generate)
+
+        chunks = [text async for text in stream_turn(model, call_context)]
+
+        assert chunks == [get_question("location", call_context["incident_fact"])]
+
+    @pytest.mark.asyncio
+    async def test_streamed_off_script_turns_count_as_model_turns(self, monkeypatch):
+        """A streamed question uses the model even when the rules handle extraction"""
+        metrics = incident_extraction_service.TurnMetrics()
+        monkeypatch.setattr(incident_extraction_service, "turn_metrics", metrics)
+        monkeypatch.setattr(incident_extraction_service, "apply_rules", lambda *args: False)
+        call_context = make_context(["There's a fire", "Should I go back in for my cat?"], emergency_type="Fire")
+        call_context["extracted_turns"] = 1
+        model = MagicMock()
+        model.generate_content_async = AsyncMock(side_effect=lambda prompt, **kwargs: make_stream("Stay outside. "))
+
+        chunks = [text async for text in stream_turn(model, call_context)]
+
+        assert chunks == ["Stay outside. "]
+        assert model.generate_content_async.await_count == 1
+        assert metrics.snapshot()["no_llm_fraction"] == 0.0
+
+    def test_is_contradiction(self):
+        """Only changes to known dispatch facts, or an explicit flag, are contradictions"""
+        incident_fact = IncidentFact(location="123 Main Street", severity="Medium")
+
+        assert not is_contradiction(incident_fact, {"location": "123 main street "})
+        assert not is_contradiction(incident_fact, {"severity": "High", "emergency_type": "Fire"})
+        assert is_contradiction(incident_fact, {"location": "125 Main Street"})
+        assert is_contradiction(incident_fact, {"contradiction": True})
+
+    def test_apply_extraction_validates_values(self):
+        """Out-of-schema values and nulls never overwrite known facts"""
+        incident_fact = IncidentFact(severity="High", location="123 Main Street")
+
+        changed = apply_extraction(incident_fact, {
+            "severity": "Extreme",
+            "location": None,
+            "people_involved": True,
+            "caller_safe": False
+        })
+
+        assert changed == ["is_caller_safe"]
+        assert incident_fact.severity == "High"
+        assert incident_fact.location == "123 Main Street"
+        assert incident_fact.people_involved == 1
+
+    def test_missing_fields_in_priority_order(self):
+        """Missing fields are ordered by how urgently they are needed"""
+        incident_fact = IncidentFact(description="Smoke in kitchen", is_caller_safe=True)
+
+        assert get_missing_incident_fields(incident_fact) == ["emergency_type", "location", "severity"]
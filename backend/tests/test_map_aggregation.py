@@ -0,0 +1,193 @@
+"""
+Test suite for the map aggregation service
+
+Tests the GEO score encoding against Redis, cell score ranges, grid
+selection by zoom, points versus clusters and heat bins, dropping expired
+units, view caching, the expired-unit sweep and the ETag of the map
+endpoint.
+"""
+
+import asyncio
+import bisect
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.map_router import view_etag
+from app.services.map_aggregation import (
+    GEO_LAT_MAX,
+    GEO_LAT_MIN,
+    GEO_LON_MAX,
+    GEO_LON_MIN,
+    MapAggregator,
+    _index,
+    cell_range,
+    geo_score,
+    grid_for_view,
+    score_position
+)
+
+
+def make_client(points, details=None):
+    """
+    Mock redis.asyncio client over a GEO index of `points` ({member: (lat, lon)}).
+
+    Pipelined ZCOUNT and ZRANGEBYSCORE answer from the sorted scores, the way
+    Redis answers them from the GEO sorted set.
+    """
+    index = sorted((geo_score(lat, lon), member) for member, (lat, lon) in points.items())
+    scores = [score for score, _ in index]
+
+    def in_range(low, high):
+        return index[bisect.bisect_left(scores, low):bisect.bisect_left(scores, int(high.lstrip("(")))]
+
+    def pipeline(transaction=False):
+        pipe = MagicMock()
+        queued = []
+        pipe.zcount.side_effect = lambda key, low, high: queued.append(len(in_range(low, high)))
+        pipe.zrangebyscore.side_effect = lambda key, low, high, start=None, num=None, withscores=False: queued.append(
+            [(member, float(score)) for score, member in in_range(low, high)][start or 0:(start or 0) + num if num else None]
+        )
+        pipe.hmget.side_effect = lambda key, *fields: queued.append((details or {}).get(key.split(":", 1)[1], [None, None]))
+        pipe.execute = AsyncMock(side_effect=lambda: list(queued))
+        return pipe
+
+    client = MagicMock()
+    client.pipeline.side_effect = pipeline
+    client.mget = AsyncMock(side_effect=lambda keys: [None] * len(keys))
+    return client
+
+
+class TestMapAggregation:
+    """Test cases for the map aggregation service"""
+
+    def test_geo_score_matches_redis(self):
+        """Scores match what GEOADD stores (values from the Redis GEORADIUS documentation)"""
+        assert geo_score(38.115556, 13.361389) == 3479099956230698
+        assert geo_score(37.502669, 15.087269) == 3479447370796909
+
+        lat, lon = score_position(geo_score(42.2808, -83.7430))
+        assert abs(lat - 42.2808) < 1e-5 and abs(lon + 83.7430) < 1e-5
+
+    def test_points_fall_in_their_cell_range(self):
+        """A point's score lies inside the score range of its cell at every resolution"""
+        lat, lon = 42.2808, -83.7430
+        score = geo_score(lat, lon)
+        for bits in (1, 8, 14, 20, 26):
+            cell = (_index(lon, GEO_LON_MIN, GEO_LON_MAX, bits), _index(lat, GEO_LAT_MIN, GEO_LAT_MAX, bits))
+            low, high = cell_range(*cell, bits)
+            assert low <= score < high
+
+    def test_grid_follows_zoom_and_cell_limit(self):
+        """Finer cells at higher zoom, coarsened to stay within the cell limit"""
+        bbox = (-83.80, 42.25, -83.70, 42.30)
+        coarse_bits, _ = grid_for_view(bbox, 10, max_cells=1024)
+        fine_bits, fine_cells = grid_for_view(bbox, 15, max_cells=1024)
+        assert fine_bits > coarse_bits
+        assert len(fine_cells) <= 1024
+
+        limited_bits, limited_cells = grid_for_view(bbox, 15, max_cells=16)
+        assert limited_bits < fine_bits and len(limited_cells) <= 16
+
+    @pytest.mark.asyncio
+    async def test_small_views_return_points_with_details(self):
+        """Below the point limit every unit in the box is returned with its type and status"""
+        points = {"ENGINE_1": (42.2808, -83.7430), "MEDIC_2": (42.2790, -83.7410), "FAR_3": (42.5, -83.2)}
+        client = make_client(points, {"ENGINE_1": ["FIRE", "available"], "MEDIC_2": ["EMS", "enroute"]})
+        aggregator = MapAggregator(max_cells=1024, point_limit=100, cache_seconds=0)
+
+        view = await aggregator.view(client, (-83.76, 42.27, -83.73, 42.29), 15, ["units"])
+
+        layer = view["layers"]["units"]
+        assert {point["id"]: point["type"] for point in layer["points"]} == {"ENGINE_1": "FIRE", "MEDIC_2": "EMS"}
+        assert layer["clusters"] == []
+        assert sum(count for _, _, count in layer["heat"]) == layer["total"] == 2
+
+    @pytest.mark.asyncio
+    async def test_large_views_return_clusters(self):
+        """Above the point limit cells become clusters placed on a member, with heat bins"""
+        points = {f"unit_{index}": (42.28 + index * 1e-5, -83.74) for index in range(50)}
+        points["lone"] = (42.20, -83.60)
+        client = make_client(points, {"lone": ["EMS", "available"]})
+        aggregator = MapAggregator(max_cells=1024, point_limit=10, cache_seconds=0)
+
+        view = await aggregator.view(client, (-83.80, 42.15, -83.55, 42.35), 11, ["units"])
+
+        layer = view["layers"]["units"]
+        assert layer["total"] == 51
+        assert sum(cluster["count"] for cluster in layer["clusters"]) == 50
+        assert [point["id"] for point in layer["points"]] == ["lone"]
+        cluster = layer["clusters"][0]
+        assert 42.28 <= cluster["lat"] <= 42.2805 and abs(cluster["lon"] + 83.74) < 1e-5
+
+    @pytest.mark.asyncio
+    async def test_views_are_cached_briefly(self):
+        """Repeated requests for the same view within the cache lifetime reuse it"""
+        client = make_client({"ENGINE_1": (42.2808, -83.7430)})
+        aggregator = MapAggregator(max_cells=64, point_limit=100, cache_seconds=60)
+        bbox = (-83.76, 42.27, -83.73, 42.29)
+
+        first = await aggregator.view(client, bbox, 14, ["units"])
+        calls = client.pipeline.call_count
+        assert await aggregator.view(client, bbox, 14, ["units"]) == first
+        assert client.pipeline.call_count == calls
+
+    @pytest.mark.asyncio
+    async def test_cached_views_echo_the_requested_zoom(self):
+        """Zooms within one level share the cached view but each response has its own zoom"""
+        client = make_client({"ENGINE_1": (42.2808, -83.7430)})
+        aggregator = MapAggregator(max_cells=64, point_limit=100, cache_seconds=60)
+        bbox = (-83.76, 42.27, -83.73, 42.29)
+
+        first = await aggregator.view(client, bbox, 14.2, ["units"])
+        second = await aggregator.view(client, bbox, 14.8, ["units"])
+
+        assert (first["zoom"], second["zoom"]) == (14.2, 14.8)
+        assert second["layers"] == first["layers"]
+
+    @pytest.mark.asyncio
+    async def test_expired_units_are_dropped(self):
+        """Index entries whose unit hash is gone are neither shown nor counted"""
+        points = {"ENGINE_1": (42.2808, -83.7430), "EXPIRED_2": (42.2790, -83.7410)}
+        client = make_client(points, {"ENGINE_1": ["FIRE", "available"]})
+        aggregator = MapAggregator(max_cells=1024, point_limit=100, cache_seconds=0)
+
+        view = await aggregator.view(client, (-83.76, 42.27, -83.73, 42.29), 15, ["units"])
+
+        layer = view["layers"]["units"]
+        assert [point["id"] for point in layer["points"]] == ["ENGINE_1"]
+        assert sum(count for _, _, count in layer["heat"]) == layer["total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_views_start_a_periodic_sweep(self, monkeypatch):
+        """A view started after MAP_SWEEP_SECONDS prunes expired units in the background, once"""
+        prune = AsyncMock(return_value=3)
+        monkeypatch.setattr("app.services.map_aggregation.unit_store.prune_expired_units", prune)
+        client = make_client({})
+        aggregator = MapAggregator(max_cells=64, point_limit=100, cache_seconds=0, sweep_seconds=300)
+        bbox = (-83.76, 42.27, -83.73, 42.29)
+
+        await aggregator.view(client, bbox, 14, ["units"])
+        assert aggregator._sweep_task is None
+
+        aggregator._last_sweep -= 300
+        await aggregator.view(client, bbox, 14, ["units"])
+        await aggregator.view(client, bbox, 14, ["units"])
+        await asyncio.sleep(0)
+
+        prune.assert_awaited_once_with(client)
+
+    @pytest.mark.asyncio
+    async def test_unknown_layer(self):
+        """Only units and incidents can be aggregated"""
+        with pytest.raises(ValueError):
+            await MapAggregator().view(make_client({}), (-84, 42, -83, 43), 10, ["hydrants"])
+
+    def test_etag_tracks_content(self):
+        """Identical views share an ETag and changed views get a new one"""
+        assert view_etag('{"a":1}') == view_etag('{"a":1}')
+        assert view_etag('{"a":1}') != view_etag('{"a":2}')
@@ -0,0 +1,119 @@
+"""
+Test suite for the local outbox
+
+Tests idempotent recording, delivery, retry with backoff, dead-lettering,
+durability across reopening and the replay task.
+"""
+
+import asyncio
+import sqlite3
+import pytest
+from unittest.mock import AsyncMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.outbox import Outbox, backoff_delay
+
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return str(tmp_path / "outbox.db")
+
+
+def entry_state(path, key):
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT status, attempts, next_attempt_at, last_error FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+
+
+class TestOutbox:
+    """Test cases for the local outbox"""
+
+    @pytest.mark.asyncio
+    async def test_entries_are_delivered_once_per_key(self, outbox_path):
+        """A key is delivered once, even if it is recorded again afterwards"""
+        outbox = Outbox(outbox_path)
+        handler = AsyncMock(return_value=True)
+        outbox.register("notification", handler)
+
+        assert await outbox.add("notification", "n1", {"case_id": "case_1"}) is True
+        assert await outbox.add("notification", "n1", {"case_id": "case_1"}) is False
+        await outbox.replay_once()
+        assert await outbox.add("notification", "n1", {"case_id": "case_1"}) is False
+        await outbox.replay_once()
+
+        handler.assert_awaited_once_with({"case_id": "case_1"})
+        assert outbox.stats()["delivered"] == 1 and outbox.stats()["duplicates_ignored"] == 2
+        outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_failures_back_off_then_dead_letter(self, outbox_path):
+        """Failed deliveries are rescheduled, then kept as dead after max_attempts"""
+        outbox = Outbox(outbox_path, base_delay=0.0, max_attempts=3)
+        outbox.register("incident_logs", AsyncMock(side_effect=[False, RuntimeError("timeout"), False]))
+        await outbox.add("incident_logs", "batch_1", [{"idempotency_key": "a"}])
+
+        await outbox.replay_once()
+        assert entry_state(outbox_path, "batch_1")[:2] == ("pending", 1)
+        await outbox.replay_once()
+        assert entry_state(outbox_path, "batch_1")[3] == "timeout"
+        await outbox.replay_once()
+
+        assert entry_state(outbox_path, "batch_1")[:2] == ("dead", 3)
+        assert outbox.stats()["dead"] == 1 and outbox.stats()["retries"] == 2
+        outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_waits_for_backoff(self, outbox_path):
+        """An entry is not retried before its next attempt time"""
+        outbox = Outbox(outbox_path, base_delay=60.0)
+        handler = AsyncMock(return_value=False)
+        outbox.register("notification", handler)
+        await outbox.add("notification", "n1", {})
+
+        await outbox.replay_once()
+        await outbox.replay_once()
+
+        assert handler.await_count == 1
+        outbox.close()
+
+    @pytest.mark.asyncio
+    async def test_pending_entries_survive_reopening(self, outbox_path):
+        """Entries recorded before a restart are replayed by the next process"""
+        first = Outbox(outbox_path)
+        await first.add("notification", "n1", {"case_id": "case_1"})
+        first.close()
+
+        second = Outbox(outbox_path)
+        handler = AsyncMock(return_value=True)
+        second.register("notification", handler)
+        await second.replay_once()
+
+        handler.assert_awaited_once_with({"case_id": "case_1"})
+        second.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_task_delivers_new_entries_promptly(self, outbox_path):
+        """Recording an entry wakes the replay task instead of waiting for the poll"""
+        outbox = Outbox(outbox_path, poll_interval=30.0)
+        delivered = asyncio.Event()
+
+        async def handler(payload):
+            delivered.set()
+            return True
+
+        outbox.register("notification", handler)
+        outbox.start()
+        await asyncio.sleep(0.05)
+        await outbox.add("notification", "n1", {})
+
+        await asyncio.wait_for(delivered.wait(), 1.0)
+        await outbox.stop()
+
+    def test_backoff_grows_and_is_capped(self):
+        """Delays double per attempt, jittered within their upper half, up to the cap"""
+        assert 0.5 <= backoff_delay(1, 1.0, 300.0) <= 1.0
+        assert 4.0 <= backoff_delay(4, 1.0, 300.0) <= 8.0
+        assert 150.0 <= backoff_delay(20, 1.0, 300.0) <= 300.0
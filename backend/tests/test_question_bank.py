@@ -0,0 +1,70 @@
+"""
+Test suite for the question bank
+
+Tests question lookup by missing field, emergency type and urgency.
+"""
+
+import pytest
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.incident_schema import IncidentFact
+from app.services.question_bank import (
+    BANK_FIELDS,
+    BANK_TYPES,
+    CRITICAL,
+    STANDARD,
+    get_question,
+    get_urgency,
+    is_off_script,
+)
+
+
+class TestQuestionBank:
+    """Test cases for the question bank"""
+
+    def test_every_field_and_type_has_a_question(self):
+        """Fallbacks cover every missing field for every emergency type"""
+        for field in BANK_FIELDS:
+            for emergency_type in BANK_TYPES:
+                assert get_question(field, IncidentFact(emergency_type=emergency_type))
+
+    def test_type_specific_question(self):
+        """Emergency type selects a specific phrasing when one exists"""
+        medical = get_question("severity", IncidentFact(emergency_type="Medical"))
+        other = get_question("severity", IncidentFact(emergency_type="Other"))
+
+        assert "breathing" in medical
+        assert medical != other
+
+    def test_urgency(self):
+        """Critical severity, active threats and unsafe callers are critical"""
+        assert get_urgency(IncidentFact()) == STANDARD
+        assert get_urgency(IncidentFact(severity="Critical")) == CRITICAL
+        assert get_urgency(IncidentFact(is_caller_safe=False)) == CRITICAL
+        assert get_question("location", IncidentFact(emergency_type="Police", is_caller_safe=False)).startswith("Stay")
+
+    def test_attempts_rotate_phrasings(self):
+        """Repeated asks for the same field are rephrased"""
+        incident_fact = IncidentFact(emergency_type="Fire")
+
+        assert get_question("location", incident_fact, 0) != get_question("location", incident_fact, 1)
+        assert get_question("location", incident_fact, 0) == get_question("location", incident_fact, 2)
+
+    def test_safety_questions_mention_safety(self):
+        """Yes/no answers to safety questions are resolved by the rule extractor"""
+        for emergency_type in BANK_TYPES:
+            for attempt in range(2):
+                assert "safe" in get_question("caller_safety", IncidentFact(emergency_type=emergency_type), attempt).lower()
+
+    @pytest.mark.parametrize("text,expected", [
+        ("It's 412 Maple Avenue.", False),
+        ("How long until they get here?", True),
+        ("What should I do about the smoke", True),
+    ])
+    def test_is_off_script(self, text, expected):
+        """Caller questions and requests for guidance are off script"""
+        assert is_off_script(text) is expected
@@ -0,0 +1,260 @@
+"""
+Test suite for the Redis Loader
+
+Tests bulk pipelined loading, single-pass index construction, streaming
+loads of large history files and their limits, and history retention.
+"""
+
+import pytest
+import json
+from unittest.mock import MagicMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.unit_store import UNIT_GEO_KEY
+from app.services.unit_history_service import UNIT_HISTORY_RETENTION_SECONDS
+from utils.redis_loader import RedisLoader
+
+
+@pytest.fixture
+def mock_pipeline():
+    """Create a mock Redis pipeline"""
+    pipe = MagicMock()
+    pipe.execute.return_value = []
+    return pipe
+
+
+@pytest.fixture
+def loader(mock_pipeline):
+    """Create a RedisLoader with a mocked Redis client"""
+    loader = RedisLoader(redis_url="redis://localhost:6379/0")
+    loader.redis_client = MagicMock()
+    loader.redis_client.pipeline.return_value = mock_pipeline
+    return loader
+
+
+@pytest.fixture
+def sample_data():
+    """Sample historical unit data"""
+    return {
+        "units": [
+            {
+                "unit_id": "police_01",
+                "type": "POLICE",
+                "status_history": [
+                    {"timestamp": "2025-09-28T07:48:47", "status": "available", "location": [42.31, -83.83]},
+                    {"timestamp": "2025-09-28T07:51:51", "status": "enroute", "location": [42.25, -83.79]}
+                ]
+            },
+            {
+                "unit_id": "fire_01",
+                "type": "FIRE",
+                "status_history": [
+                    {"timestamp": "2025-09-28T07:49:00", "status": "available", "location": [42.28, -83.74]}
+                ]
+            },
+            {
+                "unit_id": "hospital_01",
+                "type": "HOSPITAL",
+                "name": "Hospital 01",
+                "location": [42.29, -83.84],
+                "er_capacity": 87,
+                "last_updated": "2025-09-28T07:53:47"
+            }
+        ]
+    }
+
+
+class TestRedisLoader:
+    """Test cases for the Redis loader"""
+
+    @pytest.mark.asyncio
+    async def test_load_all_units_single_round_trip_per_chunk(self, loader, mock_pipeline, sample_data):
+        """All units in a chunk are written with one pipeline execute"""
+        stats = await loader.load_all_units(sample_data, chunk_size=10)
+
+        assert stats["loaded"] == 3
+        assert stats["errors"] == 0
+        assert stats["chunks"] == 1
+        assert "units_per_second" in stats
+        mock_pipeline.execute.assert_called_once()
+        assert mock_pipeline.hset.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_load_all_units_chunks(self, loader, mock_pipeline, sample_data):
+        """Units are split across pipelines by chunk size"""
+        stats = await loader.load_all_units(sample_data, chunk_size=2)
+
+        assert stats["chunks"] == 2
+        assert mock_pipeline.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_load_builds_type_and_geo_indexes(self, loader, mock_pipeline, sample_data):
+        """Type, status and GEO indexes are written in the loading pass"""
+        await loader.load_all_units(sample_data)
+
+        sadd_calls = [call.args for call in mock_pipeline.sadd.call_args_list]
+        assert ("units:police", "police_01") in sadd_calls
+        assert ("units:fire", "fire_01") in sadd_calls
+        assert ("units:hospital", "hospital_01") in sadd_calls
+        assert ("units:status:enroute", "police_01") in sadd_calls
+
+        geo_calls = [call.args for call in mock_pipeline.geoadd.call_args_list]
+        # Latest police location, stored as lon, lat, member
+        assert (UNIT_GEO_KEY, [-83.79, 42.25, "police_01"]) in geo_calls
+
+        # No keyspace scans during load
+        loader.redis_client.keys.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_load_counts_invalid_units_as_errors(self, loader, mock_pipeline):
+        """Malformed units are reported without aborting the load"""
+        data = {"units": [{"unit_id": "broken"}]}
+
+        stats = await loader.load_all_units(data)
+
+        assert stats["loaded"] == 0
+        assert stats["errors"] == 1
+        mock_pipeline.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_load_reports_failed_chunk(self, loader, mock_pipeline, sample_data):
+        """Redis command failures mark the chunk as failed"""
+        mock_pipeline.execute.return_value = [Exception("OOM")]
+
+        stats = await loader.load_all_units(sample_data)
+
+        assert stats["loaded"] == 0
+        assert stats["errors"] == 3
+
+    @pytest.mark.asyncio
+    async def test_create_indexes_uses_scan(self, loader, mock_pipeline):
+        """Index rebuild scans the keyspace instead of using KEYS"""
+        loader.redis_client.scan_iter.return_value = iter(["unit:police_01", "unit:fire_01"])
+        mock_pipeline.execute.side_effect = [
+            [
+                ["police_01", "POLICE", "available", "42.25", "-83.79"],
+                ["fire_01", "FIRE", "dispatched", "42.28", "-83.74"]
+            ],
+            []
+        ]
+
+        await loader.create_indexes()
+
+        loader.redis_client.keys.assert_not_called()
+        sadd_calls = [call.args for call in mock_pipeline.sadd.call_args_list]
+        assert ("units:police", "police_01") in sadd_calls
+        assert ("units:status:dispatched", "fire_01") in sadd_calls
+
+
+class TestStreamingLoader:
+    """Test cases for the streaming loader"""
+
+    @pytest.fixture
+    def data_file(self, tmp_path, sample_data):
+        """Write sample data to a file with extra top-level keys"""
+        path = tmp_path / "units.json"
+        path.write_text(json.dumps({"generated_at": "2025-09-28T07:53:47", **sample_data}, indent=2))
+        return str(path)
+
+    def test_iter_units_matches_full_parse(self, loader, data_file, sample_data):
+        """Incremental parsing yields the same units across tiny reads"""
+        units = list(loader.iter_units_from_file(data_file, read_size=5))
+
+        assert units == sample_data["units"]
+
+    def test_iter_units_empty_array(self, loader, tmp_path):
+        """Files without units yield nothing"""
+        path = tmp_path / "empty.json"
+        path.write_text('{"units": [], "generated_at": "2025"}')
+
+        assert list(loader.iter_units_from_file(str(path))) == []
+
+    def test_iter_units_invalid_json(self, loader, tmp_path):
+        """Truncated files raise a JSON decode error"""
+        path = tmp_path / "broken.json"
+        path.write_text('{"units": [{"unit_id": "police_01"')
+
+        with pytest.raises(json.JSONDecodeError):
+            list(loader.iter_units_from_file(str(path)))
+
+    def test_iter_units_skips_other_values_without_decoding(self, loader, tmp_path, sample_data, monkeypatch):
+        """Top-level values other than units are scanned past, brackets and escapes in strings included"""
+        path = tmp_path / "units.json"
+        other = {"notes": ['a "quoted" ] } \\', {"nested": [1, 2, {"deep": "}"}]}], "count": 3}
+        path.write_text(json.dumps({"meta": other, "label": "x\\\"y", **sample_data, "trailer": [other] * 3}))
+        decoded = []
+
+        def raw_decode(text, pos):
+            value, end = json.JSONDecoder().raw_decode(text, pos)
+            decoded.append(value)
+            return value, end
+
+        decoder = MagicMock()
+        decoder.raw_decode.side_effect = raw_decode
+        monkeypatch.setattr("utils.redis_loader._json_decoder", decoder)
+
+        assert list(loader.iter_units_from_file(str(path), read_size=3)) == sample_data["units"]
+        # Only keys and units were decoded
+        assert decoded == ["meta", "label", "units", *sample_data["units"], "trailer"]
+
+    def test_iter_units_numbers_split_across_reads(self, loader, tmp_path, sample_data):
+        """Numbers cut after "." or "e" by a read boundary are completed, not decoded as their prefix"""
+        path = tmp_path / "units.json"
+        path.write_text('{"version": 1.5, "scale": -2.5e-3, "units": %s, "count": 1E+10, "ratio": 0.125}' % json.dumps(sample_data["units"]))
+
+        for read_size in range(1, 24):
+            assert list(loader.iter_units_from_file(str(path), read_size=read_size)) == sample_data["units"]
+
+    def test_iter_units_rejects_oversized_values(self, loader, tmp_path):
+        """A unit that does not fit within max_value_size raises instead of buffering on"""
+        path = tmp_path / "huge.json"
+        path.write_text(json.dumps({"units": [{"unit_id": "police_01", "notes": "x" * 10000}]}))
+
+        with pytest.raises(json.JSONDecodeError, match="larger than"):
+            list(loader.iter_units_from_file(str(path), read_size=64, max_value_size=1000))
+        assert len(list(loader.iter_units_from_file(str(path), read_size=64, max_value_size=20000))) == 1
+
+    @pytest.mark.asyncio
+    async def test_load_units_streaming(self, loader, mock_pipeline, data_file):
+        """Streaming load writes every unit in bounded chunks"""
+        stats = await loader.load_units_streaming(data_file, chunk_size=2, concurrency=2)
+
+        assert stats["loaded"] == 3
+        assert stats["errors"] == 0
+        assert stats["chunks"] == 2
+        mock_pipeline.xadd.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_load_units_streaming_with_history(self, loader, mock_pipeline, data_file):
+        """Status histories are written to per-unit streams in time order"""
+        await loader.load_units_streaming(data_file, write_history=True)
+
+        mock_pipeline.delete.assert_any_call("history:unit:police_01")
+        xadd_calls = [call for call in mock_pipeline.xadd.call_args_list if call.args[0] == "history:unit:police_01"]
+        assert [call.args[1]["status"] for call in xadd_calls] == ["available", "enroute"]
+        first_ms = int(xadd_calls[0].kwargs["id"].split("-")[0])
+        second_ms = int(xadd_calls[1].kwargs["id"].split("-")[0])
+        assert second_ms > first_ms
+        mock_pipeline.expire.assert_any_call("history:unit:police_01", UNIT_HISTORY_RETENTION_SECONDS)
+
+    def test_queue_status_history_keeps_samples_with_equal_timestamps(self, loader, mock_pipeline):
+        """Samples sharing a timestamp are all written, in file order, with distinct IDs"""
+        unit = {
+            "unit_id": "police_01",
+            "type": "POLICE",
+            "status_history": [
+                {"timestamp": "2025-09-28T07:51:51", "status": "enroute", "location": [42.25, -83.79]},
+                {"timestamp": "2025-09-28T07:48:47", "status": "available", "location": [42.31, -83.83]},
+                {"timestamp": "2025-09-28T07:51:51", "status": "on_scene", "location": [42.26, -83.78]}
+            ]
+        }
+
+        loader.queue_status_history(mock_pipeline, unit)
+
+        xadd_calls = mock_pipeline.xadd.call_args_list
+        assert [call.args[1]["status"] for call in xadd_calls] == ["available", "enroute", "on_scene"]
+        assert len({call.kwargs["id"] for call in xadd_calls}) == 3
@@ -39,6 +39,26 @@ class MockRedisClient:
         unit_type = key.split(':')[1]
         return self.unit_types.get(unit_type, set())
     
+    def sinter(self, type_key, status_key):
+        """Mock sinter of a type set and a status set (status read from the unit hash)"""
+        status = status_key.split(':')[-1]
+        return {
+            unit_id for unit_id in self.smembers(type_key)
+            if self.units.get(f'unit:{unit_id}', {}).get('status') == status
+        }
+    
+    def sadd(self, key, *members):
+        """Mock sadd; status sets are derived from unit hashes"""
+        return len(members)
+    
+    def srem(self, key, *members):
+        """Mock srem; status sets are derived from unit hashes"""
+        return 0
+    
+    def pipeline(self, transaction=True):
+        """Mock pipeline that replays queued commands on execute"""
+        return MockPipeline(self)
+    
     def hgetall(self, key):
         """Mock hgetall for unit data"""
         return self.units.get(key, {})
@@ -53,6 +73,14 @@ class MockRedisClient:
         self.units[key].update(kwargs)
         return 1
     
+    def eval(self, script, numkeys, *keys_and_args):
+        """Mock of the unit store's status update script"""
+        key, status, last_updated = keys_and_args[0], keys_and_args[numkeys + 1], keys_and_args[numkeys + 2]
+        if key not in self.units:
+            return 0
+        self.units[key].update({'status': status, 'last_updated': last_updated})
+        return 1
+    
     def publish(self, channel, message):
         """Mock publish for logging"""
         self.published_logs.append({
@@ -66,6 +94,20 @@ class MockRedisClient:
         """Mock ping"""
         return True
 
+class MockPipeline:
+    """Mock Redis pipeline"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+    
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: self.commands.append((method, args, kwargs))
+    
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.commands]
+
 @pytest.fixture
 def mock_redis():
     """Create a mock Redis client"""
@@ -86,28 +128,32 @@ def sample_units():
             'unit_id': 'police_01',
             'type': 'POLICE',
             'status': 'available',
-            'location': json.dumps([42.2808, -83.7430]),  # Ann Arbor center
+            'lat': '42.2808',
+            'lon': '-83.7430',  # Ann Arbor center
             'last_updated': datetime.now().isoformat()
         },
         'unit:police_02': {
             'unit_id': 'police_02',
             'type': 'POLICE',
             'status': 'available',
-            'location': json.dumps([42.2900, -83.7500]),  # Slightly north
+            'lat': '42.2900',
+            'lon': '-83.7500',  # Slightly north
             'last_updated': datetime.now().isoformat()
         },
         'unit:police_03': {
             'unit_id': 'police_03',
             'type': 'POLICE',
             'status': 'enroute',  # Not available
-            'location': json.dumps([42.2700, -83.7300]),
+            'lat': '42.2700',
+            'lon': '-83.7300',
             'last_updated': datetime.now().isoformat()
         },
         'unit:fire_01': {
             'unit_id': 'fire_01',
             'type': 'FIRE',
             'status': 'available',
-            'location': json.dumps([42.2750, -83.7400]),
+            'lat': '42.2750',
+            'lon': '-83.7400',
             'last_updated': datetime.now().isoformat()
         }
     }
@@ -162,7 +208,7 @@ class TestRouterAgent:
         """Test getting available units from Redis"""
         # Setup mock data
         mock_redis.units = sample_units
-        mock_redis.unit_types['police'] = {'unit:police_01', 'unit:police_02', 'unit:police_03'}
+        mock_redis.unit_types['police'] = {'police_01', 'police_02', 'police_03'}
         
         # Test getting available police units
         available_units = await router_agent.get_available_units('POLICE')
@@ -194,7 +240,7 @@ class TestRouterAgent:
         for unit_data in sample_units.values():
             if unit_data['status'] == 'available':
                 unit = unit_data.copy()
-                unit['location'] = json.loads(unit['location'])
+                unit['location'] = [float(unit['lat']), float(unit['lon'])]
                 units.append(unit)
         
         # Test location (Ann Arbor center)
@@ -231,6 +277,14 @@ class TestRouterAgent:
         assert mock_redis.units['unit:police_01']['status'] == 'enroute'
         assert 'last_updated' in mock_redis.units['unit:police_01']
     
+    @pytest.mark.asyncio
+    async def test_update_unit_status_missing_unit(self, router_agent, mock_redis):
+        """A unit whose hash has expired is not recreated by a status update"""
+        success = await router_agent.update_unit_status('police_99', 'enroute')
+        
+        assert success is False
+        assert 'unit:police_99' not in mock_redis.units
+    
     @pytest.mark.asyncio
     async def test_publish_log(self, router_agent, mock_redis):
         """Test publishing log to Redis"""
@@ -247,14 +301,17 @@ class TestRouterAgent:
         published_log = mock_redis.published_logs[0]
         
         assert published_log['channel'] == 'log_queue'
-        assert json.loads(published_log['message']) == log_data
+        message = json.loads(published_log['message'])
+        # Each published log gets an ID for the Comms Agent's idempotency key
+        assert message.pop('message_id')
+        assert message == log_data
     
     @pytest.mark.asyncio
     async def test_process_incident_success(self, router_agent, mock_redis, sample_units, sample_incident):
         """Test successful incident processing"""
         # Setup mock data
         mock_redis.units = sample_units
-        mock_redis.unit_types['fire'] = {'unit:fire_01'}
+        mock_redis.unit_types['fire'] = {'fire_01'}
         
         # Process incident
         await router_agent.process_incident(sample_incident)
@@ -309,7 +366,7 @@ class TestRouterAgent:
             
             # Setup units for this type
             mock_redis.units = sample_units
-            mock_redis.unit_types[expected_unit_type.lower()] = {f'unit:{expected_unit_type.lower()}_01'}
+            mock_redis.unit_types[expected_unit_type.lower()] = {f'{expected_unit_type.lower()}_01'}
             
             # Clear previous logs
             mock_redis.published_logs = []
@@ -146,7 +146,7 @@ class TestRouterAgent:
     @pytest.mark.asyncio
     async def test_update_unit_status_failure(self, router_agent, mock_redis_client):
         """Test unit status update failure"""
-        mock_redis_client.hset.side_effect = Exception("Redis error")
+        mock_redis_client.pipeline.return_value.execute.side_effect = Exception("Redis error")
         
         success = await router_agent.update_unit_status("POLICE_001", "enroute")
         
@@ -0,0 +1,71 @@
+"""
+Test suite for the rule-based fact extractor
+
+Tests deterministic extraction of explicitly stated incident facts.
+"""
+
+import pytest
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rule_extractor import extract_rules
+
+
+class TestRuleExtractor:
+    """Test cases for the rule-based fact extractor"""
+
+    @pytest.mark.parametrize("text,emergency_type", [
+        ("Help, my kitchen is on fire!", "Fire"),
+        ("My father collapsed, we need an ambulance", "Medical"),
+        ("Someone is breaking into my neighbor's house", "Police"),
+        ("There's a fire and someone is bleeding", None),  # Ambiguous
+    ])
+    def test_emergency_type(self, text, emergency_type):
+        """Emergency type is only reported when one type's keywords match"""
+        updates, _ = extract_rules(text)
+
+        assert updates.get("emergency_type") == emergency_type
+
+    def test_callback_number(self):
+        """US phone numbers are normalized to digits"""
+        updates, residual = extract_rules("You can call me back at (734) 555-0148.")
+
+        assert updates["callback_number"] == "7345550148"
+        assert "734" not in residual
+
+    def test_coordinates_and_address(self):
+        """Coordinates and street addresses resolve the location"""
+        coordinates, _ = extract_rules("We're at 42.2808, -83.7430, in the park")
+        address, residual = extract_rules("We're at 88 Packard Street apartment 3B.")
+
+        assert coordinates["location"] == "42.2808, -83.7430"
+        assert address["location"] == "88 Packard Street apartment 3B"
+        assert residual == []
+
+    @pytest.mark.parametrize("text,count", [
+        ("About 30 people live here", 30),
+        ("There are two men, one has a crowbar", 2),
+        ("It's just him, he's 67.", 1),
+        ("Two people inside and three kids outside", None),  # Conflicting counts
+    ])
+    def test_people_involved(self, text, count):
+        """A single stated people count is extracted"""
+        updates, _ = extract_rules(text)
+
+        assert updates.get("people_involved") == count
+
+    def test_caller_safety(self):
+        """Safety statements, negations and yes/no answers to safety questions"""
+        assert extract_rules("I'm outside now, I'm fine.")[0]["is_caller_safe"] is True
+        assert extract_rules("No, I'm not safe, he's coming back")[0]["is_caller_safe"] is False
+        assert extract_rules("Yes.", "Are you in a safe place right now?")[0]["is_caller_safe"] is True
+        assert "is_caller_safe" not in extract_rules("Yes.", "Is the door locked?")[0]
+
+    def test_residual_words(self):
+        """Unexplained content is reported so the turn can go to the LLM"""
+        _, residual = extract_rules("He has a history of heart problems and takes blood thinners")
+
+        assert len(residual) > 5
@@ -59,6 +59,7 @@ class TestIncidentRegistry:
             "location": "123 Main St, Ann Arbor, MI",
             "latitude": 42.2808,
             "longitude": -83.7430,
+            "location_precision": "address",
             "is_active_threat": True,
             "details": "Building fire with smoke visible",
             "people_involved": 5,
@@ -257,6 +258,81 @@ class TestIncidentRegistry:
         # Should respect the limit
         assert len(incidents) <= 2
     
+    @pytest.mark.asyncio
+    async def test_find_duplicate_same_type_nearby(self, incident_registry, mock_redis_client, sample_incident):
+        """A nearby active incident of the same type within the window is a duplicate"""
+        existing = {**sample_incident, "case_id": "incident_001", "emergency_type": "fire"}
+        other_type = {**sample_incident, "case_id": "incident_002", "emergency_type": "Medical"}
+        mock_redis_client.georadius.return_value = ["incident_002", "incident_001", sample_incident["case_id"]]
+        mock_redis_client.mget = Mock(return_value=[json.dumps(other_type), json.dumps(existing)])
+        
+        duplicate_of = await incident_registry.find_duplicate(sample_incident)
+        
+        assert duplicate_of == "incident_001"
+        # The incident itself is never its own duplicate
+        mock_redis_client.mget.assert_called_once_with(["incident:data:incident_002", "incident:data:incident_001"])
+    
+    @pytest.mark.asyncio
+    async def test_find_duplicate_outside_window(self, incident_registry, mock_redis_client, sample_incident):
+        """An older incident at the same spot outside the time window is not a duplicate"""
+        existing = {**sample_incident, "case_id": "incident_001", "timestamp": "2020-01-01T00:00:00"}
+        mock_redis_client.georadius.return_value = ["incident_001"]
+        mock_redis_client.mget = Mock(return_value=[json.dumps(existing)])
+        
+        assert await incident_registry.find_duplicate(sample_incident, window_seconds=900) is None
+    
+    @pytest.mark.asyncio
+    async def test_find_duplicate_without_coordinates(self, incident_registry, mock_redis_client, sample_incident):
+        """Incidents without coordinates are never deduplicated"""
+        incident = {**sample_incident, "latitude": None}
+        
+        assert await incident_registry.find_duplicate(incident) is None
+        mock_redis_client.georadius.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_find_duplicate_requires_precise_locations(self, incident_registry, mock_redis_client, sample_incident):
+        """Street or place centroids are never merged, on either side of the match"""
+        street = {**sample_incident, "location_precision": "street"}
+        assert await incident_registry.find_duplicate(street) is None
+        mock_redis_client.georadius.assert_not_called()
+        
+        existing = {**sample_incident, "case_id": "incident_001", "location_precision": "place"}
+        mock_redis_client.georadius.return_value = ["incident_001"]
+        mock_redis_client.mget = Mock(return_value=[json.dumps(existing)])
+        assert await incident_registry.find_duplicate(sample_incident) is None
+    
+    @pytest.mark.asyncio
+    async def test_claim_location_first_report_wins(self, incident_registry, mock_redis_client, sample_incident):
+        """The first report claims its type and cell; a later one gets the holder's case ID"""
+        mock_redis_client.set.return_value = True
+        assert await incident_registry.claim_location(sample_incident, window_seconds=900) is None
+        key = mock_redis_client.set.call_args[0][0]
+        assert key.startswith("incident:claim:fire:") and len(key.rsplit(":", 1)[1]) == 7
+        assert mock_redis_client.set.call_args[1] == {"nx": True, "ex": 900}
+        
+        mock_redis_client.set.return_value = None
+        mock_redis_client.get.return_value = "incident_001"
+        assert await incident_registry.claim_location(sample_incident) == "incident_001"
+        
+        mock_redis_client.set.reset_mock()
+        assert await incident_registry.claim_location({**sample_incident, "location_precision": None}) is None
+        mock_redis_client.set.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_attach_duplicate_counts_merge(self, incident_registry, mock_redis_client, sample_incident):
+        """Duplicates are linked to the case and counted per emergency type"""
+        pipe = Mock()
+        pipe.execute.return_value = [2, True, 5, 3]
+        mock_redis_client.pipeline = Mock(return_value=pipe)
+        
+        linked = await incident_registry.attach_duplicate("incident_001", {**sample_incident, "call_id": "call_9"})
+        
+        assert linked == 2
+        assert pipe.rpush.call_args[0][0] == "incident:linked:incident_001"
+        assert json.loads(pipe.rpush.call_args[0][1])["call_id"] == "call_9"
+        pipe.hincrby.assert_any_call("incidents:dedup", "merged", 1)
+        pipe.hincrby.assert_any_call("incidents:dedup", "merged:fire", 1)
+    
     @pytest.mark.asyncio
     async def test_close_connection(self, incident_registry, mock_redis_client):
         """Test connection closure"""
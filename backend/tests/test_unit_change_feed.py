@@ -0,0 +1,174 @@
+"""
+Test suite for the unit change feed
+
+Tests type and bounding box filters, removal events, the per-unit minimum
+interval with latest-state coalescing, merging of status-only changes, the
+bound on known states, waiting for the subscription, resync after a lost
+subscription and the SSE event format.
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.units_router import sse_event
+from app.services import unit_change_feed as feed_module
+from app.services.unit_change_feed import RESYNC, UnitChangeFeed, UnitSubscriber
+
+ANN_ARBOR = (-83.80, 42.22, -83.68, 42.32)
+
+
+def unit(unit_id="ENGINE_1", unit_type="FIRE", status="enroute", lat=42.28, lon=-83.74):
+    return {"unit_id": unit_id, "type": unit_type, "status": status, "lat": lat, "lon": lon, "last_updated": "2025-01-01T12:00:00"}
+
+
+class TestUnitChangeFeed:
+    """Test cases for the unit change feed"""
+
+    def test_filters_by_type_and_bbox(self):
+        """Only units of the subscribed types inside the box are queued"""
+        subscriber = UnitSubscriber(types=["fire"], bbox=ANN_ARBOR)
+
+        subscriber.offer(unit())
+        subscriber.offer(unit("PATROL_1", unit_type="POLICE"))
+        subscriber.offer(unit("ENGINE_2", lat=40.0))
+
+        assert list(subscriber.pending) == ["ENGINE_1"]
+
+    def test_unit_leaving_the_box_is_removed_once(self):
+        """A visible unit that moves out is sent once as removed, then ignored"""
+        subscriber = UnitSubscriber(bbox=ANN_ARBOR)
+        subscriber.offer(unit())
+        subscriber.due(now=0.0)
+
+        subscriber.offer(unit(lat=43.0))
+        assert subscriber.due(now=1.0)[0] == [{"unit_id": "ENGINE_1", "removed": True}]
+        subscriber.offer(unit(lat=43.1))
+        assert not subscriber.pending
+
+    def test_min_interval_coalesces_to_latest_state(self):
+        """Updates inside the interval wait and are replaced by newer ones"""
+        subscriber = UnitSubscriber(min_interval=1.0)
+
+        subscriber.offer(unit(status="enroute"))
+        ready, next_due = subscriber.due(now=10.0)
+        assert [event["status"] for event in ready] == ["enroute"] and next_due is None
+
+        subscriber.offer(unit(status="on_scene", lat=42.281))
+        subscriber.offer(unit(status="on_scene", lat=42.282))
+        ready, next_due = subscriber.due(now=10.5)
+        assert ready == [] and next_due == 11.0
+
+        ready, _ = subscriber.due(now=11.0)
+        assert [(event["status"], event["lat"]) for event in ready] == [("on_scene", 42.282)]
+        assert subscriber.coalesced == 1
+
+    @pytest.mark.asyncio
+    async def test_status_only_changes_merge_with_known_state(self):
+        """A status update for an unseen unit reads its state once, then merges"""
+        feed = UnitChangeFeed("redis://localhost:6379/0")
+        feed.client = MagicMock()
+        subscriber = UnitSubscriber(types=["FIRE"])
+        feed.subscribers.add(subscriber)
+
+        with patch.object(feed_module.unit_store, "get_unit", AsyncMock(return_value=unit(status="available"))) as get_unit:
+            await feed.apply({"unit_id": "ENGINE_1", "status": "dispatched", "last_updated": "2025-01-01T12:01:00"})
+            await feed.apply({"unit_id": "ENGINE_1", "status": "enroute", "last_updated": "2025-01-01T12:02:00"})
+
+        get_unit.assert_awaited_once()
+        assert subscriber.pending["ENGINE_1"]["type"] == "FIRE"
+        assert subscriber.pending["ENGINE_1"]["status"] == "enroute"
+
+        await feed.apply({"unit_id": "ENGINE_1", "deleted": True})
+        assert subscriber.pending["ENGINE_1"] == {"unit_id": "ENGINE_1", "removed": True}
+        assert "ENGINE_1" not in feed.units
+
+    @pytest.mark.asyncio
+    async def test_known_states_are_bounded(self):
+        """The least recently changed units are forgotten beyond the limit or after their TTL"""
+        feed = UnitChangeFeed("redis://localhost:6379/0", max_units=2)
+        for unit_id in ("ENGINE_1", "ENGINE_2", "ENGINE_3"):
+            await feed.apply(unit(unit_id))
+        assert list(feed.units) == ["ENGINE_2", "ENGINE_3"]
+
+        with patch.object(feed_module.time, "monotonic", return_value=feed.units["ENGINE_3"][0] + feed_module.unit_store.UNIT_TTL_SECONDS):
+            await feed.apply(unit("ENGINE_4"))
+        assert list(feed.units) == ["ENGINE_4"]
+
+    @pytest.mark.asyncio
+    async def test_subscribe_waits_for_confirmed_subscription(self):
+        """Subscribers are added only once Redis confirms the channel subscription"""
+        feed = UnitChangeFeed("redis://localhost:6379/0")
+        feed.task = MagicMock()
+        feed.task.done.return_value = False
+
+        with pytest.raises(asyncio.TimeoutError):
+            await feed.subscribe(timeout=0.01)
+        assert not feed.subscribers
+
+        feed.ready.set()
+        subscriber = await feed.subscribe(timeout=0.01)
+        assert feed.subscribers == {subscriber}
+
+    @pytest.mark.asyncio
+    async def test_resubscribing_asks_subscribers_to_resync(self):
+        """After the subscription is lost and restored, pending changes are dropped for a RESYNC"""
+        feed = UnitChangeFeed("redis://localhost:6379/0")
+        subscriber = UnitSubscriber()
+        feed.subscribers.add(subscriber)
+        connections = []
+
+        def pubsub():
+            connection = MagicMock()
+            connection.subscribe = AsyncMock()
+            connection.aclose = AsyncMock()
+
+            async def listen():
+                yield {"type": "subscribe", "data": 1}
+                if not connections[1:]:
+                    yield {"type": "message", "data": json.dumps(unit())}
+                    raise ConnectionError("connection reset")
+                await asyncio.Event().wait()
+
+            connection.listen = listen
+            connections.append(connection)
+            return connection
+
+        feed.client = MagicMock()
+        feed.client.pubsub.side_effect = pubsub
+        feed.client.aclose = AsyncMock()
+        with patch.object(feed_module, "RECONNECT_BACKOFF_SECONDS", (0.0,)):
+            feed.task = asyncio.create_task(feed._relay())
+            for _ in range(20):
+                await asyncio.sleep(0)
+        await feed.stop()
+
+        assert len(connections) == 2 and feed.resyncs == 1
+        assert not subscriber.pending and not feed.units
+        events = subscriber.events(heartbeat=5.0)
+        assert await events.__anext__() is RESYNC
+        await events.aclose()
+
+    @pytest.mark.asyncio
+    async def test_events_wait_for_changes(self):
+        """The subscriber's event iterator yields changes as they are offered"""
+        subscriber = UnitSubscriber()
+        events = subscriber.events(heartbeat=5.0)
+
+        next_event = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.01)
+        assert not next_event.done()
+
+        subscriber.offer(unit())
+        assert (await asyncio.wait_for(next_event, 1.0))["unit_id"] == "ENGINE_1"
+        await events.aclose()
+
+    def test_sse_event_format(self):
+        """Events carry an id, a name and compact JSON data"""
+        assert sse_event("unit", {"unit_id": "ENGINE_1"}, 3) == 'id: 3\nevent: unit\ndata: {"unit_id":"ENGINE_1"}\n\n'
@@ -0,0 +1,77 @@
+"""
+Test suite for the unit location history service
+
+Tests stream writes, time-range trail queries and downsampling.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timedelta, timezone
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.unit_history_service import (
+    UNIT_HISTORY_MAXLEN,
+    UNIT_HISTORY_RETENTION_SECONDS,
+    downsample,
+    get_unit_trail,
+    history_key,
+    queue_location_sample,
+    to_ms,
+)
+
+
+class TestUnitHistoryService:
+    """Test cases for the unit history service"""
+
+    def test_queue_location_sample_is_capped(self):
+        """Samples are appended with approximate MAXLEN trimming and renew the retention"""
+        pipe = MagicMock()
+
+        queue_location_sample(pipe, "FIRE_ENGINE_001", 42.28, -83.74, "Available")
+
+        pipe.xadd.assert_called_once_with(
+            "history:unit:FIRE_ENGINE_001",
+            {"lat": 42.28, "lon": -83.74, "status": "Available"},
+            maxlen=UNIT_HISTORY_MAXLEN,
+            approximate=True
+        )
+        pipe.expire.assert_called_once_with("history:unit:FIRE_ENGINE_001", UNIT_HISTORY_RETENTION_SECONDS)
+
+    def test_downsample_keeps_latest_per_bucket(self):
+        """Downsampling keeps one point per time bucket, including the last sample"""
+        points = [{"ms": ms, "lat": 0.0, "lon": 0.0, "status": "Available"} for ms in range(0, 1000, 10)]
+
+        result = downsample(points, 0, 999, 10)
+
+        assert len(result) == 10
+        assert result[-1]["ms"] == 990
+        assert [p["ms"] for p in result] == sorted(p["ms"] for p in result)
+
+    def test_downsample_short_trail_unchanged(self):
+        """Trails under the limit are returned as-is"""
+        points = [{"ms": 1, "lat": 0.0, "lon": 0.0, "status": "Available"}]
+
+        assert downsample(points, 0, 10, 5) == points
+
+    @pytest.mark.asyncio
+    async def test_get_unit_trail(self):
+        """Trail queries read the stream by millisecond range"""
+        end = datetime(2025, 9, 28, 8, 0, tzinfo=timezone.utc)
+        start = end - timedelta(hours=1)
+        sample_ms = to_ms(end - timedelta(minutes=5))
+        redis_client = MagicMock()
+        redis_client.xrange = AsyncMock(return_value=[
+            (f"{sample_ms}-0", {"lat": "42.28", "lon": "-83.74", "status": "Available"}),
+            (f"{sample_ms + 1}-0", {"lat": "bad"}),
+        ])
+
+        trail = await get_unit_trail(redis_client, "police_01", start, end)
+
+        redis_client.xrange.assert_awaited_once_with(history_key("police_01"), min=to_ms(start), max=to_ms(end))
+        assert trail["total_samples"] == 1
+        assert trail["points"][0]["lat"] == 42.28
+        assert trail["points"][0]["timestamp"] == "2025-09-28T07:55:00+00:00"
@@ -0,0 +1,264 @@
+"""
+Test suite for the unit state store
+
+Tests the canonical encoding, index maintenance, pipelined reads and
+paginated index listings.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.unit_store import (
+    UNIT_GEO_KEY,
+    UNIT_TTL_SECONDS,
+    UNITS_ALL_KEY,
+    decode_unit,
+    encode_unit,
+    get_unit_counts,
+    get_units,
+    list_units,
+    normalize_status,
+    parse_bbox,
+    prune_expired_units,
+    queue_status_update,
+    queue_unit_delete,
+    queue_unit_write,
+    update_status,
+)
+
+
+class TestUnitStore:
+    """Test cases for the unit state store"""
+
+    def test_normalize_status(self):
+        """Status spellings from agents and schemas map onto index names"""
+        assert normalize_status("Available") == "available"
+        assert normalize_status("En_Route") == "enroute"
+        assert normalize_status("On_Scene") == "on_scene"
+        assert normalize_status(None) == "unknown"
+        with pytest.raises(ValueError):
+            normalize_status("parked")
+
+    def test_encode_decode_round_trip(self):
+        """All location shapes are stored as flat lat/lon with extras in attrs"""
+        for location in ([42.28, -83.74], {"lat": 42.28, "lon": -83.74}):
+            encoded = encode_unit({
+                "unit_id": "fire_01",
+                "type": "fire",
+                "status": "Available",
+                "location": location,
+                "water_level": 80
+            })
+
+            assert encoded["type"] == "FIRE"
+            assert encoded["status"] == "available"
+            assert json.loads(encoded["attrs"]) == {"water_level": 80}
+
+            decoded = decode_unit(encoded)
+            assert decoded["location"] == {"lat": 42.28, "lon": -83.74}
+            assert decoded["water_level"] == 80
+
+    def test_decode_missing_unit(self):
+        """Empty hashes decode to None"""
+        assert decode_unit({}) is None
+
+    def test_queue_unit_write_maintains_indexes(self):
+        """A write moves the unit between status sets and updates the GEO index"""
+        pipe = MagicMock()
+
+        queue_unit_write(pipe, {
+            "unit_id": "police_01",
+            "type": "POLICE",
+            "status": "dispatched",
+            "lat": 42.25,
+            "lon": -83.79
+        })
+
+        pipe.delete.assert_called_once_with("unit:police_01")
+        sadd_calls = [call.args for call in pipe.sadd.call_args_list]
+        assert (UNITS_ALL_KEY, "police_01") in sadd_calls
+        assert ("units:police", "police_01") in sadd_calls
+        assert ("units:status:dispatched", "police_01") in sadd_calls
+        pipe.srem.assert_any_call("units:status:available", "police_01")
+        pipe.geoadd.assert_called_once_with(UNIT_GEO_KEY, [-83.79, 42.25, "police_01"])
+
+        channel, change = pipe.publish.call_args[0]
+        assert channel == "units:changes"
+        assert json.loads(change)["status"] == "dispatched"
+
+    def test_queue_status_update(self):
+        """Status-only updates are one script that checks the unit exists and refreshes its TTL"""
+        pipe = MagicMock()
+
+        assert queue_status_update(pipe, "fire_01", "En_Route") == "enroute"
+
+        script, numkeys, *keys_and_args = pipe.eval.call_args[0]
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        assert "EXISTS" in script and "EXPIRE" in script
+        assert keys[:2] == ["unit:fire_01", "units:status:enroute"]
+        assert "units:status:available" in keys[2:]
+        assert args[:2] == ["fire_01", "enroute"] and args[3] == UNIT_TTL_SECONDS
+        assert json.loads(args[5])["status"] == "enroute"
+        pipe.hset.assert_not_called()
+
+    def test_queue_unit_delete_drops_history(self):
+        """Deleting a unit removes its hash and location history and publishes the deletion"""
+        pipe = MagicMock()
+
+        queue_unit_delete(pipe, "fire_01")
+
+        pipe.delete.assert_called_once_with("unit:fire_01", "history:unit:fire_01")
+        pipe.zrem.assert_called_once_with(UNIT_GEO_KEY, "fire_01")
+        assert json.loads(pipe.publish.call_args[0][1]) == {"unit_id": "fire_01", "deleted": True}
+
+    @pytest.mark.asyncio
+    async def test_update_status_missing_unit(self):
+        """Updating a unit whose hash is gone reports it as missing"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[0])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+
+        assert await update_status(client, "fire_01", "dispatched") is None
+        pipe.execute.return_value = [1]
+        assert await update_status(client, "fire_01", "dispatched") == "dispatched"
+
+    @pytest.mark.asyncio
+    async def test_get_units_prunes_expired(self):
+        """Units are read in one pipeline and expired IDs are removed from indexes only"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[
+            [encode_unit({"unit_id": "ems_01", "type": "EMS", "status": "available", "location": [42.0, -83.0]}), {}],
+            [1]
+        ])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+
+        units = await get_units(client, ["ems_01", "ems_02"])
+
+        assert [unit["unit_id"] for unit in units] == ["ems_01"]
+        assert pipe.execute.await_count == 2
+        script, numkeys, *keys_and_args = pipe.eval.call_args[0]
+        keys, args = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        assert "EXISTS" in script
+        assert keys[0] == UNITS_ALL_KEY and keys[-2:] == [UNIT_GEO_KEY, "unit:ems_02"]
+        assert args == ["ems_02"]
+        # The unit expired: nothing is deleted and no change is published
+        pipe.delete.assert_not_called()
+        pipe.publish.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_prune_expired_units_walks_geo_index(self):
+        """The sweep pages through the GEO index and prunes only units without a hash"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[[1, 0], [1], [1]])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        client.zscan = AsyncMock(side_effect=[(7, [("ems_01", 1.0), ("ems_02", 2.0)]), (0, [("fire_01", 3.0)])])
+
+        assert await prune_expired_units(client, batch_size=2) == 1
+
+        assert client.zscan.await_args_list[1].kwargs["cursor"] == 7
+        script, numkeys, *keys_and_args = pipe.eval.call_args[0]
+        assert keys_and_args[numkeys:] == ["ems_02"]
+        assert pipe.eval.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_get_unit_counts(self):
+        """Counts come from index set cardinalities in one round trip"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[5, 2, 1, 1, 1, 3, 1, 1, 0, 0, 0])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+
+        counts = await get_unit_counts(client)
+
+        assert counts["total"] == 5
+        assert counts["by_type"]["POLICE"] == 2
+        assert counts["by_status"]["available"] == 3
+        pipe.execute.assert_awaited_once()
+
+    def test_parse_bbox(self):
+        """Bounding boxes are min_lon,min_lat,max_lon,max_lat"""
+        assert parse_bbox("-83.8,42.2,-83.5,42.6") == (-83.8, 42.2, -83.5, 42.6)
+        with pytest.raises(ValueError):
+            parse_bbox("1,2,3")
+        with pytest.raises(ValueError):
+            parse_bbox("-83.5,42.2,-83.8,42.6")
+
+    @pytest.mark.asyncio
+    async def test_list_units_scans_smallest_index(self):
+        """Type and status filters SSCAN the smaller set and filter by the other"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[
+            [40, 3],                   # SCARD units:fire, units:status:available
+            [[True, False, True]],     # SMISMEMBER units:fire
+            [encode_unit({"unit_id": "fire_01", "type": "FIRE", "status": "available", "location": [42.0, -83.0]}),
+             encode_unit({"unit_id": "fire_02", "type": "FIRE", "status": "available", "location": [42.1, -83.1]})]
+        ])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        client.sscan = AsyncMock(return_value=(0, ["fire_01", "police_01", "fire_02"]))
+
+        page = await list_units(client, unit_type="fire", status="Available", limit=10)
+
+        client.sscan.assert_awaited_once_with("units:status:available", cursor=0, count=10)
+        pipe.smismember.assert_called_once_with("units:fire", ["fire_01", "police_01", "fire_02"])
+        assert [unit["unit_id"] for unit in page["units"]] == ["fire_01", "fire_02"]
+        assert page["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_list_units_cursor_keeps_source_set(self):
+        """Later pages walk the set chosen on the first page without SCARD"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[
+            [40, 3],                   # SCARD units:fire, units:status:available
+            [[True]],                  # SMISMEMBER units:fire
+            [encode_unit({"unit_id": "fire_01", "type": "FIRE", "status": "available", "location": [42.0, -83.0]})],
+            [[True]],
+            [encode_unit({"unit_id": "fire_02", "type": "FIRE", "status": "available", "location": [42.1, -83.1]})]
+        ])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        client.sscan = AsyncMock(side_effect=[(7, ["fire_01"]), (0, ["fire_02"])])
+
+        first = await list_units(client, unit_type="fire", status="available", limit=1)
+        second = await list_units(client, unit_type="fire", status="available", cursor=int(first["next_cursor"]), limit=1)
+
+        assert first["next_cursor"] == str(7 * 2 + 1)
+        assert pipe.scard.call_count == 2
+        client.sscan.assert_awaited_with("units:status:available", cursor=7, count=1)
+        assert second["next_cursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_list_units_bbox_pages_stored_matches(self):
+        """Bounding box matches are stored once, then paged with ZRANGE and filtered exactly"""
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(side_effect=[
+            [3, True, ["ems_01", "ems_03"], 3],            # GEOSEARCHSTORE, EXPIRE, ZRANGE, ZCARD
+            [[(-83.7, 42.3), (-83.9, 42.3)]],              # GEOPOS (ems_03 is outside the bbox)
+            [encode_unit({"unit_id": "ems_01", "type": "EMS", "status": "available", "location": [42.3, -83.7]})],
+            [["ems_02"], 3],                               # ZRANGE, ZCARD
+            [[(-83.6, 42.4)]],
+            [encode_unit({"unit_id": "ems_02", "type": "EMS", "status": "available", "location": [42.4, -83.6]})]
+        ])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        bbox = (-83.8, 42.2, -83.5, 42.5)
+
+        first = await list_units(client, bbox=bbox, limit=2)
+        second = await list_units(client, bbox=bbox, cursor=int(first["next_cursor"]), limit=2)
+
+        pipe.geosearchstore.assert_called_once()
+        assert pipe.geosearchstore.call_args.kwargs["unit"] == "KM"
+        pipe.zrange.assert_called_with("units:bbox:-83.8,42.2,-83.5,42.5", 2, 3)
+        assert [unit["unit_id"] for unit in first["units"]] == ["ems_01"]
+        assert first["next_cursor"] == "2"
+        assert [unit["unit_id"] for unit in second["units"]] == ["ems_02"]
+        assert second["next_cursor"] is None
@@ -0,0 +1,124 @@
+"""
+Test suite for the units API routes
+
+Tests the unit endpoints through a TestClient, with Redis and the unit store
+mocked: request bodies, status codes and what is passed to the store.
+"""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api import units_router as units_module
+from app.api.units_router import units_router
+from app.database import unit_store
+from app.database.redis import get_redis_dependency
+from app.schemas.unit_schema import EMSUnitState, Location, PoliceUnitState
+
+
+@pytest.fixture
+def redis_client():
+    return MagicMock()
+
+
+@pytest.fixture
+def client(redis_client):
+    app = FastAPI()
+    app.include_router(units_router)
+    app.dependency_overrides[get_redis_dependency] = lambda: redis_client
+    return TestClient(app)
+
+
+class TestUnitsRouter:
+    """Test cases for the units API routes"""
+
+    @pytest.fixture
+    def pipe(self, redis_client):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[])
+        redis_client.pipeline.return_value = pipe
+        return pipe
+
+    def test_update_unit_status_indexes_ems_units_as_ems(self, client, pipe):
+        """An EMS unit's state is stored and indexed under the EMS type"""
+        unit = EMSUnitState(unit_id="EMS_AMBULANCE_001", status="En_Route", location=Location(lat=37.76, lon=-122.43), patient_count=1)
+
+        response = client.post("/status", json=unit.model_dump())
+
+        assert response.status_code == 200
+        mapping = pipe.hset.call_args.kwargs["mapping"]
+        assert (mapping["unit_id"], mapping["type"], mapping["status"]) == ("EMS_AMBULANCE_001", "EMS", "enroute")
+        pipe.sadd.assert_any_call(unit_store.type_key("EMS"), "EMS_AMBULANCE_001")
+
+    def test_update_unit_status_police_unit(self, client, pipe):
+        """Police units keep the POLICE type"""
+        unit = PoliceUnitState(unit_id="POLICE_PATROL_001", location=Location(lat=37.78, lon=-122.41), assigned_officer_id="OFFICER_001")
+
+        response = client.post("/status", json=unit.model_dump())
+
+        assert response.status_code == 200
+        assert pipe.hset.call_args.kwargs["mapping"]["type"] == "POLICE"
+
+    def test_update_unit_status_requires_known_type(self, client, pipe):
+        """A payload without a known type is rejected instead of being indexed under a guessed one"""
+        response = client.post("/status", json={"unit_id": "UNIT_1", "status": "Available", "location": {"lat": 1.0, "lon": 2.0}})
+
+        assert response.status_code == 422
+        pipe.execute.assert_not_awaited()
+
+    def test_change_unit_status_reads_json_body(self, client, redis_client):
+        """PATCH /{unit_id}/status takes the new status from the JSON body"""
+        with patch.object(units_module.unit_store, "update_status", AsyncMock(return_value="Dispatched")) as update_status:
+            response = client.patch("/FIRE_ENGINE_001/status", json={"status": "dispatched"})
+
+        assert response.status_code == 200
+        assert response.json() == {"unit_id": "FIRE_ENGINE_001", "status": "Dispatched"}
+        update_status.assert_awaited_once_with(redis_client, "FIRE_ENGINE_001", "dispatched")
+
+    def test_change_unit_status_missing_unit(self, client):
+        """Changing the status of an unknown unit is a 404"""
+        with patch.object(units_module.unit_store, "update_status", AsyncMock(return_value=None)):
+            response = client.patch("/UNKNOWN/status", json={"status": "Available"})
+
+        assert response.status_code == 404
+
+    def test_change_unit_status_invalid_status(self, client):
+        """A status the store rejects is a 400"""
+        with patch.object(units_module.unit_store, "update_status", AsyncMock(side_effect=ValueError("Unknown unit status: Parked"))):
+            response = client.patch("/FIRE_ENGINE_001/status", json={"status": "Parked"})
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Unknown unit status: Parked"
+
+    def test_unit_history_accepts_times_without_offset(self, client, redis_client):
+        """start/end without a timezone are read as UTC instead of failing the comparison"""
+        trail = {"unit_id": "POLICE_001", "points": []}
+        with patch.object(units_module, "get_unit_trail", AsyncMock(return_value=trail)) as get_unit_trail:
+            response = client.get("/POLICE_001/history", params={"start": "2026-10-19T08:00:00", "end": "2026-10-19T09:00:00+00:00"})
+
+        assert response.status_code == 200
+        assert response.json() == trail
+        _, unit_id, start, end, max_points = get_unit_trail.await_args.args
+        assert start == datetime(2026, 10, 19, 8, tzinfo=timezone.utc)
+        assert end == datetime(2026, 10, 19, 9, tzinfo=timezone.utc)
+        assert (unit_id, max_points) == ("POLICE_001", 500)
+
+    def test_unit_history_naive_start_without_end(self, client):
+        """A naive start with no end is compared with the current UTC time"""
+        with patch.object(units_module, "get_unit_trail", AsyncMock(return_value={})):
+            response = client.get("/POLICE_001/history", params={"start": "2000-01-01T00:00:00"})
+
+        assert response.status_code == 200
+
+    def test_unit_history_rejects_reversed_range(self, client):
+        """start after end is a 400"""
+        response = client.get("/POLICE_001/history", params={"start": "2026-10-19T09:00:00", "end": "2026-10-19T08:00:00"})
+
+        assert response.status_code == 400
@@ -0,0 +1,96 @@
+"""
+Test suite for the streaming Vapi logic handler
+
+Tests that streamed off-script replies get the same urgency prefix as the
+non-streaming handler, and that a turn completing the incident sends only
+the completion message.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api import vapi_router
+from app.api.vapi_router import INCIDENT_COMPLETE_MESSAGE, VapiHandlerRequest, vapi_streaming_logic_handler
+from app.schemas.incident_schema import IncidentFact
+
+OFF_SCRIPT_TURN = "The smoke is getting really thick near the stairs, what should I do?"
+
+
+def make_model(extraction, *texts):
+    """Mock Gemini model: streamed calls yield `texts`, others return `extraction` as JSON"""
+    async def chunks():
+        for text in texts:
+            yield MagicMock(text=text)
+
+    model = MagicMock()
+    model.generate_content_async = AsyncMock(side_effect=lambda prompt, **kwargs: (
+        chunks() if kwargs.get("stream") else MagicMock(text=json.dumps(extraction))
+    ))
+    return model
+
+
+async def stream_reply(model, incident_fact):
+    """Run one off-script turn through the streaming handler; returns the streamed text and finalize mock"""
+    call_context = {
+        "incident_fact": incident_fact,
+        "conversation_history": [
+            {"role": "user", "content": "There's a fire"},
+            {"role": "user", "content": OFF_SCRIPT_TURN}
+        ],
+        "extracted_turns": 1,
+        "last_question": None
+    }
+    request = VapiHandlerRequest(call={}, callId="call_1", customer={})
+    store = MagicMock()
+    store.save = AsyncMock()
+
+    with patch.object(vapi_router, "model", model), \
+            patch.object(vapi_router, "start_turn", AsyncMock(return_value=call_context)), \
+            patch.object(vapi_router, "finalize_incident", AsyncMock()) as finalize, \
+            patch.object(vapi_router, "call_context_store", store):
+        response = await vapi_streaming_logic_handler(request, redis_client=MagicMock())
+        events = [event async for event in response.body_iterator]
+
+    text = "".join(
+        json.loads(event[len("data: "):])["choices"][0]["delta"].get("content", "")
+        for event in events
+        if event != "data: [DONE]\n\n"
+    )
+    return text, finalize
+
+
+class TestVapiStreaming:
+    """Test cases for the streaming Vapi logic handler"""
+
+    @pytest.mark.asyncio
+    async def test_urgent_prefix_when_location_is_missing(self):
+        """Streamed replies start with URGENT: while critical facts are missing, as on /handler"""
+        model = make_model({"severity": "High"}, "Get low and ", "leave now.")
+
+        text, finalize = await stream_reply(model, IncidentFact(emergency_type="Fire"))
+
+        assert text == "URGENT: Get low and leave now."
+        finalize.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_completing_turn_sends_only_the_completion_message(self):
+        """When the turn completes the incident, the streamed question is dropped"""
+        incident_fact = IncidentFact(
+            emergency_type="Fire",
+            location="412 Maple Avenue",
+            description="Kitchen fire spreading to the stairs",
+            is_caller_safe=True,
+            people_involved=2
+        )
+        model = make_model({"severity": "High"}, "Get low and ", "leave now.")
+
+        text, finalize = await stream_reply(model, incident_fact)
+
+        assert text == INCIDENT_COMPLETE_MESSAGE
+        finalize.assert_awaited_once()
@@ -0,0 +1,182 @@
+"""
+Test suite for the Redis WebSocket backplane
+
+Tests channel routing, pipelined publishing, topic-routed events, local
+fallback when Redis fails and per-group subscriptions.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.websocket_backplane import RedisBackplane, channel_for, decode_routed, encode_routed, group_for
+from app.core.websocket_hub import WebSocketHub
+
+
+def make_backplane(pipeline_error=None):
+    """Backplane on a hub with a mocked Redis client and pub/sub"""
+    hub = WebSocketHub(batch_window_ms=0)
+    hub.broadcast = MagicMock(return_value=1)
+    hub.route = MagicMock(return_value=1)
+    backplane = RedisBackplane(hub, "redis://localhost:6379/0")
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(side_effect=pipeline_error)
+    backplane.client = MagicMock()
+    backplane.client.pipeline.return_value = pipe
+    backplane.pubsub = MagicMock()
+    backplane.pubsub.subscribe = AsyncMock()
+    backplane.pubsub.unsubscribe = AsyncMock()
+    backplane.outbox = asyncio.Queue()
+    backplane.connected = True
+    hub.backplane = backplane
+    return hub, backplane, pipe
+
+
+class TestRedisBackplane:
+    """Test cases for the Redis WebSocket backplane"""
+
+    def test_channels(self):
+        """Broadcasts and groups map to their own channels and back"""
+        assert channel_for(None) == "ws:broadcast"
+        assert channel_for("call_1") == "ws:group:call_1"
+        assert group_for("ws:group:call_1") == "call_1"
+        assert group_for("ws:broadcast") is None
+
+    @pytest.mark.asyncio
+    async def test_publish_is_pipelined(self):
+        """Queued publishes go out in one pipeline and are not delivered locally"""
+        hub, backplane, pipe = make_backplane()
+
+        hub.publish("update_1")
+        hub.publish("update_2", group="call_1")
+        task = asyncio.create_task(backplane._publish_loop())
+        await asyncio.sleep(0)
+        task.cancel()
+
+        pipe.publish.assert_any_call("ws:broadcast", "update_1")
+        pipe.publish.assert_any_call("ws:group:call_1", "update_2")
+        pipe.execute.assert_awaited_once()
+        hub.broadcast.assert_not_called()
+        assert backplane.published == 2
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_falls_back_to_local(self):
+        """When Redis rejects a publish, local clients still get the update"""
+        hub, backplane, pipe = make_backplane(pipeline_error=ConnectionError("redis down"))
+
+        hub.publish("update_1", group="call_1")
+        task = asyncio.create_task(backplane._publish_loop())
+        await asyncio.sleep(0)
+        task.cancel()
+
+        hub.broadcast.assert_called_once_with("update_1", group="call_1")
+        assert backplane.stats()["local_fallbacks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_relay_delivers_to_local_clients(self):
+        """Messages received from Redis are broadcast to this worker's clients"""
+        hub, backplane, _ = make_backplane()
+
+        async def listen():
+            yield {"type": "message", "channel": "ws:broadcast", "data": "for_all"}
+            yield {"type": "message", "channel": "ws:group:call_1", "data": "for_call"}
+            await asyncio.Event().wait()
+
+        backplane.pubsub.listen = listen
+        task = asyncio.create_task(backplane._relay_loop())
+        await asyncio.sleep(0)
+        task.cancel()
+
+        hub.broadcast.assert_any_call("for_all", group=None)
+        hub.broadcast.assert_any_call("for_call", group="call_1")
+        assert backplane.relayed == 2
+
+    def test_full_queue_delivers_oldest_locally(self):
+        """While Redis lags, the queue stays bounded and the oldest publish reaches local clients only"""
+        hub, backplane, _ = make_backplane()
+        backplane.outbox = asyncio.Queue(maxsize=2)
+
+        for index in range(4):
+            hub.publish(f"update_{index}", group="call_1")
+
+        assert backplane.outbox.qsize() == 2
+        assert [call.args[0] for call in hub.broadcast.call_args_list] == ["update_0", "update_1"]
+        assert backplane.stats()["overflows"] == 2
+
+    @pytest.mark.asyncio
+    async def test_resubscribe_closes_previous_pubsub(self):
+        """A reconnect closes the lost subscription's connection before opening a new one"""
+        hub, backplane, _ = make_backplane()
+        old_pubsub = backplane.pubsub
+        old_pubsub.aclose = AsyncMock()
+        new_pubsub = MagicMock()
+        new_pubsub.subscribe = AsyncMock()
+        backplane.client.pubsub.return_value = new_pubsub
+        backplane.connected = False
+
+        await backplane._subscribe()
+
+        old_pubsub.aclose.assert_awaited_once()
+        assert backplane.pubsub is new_pubsub and backplane.connected
+
+    def test_routed_payload_round_trip(self):
+        """Topics and event type travel in a header line ahead of the message"""
+        payload = encode_routed('{"type":"fact_update"}', ["call:call_1", "cell:d"], "fact_update")
+
+        assert decode_routed(payload) == ('{"type":"fact_update"}', ["call:call_1", "cell:d"], "fact_update")
+        assert decode_routed(encode_routed("{}", [], None)) == ("{}", [], None)
+
+    @pytest.mark.asyncio
+    async def test_routed_events_are_routed_on_every_worker(self):
+        """Topic-routed publishes go out on ws:routed and each worker routes them locally"""
+        hub, backplane, pipe = make_backplane()
+
+        hub.publish("fact", topics=["call:call_1"], event_type="fact_update")
+        task = asyncio.create_task(backplane._publish_loop())
+        await asyncio.sleep(0)
+        task.cancel()
+        pipe.publish.assert_called_once_with("ws:routed", "fact_update\tcall:call_1\nfact")
+
+        async def listen():
+            yield {"type": "message", "channel": "ws:routed", "data": "fact_update\tcall:call_1\nfact"}
+            await asyncio.Event().wait()
+
+        backplane.pubsub.listen = listen
+        task = asyncio.create_task(backplane._relay_loop())
+        await asyncio.sleep(0)
+        task.cancel()
+
+        hub.route.assert_called_once_with("fact", ["call:call_1"], "fact_update")
+        hub.broadcast.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_group_channels_follow_local_clients(self):
+        """A worker subscribes to a group channel while it has clients in that group"""
+        hub, backplane, _ = make_backplane()
+        websocket = MagicMock()
+        websocket.accept = AsyncMock()
+
+        await hub.connect(websocket, groups=["call_1"])
+        hub.disconnect(websocket)
+        await asyncio.sleep(0)
+
+        backplane.pubsub.subscribe.assert_awaited_once_with("ws:group:call_1")
+        backplane.pubsub.unsubscribe.assert_awaited_once_with("ws:group:call_1")
+
+    @pytest.mark.asyncio
+    async def test_without_backplane_publish_is_local(self):
+        """If Redis is unreachable at startup the hub keeps delivering locally"""
+        hub = WebSocketHub(batch_window_ms=0)
+        hub.broadcast = MagicMock(return_value=1)
+
+        with patch.object(RedisBackplane, "start", AsyncMock(side_effect=ConnectionError("refused"))), \
+             patch.object(RedisBackplane, "stop", AsyncMock()):
+            assert await hub.start_backplane("redis://localhost:6379/0") is False
+
+        hub.publish("update_1")
+        hub.broadcast.assert_called_once_with("update_1", None)
@@ -0,0 +1,284 @@
+"""
+Test suite for the WebSocket fan-out hub
+
+Tests non-blocking broadcast, per-client queue overflow policies, group
+delivery, topic subscriptions, pruning of dead connections, frame
+batching and fact deltas.
+"""
+
+import asyncio
+import json
+import pytest
+import threading
+from datetime import datetime
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add backend directory to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.frontend_router import ConnectionManager, fact_changes, fact_delta
+from app.core.websocket_hub import SLOW_CLIENT_CLOSE_CODE, WebSocketHub, call_topic, cell_topics, dumps
+
+
+def make_websocket(send_delay: float = 0.0, fail: bool = False):
+    """Mock WebSocket that records sent messages, optionally slowly or failing"""
+    websocket = MagicMock()
+    websocket.accept = AsyncMock()
+    websocket.close = AsyncMock()
+    websocket.sent = []
+
+    async def send_text(message):
+        if fail:
+            raise RuntimeError("connection closed")
+        await asyncio.sleep(send_delay)
+        websocket.sent.append(message)
+
+    websocket.send_text = send_text
+    return websocket
+
+
+class TestWebSocketHub:
+    """Test cases for the WebSocket fan-out hub"""
+
+    @pytest.mark.asyncio
+    async def test_slow_client_does_not_block_broadcast(self):
+        """Broadcast returns at once and fast clients are not held up by a slow one"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        slow, fast = make_websocket(send_delay=1.0), make_websocket()
+        await hub.connect(slow)
+        await hub.connect(fast)
+
+        assert hub.broadcast("transcript") == 2
+        await asyncio.sleep(0.01)
+
+        assert fast.sent == ["transcript"]
+        assert slow.sent == []
+        hub.disconnect(slow)
+        hub.disconnect(fast)
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_keeps_latest_messages(self):
+        """A full queue discards its oldest message"""
+        hub = WebSocketHub(max_queue=2, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        websocket = make_websocket(send_delay=1.0)
+        client = await hub.connect(websocket)
+
+        for message in ["m0", "m1", "m2", "m3"]:
+            hub.broadcast(message)
+
+        assert list(client.queue._queue) == ["m2", "m3"]
+        assert hub.stats()["dropped"] == 2
+        hub.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy_closes_slow_client(self):
+        """With the disconnect policy a client that falls behind is closed and pruned"""
+        hub = WebSocketHub(max_queue=1, overflow="disconnect", send_timeout=5, batch_window_ms=0)
+        websocket = make_websocket(send_delay=1.0)
+        await hub.connect(websocket, groups=["call_1"])
+
+        assert hub.broadcast("m0") == 1
+        assert hub.broadcast("m1") == 0
+        await asyncio.sleep(0)
+
+        websocket.close.assert_awaited_once_with(code=SLOW_CLIENT_CLOSE_CODE)
+        assert hub.stats()["clients"] == 0
+        assert hub.groups == {}
+
+    @pytest.mark.asyncio
+    async def test_dead_socket_is_pruned(self):
+        """A client whose send fails is removed from the hub and its groups"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        dead, alive = make_websocket(fail=True), make_websocket()
+        await hub.connect(dead, groups=["call_1"])
+        await hub.connect(alive, groups=["call_1"])
+
+        hub.broadcast("update", group="call_1")
+        await asyncio.sleep(0.01)
+
+        assert hub.active_connections == [alive]
+        assert hub.broadcast("next", group="call_1") == 1
+        hub.disconnect(alive)
+
+    @pytest.mark.asyncio
+    async def test_group_broadcast(self):
+        """Group broadcasts reach only that group's clients"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        call_client, dashboard = make_websocket(), make_websocket()
+        await hub.connect(call_client, groups=["call_1"])
+        await hub.connect(dashboard)
+
+        hub.broadcast("fact", group="call_1")
+        hub.broadcast("other", group="call_2")
+        await asyncio.sleep(0.01)
+
+        assert call_client.sent == ["fact"]
+        assert dashboard.sent == []
+        hub.disconnect(call_client)
+        hub.disconnect(dashboard)
+
+    @pytest.mark.asyncio
+    async def test_route_by_topic_and_event_type(self):
+        """Routed events reach subscribers of their topics, clients without subscriptions and matching types only"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        everything, call_1, call_2 = make_websocket(), make_websocket(), make_websocket()
+        region, transcripts_only = make_websocket(), make_websocket()
+        await hub.connect(everything)
+        await hub.connect(call_1, groups=[call_topic("call_1")])
+        await hub.connect(call_2, groups=[call_topic("call_2")])
+        await hub.connect(region, groups=["cell:dps"])
+        await hub.connect(transcripts_only, types=["transcript_update"])
+
+        assert hub.route("fact", [call_topic("call_1")] + cell_topics("dps2w"), "fact_update") == 3
+        await asyncio.sleep(0.01)
+
+        assert everything.sent == call_1.sent == region.sent == ["fact"]
+        assert call_2.sent == transcripts_only.sent == []
+        assert hub.stats()["deliveries_per_routed_event"] == 3
+        for websocket in (everything, call_1, call_2, region, transcripts_only):
+            hub.disconnect(websocket)
+        assert hub.groups == {} and hub.unfiltered == set()
+
+    @pytest.mark.asyncio
+    async def test_subscribe_and_unsubscribe(self):
+        """A client narrowed to topics gets everything again once it drops them"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        websocket = make_websocket()
+        await hub.connect(websocket)
+
+        hub.subscribe(websocket, [call_topic("call_1")], ["fact_update"])
+        assert hub.subscriptions(websocket) == {"topics": ["call:call_1"], "types": ["fact_update"]}
+        assert hub.route("other_call", [call_topic("call_2")], "fact_update") == 0
+        assert hub.route("transcript", [call_topic("call_1")], "transcript_update") == 0
+
+        hub.unsubscribe(websocket, [call_topic("call_1")], ["fact_update"])
+        assert hub.subscriptions(websocket) == {"topics": [], "types": None}
+        assert hub.route("other_call", [call_topic("call_2")], "fact_update") == 1
+        hub.disconnect(websocket)
+
+    @pytest.mark.asyncio
+    async def test_call_updates_follow_the_call_region(self):
+        """Once a call's location is known, its later updates reach that region's subscribers"""
+        manager = ConnectionManager(batch_window_ms=0)
+        region, elsewhere = make_websocket(), make_websocket()
+        await manager.connect(region, topics=["cell:dps2"])
+        await manager.connect(elsewhere, topics=["cell:9q8y"])
+
+        manager.publish_update({"type": "transcript_update", "call_id": "call_1", "data": {"text": "Help"}})
+        manager.publish_update({
+            "type": "fact_update",
+            "call_id": "call_1",
+            "data": {"incident_fact": {"latitude": 42.2808, "longitude": -83.7430}}
+        })
+        manager.publish_update({"type": "transcript_update", "call_id": "call_1", "data": {"text": "Hurry"}})
+        await asyncio.sleep(0.01)
+
+        frames = [json.loads(frame) for frame in region.sent]
+        received = [message for frame in frames for message in frame.get("messages", [frame])]
+        assert [message["type"] for message in received] == ["fact_update", "transcript_update"]
+        assert elsewhere.sent == []
+        manager.disconnect(region)
+        manager.disconnect(elsewhere)
+
+    @pytest.mark.asyncio
+    async def test_location_text_is_geocoded_off_the_event_loop(self):
+        """Location text is geocoded in an executor before publishing, never inside publish_update"""
+        manager = ConnectionManager(batch_window_ms=0)
+        region = make_websocket()
+        await manager.connect(region, topics=["cell:dps2"])
+        geocoded_on = []
+
+        def geocode(text):
+            geocoded_on.append(threading.get_ident())
+            return MagicMock(lat=42.2808, lon=-83.7430)
+
+        update = {"type": "fact_update", "call_id": "call_1", "data": {"field": "location", "value": "412 Maple Avenue"}}
+        with patch("app.api.frontend_router.geocode", side_effect=geocode) as geocode_mock:
+            manager.publish_update(dict(update))
+            geocode_mock.assert_not_called()
+
+            await manager.geocode_update("call_1", update)
+            manager.publish_update(update)
+        await asyncio.sleep(0.01)
+
+        assert geocoded_on and geocoded_on[0] != threading.get_ident()
+        frames = [json.loads(frame) for frame in region.sent]
+        received = [message for frame in frames for message in frame.get("messages", [frame])]
+        assert [message["type"] for message in received] == ["fact_update"]
+        manager.disconnect(region)
+
+    @pytest.mark.asyncio
+    async def test_held_messages_follow_release_frame(self):
+        """A client connected with hold gets the catch-up frame before live updates"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=0)
+        websocket = make_websocket()
+        client = await hub.connect(websocket, groups=["call_1"], hold=True)
+
+        hub.broadcast("live_4", group="call_1")
+        await asyncio.sleep(0.01)
+        assert websocket.sent == []
+
+        client.release("snapshot_3")
+        await asyncio.sleep(0.01)
+        assert "".join(websocket.sent).index("snapshot_3") < "".join(websocket.sent).index("live_4")
+        hub.disconnect(websocket)
+
+    def test_unknown_overflow_policy(self):
+        """Only drop_oldest and disconnect are accepted"""
+        with pytest.raises(ValueError):
+            WebSocketHub(overflow="block")
+
+    @pytest.mark.asyncio
+    async def test_burst_is_batched_into_one_frame(self):
+        """Messages arriving within the batching window are sent as one frame"""
+        hub = WebSocketHub(max_queue=8, overflow="drop_oldest", send_timeout=5, batch_window_ms=20)
+        websocket = make_websocket()
+        await hub.connect(websocket)
+
+        for index in range(3):
+            hub.broadcast(dumps({"type": "transcript_update", "seq": index}))
+        await asyncio.sleep(0.05)
+
+        assert len(websocket.sent) == 1
+        frame = json.loads(websocket.sent[0])
+        assert frame["type"] == "batch"
+        assert [message["seq"] for message in frame["messages"]] == [0, 1, 2]
+        assert hub.stats()["frames_sent"] == 1
+        hub.disconnect(websocket)
+
+    def test_dumps_handles_uuid_and_datetime(self):
+        """Messages with UUIDs and datetimes serialize to compact JSON"""
+        case_id = uuid4()
+        encoded = dumps({"case_id": case_id, "at": datetime(2024, 1, 1)})
+
+        assert json.loads(encoded) == {"case_id": str(case_id), "at": "2024-01-01T00:00:00"}
+        assert " " not in encoded
+
+    def test_fact_updates_carry_changed_fields(self):
+        """Once a call has facts, only the fields that differ from them are sent"""
+        first = {"incident_fact": {"emergency_type": "Fire", "location": None}}
+        second = {"incident_fact": {"emergency_type": "Fire", "location": "412 Maple Avenue"}}
+
+        assert fact_changes(None, first) == first
+        assert fact_changes(first["incident_fact"], second) == {
+            "incident_fact": {"location": "412 Maple Avenue"},
+            "delta": True
+        }
+        assert fact_changes(second["incident_fact"], second) is None
+
+    @pytest.mark.asyncio
+    async def test_fact_delta_uses_shared_call_snapshot(self):
+        """Deltas are computed against the call's event log, which folds every worker's updates"""
+        event_log = MagicMock()
+        event_log.snapshot = AsyncMock(return_value={"facts": {"emergency_type": "Fire", "location": "412 Maple Avenue"}})
+        update = {"incident_fact": {"emergency_type": "Fire", "location": "412 Maple Avenue", "people_involved": 2}}
+
+        with patch("app.api.frontend_router.call_event_log", event_log), \
+             patch("app.api.frontend_router.get_redis_client", AsyncMock(return_value="client")):
+            delta = await fact_delta("call_1", update)
+
+        event_log.snapshot.assert_awaited_once_with("client", "call_1")
+        assert delta == {"incident_fact": {"people_involved": 2}, "delta": True}
@@ -27,6 +27,9 @@ CREATE INDEX IF NOT EXISTS idx_incident_logs_timestamp ON incident_logs(timestam
 -- Create index on incident_fact for JSON queries
 CREATE INDEX IF NOT EXISTS idx_incident_logs_incident_fact ON incident_logs USING GIN(incident_fact);
 
+-- Comms Agent writes each log row with an idempotency key; replayed inserts skip rows already stored
+ALTER TABLE incident_logs ADD COLUMN IF NOT EXISTS idempotency_key TEXT UNIQUE;
+
 -- Knowledge base table for storing strategic insights with vector embeddings
 CREATE TABLE IF NOT EXISTS knowledge_base (
     id SERIAL PRIMARY KEY,
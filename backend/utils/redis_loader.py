@@ -2,14 +2,19 @@
 Redis Loader for Emergency Dispatch System
 
 This script loads historical unit data from JSON into Redis for real-time access.
-It stores the most recent status update for each unit using Redis Hash structures.
+It stores the most recent status update for each unit in the unit state store
+schema (see app/database/unit_store.py), writing units in pipelined chunks and
+maintaining the type, status and GEO indexes in the same pass.
 """
 
 import json
+import re
 import redis
 import asyncio
+import itertools
 import logging
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, Iterator, List, Tuple
 from datetime import datetime
 import os
 import sys
@@ -18,11 +23,31 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.core.config import settings
+from app.database import unit_store
+from app.services.unit_history_service import UNIT_HISTORY_MAXLEN, UNIT_HISTORY_RETENTION_SECONDS, history_key, to_ms
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Loader limits
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_READ_SIZE = 64 * 1024
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_VALUE_SIZE = 64 * 1024 * 1024
+
+_json_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# Characters that matter when skipping a value: inside a string, and outside one
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURE_SPECIAL = re.compile(r'["{}\[\]]')
+# The rest of the buffer could still continue a number (e.g. "1." or "2e")
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*\Z')
+
+def timestamp_to_ms(timestamp: str) -> int:
+    """Convert an ISO timestamp to epoch milliseconds (naive timestamps are UTC)"""
+    return to_ms(datetime.fromisoformat(timestamp))
+
 class RedisLoader:
     """Handles loading unit data into Redis"""
     
@@ -56,6 +81,139 @@ class RedisLoader:
             logger.error(f"❌ Invalid JSON in file {file_path}: {e}")
             raise
     
+    def iter_units_from_file(
+        self,
+        file_path: str,
+        read_size: int = DEFAULT_READ_SIZE,
+        max_value_size: int = DEFAULT_MAX_VALUE_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Incrementally parse the `units` array of a historical data file.
+        
+        Yields one unit at a time, so memory stays bounded by the largest single
+        unit rather than the whole document. A unit larger than `max_value_size`
+        characters raises a JSONDecodeError. Other top-level values are skipped
+        by scanning their brackets and strings, without decoding them.
+        """
+        with open(file_path, 'r') as f:
+            buffer = ''
+            pos = 0
+            eof = False
+            
+            def fill(size: int = read_size) -> bool:
+                nonlocal buffer, pos, eof
+                if eof:
+                    return False
+                chunk = f.read(size)
+                if not chunk:
+                    eof = True
+                    return False
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                return True
+            
+            def next_char() -> str:
+                nonlocal pos
+                while True:
+                    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                        pos += 1
+                    if pos < len(buffer):
+                        return buffer[pos]
+                    if not fill():
+                        raise json.JSONDecodeError("Unexpected end of file", buffer, pos)
+            
+            def decode_value() -> Any:
+                nonlocal pos
+                next_char()
+                while True:
+                    try:
+                        value, end = _json_decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        # Value may be split across reads; pull in more data
+                        if eof:
+                            raise
+                        if len(buffer) - pos > max_value_size:
+                            raise json.JSONDecodeError(f"Value larger than {max_value_size} characters", buffer, pos)
+                        # Read as much as is buffered, so a large value is re-decoded O(log n) times
+                        fill(max(read_size, len(buffer) - pos))
+                        continue
+                    # A number cut by the read boundary decodes as its prefix; wait for what follows it
+                    if not eof and isinstance(value, (int, float)) and _NUMBER_TAIL.match(buffer, end):
+                        fill()
+                        continue
+                    pos = end
+                    return value
+            
+            def skip_value() -> None:
+                nonlocal pos
+                if next_char() not in '{["':
+                    decode_value()
+                    return
+                depth = 0
+                in_string = False
+                while True:
+                    match = (_STRING_SPECIAL if in_string else _STRUCTURE_SPECIAL).search(buffer, pos)
+                    if match is None:
+                        # Consumed data is dropped by the next read
+                        pos = len(buffer)
+                        if not fill():
+                            raise json.JSONDecodeError("Unexpected end of file", buffer, pos)
+                        continue
+                    char = match.group()
+                    if char == '\\':
+                        if match.end() == len(buffer):
+                            # The escaped character is in the next read
+                            pos = match.start()
+                            if not fill():
+                                raise json.JSONDecodeError("Unexpected end of file", buffer, pos)
+                            continue
+                        pos = match.end() + 1
+                        continue
+                    pos = match.end()
+                    if char == '"':
+                        in_string = not in_string
+                    elif char in '{[':
+                        depth += 1
+                    else:
+                        depth -= 1
+                    if depth == 0 and not in_string:
+                        return
+            
+            def expect(char: str) -> None:
+                nonlocal pos
+                if next_char() != char:
+                    raise json.JSONDecodeError(f"Expecting '{char}'", buffer, pos)
+                pos += 1
+            
+            expect('{')
+            if next_char() == '}':
+                return
+            while True:
+                key = decode_value()
+                expect(':')
+                if key == 'units':
+                    expect('[')
+                    if next_char() == ']':
+                        pos += 1
+                    else:
+                        while True:
+                            yield decode_value()
+                            separator = next_char()
+                            pos += 1
+                            if separator == ']':
+                                break
+                            if separator != ',':
+                                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos - 1)
+                else:
+                    skip_value()
+                
+                separator = next_char()
+                pos += 1
+                if separator == '}':
+                    return
+                if separator != ',':
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos - 1)
+    
     def get_latest_status(self, unit: Dict[str, Any]) -> Dict[str, Any]:
         """Extract the latest status from unit's status history"""
         if unit['type'] == 'HOSPITAL':
@@ -96,110 +254,243 @@ class RedisLoader:
             }
     
     async def store_unit_in_redis(self, unit_data: Dict[str, Any]) -> None:
-        """Store a single unit's data in Redis as a Hash"""
+        """Store a single unit's state and index entries in one round trip"""
         try:
-            unit_id = unit_data['unit_id']
-            unit_type = unit_data['type']
-            
-            # Create Redis key
-            redis_key = f"unit:{unit_id}"
+            def write():
+                pipe = self.redis_client.pipeline(transaction=True)
+                unit_store.queue_unit_write(pipe, unit_data)
+                pipe.execute()
             
-            # Prepare data for Redis Hash
-            redis_data = {
-                'unit_id': unit_data['unit_id'],
-                'type': unit_data['type'],
-                'status': unit_data['status'],
-                'location': json.dumps(unit_data['location']),  # Store as JSON string
-                'last_updated': unit_data['last_updated']
-            }
-            
-            # Add hospital-specific fields if applicable
-            if unit_type == 'HOSPITAL':
-                redis_data.update({
-                    'name': unit_data.get('name', ''),
-                    'er_capacity': str(unit_data.get('er_capacity', 0)),
-                    'current_patients': str(unit_data.get('current_patients', 0)),
-                    'available_beds': str(unit_data.get('available_beds', 0)),
-                    'specialties': json.dumps(unit_data.get('specialties', []))
-                })
+            await asyncio.get_event_loop().run_in_executor(None, write)
             
-            # Store in Redis
-            await asyncio.get_event_loop().run_in_executor(
-                None, 
-                lambda: self.redis_client.hset(redis_key, mapping=redis_data)
-            )
-            
-            # Set expiration (24 hours)
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.redis_client.expire(redis_key, 86400)
-            )
-            
-            logger.debug(f"✅ Stored unit {unit_id} in Redis")
+            logger.debug(f"✅ Stored unit {unit_data['unit_id']} in Redis")
             
         except Exception as e:
             logger.error(f"❌ Failed to store unit {unit_data.get('unit_id', 'unknown')}: {e}")
             raise
     
-    async def load_all_units(self, data: Dict[str, Any]) -> None:
-        """Load all units from data into Redis"""
-        units = data.get('units', [])
-        logger.info(f"🔄 Loading {len(units)} units into Redis...")
+    def queue_status_history(self, pipe, unit: Dict[str, Any]) -> None:
+        """
+        Queue a unit's full status history as a capped Redis Stream for replay.
         
-        success_count = 0
+        Entries are keyed by their original timestamp (milliseconds) so XRANGE
+        queries by time work directly. The stream is rebuilt from scratch and
+        expires UNIT_HISTORY_RETENTION_SECONDS after the load, like live history.
+        """
+        history = unit.get('status_history') or []
+        if not history:
+            return
+        
+        stream_key = history_key(unit['unit_id'])
+        pipe.delete(stream_key)
+        
+        # Sort on the time only; samples sharing a timestamp keep their file order
+        entries = sorted(
+            ((timestamp_to_ms(entry['timestamp']), entry) for entry in history),
+            key=lambda item: item[0]
+        )
+        for seq, (ms, entry) in enumerate(entries[-UNIT_HISTORY_MAXLEN:]):
+            lat, lon = entry['location'][0], entry['location'][1]
+            pipe.xadd(
+                stream_key,
+                {'lat': lat, 'lon': lon, 'status': entry['status']},
+                id=f"{ms}-{seq}"
+            )
+        pipe.expire(stream_key, UNIT_HISTORY_RETENTION_SECONDS)
+    
+    def _write_chunk(self, units: List[Dict[str, Any]], write_history: bool = False) -> Tuple[int, int]:
+        """
+        Write a chunk of units and their index entries in one pipelined round trip.
+        
+        Type, status and GEO index entries are written in the same pass over
+        the chunk, so no follow-up scan of the keyspace is needed. With
+        `write_history`, each unit's status history is also written to its
+        per-unit stream.
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        loaded_ids: List[str] = []
         error_count = 0
         
         for unit in units:
             try:
-                # Get latest status for the unit
                 latest_status = self.get_latest_status(unit)
+                unit_store.queue_unit_write(pipe, latest_status)
                 
-                # Store in Redis
-                await self.store_unit_in_redis(latest_status)
-                success_count += 1
+                if write_history:
+                    self.queue_status_history(pipe, unit)
                 
+                loaded_ids.append(latest_status['unit_id'])
             except Exception as e:
                 logger.error(f"❌ Error processing unit {unit.get('unit_id', 'unknown')}: {e}")
                 error_count += 1
         
-        logger.info(f"📊 Load Summary: {success_count} successful, {error_count} errors")
+        if not loaded_ids:
+            return 0, error_count
+        
+        results = pipe.execute(raise_on_error=False)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.error(f"❌ {len(failed)} Redis commands failed in chunk: {failed[0]}")
+            return 0, error_count + len(loaded_ids)
+        
+        return len(loaded_ids), error_count
+    
+    async def load_all_units(self, data: Dict[str, Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Load all units from data into Redis using chunked pipelines.
+        
+        Each chunk is written in a single round trip together with its index
+        entries. Returns load statistics including throughput.
+        """
+        units = data.get('units', [])
+        logger.info(f"🔄 Loading {len(units)} units into Redis (chunk size {chunk_size})...")
+        
+        success_count = 0
+        error_count = 0
+        start_time = time.perf_counter()
+        
+        for offset in range(0, len(units), chunk_size):
+            chunk = units[offset:offset + chunk_size]
+            loaded, errors = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda c=chunk: self._write_chunk(c)
+            )
+            success_count += loaded
+            error_count += errors
+        
+        elapsed = time.perf_counter() - start_time
+        stats = {
+            'loaded': success_count,
+            'errors': error_count,
+            'chunks': (len(units) + chunk_size - 1) // chunk_size,
+            'elapsed_seconds': round(elapsed, 4),
+            'units_per_second': round(success_count / elapsed, 1) if elapsed > 0 else float(success_count)
+        }
+        
+        logger.info(
+            f"📊 Load Summary: {success_count} successful, {error_count} errors "
+            f"in {stats['elapsed_seconds']}s ({stats['units_per_second']} units/s)"
+        )
+        return stats
+    
+    async def load_units_streaming(
+        self,
+        file_path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        write_history: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Stream units from a (possibly very large) file into Redis.
+        
+        The file is parsed incrementally and at most `concurrency` chunks are
+        being written at once, so memory stays bounded regardless of file size.
+        With `write_history`, full status histories are written to per-unit
+        streams for replay.
+        """
+        logger.info(f"🔄 Streaming units from {file_path} (chunk size {chunk_size}, concurrency {concurrency})...")
+        
+        loop = asyncio.get_event_loop()
+        units = self.iter_units_from_file(file_path)
+        semaphore = asyncio.Semaphore(concurrency)
+        pending = set()
+        totals = {'loaded': 0, 'errors': 0, 'chunks': 0}
+        start_time = time.perf_counter()
+        
+        def read_chunk() -> List[Dict[str, Any]]:
+            return list(itertools.islice(units, chunk_size))
+        
+        async def write(chunk: List[Dict[str, Any]]) -> None:
+            try:
+                loaded, errors = await loop.run_in_executor(
+                    None,
+                    lambda: self._write_chunk(chunk, write_history)
+                )
+                totals['loaded'] += loaded
+                totals['errors'] += errors
+            finally:
+                semaphore.release()
+        
+        try:
+            while True:
+                await semaphore.acquire()
+                chunk = await loop.run_in_executor(None, read_chunk)
+                if not chunk:
+                    semaphore.release()
+                    break
+                totals['chunks'] += 1
+                task = asyncio.create_task(write(chunk))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            if pending:
+                await asyncio.gather(*pending)
+        
+        elapsed = time.perf_counter() - start_time
+        stats = {
+            **totals,
+            'elapsed_seconds': round(elapsed, 4),
+            'units_per_second': round(totals['loaded'] / elapsed, 1) if elapsed > 0 else float(totals['loaded'])
+        }
+        
+        logger.info(
+            f"📊 Stream Load Summary: {stats['loaded']} successful, {stats['errors']} errors "
+            f"in {stats['elapsed_seconds']}s ({stats['units_per_second']} units/s)"
+        )
+        return stats
     
     async def create_indexes(self) -> None:
-        """Create Redis indexes for efficient querying"""
+        """
+        Rebuild the unit indexes from the unit hashes already in Redis.
+        
+        Every write path maintains the indexes, so this is only needed to
+        recover from index loss. It walks the keyspace with SCAN and reads
+        unit fields with one pipelined round trip per batch.
+        """
         try:
-            # Create sets for each unit type for fast lookup
-            unit_types = ['POLICE', 'FIRE', 'EMS', 'HOSPITAL']
-            
-            for unit_type in unit_types:
-                # Get all units of this type
-                pattern = f"unit:*"
-                keys = await asyncio.get_event_loop().run_in_executor(
-                    None, 
-                    lambda: self.redis_client.keys(pattern)
-                )
+            def rebuild() -> Dict[str, int]:
+                counts: Dict[str, int] = {}
+                batch: List[str] = []
                 
-                # Filter by type and add to type set
-                type_units = []
-                for key in keys:
-                    unit_type_in_redis = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda k=key: self.redis_client.hget(k, 'type')
-                    )
-                    if unit_type_in_redis == unit_type:
-                        type_units.append(key)
+                def flush():
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for key in batch:
+                        pipe.hmget(key, 'unit_id', 'type', 'status', 'lat', 'lon')
+                    rows = pipe.execute(raise_on_error=False)
+                    
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for row in rows:
+                        # Skip keys that are not unit hashes in the current schema
+                        if isinstance(row, Exception) or not row[0] or row[3] is None:
+                            continue
+                        unit_id, unit_type, status, lat, lon = row
+                        try:
+                            status = unit_store.normalize_status(status)
+                        except ValueError:
+                            continue
+                        unit_store.queue_unit_indexes(
+                            pipe,
+                            unit_id,
+                            unit_store.normalize_type(unit_type),
+                            status,
+                            float(lat),
+                            float(lon)
+                        )
+                        counts[unit_type] = counts.get(unit_type, 0) + 1
+                    pipe.execute()
+                    batch.clear()
                 
-                # Store in type-specific set
-                if type_units:
-                    type_key = f"units:{unit_type.lower()}"
-                    await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: self.redis_client.sadd(type_key, *type_units)
-                    )
-                    await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: self.redis_client.expire(type_key, 86400)
-                    )
-                    logger.info(f"📋 Created index for {len(type_units)} {unit_type} units")
+                for key in self.redis_client.scan_iter(match=f"{unit_store.UNIT_KEY_PREFIX}*", count=DEFAULT_CHUNK_SIZE):
+                    batch.append(key)
+                    if len(batch) >= DEFAULT_CHUNK_SIZE:
+                        flush()
+                if batch:
+                    flush()
+                return counts
+            
+            counts = await asyncio.get_event_loop().run_in_executor(None, rebuild)
+            for unit_type, count in counts.items():
+                logger.info(f"📋 Indexed {count} {unit_type} units")
             
         except Exception as e:
             logger.error(f"❌ Failed to create indexes: {e}")
@@ -208,23 +499,20 @@ class RedisLoader:
     async def verify_data(self) -> None:
         """Verify that data was loaded correctly"""
         try:
-            # Count total units
-            pattern = "unit:*"
-            keys = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.redis_client.keys(pattern)
-            )
+            # Read index cardinalities in one round trip instead of scanning keys
+            unit_types = unit_store.UNIT_TYPES
             
-            logger.info(f"🔍 Verification: Found {len(keys)} units in Redis")
+            def read_counts():
+                pipe = self.redis_client.pipeline(transaction=False)
+                for unit_type in unit_types:
+                    pipe.scard(unit_store.type_key(unit_type))
+                pipe.zcard(unit_store.UNIT_GEO_KEY)
+                return pipe.execute()
             
-            # Count by type
-            unit_types = ['POLICE', 'FIRE', 'EMS', 'HOSPITAL']
-            for unit_type in unit_types:
-                type_key = f"units:{unit_type.lower()}"
-                count = await asyncio.get_event_loop().run_in_executor(
-                    None,
-                    lambda: self.redis_client.scard(type_key)
-                )
+            *type_counts, geo_count = await asyncio.get_event_loop().run_in_executor(None, read_counts)
+            
+            logger.info(f"🔍 Verification: Found {sum(type_counts)} units in Redis ({geo_count} geo-indexed)")
+            for unit_type, count in zip(unit_types, type_counts):
                 logger.info(f"   {unit_type}: {count} units")
             
         except Exception as e:
@@ -237,7 +525,7 @@ class RedisLoader:
             await asyncio.get_event_loop().run_in_executor(None, self.redis_client.close)
             logger.info("🔌 Redis connection closed")
 
-async def main():
+async def main(args):
     """Main function to load data into Redis"""
     print("=" * 60)
     print("🔄 REDIS LOADER - EMERGENCY DISPATCH SYSTEM")
@@ -250,15 +538,13 @@ async def main():
         # Connect to Redis
         await loader.connect()
         
-        # Load data from file
-        data_file = "backend/data/historical_unit_data.json"
-        data = await loader.load_units_from_file(data_file)
-        
-        # Load all units into Redis
-        await loader.load_all_units(data)
-        
-        # Create indexes
-        await loader.create_indexes()
+        # Stream units from file into Redis (indexes are built in the same pass)
+        await loader.load_units_streaming(
+            args.file,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            write_history=args.history
+        )
         
         # Verify data
         await loader.verify_data()
@@ -275,4 +561,12 @@ async def main():
         await loader.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Load historical unit data into Redis")
+    parser.add_argument("file", nargs="?", default="backend/data/historical_unit_data.json", help="Historical unit data file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Units per pipelined write")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Chunks written in parallel")
+    parser.add_argument("--history", action="store_true", help="Also write full status history streams for replay")
+    
+    asyncio.run(main(parser.parse_args()))